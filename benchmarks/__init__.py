@@ -0,0 +1 @@
+"""Stand-alone load and micro benchmarks; run modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,89 @@
+"""ABAC decisions/sec: memoized, compiled and indexed vs evaluating every policy.
+
+Defines ``--policies`` policies spread over ``--resources`` resource types and
+asks ``--decisions`` questions from a pool of ``--subjects`` subjects. Reports
+memoized decisions (subject attributes only), record-level decisions (the
+compiled closures run every time) and a baseline that ``eval``s every policy's
+code object against every request with no resource index.
+
+    python -m benchmarks.abac_policy --policies 500 --resources 50 --decisions 2000000
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from src.services.abac import Attributes, PolicyEngine
+
+TEMPLATES = (
+    "subject.department == resource.department and action in ['read', 'approve']",
+    "subject.level >= {level} and action != 'delete'",
+    "subject.role == 'auditor' and action == 'read'",
+    "subject.id == resource.owner_id or subject.role in ['admin', 'finance']",
+)
+ACTIONS = ("read", "approve", "update", "delete")
+
+
+def _report(label, count, elapsed):
+    print(f"{label:<26}: {count:,} decisions in {elapsed:.2f}s ({count / elapsed:,.0f}/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=200)
+    parser.add_argument("--resources", type=int, default=40)
+    parser.add_argument("--subjects", type=int, default=1_000)
+    parser.add_argument("--decisions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    engine = PolicyEngine(memo_size=args.subjects * args.resources * len(ACTIONS))
+    policies = []
+    for i in range(args.policies):
+        expression = TEMPLATES[i % len(TEMPLATES)].format(level=rng.randint(2, 6))
+        resource = f"res{i % args.resources}"
+        effect = "deny" if i % 17 == 0 else "allow"
+        engine.define(f"p{i}", expression, effect, resources=[resource])
+        policies.append((resource, effect, compile(expression, f"p{i}", "eval")))
+    subjects = [
+        Attributes(id=i, department=f"d{i % 20}", level=rng.randint(1, 6), role=rng.choice(["staff", "auditor", "admin"]))
+        for i in range(args.subjects)
+    ]
+    requests = [
+        (rng.choice(subjects), f"res{rng.randrange(args.resources)}", rng.choice(ACTIONS))
+        for _ in range(min(args.decisions, 200_000))
+    ]
+    record = {"department": "d3", "owner_id": 42}
+    repeats = max(1, args.decisions // len(requests))
+    total = repeats * len(requests)
+
+    decide = engine.decide
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for subject, resource, action in requests:
+            decide(subject, resource, action)
+    _report("memoized", total, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for subject, resource, action in requests:
+            decide(subject, resource, action, record)
+    _report("compiled, per record", total, time.perf_counter() - started)
+
+    sample = requests[: max(1, len(requests) // 20)]
+    resource_ns = SimpleNamespace(**record)
+    started = time.perf_counter()
+    for subject, resource, action in sample:
+        scope = {"subject": SimpleNamespace(**subject), "resource": resource_ns, "action": action}
+        allowed = denied = False
+        for target, effect, code in policies:
+            if target == resource and eval(code, {}, scope):
+                denied = denied or effect == "deny"
+                allowed = allowed or effect == "allow"
+        _ = allowed and not denied
+    _report("eval every policy", len(sample), time.perf_counter() - started)
+    print(engine.metrics())
+
+
+if __name__ == "__main__":
+    main()
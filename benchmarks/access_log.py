@@ -0,0 +1,82 @@
+"""Request-path cost of the access logger and its writer throughput.
+
+Logs ``--records`` access records from ``--threads`` threads as fast as
+possible and reports the per-call cost on the request path and the rate the
+background writer sustains, then paces ``--rate`` records/s for ``--seconds``
+to show the steady-state overhead and how far the writer lags behind.
+
+    python -m benchmarks.access_log --records 500000 --rate 5000
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+from src.middleware.logging_middleware import AccessLogger
+
+RECORD = ("GET", "/api/todos?limit=20", "/api/todos", 200, 0.00042, "admin", "10.0.0.7")
+
+
+def burst(directory: str, records: int, threads: int):
+    log = AccessLogger("burst", directory=directory, capacity=records + 1)
+    per_thread = records // threads
+    costs = []
+
+    def produce():
+        log_ = log.log
+        now = time.time
+        started = time.perf_counter()
+        for _ in range(per_thread):
+            log_((now(), *RECORD))
+        costs.append((time.perf_counter() - started) / per_thread)
+
+    workers = [threading.Thread(target=produce) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    log.close()
+    elapsed = time.perf_counter() - started
+    print(f"burst: {per_thread * threads:,} records from {threads} threads")
+    print(f"  log() cost      : {sum(costs) / len(costs) * 1e6:.2f} us/call")
+    print(f"  written         : {log.written:,} in {log.batches:,} batches, {log.written / elapsed:,.0f} records/s")
+
+
+def paced(directory: str, rate: int, seconds: float):
+    log = AccessLogger("paced", directory=directory)
+    interval = 1.0 / rate
+    total = int(rate * seconds)
+    spent = 0.0
+    max_pending = 0
+    deadline = time.perf_counter()
+    for _ in range(total):
+        deadline += interval
+        started = time.perf_counter()
+        log.log((time.time(), *RECORD))
+        spent += time.perf_counter() - started
+        max_pending = max(max_pending, len(log._pending))
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    log.close()
+    print(f"paced: {total:,} records at {rate:,}/s")
+    print(f"  log() cost      : {spent / total * 1e6:.2f} us/call")
+    print(f"  max queue depth : {max_pending:,} (flush every {log.flush_interval * 1000:.0f} ms)")
+    print(f"  written/dropped : {log.written:,}/{log.dropped:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=300_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rate", type=int, default=5_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        burst(directory, args.records, args.threads)
+        paced(directory, args.rate, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""DAO layer benchmark: bulk inserts and deep pagination on SQLite.
+
+Inserts ``--rows`` documents one row per statement and via batched
+``executemany``, then compares reading a deep page with ``LIMIT/OFFSET``
+against keyset pagination (``WHERE id > ? LIMIT``), and finishes with a
+concurrent point-lookup run through the connection pool.
+
+    python -m benchmarks.dao_bulk --rows 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from src.dao.base import ConnectionPool, ensure_schema
+from src.dao.document_dao import DocumentDAO
+
+
+def _docs(start: int, count: int):
+    for i in range(start, start + count):
+        yield {"name": f"doc-{i}.pdf", "path": f"/docs/{i}.pdf", "type": "pdf", "owner_id": i % 1000 + 1, "folder_id": i % 50, "version": 1}
+
+
+def run(rows: int, batch: int, single: int, threads: int, lookups: int, pool_size: int):
+    path = os.path.join(tempfile.mkdtemp(), "dao_bench.sqlite3")
+    pool = ConnectionPool(f"sqlite:///{path}", size=pool_size)
+    ensure_schema(pool)
+    dao = DocumentDAO(pool)
+
+    started = time.perf_counter()
+    for record in _docs(0, single):
+        dao.insert(record)
+    single_s = time.perf_counter() - started
+    print(f"insert (1 row / txn):   {single / single_s:>12,.0f} rows/s over {single:,} rows")
+
+    started = time.perf_counter()
+    dao.insert_many(_docs(single, rows), batch_size=batch)
+    bulk_s = time.perf_counter() - started
+    print(f"insert_many (batch {batch}): {rows / bulk_s:>9,.0f} rows/s over {rows:,} rows")
+
+    total = dao.count()
+    offset = max(0, total - 100)
+    with pool.connection() as conn:
+        started = time.perf_counter()
+        conn.execute("SELECT * FROM document ORDER BY id LIMIT 100 OFFSET ?", (offset,)).fetchall()
+        offset_s = time.perf_counter() - started
+        last_id = conn.execute("SELECT id FROM document ORDER BY id LIMIT 1 OFFSET ?", (offset,)).fetchone()[0]
+    started = time.perf_counter()
+    dao.page(after=last_id - 1, limit=100)
+    keyset_s = time.perf_counter() - started
+    print(f"deep page @{offset:,}: OFFSET {offset_s * 1000:.2f} ms vs keyset {keyset_s * 1000:.3f} ms")
+
+    started = time.perf_counter()
+    scanned = sum(1 for _ in dao.iter_all(batch_size=1000))
+    print(f"iter_all over {scanned:,} rows: {(time.perf_counter() - started) * 1000:,.0f} ms")
+
+    ids = [random.randint(1, total) for _ in range(lookups)]
+
+    def reader(chunk):
+        for key in chunk:
+            dao.get(key)
+
+    workers = [threading.Thread(target=reader, args=(ids[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    print(f"get() x{lookups:,} on {threads} threads / pool of {pool_size}: {lookups / elapsed:,.0f}/s")
+    pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--single", type=int, default=5_000, help="rows inserted one statement at a time")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=50_000)
+    parser.add_argument("--pool-size", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.batch, args.single, args.threads, args.lookups, args.pool_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Data-scope listing: filters pushed into SQL vs fetching everything and filtering in Python.
+
+Builds an org tree ``--depth`` levels deep with ``--fanout`` children per
+department, ``--users`` users spread over it and ``--documents`` documents
+owned by them. For managers at each level it times listing the first page of
+their ``department_tree`` scope and counting it, with the scope resolved by
+``DataScopes`` and applied by ``DocumentDAO.page``/``count``. The baseline is
+what the scope would cost without pushdown: read the department table and
+walk it per request, then scan every document and user row in Python.
+
+    python -m benchmarks.data_scope --documents 200000 --users 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from src.dao.base import ConnectionPool, ensure_schema
+from src.dao.department_dao import DepartmentDAO
+from src.dao.document_dao import DocumentDAO
+from src.dao.user_dao import UserDAO
+from src.services.data_scope import DEPARTMENT_TREE, DataScopes
+from src.services.org_tree import OrgTree
+
+
+def _build_tree(depts: DepartmentDAO, depth: int, fanout: int):
+    levels = [[depts.insert({"name": "HQ"})]]
+    for level in range(1, depth):
+        levels.append([
+            depts.insert({"name": f"L{level}-{parent}-{i}", "parent_id": parent})
+            for parent in levels[-1]
+            for i in range(fanout)
+        ])
+    return levels
+
+
+def _python_filter(depts: DepartmentDAO, users: UserDAO, docs: DocumentDAO, dept_id: int, limit: int):
+    children = defaultdict(list)
+    for row in depts.hierarchy():
+        children[row["parent_id"]].append(row["id"])
+    allowed, stack = set(), [dept_id]
+    while stack:
+        current = stack.pop()
+        allowed.add(current)
+        stack.extend(children[current])
+    owners = {user["id"] for user in users.iter_all(batch_size=5000) if user["dept_id"] in allowed}
+    rows = [doc for doc in docs.iter_all(batch_size=5000) if doc["owner_id"] in owners]
+    return rows[:limit], len(rows)
+
+
+def _time(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--documents", type=int, default=200_000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "data_scope_bench.sqlite3")
+    pool = ConnectionPool(f"sqlite:///{path}", size=2)
+    ensure_schema(pool)
+    depts, users, docs = DepartmentDAO(pool), UserDAO(pool), DocumentDAO(pool)
+    levels = _build_tree(depts, args.depth, args.fanout)
+    all_depts = [dept for level in levels for dept in level]
+    rng = random.Random(3)
+    users.insert_many(
+        {"username": f"u{i}", "password": "x", "real_name": f"U{i}", "dept_id": rng.choice(all_depts)}
+        for i in range(args.users)
+    )
+    docs.insert_many(
+        {"name": f"doc-{i}", "path": f"/docs/{i}", "type": "pdf", "owner_id": rng.randint(1, args.users)}
+        for i in range(args.documents)
+    )
+    print(f"{len(all_depts):,} departments, {args.users:,} users, {args.documents:,} documents")
+
+    scopes = DataScopes(OrgTree(depts, users), users)
+    for level, ids in enumerate(levels):
+        dept_id = ids[0]
+        manager = users.insert({"username": f"manager{level}", "password": "x", "real_name": "M", "dept_id": dept_id})
+        scopes.set_scope(manager, DEPARTMENT_TREE)
+
+        def pushed():
+            scope = scopes.scope_for(manager)
+            return docs.page(limit=args.page, scope=scope), docs.count(scope=scope)
+
+        pushed_s, (page, count) = _time(pushed, args.repeat)
+        python_s, (py_page, py_count) = _time(
+            lambda: _python_filter(depts, users, docs, dept_id, args.page), max(1, args.repeat // 10)
+        )
+        assert count == py_count and page == py_page
+        print(
+            f"level {level}: {len(scopes.scope_for(manager).departments):>5,} depts, {count:>7,} rows | "
+            f"pushdown {pushed_s * 1000:8.2f} ms | python filter {python_s * 1000:8.2f} ms | {python_s / pushed_s:6.1f}x"
+        )
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
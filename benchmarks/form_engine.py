@@ -0,0 +1,108 @@
+"""Compiled form validation vs interpreting the schema on every call.
+
+Builds a ``--fields`` field form covering every field type and validates
+``--rows`` submissions three ways: an interpreter that walks the schema dicts
+per submission, the compiled validator one row at a time, and
+``validate_many`` over the whole batch. Also times the cached lookup by schema
+(hashing included) and rendering.
+
+    python -m benchmarks.form_engine --fields 50 --rows 20000
+"""
+import argparse
+import datetime
+import re
+import time
+
+from src.workflow.form_engine import FORMS, compile_form
+
+TYPES = ("string", "number", "integer", "boolean", "date", "select", "text")
+
+
+def build_schema(fields):
+    specs = []
+    for i in range(fields):
+        kind = TYPES[i % len(TYPES)]
+        spec = {"name": f"f{i}", "label": f"Field {i}", "type": kind, "required": i % 3 == 0}
+        if kind in ("number", "integer"):
+            spec.update(min=0, max=1_000_000)
+        elif kind == "select":
+            spec["options"] = ["a", "b", "c", "d"]
+        elif kind in ("string", "text"):
+            spec.update(max_length=200, pattern="[\\w ]*") if i % 2 else spec.update(max_length=200)
+        specs.append(spec)
+    return {"fields": specs}
+
+
+def build_row(schema, i):
+    values = {"string": f"value {i}", "text": "long text", "number": str(i * 1.5), "integer": i,
+              "boolean": "on", "date": "2024-05-01", "select": "b"}
+    return {spec["name"]: values[spec["type"]] for spec in schema["fields"]}
+
+
+def interpret(schema, data):
+    """Baseline: re-read every field spec and branch on its type per submission."""
+    cleaned, errors = {}, {}
+    for spec in schema["fields"]:
+        name, kind = spec["name"], spec.get("type", "string")
+        value = data.get(name)
+        if value is None or value == "":
+            if spec.get("required"):
+                errors[name] = "is required"
+            elif "default" in spec:
+                cleaned[name] = spec["default"]
+            continue
+        try:
+            if kind in ("string", "text"):
+                if not isinstance(value, str):
+                    raise ValueError("must be a string")
+                if "max_length" in spec and len(value) > spec["max_length"]:
+                    raise ValueError("too long")
+                if spec.get("pattern") and not re.fullmatch(spec["pattern"], value):
+                    raise ValueError("has an invalid format")
+            elif kind in ("number", "integer"):
+                value = float(value) if kind == "number" else int(value)
+                if "min" in spec and value < spec["min"] or "max" in spec and value > spec["max"]:
+                    raise ValueError("out of range")
+            elif kind == "boolean":
+                value = str(value).lower() in ("true", "1", "on", "yes")
+            elif kind == "date":
+                datetime.date.fromisoformat(value)
+            elif kind == "select" and value not in spec["options"]:
+                raise ValueError("is not one of the options")
+            cleaned[name] = value
+        except ValueError as exc:
+            errors[name] = str(exc)
+    return cleaned, errors
+
+
+def _timed(label, rows, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24}: {elapsed * 1000:8.1f} ms ({elapsed / rows * 1e6:6.1f} us/submission)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fields", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    schema = build_schema(args.fields)
+    rows = [build_row(schema, i) for i in range(args.rows)]
+    started = time.perf_counter()
+    form = compile_form(schema)
+    print(f"compile                 : {(time.perf_counter() - started) * 1000:8.2f} ms for {args.fields} fields")
+    assert all(not interpret(schema, row)[1] for row in rows[:10]) and not form.validate_many(rows[:10]).errors
+
+    baseline = _timed("interpreted", args.rows, lambda: [interpret(schema, row) for row in rows])
+    compiled = _timed("compiled, per row", args.rows, lambda: [form.check(row) for row in rows])
+    batch = _timed("compiled, validate_many", args.rows, lambda: form.validate_many(rows))
+    _timed("cached lookup + check", args.rows, lambda: [FORMS.get(schema).check(row) for row in rows])
+    _timed("render", args.rows, lambda: [form.render(row) for row in rows])
+    print(f"speedup vs interpreted  : {baseline / compiled:.1f}x per row, {baseline / batch:.1f}x batched")
+
+
+if __name__ == "__main__":
+    main()
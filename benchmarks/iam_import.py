@@ -0,0 +1,54 @@
+"""Bulk user import throughput: users/sec through the streaming CSV importer.
+
+Writes a ``--users`` row CSV (``--password-ratio`` of rows carry a password and
+``--duplicates`` repeat an earlier username), then imports it into a fresh
+SQLite file with one hashing worker and with ``--workers``.
+
+    python -m benchmarks.iam_import --users 200000 --workers 8 --iterations 260000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from src.dao.base import ConnectionPool, ensure_schema
+from src.dao.user_dao import UserDAO
+from src.services.iam_import import UserImporter, read_csv
+
+
+def _write_source(path, users, password_ratio, duplicates):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["username", "real_name", "password", "email", "dept_id"])
+        for i in range(users):
+            n = random.randrange(i) if i and random.random() < duplicates else i
+            password = f"pw-{n}" if random.random() < password_ratio else ""
+            writer.writerow([f"user{n}", f"User {n}", password, f"user{n}@example.com", n % 50 + 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--chunk", type=int, default=1_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--password-ratio", type=float, default=0.2)
+    parser.add_argument("--duplicates", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "users.csv")
+        _write_source(source, args.users, args.password_ratio, args.duplicates)
+        for workers in sorted({1, args.workers}):
+            pool = ConnectionPool(f"sqlite:///{directory}/import-{workers}.db", size=2)
+            ensure_schema(pool)
+            importer = UserImporter(UserDAO(pool), chunk_size=args.chunk, workers=workers, iterations=args.iterations)
+            report = importer.run(read_csv(source), source=source)
+            print(f"{workers} worker(s): {report.imported:,} imported, {report.duplicates:,} duplicates, "
+                  f"{report.invalid} invalid in {report.elapsed:.2f}s ({report.users_per_sec:,.0f} users/s)")
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
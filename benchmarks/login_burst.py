@@ -0,0 +1,105 @@
+"""Login throughput and latency under a burst of concurrent logins.
+
+Starts the server in-process, releases ``--logins`` concurrent ``/api/login``
+calls at once and, meanwhile, polls ``/api/me`` from one already logged-in
+client to show what the burst does to everyone else. Runs with password checks
+inline in the request threads and on the credential process pool.
+
+    python -m benchmarks.login_burst --logins 500 --iterations 260000 --workers 8
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from typing import List
+
+import src.web.server as web
+from benchmarks.server_load import _login, _percentile
+from src.middleware.rate_limit_middleware import LIMITS
+from src.services.credentials import CredentialVerifier, hash_password
+
+
+def _attempt(port: int, barrier: threading.Barrier, latencies: List[float], statuses: List[int]) -> None:
+    barrier.wait()
+    started = time.perf_counter()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        conn.request("POST", "/api/login", body=json.dumps({"username": "bench", "password": "bench-pw"}))
+        resp = conn.getresponse()
+        resp.read()
+        conn.close()
+        statuses.append(resp.status)
+    except OSError:
+        statuses.append(0)
+    latencies.append(time.perf_counter() - started)
+
+
+def _poll(port: int, cookie: str, stop: threading.Event, samples: List[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        conn.request("GET", "/api/me", headers={"Cookie": cookie})
+        conn.getresponse().read()
+        conn.close()
+        samples.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def run(label: str, verifier: CredentialVerifier, logins: int, threads: int) -> None:
+    web.VERIFIER = verifier.start()
+    server = web.make_server("127.0.0.1", 0, threaded=True, max_workers=threads)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cookie = _login(port)
+
+    latencies: List[float] = []
+    statuses: List[int] = []
+    polls: List[float] = []
+    stop = threading.Event()
+    barrier = threading.Barrier(logins + 1)
+    clients = [threading.Thread(target=_attempt, args=(port, barrier, latencies, statuses)) for _ in range(logins)]
+    for client in clients:
+        client.start()
+    poller = threading.Thread(target=_poll, args=(port, cookie, stop, polls))
+    poller.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    poller.join()
+    server.shutdown()
+    server.server_close()
+    verifier.close()
+
+    ok = statuses.count(200)
+    print(
+        f"{label:>12}: {ok}/{logins} ok, {statuses.count(503)} busy in {elapsed:.2f}s ({ok / elapsed:,.0f} logins/s) | "
+        f"login p50={_percentile(latencies, 50) * 1000:.0f}ms p99={_percentile(latencies, 99) * 1000:.0f}ms | "
+        f"/api/me p99={_percentile(polls, 99) * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="credential pool processes")
+    parser.add_argument("--threads", type=int, default=64, help="server request threads")
+    parser.add_argument("--queue", type=int, default=1024, help="credential checks allowed in flight")
+    parser.add_argument("--wait", type=float, default=60.0, help="seconds a login waits for a slot")
+    args = parser.parse_args()
+
+    LIMITS.set_route_limit("POST /api/login", None)
+    web.USER_DB["bench"] = {"password": hash_password("bench-pw", args.iterations), "modules": ["office"], "role": "user"}
+    print(f"{args.logins} concurrent logins, PBKDF2 x {args.iterations:,}, {args.threads} request threads")
+    for label, workers in (("inline", 0), (f"pool({args.workers})", args.workers)):
+        verifier = CredentialVerifier(workers=workers, max_pending=args.queue, wait=args.wait, iterations=args.iterations)
+        run(label, verifier, args.logins, args.threads)
+
+
+if __name__ == "__main__":
+    main()
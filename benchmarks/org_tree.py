@@ -0,0 +1,123 @@
+"""Org hierarchy queries: Euler-tour index vs walking ``department.parent_id`` in SQL.
+
+Builds a random tree of ``--departments`` departments (each new department
+hangs under one of the previous ``--window`` ones, which gives a deep, bushy
+tree) with random headcounts. Then for ``--queries`` random departments it
+times three things:
+
+- ancestors: ``OrgTree.ancestors`` vs one ``SELECT parent_id`` per level;
+- subtree: ``OrgTree.subtree`` vs a ``WITH RECURSIVE`` query;
+- headcount rollup: ``OrgTree.rollup`` vs the same recursive query joined to
+  ``user``.
+
+Also reports the incremental insert and move rate and how many full relabels
+they caused.
+
+    python -m benchmarks.org_tree --departments 20000 --queries 2000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.dao.base import ConnectionPool, ensure_schema
+from src.dao.department_dao import DepartmentDAO
+from src.dao.user_dao import UserDAO
+from src.services.org_tree import OrgTree
+
+SUBTREE_SQL = """
+WITH RECURSIVE sub(id) AS (
+    SELECT ? UNION ALL SELECT d.id FROM department d JOIN sub ON d.parent_id = sub.id
+)
+"""
+
+
+def _sql_ancestors(conn, dept_id):
+    chain = []
+    parent = conn.execute("SELECT parent_id FROM department WHERE id = ?", (dept_id,)).fetchone()[0]
+    while parent is not None:
+        chain.append(parent)
+        parent = conn.execute("SELECT parent_id FROM department WHERE id = ?", (parent,)).fetchone()[0]
+    return tuple(chain)
+
+
+def _sql_subtree(conn, dept_id):
+    return frozenset(row[0] for row in conn.execute(SUBTREE_SQL + "SELECT id FROM sub", (dept_id,)))
+
+
+def _sql_rollup(conn, dept_id):
+    sql = SUBTREE_SQL + "SELECT COUNT(*) FROM `user` WHERE status = 1 AND dept_id IN (SELECT id FROM sub)"
+    return conn.execute(sql, (dept_id,)).fetchone()[0]
+
+
+def _compare(label, targets, indexed, baseline):
+    started = time.perf_counter()
+    expected = [indexed(dept) for dept in targets]
+    indexed_s = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = [baseline(dept) for dept in targets]
+    baseline_s = time.perf_counter() - started
+    assert expected == actual, label
+    print(
+        f"{label:<10}: index {len(targets) / indexed_s:>12,.0f}/s | sql walk {len(targets) / baseline_s:>10,.0f}/s"
+        f" | {baseline_s / indexed_s:8.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--departments", type=int, default=10_000)
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    path = os.path.join(tempfile.mkdtemp(), "org_tree_bench.sqlite3")
+    pool = ConnectionPool(f"sqlite:///{path}", size=2)
+    ensure_schema(pool)
+    depts, users = DepartmentDAO(pool), UserDAO(pool)
+    depts.insert_many(
+        {"name": f"d{i}", "parent_id": rng.randint(max(1, i - args.window), i - 1) if i > 1 else None}
+        for i in range(1, args.departments + 1)
+    )
+    users.insert_many(
+        {"username": f"u{i}", "password": "x", "real_name": "U", "dept_id": rng.randint(1, args.departments)}
+        for i in range(args.users)
+    )
+
+    tree = OrgTree(depts, users)
+    started = time.perf_counter()
+    tree.load()
+    print(f"load {args.departments:,} departments + headcount: {time.perf_counter() - started:.3f}s")
+    depth = max(len(tree.ancestors(dept)) for dept in range(1, args.departments + 1))
+    print(f"max depth {depth}")
+
+    targets = [rng.randint(1, args.departments) for _ in range(args.queries)]
+    with pool.connection() as conn:
+        _compare("ancestors", targets, tree.ancestors, lambda dept: _sql_ancestors(conn, dept))
+        _compare("subtree", targets, tree.subtree, lambda dept: _sql_subtree(conn, dept))
+        _compare("rollup", targets, lambda dept: tree.rollup("staff", dept), lambda dept: _sql_rollup(conn, dept))
+
+    relabels = tree.relabels
+    started = time.perf_counter()
+    added = range(args.departments + 1, args.departments + 1 + args.queries)
+    for dept in added:
+        tree.add(dept, rng.randint(1, dept - 1))
+    moves = 0
+    for _ in range(args.queries):
+        dept, parent = rng.randint(2, len(tree)), rng.randint(1, len(tree))
+        if not tree.is_ancestor(dept, parent):
+            tree.move(dept, parent)
+            moves += 1
+    elapsed = time.perf_counter() - started
+    print(
+        f"incremental: {len(added):,} inserts + {moves:,} moves in {elapsed:.3f}s"
+        f" ({(len(added) + moves) / elapsed:,.0f}/s), {tree.relabels - relabels} full relabels"
+    )
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Outbox enqueue latency and relay throughput under a burst.
+
+Enqueues ``--messages`` records as fast as ``--producers`` threads can (or
+paced at ``--rate`` msgs/s), reporting per-call enqueue latency percentiles,
+how far the relay lags behind, and how long it takes to drain everything to a
+``LocalBroker``.
+
+    python -m benchmarks.outbox --messages 500000
+    python -m benchmarks.outbox --rate 100000 --messages 1000000
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from src.events.outbox import Outbox
+
+
+def _pct(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run(messages: int, producers: int, rate: float, fsync_interval: float):
+    box = Outbox(tempfile.mkdtemp(prefix="outbox-bench-"), fsync_interval=fsync_interval).start()
+    per_thread = messages // producers
+    latencies = [[] for _ in range(producers)]
+    peak_lag = [0]
+
+    def produce(idx):
+        record = latencies[idx]
+        enqueue = box.enqueue
+        clock = time.perf_counter
+        interval = producers / rate if rate else 0.0
+        next_at = clock()
+        for i in range(per_thread):
+            if interval:
+                next_at += interval
+                while clock() < next_at:
+                    pass
+            started = clock()
+            enqueue("kafka", "events", {"producer": idx, "seq": i})
+            record.append(clock() - started)
+
+    def watch(stop):
+        while not stop.is_set():
+            peak_lag[0] = max(peak_lag[0], box.relay.metrics()["lag"])
+            stop.wait(0.01)
+
+    stop = threading.Event()
+    watcher = threading.Thread(target=watch, args=(stop,))
+    watcher.start()
+    workers = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    produced_s = time.perf_counter() - started
+    box.relay.stop()
+    drained_s = time.perf_counter() - started
+    stop.set()
+    watcher.join()
+
+    samples = sorted(s for chunk in latencies for s in chunk)
+    total = len(samples)
+    print(f"enqueued {total:,} msgs from {producers} producers in {produced_s:.2f}s: {total / produced_s:,.0f} msgs/s")
+    print(
+        f"enqueue latency: mean {statistics.fmean(samples) * 1e6:.1f} µs, p50 {_pct(samples, 0.5) * 1e6:.1f} µs, "
+        f"p99 {_pct(samples, 0.99) * 1e6:.1f} µs, max {samples[-1] * 1e6:,.0f} µs"
+    )
+    metrics = box.metrics()
+    print(
+        f"relay delivered {metrics['relay']['delivered']:,} in {drained_s:.2f}s "
+        f"({metrics['relay']['batches']:,} batches), peak lag {peak_lag[0]:,} msgs, "
+        f"{metrics['log']['fsyncs']:,} fsyncs over {metrics['log']['segments']} segment(s)"
+    )
+    box.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500_000)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0, help="target msgs/s across producers; 0 = unpaced burst")
+    parser.add_argument("--fsync-interval", type=float, default=0.005)
+    args = parser.parse_args()
+    run(args.messages, args.producers, args.rate, args.fsync_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Rate limiter check cost, single-threaded and under contention.
+
+Spreads ``--checks`` checks over ``--clients`` client keys, first from one
+thread to get the per-check cost, then from ``--threads`` threads at once, for
+both algorithms and with one lock vs the default striped shards.
+
+    python -m benchmarks.rate_limit --threads 64
+"""
+import argparse
+import random
+import threading
+import time
+
+from src.middleware.rate_limit_middleware import ALGORITHMS, RateLimiter
+
+
+def run(algorithm: str, shards: int, checks: int, clients: int, threads: int):
+    limiter = RateLimiter(1_000, 1.0, algorithm=algorithm, shards=shards)
+    keys = [f"10.0.{i // 256}.{i % 256}" for i in range(clients)]
+    for key in keys:
+        limiter.allow(key)
+
+    sample = [random.choice(keys) for _ in range(checks)]
+    hit = limiter.hit
+    started = time.perf_counter()
+    for key in sample:
+        hit(key)
+    single_us = (time.perf_counter() - started) / checks * 1e6
+
+    per_thread = checks // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset):
+        mine = sample[offset:] + sample[:offset]
+        barrier.wait()
+        for key in mine[:per_thread]:
+            hit(key)
+
+    workers = [threading.Thread(target=worker, args=(i * 997 % checks,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = per_thread * threads
+    print(
+        f"{algorithm:<15} shards={shards:<3} 1 thread: {single_us:5.2f} us/check   "
+        f"{threads} threads: {total / elapsed:>12,.0f} checks/s ({elapsed / total * 1e6:5.2f} us/check)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checks", type=int, default=500_000)
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=64)
+    args = parser.parse_args()
+    for algorithm in ALGORITHMS:
+        for shards in (1, 64):
+            run(algorithm, shards, args.checks, args.clients, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Micro-benchmark: route table dispatch vs the old ``if self.path == ...`` chain.
+
+For each endpoint count a synthetic API surface is generated (one tenth of it
+with ``{id}`` path parameters) and looked up through both the precompiled
+``Router`` and an equivalent generated if-chain that mirrors the original
+``do_GET`` layout (``/static/`` prefix check, ``.html`` check, then one
+comparison per endpoint).
+
+    python -m benchmarks.router_dispatch --endpoints 20 200 1000
+"""
+import argparse
+import re
+import timeit
+from pathlib import Path
+
+from src.web.router import Router
+from src.web.server import ROUTES, UI_DIR
+
+
+def _paths(count: int):
+    modules = ["iam", "oa", "hrm", "finance", "crm", "project", "asset", "office", "bi", "itsm"]
+    paths = []
+    for i in range(count):
+        module = modules[i % len(modules)]
+        if i % 10 == 9:
+            paths.append(f"/api/{module}/res{i}/{{id}}")
+        else:
+            paths.append(f"/api/{module}/res{i}")
+    return paths
+
+
+def _build_chain(paths):
+    """Generate a do_GET-style function with one branch per endpoint."""
+    lines = [
+        "def dispatch(path):",
+        "    if path.startswith('/static/'):",
+        "        return 'static'",
+        "    if path.endswith('.html'):",
+        "        return 'page'",
+    ]
+    patterns = {}
+    for idx, path in enumerate(paths):
+        if "{" in path:
+            patterns[idx] = re.compile("^" + path.replace("{id}", "(?P<id>[^/]+)") + "$")
+            lines.append(f"    m = patterns[{idx}].match(path)")
+            lines.append("    if m:")
+            lines.append(f"        return {idx}")
+        else:
+            lines.append(f"    if path == {path!r}:")
+            lines.append(f"        return {idx}")
+    lines.append("    return None")
+    namespace = {"patterns": patterns}
+    exec("\n".join(lines), namespace)  # noqa: S102 - generated benchmark fixture
+    return namespace["dispatch"]
+
+
+def _build_router(paths):
+    router = Router()
+    for idx, path in enumerate(paths):
+        router.add("GET", path, idx, auth=True)
+    router.add_static_dir(Path(UI_DIR))
+    return router
+
+
+def _bench(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", type=int, nargs="+", default=[20, 200, 1000])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"live route table: {len(ROUTES.static)} static paths registered")
+    print(f"{'endpoints':>9} {'lookup':>10} {'if-chain ns':>12} {'router ns':>10} {'speedup':>8}")
+    for count in args.endpoints:
+        paths = _paths(count)
+        chain = _build_chain(paths)
+        router = _build_router(paths)
+        last_literal = next(p for p in reversed(paths) if "{" not in p)
+        last_param = next(p for p in reversed(paths) if "{" in p).replace("{id}", "42")
+        cases = {
+            "first": paths[0],
+            "last": last_literal,
+            "param": last_param,
+            "miss": "/api/nope/missing",
+        }
+        for label, path in cases.items():
+            legacy = _bench(lambda: chain(path), args.number)
+            table = _bench(lambda: router.resolve("GET", path), args.number)
+            print(f"{count:>9} {label:>10} {legacy:>12.0f} {table:>10.0f} {legacy / table:>7.1f}x")
+        static_path = "/static/app.js"
+        table = _bench(lambda: router.static.get(static_path), args.number)
+        legacy = _bench(lambda: chain(static_path), args.number)
+        print(f"{count:>9} {'static':>10} {legacy:>12.0f} {table:>10.0f} {legacy / table:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
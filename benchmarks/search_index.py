@@ -0,0 +1,117 @@
+"""Knowledge search latency on a synthetic mixed Chinese/English corpus.
+
+Generates ``--documents`` articles from Zipf-distributed English words and
+Chinese phrases, indexes them, saves the segment and times reopening it
+(startup) against the time ``add`` took to build it. Then it runs ``--queries``
+queries of each kind against the reopened, memory-mapped index and reports
+p50/p95/p99 latency:
+
+- ``term``: one English word;
+- ``and``: two English words, both required;
+- ``cjk``: a Chinese phrase (its bigrams all required);
+- ``or``: three words, any of them.
+
+Finally it times queries again after ``--updates`` edits sit in the
+in-memory delta.
+
+    python -m benchmarks.search_index --documents 500000 --queries 500
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from itertools import accumulate
+
+from src.services.search_index import SearchIndex
+
+HANZI = [chr(code) for code in range(0x4E00, 0x4E00 + 3000)]
+
+
+def _vocabulary(rng: random.Random, size: int):
+    english = sorted({"".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(size)})
+    chinese = sorted({"".join(rng.choices(HANZI, k=rng.randint(2, 4))) for _ in range(size)})
+    rng.shuffle(english)
+    rng.shuffle(chinese)
+    weights = list(accumulate(1 / rank for rank in range(1, size + 1)))
+    return english, chinese, weights
+
+
+def _articles(rng, count, english, chinese, weights):
+    languages = ((english, weights[: len(english)], " "), (chinese, weights[: len(chinese)], ""))
+    for article_id in range(1, count + 1):
+        words, cum_weights, sep = languages[article_id % 2 == 0]
+        title = sep.join(rng.choices(words, cum_weights=cum_weights, k=5))
+        body = " ".join(sep.join(rng.choices(words, cum_weights=cum_weights, k=8)) for _ in range(5))
+        yield article_id, title, body, ["faq"] if article_id % 10 == 0 else []
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000  # noqa: E731
+    return f"p50 {pick(0.50):7.2f} ms | p95 {pick(0.95):7.2f} ms | p99 {pick(0.99):7.2f} ms"
+
+
+def _run_queries(index, label, queries, **options):
+    samples, hits = [], 0
+    for query in queries:
+        started = time.perf_counter()
+        hits += len(index.search(query, 10, **options))
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<6}: {_percentiles(samples)} | {hits / len(queries):4.1f} hits/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=500_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--updates", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    english, chinese, weights = _vocabulary(rng, args.vocabulary)
+    path = os.path.join(tempfile.mkdtemp(), "knowledge.idx")
+    index = SearchIndex(path, flush_docs=0)
+    build_s = 0.0
+    for article in _articles(rng, args.documents, english, chinese, weights):
+        started = time.perf_counter()
+        index.add(*article)
+        build_s += time.perf_counter() - started
+    started = time.perf_counter()
+    index.save()
+    save_s = time.perf_counter() - started
+    index.close()
+    print(
+        f"build {args.documents:,} docs: {build_s:.1f}s ({args.documents / build_s:,.0f} docs/s) | "
+        f"save {save_s:.1f}s | segment {os.path.getsize(path) / 2 ** 20:,.0f} MiB"
+    )
+
+    started = time.perf_counter()
+    index = SearchIndex(path, flush_docs=0)
+    len(index)  # opens the segment
+    print(f"startup: reopen mmap segment {time.perf_counter() - started:.2f}s vs rebuild {build_s:.1f}s")
+    print(index.metrics())
+
+    # Queries mostly draw from the top of the distribution, where posting lists are longest.
+    head = max(50, len(english) // 20)
+    queries = {
+        "term": [rng.choice(english[:head]) for _ in range(args.queries)],
+        "and": [" ".join(rng.sample(english[:head], 2)) for _ in range(args.queries)],
+        "cjk": [rng.choice(chinese[:head]) for _ in range(args.queries)],
+        "or": [" ".join(rng.sample(english[:head], 3)) for _ in range(args.queries)],
+    }
+    for label, batch in queries.items():
+        _run_queries(index, label, batch, mode="or" if label == "or" else "and")
+
+    for article_id, title, body, tags in _articles(random.Random(7), args.updates, english, chinese, weights):
+        index.add(article_id * 3, title, body, tags)
+    print(f"after {args.updates:,} edits in the delta:")
+    for label in ("and", "cjk"):
+        _run_queries(index, label, queries[label])
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
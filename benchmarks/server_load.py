@@ -0,0 +1,132 @@
+"""Load benchmark for the demo web server.
+
+Starts the server in-process on a free port, logs in ``--clients`` concurrent
+clients and has each of them issue ``--requests`` calls. A fraction of the calls
+(``--slow-ratio``) hit `/api/run` with an artificially slow task so the effect of
+head-of-line blocking on the cheap `/api/me` polls is visible. Latency
+percentiles are reported per serving mode.
+
+    python -m benchmarks.server_load --clients 200 --requests 20
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+from src.web.server import DemoHandler, make_server
+
+SLOW_TASK = "bench:slow"
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _login(port: int) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request("POST", "/api/login", body=json.dumps({"username": "admin", "password": "admin"}))
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader("Set-Cookie", "")
+    conn.close()
+    return cookie.split(";", 1)[0]
+
+
+def _client(port: int, client_idx: int, requests: int, slow_every: int, fast: List[float], slow: List[float], errors: List[str]):
+    try:
+        cookie = _login(port)
+    except OSError as exc:
+        errors.append(repr(exc))
+        return
+    headers = {"Cookie": cookie}
+    body = json.dumps({"tasks": [SLOW_TASK]})
+    for i in range(requests):
+        is_slow = bool(slow_every) and (client_idx + i) % slow_every == 0
+        started = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            if is_slow:
+                conn.request("POST", "/api/run", body=body, headers=headers)
+            else:
+                conn.request("GET", "/api/me", headers=headers)
+            conn.getresponse().read()
+            conn.close()
+        except OSError as exc:
+            errors.append(repr(exc))
+            continue
+        (slow if is_slow else fast).append(time.perf_counter() - started)
+
+
+def run_mode(threaded: bool, clients: int, requests: int, slow_ratio: float, max_workers: int) -> Dict[str, float]:
+    server = make_server("127.0.0.1", 0, threaded=threaded, max_workers=max_workers)
+    port = server.server_address[1]
+    serve = threading.Thread(target=server.serve_forever, daemon=True)
+    serve.start()
+
+    fast: List[float] = []
+    slow: List[float] = []
+    errors: List[str] = []
+    slow_every = int(round(1 / slow_ratio)) if slow_ratio > 0 else 0
+    workers = [
+        threading.Thread(target=_client, args=(port, idx, requests, slow_every, fast, slow, errors))
+        for idx in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+
+    total = len(fast) + len(slow)
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "rps": total / elapsed if elapsed else 0.0,
+        "me_p50_ms": _percentile(fast, 50) * 1000,
+        "me_p99_ms": _percentile(fast, 99) * 1000,
+        "me_mean_ms": (statistics.fmean(fast) * 1000) if fast else 0.0,
+        "run_p50_ms": _percentile(slow, 50) * 1000,
+        "run_p99_ms": _percentile(slow, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="duration of the slow /api/run task")
+    parser.add_argument("--slow-ratio", type=float, default=0.05, help="share of requests hitting /api/run")
+    parser.add_argument("--workers", type=int, default=None, help="threaded mode worker cap (default MAX_WORKERS)")
+    parser.add_argument("--mode", choices=["threaded", "single", "both"], default="both")
+    args = parser.parse_args()
+
+    delay = args.slow_ms / 1000.0
+    DemoHandler.task_registry[SLOW_TASK] = ("iam", lambda user: time.sleep(delay) or {"slept_ms": args.slow_ms})
+
+    from config.settings import MAX_WORKERS
+
+    max_workers = args.workers or MAX_WORKERS
+    modes = {"threaded": [True], "single": [False], "both": [False, True]}[args.mode]
+    print(f"clients={args.clients} requests/client={args.requests} slow={args.slow_ms}ms x {args.slow_ratio:.0%}")
+    for threaded in modes:
+        label = f"threaded({max_workers})" if threaded else "single"
+        stats = run_mode(threaded, args.clients, args.requests, args.slow_ratio, max_workers)
+        print(
+            f"{label:>14}: {stats['requests']} req, {stats['errors']} err, {stats['rps']:.0f} req/s | "
+            f"/api/me p50={stats['me_p50_ms']:.1f}ms p99={stats['me_p99_ms']:.1f}ms | "
+            f"/api/run p50={stats['run_p50_ms']:.1f}ms p99={stats['run_p99_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Session store benchmark at production-like scale.
+
+Fills a store with ``--sessions`` active sessions, then measures create and
+lookup throughput (single thread and ``--threads`` concurrent readers), the cost
+of a full expiry sweep and the resident memory of the process.
+
+    python -m benchmarks.session_store --sessions 1000000
+    python -m benchmarks.session_store --backend sqlite --sessions 200000
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+
+from src.web.sessions import MemorySessionBackend, SessionStore, SQLiteSessionBackend
+
+
+class _Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run(backend_name: str, sessions: int, lookups: int, threads: int):
+    clock = _Clock()
+    if backend_name == "memory":
+        backend = MemorySessionBackend()
+    else:
+        backend = SQLiteSessionBackend(os.path.join(tempfile.mkdtemp(), "sessions.sqlite3"))
+    store = SessionStore(backend, ttl=3600, clock=clock)
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    tokens = [store.create(f"user{i % 50000}") for i in range(sessions)]
+    create_s = time.perf_counter() - started
+    print(f"[{backend_name}] created {sessions:,} sessions: {sessions / create_s:,.0f}/s, peak RSS +{_rss_mb() - rss_before:,.0f} MB")
+
+    sample = random.sample(tokens, min(lookups, len(tokens)))
+    started = time.perf_counter()
+    for token in sample:
+        store.get(token)
+    get_s = time.perf_counter() - started
+    print(f"[{backend_name}] lookups (1 thread): {len(sample) / get_s:,.0f}/s, {get_s / len(sample) * 1e6:.2f} µs/op")
+
+    def reader(chunk):
+        for token in chunk:
+            store.get(token)
+
+    chunks = [sample[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=reader, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    mt_s = time.perf_counter() - started
+    print(f"[{backend_name}] lookups ({threads} threads): {len(sample) / mt_s:,.0f}/s aggregate")
+
+    # Expire roughly half the sessions, then sweep.
+    for token in tokens[::2]:
+        backend.touch(token, clock.now - 1)
+    started = time.perf_counter()
+    removed = store.sweep()
+    sweep_s = time.perf_counter() - started
+    print(f"[{backend_name}] sweep removed {removed:,} expired sessions in {sweep_s * 1000:,.0f} ms; {len(store):,} remain")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run(args.backend, args.sessions, args.lookups, args.threads)
+
+
+if __name__ == "__main__":
+    main()
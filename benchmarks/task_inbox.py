@@ -0,0 +1,65 @@
+"""Paginated "my todos" through the task inbox vs a scan over every task.
+
+Indexes ``--tasks`` tasks spread over ``--assignees`` users, then pages one
+user's open tasks newest-first, both through ``TaskInbox.page`` and by filtering
+and sorting the full task list the way a query without ``idx_task_assignee``
+would.
+
+    python -m benchmarks.task_inbox --tasks 1000000
+"""
+import argparse
+import random
+import time
+
+from src.workflow.task_inbox import COMPLETED, OPEN, TaskInbox
+
+
+def run(tasks: int, assignees: int, pages: int, limit: int):
+    inbox = TaskInbox(closed_capacity=tasks)
+    rows = []
+    started = time.perf_counter()
+    for task_id in range(1, tasks + 1):
+        assignee = f"user{random.randrange(assignees)}"
+        created_at = 1_700_000_000.0 + task_id
+        inbox.add(task_id, assignee, {"name": "review"}, created_at=created_at)
+        rows.append({"id": task_id, "assignee": assignee, "status": OPEN, "created_at": created_at})
+    for task_id in range(1, tasks + 1, 3):
+        inbox.update(task_id, COMPLETED)
+        rows[task_id - 1]["status"] = COMPLETED
+    build_s = time.perf_counter() - started
+    print(f"indexed {tasks:,} tasks for {assignees:,} assignees in {build_s:.2f}s ({tasks / build_s:,.0f} ops/s)")
+
+    users = [f"user{random.randrange(assignees)}" for _ in range(pages)]
+    started = time.perf_counter()
+    for user in users:
+        cursor = None
+        for _ in range(3):
+            _, cursor = inbox.page(user, OPEN, cursor, limit)
+    indexed_us = (time.perf_counter() - started) / (pages * 3) * 1e6
+
+    scans = max(1, pages // 100)
+    started = time.perf_counter()
+    for user in users[:scans]:
+        mine = sorted(
+            (row for row in rows if row["assignee"] == user and row["status"] == OPEN),
+            key=lambda row: (row["created_at"], row["id"]),
+            reverse=True,
+        )
+        mine[:limit]
+    scan_us = (time.perf_counter() - started) / scans * 1e6
+    print(f"indexed page : {indexed_us:,.1f} us/page")
+    print(f"full scan    : {scan_us:,.1f} us/page ({scan_us / indexed_us:,.0f}x slower)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500_000)
+    parser.add_argument("--assignees", type=int, default=2_000)
+    parser.add_argument("--pages", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    run(args.tasks, args.assignees, args.pages, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Workflow engine with 100k approval instances in flight.
+
+Deploys a leave-approval process (manager task, then a parallel fork into an
+HR task and a booking service task, joined before the end), starts
+``--instances`` instances so they all wait on the manager task at once, then
+approves every manager task and finally every HR task. Reports per-phase
+throughput, resident memory and how the write-behind persistence kept up.
+
+    python -m benchmarks.workflow_engine --instances 100000
+    python -m benchmarks.workflow_engine --no-persist
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from src.dao.base import ConnectionPool, ensure_schema
+from src.workflow import task_executor
+from src.workflow.engine import TransitionWriter, WorkflowEngine
+from src.workflow.process_builder import ProcessRegistry
+
+LEAVE = {
+    "key": "leave",
+    "name": "Leave approval",
+    "version": 1,
+    "nodes": [
+        {"id": "start", "type": "start"},
+        {"id": "manager", "type": "user_task", "assignee": "$manager_id"},
+        {"id": "decide", "type": "exclusive"},
+        {"id": "fork", "type": "parallel"},
+        {"id": "hr", "type": "user_task", "assignee": 1},
+        {"id": "book", "type": "service_task", "action": "bench.book_leave"},
+        {"id": "join", "type": "parallel"},
+        {"id": "approved", "type": "end"},
+        {"id": "rejected", "type": "end", "status": "rejected"},
+    ],
+    "edges": [
+        {"from": "start", "to": "manager"},
+        {"from": "manager", "to": "decide"},
+        {"from": "decide", "to": "fork", "condition": "approved"},
+        {"from": "decide", "to": "rejected"},
+        {"from": "fork", "to": "hr"},
+        {"from": "fork", "to": "book"},
+        {"from": "hr", "to": "join"},
+        {"from": "book", "to": "join"},
+        {"from": "join", "to": "approved"},
+    ],
+}
+
+
+@task_executor.register("bench.book_leave")
+def _book_leave(task, variables):
+    return {"days_booked": variables.get("days", 1)}
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _phase(label: str, count: int, started: float, engine: WorkflowEngine):
+    elapsed = time.perf_counter() - started
+    metrics = engine.metrics()
+    print(
+        f"{label:<28} {count:>9,} in {elapsed:6.2f}s = {count / elapsed:>9,.0f}/s | "
+        f"open tasks {metrics['open_tasks']:>7,} | RSS {_rss_mb():,.0f} MB"
+        + (f" | writer backlog {metrics['writer']['pending']:,}" if "writer" in metrics else "")
+    )
+
+
+def run(instances: int, persist: bool, batch_size: int):
+    writer = None
+    if persist:
+        pool = ConnectionPool(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'workflow.sqlite3')}", size=2)
+        ensure_schema(pool)
+        writer = TransitionWriter(pool, batch_size=batch_size).start()
+    engine = WorkflowEngine(registry=ProcessRegistry(), writer=writer)
+    engine.deploy(LEAVE)
+
+    started = time.perf_counter()
+    for i in range(instances):
+        engine.start("leave", {"manager_id": 1000 + i % 500, "days": 1 + i % 5}, starter_id=i)
+    _phase("start (wait on manager)", instances, started, engine)
+
+    started = time.perf_counter()
+    for task in engine.open_tasks():
+        engine.complete(task.id, "approve")
+    engine.drain()
+    _phase("approve manager + fork", instances, started, engine)
+
+    started = time.perf_counter()
+    for task in engine.open_tasks(assignee=1):
+        engine.complete(task.id, "approve")
+    engine.drain()
+    _phase("approve HR + join + end", instances, started, engine)
+
+    print(f"instances: {engine.metrics()['instances']}")
+    if writer is not None:
+        started = time.perf_counter()
+        writer.stop()
+        print(
+            f"persistence: {writer.rows_written:,} rows in {writer.flushes:,} batched transactions "
+            f"(final flush {time.perf_counter() - started:.2f}s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--no-persist", dest="persist", action="store_false")
+    args = parser.parse_args()
+    run(args.instances, args.persist, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,24 @@
 """Middleware toggles and ordering."""
+import os
+
 ENABLED = [
     "logging",
     "auth",
     "rate_limit",
 ]
+
+# Report per-stage latency through ``src.middleware.pipeline.StageTimings`` (shown on /api/runtime).
+TIMING = os.getenv("APP_MIDDLEWARE_TIMING", "1") == "1"
+
+# Rate limits: {"limit", "period" (seconds), "algorithm", "burst"}; ``None`` disables limiting.
+# Routes are keyed by "METHOD /pattern" as registered on the router, users by username.
+RATE_LIMIT_DEFAULT = {"algorithm": "token_bucket", "limit": 50, "period": 1.0, "burst": 100}
+RATE_LIMIT_ROUTES = {
+    "POST /api/login": {"algorithm": "sliding_window", "limit": 60, "period": 60.0},
+    "POST /api/run": {"algorithm": "token_bucket", "limit": 5, "period": 1.0, "burst": 20},
+    "POST /api/run/stream": {"algorithm": "token_bucket", "limit": 5, "period": 1.0, "burst": 20},
+    "GET /api/todos/stream": {"algorithm": "sliding_window", "limit": 30, "period": 60.0},
+}
+RATE_LIMIT_USERS = {}
+RATE_LIMIT_SHARDS = 64
+RATE_LIMIT_IDLE_SECONDS = 600
@@ -1,4 +1,13 @@
 """Security defaults and mock secrets."""
+import os
+
 API_TOKEN_TTL = 3600
 JWT_SECRET = "dev-secret"
 ALLOWED_IPS = ["127.0.0.1"]
+# PBKDF2-SHA256 work factor for new password hashes.
+PASSWORD_ITERATIONS = int(os.getenv("APP_PASSWORD_ITERATIONS", "260000"))
+# Password checks run on a dedicated process pool (0 = inline, in the request thread).
+PASSWORD_WORKERS = int(os.getenv("APP_PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+# Checks allowed in flight before new logins wait, and how long they wait before a 503.
+PASSWORD_QUEUE = int(os.getenv("APP_PASSWORD_QUEUE", "256"))
+PASSWORD_QUEUE_TIMEOUT = float(os.getenv("APP_PASSWORD_QUEUE_TIMEOUT", "2.0"))
@@ -4,3 +4,34 @@ import os
 APP_NAME = "erp-platform"
 ENV = os.getenv("APP_ENV", "development")
 MAX_WORKERS = int(os.getenv("APP_MAX_WORKERS", "8"))
+TASK_TIMEOUT = float(os.getenv("APP_TASK_TIMEOUT", "30"))
+SESSION_BACKEND = os.getenv("APP_SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("APP_SESSION_DB", "sessions.sqlite3")
+FEED_CAPACITY = int(os.getenv("APP_FEED_CAPACITY", "1000"))
+FEED_SPILL_DIR = os.getenv("APP_FEED_SPILL_DIR", "")
+EVENT_DISPATCH = os.getenv("APP_EVENT_DISPATCH", "thread")
+EVENT_WORKERS = int(os.getenv("APP_EVENT_WORKERS", "4"))
+EVENT_QUEUE_SIZE = int(os.getenv("APP_EVENT_QUEUE_SIZE", "10000"))
+EVENT_BATCH_SIZE = int(os.getenv("APP_EVENT_BATCH_SIZE", "256"))
+OUTBOX_DIR = os.getenv("APP_OUTBOX_DIR", "outbox")
+OUTBOX_SEGMENT_BYTES = int(os.getenv("APP_OUTBOX_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+OUTBOX_FSYNC_INTERVAL = float(os.getenv("APP_OUTBOX_FSYNC_INTERVAL", "0.005"))
+TODO_STREAM_WINDOW = float(os.getenv("APP_TODO_STREAM_WINDOW", "30"))
+TODO_STREAM_LIMIT = int(os.getenv("APP_TODO_STREAM_LIMIT", str(max(1, MAX_WORKERS // 2))))
+LOG_DIR = os.getenv("APP_LOG_DIR", "logs")
+LOG_MAX_BYTES = int(os.getenv("APP_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = float(os.getenv("APP_LOG_ROTATE_SECONDS", "86400"))
+LOG_FLUSH_INTERVAL = float(os.getenv("APP_LOG_FLUSH_INTERVAL", "0.2"))
+LOG_QUEUE_SIZE = int(os.getenv("APP_LOG_QUEUE_SIZE", "100000"))
+AUDIT_DIR = os.getenv("APP_AUDIT_DIR", "audit")
+AUDIT_SEGMENT_BYTES = int(os.getenv("APP_AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("APP_AUDIT_FLUSH_INTERVAL", "0.05"))
+AUDIT_INDEX_INTERVAL = int(os.getenv("APP_AUDIT_INDEX_INTERVAL", "256"))
+AUDIT_FSYNC = os.getenv("APP_AUDIT_FSYNC", "1") == "1"
+IMPORT_CHUNK_SIZE = int(os.getenv("APP_IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_WORKERS = int(os.getenv("APP_IMPORT_WORKERS", str(os.cpu_count() or 1)))
+LDAP_SYNC_SOURCE = os.getenv("APP_LDAP_SYNC_SOURCE", "")
+FORM_CACHE_SIZE = int(os.getenv("APP_FORM_CACHE_SIZE", "256"))
+ABAC_MEMO_SIZE = int(os.getenv("APP_ABAC_MEMO_SIZE", "100000"))
+SEARCH_INDEX_PATH = os.getenv("APP_SEARCH_INDEX_PATH", "search.idx")
+SEARCH_FLUSH_DOCS = int(os.getenv("APP_SEARCH_FLUSH_DOCS", "50000"))
@@ -10,6 +10,12 @@ CREATE TABLE department (
     CONSTRAINT fk_department_parent FOREIGN KEY (parent_id) REFERENCES department(id)
 );
 
+CREATE TABLE department_quota (
+    dept_id BIGINT PRIMARY KEY,
+    quota   INT NOT NULL, -- planned headcount, rolled up by the org tree
+    CONSTRAINT fk_department_quota_dept FOREIGN KEY (dept_id) REFERENCES department(id)
+);
+
 CREATE TABLE position (
     id         BIGINT PRIMARY KEY AUTO_INCREMENT,
     name       VARCHAR(50) NOT NULL,
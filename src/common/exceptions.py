@@ -6,3 +6,12 @@ class ERPError(Exception):
 
 class ValidationError(ERPError):
     """Raised when input validation fails."""
+
+
+class TaskTimeoutError(ERPError):
+    """Raised when concurrent tasks do not finish within the allotted time."""
+
+    def __init__(self, message, results=None, pending=None):
+        super().__init__(message)
+        self.results = results if results is not None else {}
+        self.pending = pending if pending is not None else []
@@ -0,0 +1,75 @@
+"""Bounded, thread-safe record store for activity feeds.
+
+Keeps the most recent ``capacity`` records in a ``deque`` so memory stays flat
+under sustained traffic, hands out IDs from an atomic sequence, and optionally
+spills evicted records to an append-only JSON-lines file instead of dropping
+them. Reading the newest ``k`` records is O(k).
+"""
+import atexit
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class RingStore:
+    def __init__(self, capacity: int = 1000, spill_path: Optional[str] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spilled = 0
+        self._items: deque = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._spill = None
+
+    def next_id(self) -> int:
+        """Atomic, monotonically increasing ID for records about to be appended."""
+        return next(self._ids)
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Store ``record``, spilling the evicted oldest one if configured, and return it."""
+        with self._lock:
+            if self.spill_path and len(self._items) == self.capacity:
+                self._write_spill(self._items[0])
+            self._items.append(record)
+        return record
+
+    def tail(self, k: int) -> List[Dict[str, Any]]:
+        """Newest ``k`` records, oldest first."""
+        if k <= 0:
+            return []
+        with self._lock:
+            newest = list(itertools.islice(reversed(self._items), k))
+        newest.reverse()
+        return newest
+
+    def _write_spill(self, record: Dict[str, Any]) -> None:
+        if self._spill is None:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._spill = open(self.spill_path, "a", encoding="utf-8", buffering=1)
+            atexit.register(self.close)
+        self._spill.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.spilled += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            snapshot = list(self._items)
+        return iter(snapshot)
+
+
+__all__ = ["RingStore"]
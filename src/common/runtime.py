@@ -2,25 +2,217 @@
 Lightweight thread pool runtime helpers to fan-out high-level business tasks
 and minimize per-request overhead. Designed for demo stubs of the enterprise
 platform.
+
+A single process-wide executor is created lazily on first use and reused by
+every caller, so thread start-up is paid once instead of on each request. It
+can be resized at runtime, reports queue/worker metrics and is shut down
+gracefully at interpreter exit.
 """
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Callable, Iterable, Any, Dict
+import atexit
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Any, Dict, Optional, Tuple
+
+from src.common.exceptions import TaskTimeoutError
 
 DEFAULT_WORKERS = 8
 
 
-def run_concurrent(tasks: Iterable[Callable[[], Any]], max_workers: int = DEFAULT_WORKERS) -> Dict[int, Any]:
+class SharedExecutor:
+    """Resizable wrapper around a lazily created ``ThreadPoolExecutor``."""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, thread_name_prefix: str = "erp-runtime"):
+        self._max_workers = max(1, max_workers)
+        self._thread_name_prefix = thread_name_prefix
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._started = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._peak_queue = 0
+        self._peak_active = 0
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix=self._thread_name_prefix
+                    )
+                pool = self._pool
+        return pool
+
+    def _instrument(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        def run():
+            with self._lock:
+                self._started += 1
+                active = self._started - self._completed
+                if active > self._peak_active:
+                    self._peak_active = active
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self._completed += 1
+
+        return run
+
+    def submit(self, fn: Callable[[], Any]) -> Future:
+        with self._lock:
+            self._submitted += 1
+            queued = self._submitted - self._started - self._cancelled
+            if queued > self._peak_queue:
+                self._peak_queue = queued
+        task = self._instrument(fn)
+        while True:
+            pool = self._ensure_pool()
+            try:
+                return pool.submit(task)
+            except RuntimeError:
+                # A concurrent resize() retired this pool; retry on its successor.
+                if pool is self._pool:
+                    with self._lock:
+                        self._submitted -= 1
+                    raise
+
+    def cancel(self, futures: Iterable[Future]) -> int:
+        """Cancel futures that have not started yet; running ones are left alone."""
+        cancelled = sum(1 for future in futures if future.cancel())
+        if cancelled:
+            with self._lock:
+                self._cancelled += cancelled
+        return cancelled
+
+    def resize(self, max_workers: int) -> None:
+        """Swap in a pool of a new size; work queued on the old pool still finishes."""
+        max_workers = max(1, max_workers)
+        with self._lock:
+            old, self._pool = self._pool, None
+            self._max_workers = max_workers
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        with self._lock:
+            old, self._pool = self._pool, None
+        if old is not None:
+            old.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self._max_workers,
+                "queue_depth": self._submitted - self._started - self._cancelled,
+                "active_workers": self._started - self._completed,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "cancelled": self._cancelled,
+                "peak_queue_depth": self._peak_queue,
+                "peak_active_workers": self._peak_active,
+            }
+
+
+_EXECUTOR = SharedExecutor()
+
+
+def get_executor() -> SharedExecutor:
+    return _EXECUTOR
+
+
+def resize_executor(max_workers: int) -> None:
+    _EXECUTOR.resize(max_workers)
+
+
+def shutdown_executor(wait: bool = True, cancel_futures: bool = False) -> None:
+    _EXECUTOR.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def executor_metrics() -> Dict[str, int]:
+    return _EXECUTOR.metrics()
+
+
+atexit.register(shutdown_executor)
+
+
+def iter_completed(
+    tasks: Iterable[Callable[[], Any]],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[Tuple[int, Future]]:
+    """
+    Run callables on the shared executor and yield ``(index, future)`` pairs as
+    soon as each one finishes. ``max_workers`` caps how many of these tasks are
+    in flight at once. If ``timeout`` seconds pass first, ``TaskTimeoutError``
+    is raised listing the pending indices. Closing the generator early (or any
+    error) cancels the stragglers that have not started yet.
+    """
+    executor = get_executor()
+    queued = iter(enumerate(tasks))
+    limit = max_workers if max_workers and max_workers > 0 else None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    in_flight: Dict[Future, int] = {}
+
+    def fill():
+        for idx, task in queued:
+            in_flight[executor.submit(task)] = idx
+            if limit is not None and len(in_flight) >= limit:
+                return
+
+    try:
+        fill()
+        while in_flight:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            done = set()
+            if remaining is None or remaining > 0:
+                done, _ = wait(in_flight, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                pending = sorted(in_flight.values()) + [idx for idx, _ in queued]
+                raise TaskTimeoutError(f"{len(pending)} task(s) did not finish within {timeout}s", pending=pending)
+            for future in done:
+                yield in_flight.pop(future), future
+            fill()
+    finally:
+        if in_flight:
+            executor.cancel(in_flight)
+
+
+def run_concurrent(
+    tasks: Iterable[Callable[[], Any]],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[int, Any]:
     """
     Execute callables concurrently and return a mapping of index -> result.
-    Keeps memory usage low by using a bounded worker pool.
+    Tasks run on the shared executor (see ``iter_completed``); on timeout the
+    raised ``TaskTimeoutError`` carries the partial results.
     """
     results: Dict[int, Any] = {}
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_map = {executor.submit(task): idx for idx, task in enumerate(tasks)}
-        for future in as_completed(future_map):
-            idx = future_map[future]
+    completed = iter_completed(tasks, max_workers=max_workers, timeout=timeout)
+    try:
+        for idx, future in completed:
             results[idx] = future.result()
+    except TaskTimeoutError as exc:
+        exc.results = results
+        raise
+    finally:
+        completed.close()
     return results
 
 
-__all__ = ["run_concurrent", "DEFAULT_WORKERS"]
+__all__ = [
+    "run_concurrent",
+    "iter_completed",
+    "DEFAULT_WORKERS",
+    "SharedExecutor",
+    "get_executor",
+    "resize_executor",
+    "shutdown_executor",
+    "executor_metrics",
+]
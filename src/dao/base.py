@@ -0,0 +1,330 @@
+"""Shared data-access layer: pooled connections and table-level DAOs.
+
+The pool hands out SQLite connections (size from ``config.database.POOL_SIZE``)
+opened from ``config.database.DB_DSN``, so the DAOs run and can be benchmarked
+offline. ``ensure_schema`` applies ``schema.sql`` after translating the few
+MySQL-only constructs SQLite does not understand.
+
+``BaseDAO`` builds each SQL string once per column set and reuses the exact
+same text, which lets sqlite3's per-connection statement cache skip
+re-preparing it. Bulk writes go through ``executemany`` and reads page with
+keyset pagination (``WHERE id > ? ORDER BY id LIMIT ?``), which stays O(limit)
+however deep the page is.
+"""
+import itertools
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from config.database import DB_DSN, POOL_SIZE
+from src.common.exceptions import ERPError
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "schema.sql"
+_MEMORY_IDS = itertools.count(1)
+
+
+class PoolTimeoutError(ERPError):
+    """Raised when no pooled connection frees up in time."""
+
+
+def sqlite_target(dsn: str) -> Tuple[str, bool]:
+    """Map ``sqlite:///path`` (or ``sqlite:///:memory:``) to a ``sqlite3.connect`` target and uri flag."""
+    if not dsn.startswith("sqlite://"):
+        raise ValueError(f"Unsupported DSN {dsn!r}; only sqlite:/// DSNs are handled by the local DAO layer")
+    path = dsn[len("sqlite:///"):] if dsn.startswith("sqlite:///") else dsn[len("sqlite://"):]
+    if path in ("", ":memory:"):
+        # Shared-cache URI so every pooled connection sees the same in-memory database.
+        return f"file:erp-mem-{next(_MEMORY_IDS)}?mode=memory&cache=shared", True
+    return path, False
+
+
+def sqlite_ddl(schema_sql: str) -> List[str]:
+    """Translate ``schema.sql`` (MySQL 8) into SQLite statements."""
+    sql = re.sub(r"--[^\n]*", "", schema_sql)
+    sql = re.sub(r"\bBIGINT PRIMARY KEY AUTO_INCREMENT\b", "INTEGER PRIMARY KEY", sql)
+    sql = re.sub(r"\s+ON UPDATE CURRENT_TIMESTAMP", "", sql)
+    sql = re.sub(r"\bUNIQUE KEY \w+\s*\(", "UNIQUE (", sql)
+    statements: List[str] = []
+    for raw in sql.split(";"):
+        stmt = raw.strip()
+        if not stmt:
+            continue
+        table = re.match(r"CREATE TABLE\s+(`?\w+`?)", stmt)
+        if table:
+            inline = re.findall(r",\s*INDEX (\w+) \(([^)]*)\)", stmt)
+            stmt = re.sub(r",\s*INDEX \w+ \([^)]*\)", "", stmt)
+            statements.append(stmt.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+            statements.extend(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table.group(1)}({cols})" for name, cols in inline
+            )
+        else:
+            statements.append(stmt.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
+    return statements
+
+
+class ConnectionPool:
+    def __init__(self, dsn: str = DB_DSN, size: int = POOL_SIZE, timeout: float = 30.0, statement_cache: int = 256):
+        self.target, self.uri = sqlite_target(dsn)
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.statement_cache = statement_cache
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=self.size)
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+        # Keep one connection open for the pool's lifetime so in-memory databases persist.
+        self._created = 1
+        self._idle.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.target,
+            uri=self.uri,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.row_factory = sqlite3.Row
+        if not self.uri:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_grow = self._created < self.size
+            if can_grow:
+                self._created += 1
+        if can_grow:
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(f"No database connection available within {self.timeout}s") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for one transaction: commit on success, roll back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._all = self._all, []
+            self._created = 0
+        # Drain the idle queue too, so a later acquire() cannot hand out a closed connection.
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in conns:
+            conn.close()
+
+
+def ensure_schema(pool: ConnectionPool, schema_path: Path = SCHEMA_PATH) -> None:
+    statements = sqlite_ddl(schema_path.read_text(encoding="utf-8"))
+    with pool.connection() as conn:
+        for stmt in statements:
+            conn.execute(stmt)
+
+
+_DEFAULT_POOL: Optional[ConnectionPool] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Process-wide pool for ``DB_DSN``, created (and schema applied) on first use."""
+    global _DEFAULT_POOL
+    if _DEFAULT_POOL is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT_POOL is None:
+                pool = ConnectionPool()
+                ensure_schema(pool)
+                _DEFAULT_POOL = pool
+    return _DEFAULT_POOL
+
+
+@lru_cache(maxsize=1024)
+def _insert_sql(table: str, columns: Tuple[str, ...]) -> str:
+    cols = ", ".join(f"`{c}`" for c in columns)
+    marks = ", ".join("?" for _ in columns)
+    return f"INSERT INTO `{table}` ({cols}) VALUES ({marks})"
+
+
+@lru_cache(maxsize=1024)
+def _page_sql(table: str, key: str, where: Optional[str], first: bool) -> str:
+    clauses = [] if first else [f"`{key}` > ?"]
+    if where:
+        clauses.append(f"({where})")
+    where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT * FROM `{table}`{where_sql} ORDER BY `{key}` LIMIT ?"
+
+
+def _scoped(where: Optional[str], params: Sequence[Any], scope, dao: "BaseDAO") -> Tuple[Optional[str], Sequence[Any]]:
+    predicate = scope.predicate(dao) if scope is not None else None
+    if predicate is None:
+        return where, params
+    clause, scope_params = predicate
+    return (f"({where}) AND {clause}" if where else clause), list(params) + list(scope_params)
+
+
+class BaseDAO:
+    """Table gateway; subclasses set ``table`` and the writable ``columns``.
+
+    Reads accept a ``scope`` (``src.services.data_scope.DataScope``), which
+    adds a row filter to the ``WHERE`` clause. ``scope_dept`` names the column
+    holding a department id, and ``scope_owner`` the column holding the owning
+    user's id. ``scope_owner_of`` maps a user-id subquery (``{users}``) to owner
+    keys when the owner column is not a user id itself.
+    """
+
+    table: str = ""
+    columns: Tuple[str, ...] = ()
+    key: str = "id"
+    scope_dept: Optional[str] = None
+    scope_owner: Optional[str] = None
+    scope_owner_of: Optional[str] = None
+
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        self._pool = pool
+
+    @property
+    def pool(self) -> ConnectionPool:
+        if self._pool is None:
+            self._pool = get_pool()
+        return self._pool
+
+    def _columns_of(self, record: Mapping[str, Any]) -> Tuple[str, ...]:
+        return tuple(c for c in self.columns if c in record)
+
+    @contextmanager
+    def _conn(self, conn: Optional[sqlite3.Connection]) -> Iterator[sqlite3.Connection]:
+        if conn is not None:
+            yield conn
+        else:
+            with self.pool.connection() as pooled:
+                yield pooled
+
+    # --- writes ----------------------------------------------------------
+    def insert(self, record: Mapping[str, Any], conn: Optional[sqlite3.Connection] = None) -> int:
+        columns = self._columns_of(record)
+        with self._conn(conn) as c:
+            cur = c.execute(_insert_sql(self.table, columns), [record[col] for col in columns])
+            return cur.lastrowid
+
+    def insert_many(
+        self, records: Iterable[Mapping[str, Any]], batch_size: int = 1000, conn: Optional[sqlite3.Connection] = None
+    ) -> int:
+        """Insert records with ``executemany`` in batches; all records must share one column set."""
+        total = 0
+        batch: List[Sequence[Any]] = []
+        columns: Optional[Tuple[str, ...]] = None
+        with self._conn(conn) as c:
+            for record in records:
+                if columns is None:
+                    columns = self._columns_of(record)
+                batch.append([record.get(col) for col in columns])
+                if len(batch) >= batch_size:
+                    c.executemany(_insert_sql(self.table, columns), batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                c.executemany(_insert_sql(self.table, columns), batch)
+                total += len(batch)
+        return total
+
+    def update(self, key_value: Any, changes: Mapping[str, Any], conn: Optional[sqlite3.Connection] = None) -> int:
+        columns = self._columns_of(changes)
+        if not columns:
+            return 0
+        assignments = ", ".join(f"`{c}` = ?" for c in columns)
+        sql = f"UPDATE `{self.table}` SET {assignments} WHERE `{self.key}` = ?"
+        with self._conn(conn) as c:
+            return c.execute(sql, [changes[col] for col in columns] + [key_value]).rowcount
+
+    # --- reads -----------------------------------------------------------
+    def get(self, key_value: Any, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict[str, Any]]:
+        with self._conn(conn) as c:
+            row = c.execute(f"SELECT * FROM `{self.table}` WHERE `{self.key}` = ?", (key_value,)).fetchone()
+        return dict(row) if row else None
+
+    def find_one(self, column: str, value: Any, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict[str, Any]]:
+        if column not in self.columns and column != self.key:
+            raise ValueError(f"Unknown column {column!r} for {self.table}")
+        with self._conn(conn) as c:
+            row = c.execute(f"SELECT * FROM `{self.table}` WHERE `{column}` = ? LIMIT 1", (value,)).fetchone()
+        return dict(row) if row else None
+
+    def page(
+        self,
+        after: Any = None,
+        limit: int = 100,
+        where: Optional[str] = None,
+        params: Sequence[Any] = (),
+        conn: Optional[sqlite3.Connection] = None,
+        scope=None,
+    ) -> List[Dict[str, Any]]:
+        """Keyset page: rows with ``key > after`` in key order, optionally filtered by ``where`` and ``scope``."""
+        where, params = _scoped(where, params, scope, self)
+        sql = _page_sql(self.table, self.key, where, after is None)
+        args = ([] if after is None else [after]) + list(params) + [limit]
+        with self._conn(conn) as c:
+            return [dict(row) for row in c.execute(sql, args)]
+
+    def iter_all(
+        self, batch_size: int = 1000, where: Optional[str] = None, params: Sequence[Any] = (), scope=None
+    ) -> Iterator[Dict[str, Any]]:
+        after = None
+        while True:
+            rows = self.page(after=after, limit=batch_size, where=where, params=params, scope=scope)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][self.key]
+
+    def max_key(self) -> int:
+        with self._conn(None) as c:
+            return c.execute(f"SELECT COALESCE(MAX(`{self.key}`), 0) FROM `{self.table}`").fetchone()[0]
+
+    def count(self, where: Optional[str] = None, params: Sequence[Any] = (), scope=None) -> int:
+        where, params = _scoped(where, params, scope, self)
+        where_sql = f" WHERE {where}" if where else ""
+        with self._conn(None) as c:
+            return c.execute(f"SELECT COUNT(*) FROM `{self.table}`{where_sql}", list(params)).fetchone()[0]
+
+
+__all__ = [
+    "BaseDAO",
+    "ConnectionPool",
+    "PoolTimeoutError",
+    "ensure_schema",
+    "get_pool",
+    "sqlite_ddl",
+    "sqlite_target",
+]
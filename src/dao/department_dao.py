@@ -1,4 +1,28 @@
-"""Data access placeholder."""
+"""Department table access."""
+from typing import Dict, List
+
+from src.dao.base import BaseDAO
+
+
+class DepartmentDAO(BaseDAO):
+    table = "department"
+    columns = ("name", "parent_id", "leader_id")
+    scope_dept = "id"
+
+    def hierarchy(self) -> List[Dict]:
+        """Every department's ``id``/``parent_id``/``leader_id``/``name``, for building the org tree in memory."""
+        with self._conn(None) as c:
+            return [dict(row) for row in c.execute("SELECT id, parent_id, leader_id, name FROM department ORDER BY id")]
+
+    def quotas(self) -> Dict[int, int]:
+        """Planned headcount per department, from ``department_quota``."""
+        with self._conn(None) as c:
+            return dict(c.execute("SELECT dept_id, quota FROM department_quota").fetchall())
+
+    def set_quota(self, dept_id: int, quota: int) -> None:
+        with self._conn(None) as c:
+            c.execute("INSERT OR REPLACE INTO department_quota (dept_id, quota) VALUES (?, ?)", (dept_id, quota))
+
 
 def save(record):
-    return {"saved": record}
+    return {"saved": record, "id": DepartmentDAO().insert(record)}
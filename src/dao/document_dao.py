@@ -1,4 +1,32 @@
-"""Data access placeholder."""
+"""Document and document version access."""
+from typing import Dict, List, Optional
+
+from src.dao.base import BaseDAO
+
+
+class DocumentDAO(BaseDAO):
+    table = "document"
+    columns = ("name", "path", "type", "owner_id", "folder_id", "version")
+    scope_owner = "owner_id"
+
+    def by_folder(self, folder_id: int, after: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        return self.page(after=after, limit=limit, where="folder_id = ?", params=(folder_id,))
+
+    def add_version(self, document_id: int, path: str, remark: Optional[str] = None) -> int:
+        """Bump ``document.version`` and record the new revision in one transaction."""
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE document SET version = version + 1, path = ? WHERE id = ?", (path, document_id))
+            version = conn.execute("SELECT version FROM document WHERE id = ?", (document_id,)).fetchone()[0]
+            DocumentVersionDAO(self.pool).insert(
+                {"document_id": document_id, "version": version, "path": path, "remark": remark}, conn=conn
+            )
+        return version
+
+
+class DocumentVersionDAO(BaseDAO):
+    table = "document_version"
+    columns = ("document_id", "version", "path", "remark")
+
 
 def save(record):
-    return {"saved": record}
+    return {"saved": record, "id": DocumentDAO().insert(record)}
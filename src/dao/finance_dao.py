@@ -1,4 +1,35 @@
-"""Data access placeholder."""
+"""Expense claim access."""
+from typing import Dict, Iterable, List, Mapping
+
+from src.dao.base import BaseDAO
+
+
+class ExpenseItemDAO(BaseDAO):
+    table = "expense_item"
+    columns = ("claim_id", "amount", "category", "remark")
+
+
+class ExpenseClaimDAO(BaseDAO):
+    table = "expense_claim"
+    columns = ("employee_id", "total_amount", "description", "process_instance_id")
+    scope_owner = "employee_id"
+    scope_owner_of = "SELECT id FROM employee WHERE user_id IN ({users})"
+
+    def create_claim(self, claim: Mapping, items: Iterable[Mapping] = ()) -> int:
+        """Insert a claim and its line items in one transaction; ``total_amount`` defaults to the item sum."""
+        items = list(items)
+        record = dict(claim)
+        record.setdefault("total_amount", sum(item["amount"] for item in items))
+        with self.pool.connection() as conn:
+            claim_id = self.insert(record, conn=conn)
+            ExpenseItemDAO(self.pool).insert_many(({**item, "claim_id": claim_id} for item in items), conn=conn)
+        return claim_id
+
+    def items(self, claim_id: int) -> List[Dict]:
+        return ExpenseItemDAO(self.pool).page(limit=10_000, where="claim_id = ?", params=(claim_id,))
+
 
 def save(record):
-    return {"saved": record}
+    record = dict(record)
+    items = record.pop("items", ())
+    return {"saved": record, "id": ExpenseClaimDAO().create_claim(record, items)}
@@ -1,4 +1,456 @@
-"""Data access placeholder."""
+"""Append-only, hash-chained audit trail.
+
+Audit records go to segment files under ``AUDIT_DIR``, named after the first
+sequence number they hold (``<seq>.seg``). A segment starts with a header:
+a magic tag, its base sequence, and the chain hash of the previous segment's
+last record (the anchor; 32 zero bytes for the first segment). Each record
+follows a fixed layout, ``RECORD`` (seq, timestamp, detail length, actor and
+action as 32-byte fields), then the JSON detail, then the record's chain hash:
+``sha256(previous hash + header + detail)``. An actor or action that does not
+fit in 32 bytes is stored as ``~`` plus a truncated sha256 of its value, with
+the full value kept in the detail (``_audit_actor``/``_audit_action``) and
+restored when read. Editing, dropping or reordering
+any record breaks every hash after it. Because each segment carries its anchor,
+segments can be verified independently and in parallel
+(``src.jobs.audit_verify``).
+
+``append`` only assigns a sequence number and queues the record. A background
+flusher, or ``flush``, chains and writes the queue in one ``write`` plus one
+fsync per batch. While writing, the store keeps a sparse index per segment:
+one block entry every ``index_interval`` records, holding the block's file
+offset, its time range and the set of actors in it. A segment's index is saved
+next to it (``<seq>.idx``) when the segment is sealed. ``query`` uses the
+indexes to skip whole segments and blocks that cannot match an actor or time
+range, so it reads only the blocks that might contain results.
+"""
+import atexit
+import bisect
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
+
+from config.settings import (
+    AUDIT_DIR,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_FSYNC,
+    AUDIT_INDEX_INTERVAL,
+    AUDIT_SEGMENT_BYTES,
+)
+from src.common.exceptions import ERPError
+from src.models.log import AuditLog
+
+MAGIC = b"ERPAUDT1"
+SEGMENT_HEADER = struct.Struct("<8sQ32s")  # magic, base seq, anchor hash
+RECORD = struct.Struct("<QdI32s32s")  # seq, ts, detail length, actor, action
+HASH_SIZE = 32
+GENESIS = bytes(HASH_SIZE)
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+FIELD_SIZE = 32
+LONG_MARK = b"~"
+LONG_KEYS = {"actor": "_audit_actor", "action": "_audit_action"}
+
+Timestamp = Union[float, datetime, None]
+RawRecord = Tuple[int, int, float, str, str, bytes, bytes, bytes]  # pos, seq, ts, actor, action, detail, digest, header
+
+
+class CorruptAuditLogError(ERPError):
+    """Raised when an audit segment cannot be parsed."""
+
+
+def chain_hash(previous: bytes, header: bytes, detail: bytes) -> bytes:
+    return hashlib.sha256(previous + header + detail).digest()
+
+
+def _field(value: Any) -> Tuple[bytes, Optional[str]]:
+    """Fixed-width form of ``value`` plus the full text when it had to be hashed to fit."""
+    text = str(value if value is not None else "")
+    raw = text.encode()
+    if len(raw) <= FIELD_SIZE and not raw.startswith(LONG_MARK):
+        return raw, None
+    return LONG_MARK + hashlib.sha256(raw).hexdigest()[: FIELD_SIZE - len(LONG_MARK)].encode(), text
+
+
+def _text(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode()
+
+
+def read_segment_header(data: bytes) -> Tuple[int, bytes]:
+    """``(base seq, anchor hash)`` of a segment's contents."""
+    if len(data) < SEGMENT_HEADER.size:
+        raise CorruptAuditLogError("truncated segment header")
+    magic, base, anchor = SEGMENT_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise CorruptAuditLogError(f"bad segment magic {magic!r}")
+    return base, anchor
+
+
+def iter_records(data: bytes, pos: int = SEGMENT_HEADER.size, end: Optional[int] = None) -> Iterator[RawRecord]:
+    """Parse records from ``data[pos:end]``, stopping before an incomplete tail."""
+    end = len(data) if end is None else end
+    while pos + RECORD.size <= end:
+        seq, ts, length, actor, action = RECORD.unpack_from(data, pos)
+        detail_at = pos + RECORD.size
+        next_pos = detail_at + length + HASH_SIZE
+        if next_pos > end:
+            return
+        yield (
+            pos,
+            seq,
+            ts,
+            _text(actor),
+            _text(action),
+            bytes(data[detail_at:detail_at + length]),
+            bytes(data[detail_at + length:next_pos]),
+            bytes(data[pos:detail_at]),
+        )
+        pos = next_pos
+
+
+def _epoch(value: Timestamp) -> Optional[float]:
+    return value.timestamp() if isinstance(value, datetime) else value
+
+
+class _Block:
+    __slots__ = ("offset", "seq", "first_ts", "last_ts", "actors")
+
+    def __init__(self, offset: int, seq: int, first_ts: float, last_ts: float, actors: Set[str]):
+        self.offset = offset
+        self.seq = seq
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.actors = actors
+
+
+class _SegmentIndex:
+    def __init__(self, path: str, base: int, anchor: bytes):
+        self.path = path
+        self.base = base
+        self.anchor = anchor
+        self.count = 0
+        self.size = SEGMENT_HEADER.size
+        self.first_ts = 0.0
+        self.last_ts = 0.0
+        self.last_hash = anchor
+        self.blocks: List[_Block] = []
+        self.block_last_ts: List[float] = []
+        self.actors: Set[str] = set()
+
+    def note(self, offset: int, seq: int, ts: float, actor: str, digest: bytes, interval: int) -> None:
+        if self.count % interval == 0:
+            self.blocks.append(_Block(offset, seq, ts, ts, set()))
+            self.block_last_ts.append(ts)
+        block = self.blocks[-1]
+        block.last_ts = ts
+        block.actors.add(actor)
+        self.block_last_ts[-1] = ts
+        self.actors.add(actor)
+        if not self.count:
+            self.first_ts = ts
+        self.last_ts = ts
+        self.last_hash = digest
+        self.count += 1
+
+    @property
+    def index_path(self) -> str:
+        return self.path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+    def save(self) -> None:
+        payload = {
+            "base": self.base,
+            "anchor": self.anchor.hex(),
+            "count": self.count,
+            "size": self.size,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "last_hash": self.last_hash.hex(),
+            "blocks": [[b.offset, b.seq, b.first_ts, b.last_ts, sorted(b.actors)] for b in self.blocks],
+        }
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp, self.index_path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["_SegmentIndex"]:
+        """Saved index for a sealed segment, or ``None`` if missing or stale."""
+        index_path = path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        try:
+            with open(index_path, encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if payload.get("size") != os.path.getsize(path):
+            return None
+        index = cls(path, payload["base"], bytes.fromhex(payload["anchor"]))
+        index.count, index.size = payload["count"], payload["size"]
+        index.first_ts, index.last_ts = payload["first_ts"], payload["last_ts"]
+        index.last_hash = bytes.fromhex(payload["last_hash"])
+        for offset, seq, first_ts, last_ts, actors in payload["blocks"]:
+            index.blocks.append(_Block(offset, seq, first_ts, last_ts, set(actors)))
+            index.block_last_ts.append(last_ts)
+            index.actors.update(actors)
+        return index
+
+
+class AuditStore:
+    def __init__(
+        self,
+        directory: str = AUDIT_DIR,
+        segment_bytes: int = AUDIT_SEGMENT_BYTES,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        index_interval: int = AUDIT_INDEX_INTERVAL,
+        fsync: bool = AUDIT_FSYNC,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.index_interval = max(1, index_interval)
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()  # guards the pending queue and sequence numbers
+        self._write_lock = threading.Lock()  # guards files and indexes; taken before ``_lock``
+        self._pending: List[Tuple[int, float, bytes, bytes, bytes, str]] = []
+        self._segments: List[_SegmentIndex] = []
+        self._closed = False
+        self.appended = 0
+        self.batches = 0
+        self._recover()
+        active = self._segments[-1]
+        self._next_seq = active.base + active.count
+        self._last_ts = active.last_ts
+        self._file = open(active.path, "ab")
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="audit-flush", daemon=True)
+        self._flusher.start()
+
+    # --- recovery --------------------------------------------------------
+    def _recover(self) -> None:
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        for i, name in enumerate(names):
+            path = os.path.join(self.directory, name)
+            index = _SegmentIndex.load(path) if i < len(names) - 1 else None
+            self._segments.append(index or self._scan(path))
+        if not self._segments:
+            self._segments.append(self._new_segment(1, GENESIS))
+
+    def _scan(self, path: str) -> _SegmentIndex:
+        """Rebuild a segment's index from its records and cut off a torn tail."""
+        with open(path, "rb") as fh:
+            data = fh.read()
+        base, anchor = read_segment_header(data)
+        index = _SegmentIndex(path, base, anchor)
+        for pos, seq, ts, actor, _, detail, digest, _ in iter_records(data):
+            index.note(pos, seq, ts, actor, digest, self.index_interval)
+            index.size = pos + RECORD.size + len(detail) + HASH_SIZE
+        if index.size != len(data):
+            os.truncate(path, index.size)
+        return index
+
+    def _new_segment(self, base: int, anchor: bytes) -> _SegmentIndex:
+        path = os.path.join(self.directory, f"{base:020d}{SEGMENT_SUFFIX}")
+        with open(path, "wb") as fh:
+            fh.write(SEGMENT_HEADER.pack(MAGIC, base, anchor))
+        return _SegmentIndex(path, base, anchor)
+
+    # --- writes ----------------------------------------------------------
+    def append(self, actor: Any, action: str, detail: Optional[Mapping[str, Any]] = None) -> int:
+        """Queue one record and return its sequence number; it is durable after the next flush."""
+        (actor_raw, actor_full), (action_raw, action_full) = _field(actor), _field(action)
+        if actor_full is not None or action_full is not None:
+            detail = dict(detail or {})
+            for key, full in (("actor", actor_full), ("action", action_full)):
+                if full is not None:
+                    detail[LONG_KEYS[key]] = full
+        payload = json.dumps(detail or {}, default=str, separators=(",", ":"), ensure_ascii=False).encode()
+        with self._lock:
+            if self._closed:
+                raise ERPError("Audit store is closed")
+            seq = self._next_seq
+            self._next_seq += 1
+            # Monotonic so the sparse time index can bisect; whole microseconds so ``created_at`` round-trips.
+            ts = max(round(time.time(), 6), self._last_ts)
+            self._last_ts = ts
+            self._pending.append((seq, ts, actor_raw, action_raw, payload, actor_raw.decode()))
+            self.appended += 1
+        return seq
+
+    def flush(self) -> int:
+        """Chain, write and (optionally) fsync everything queued so far; returns the record count."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch or self._file is None:
+                return 0
+            active = self._segments[-1]
+            buffer = bytearray()
+            previous = active.last_hash
+            for seq, ts, actor_raw, action_raw, payload, actor in batch:
+                size = RECORD.size + len(payload) + HASH_SIZE
+                if active.count and active.size + len(buffer) + size > self.segment_bytes:
+                    self._write(active, buffer)
+                    buffer = bytearray()
+                    active = self._roll(active, seq)
+                header = RECORD.pack(seq, ts, len(payload), actor_raw, action_raw)
+                digest = chain_hash(previous, header, payload)
+                active.note(active.size + len(buffer), seq, ts, actor, digest, self.index_interval)
+                buffer += header
+                buffer += payload
+                buffer += digest
+                previous = digest
+            self._write(active, buffer)
+            self.batches += 1
+        return len(batch)
+
+    def _write(self, segment: _SegmentIndex, buffer: bytearray) -> None:
+        if not buffer:
+            return
+        self._file.write(buffer)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        segment.size += len(buffer)
+
+    def _roll(self, sealed: _SegmentIndex, base: int) -> _SegmentIndex:
+        self._file.close()
+        sealed.save()
+        segment = self._new_segment(base, sealed.last_hash)
+        self._segments.append(segment)
+        self._file = open(segment.path, "ab")
+        return segment
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    # --- reads -----------------------------------------------------------
+    def query(
+        self,
+        actor: Optional[Any] = None,
+        since: Timestamp = None,
+        until: Timestamp = None,
+        action: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[AuditLog]:
+        """Records matching every given filter, oldest first."""
+        self.flush()
+        since, until = _epoch(since), _epoch(until)
+        actor_key = None if actor is None else _field(actor)[0].decode()
+        action_key = None if action is None else _field(action)[0].decode()
+        actor = None if actor is None else str(actor)
+        with self._write_lock:
+            segments = [(s, s.size, list(s.blocks), list(s.block_last_ts)) for s in self._segments if s.count]
+        results: List[AuditLog] = []
+        for segment, size, blocks, block_last_ts in segments:
+            if since is not None and segment.last_ts < since:
+                continue
+            if until is not None and segment.first_ts > until:
+                break
+            if actor_key is not None and actor_key not in segment.actors:
+                continue
+            start = bisect.bisect_left(block_last_ts, since) if since is not None else 0
+            with open(segment.path, "rb") as fh:
+                for i in range(start, len(blocks)):
+                    block = blocks[i]
+                    if until is not None and block.first_ts > until:
+                        break
+                    if actor_key is not None and actor_key not in block.actors:
+                        continue
+                    end = blocks[i + 1].offset if i + 1 < len(blocks) else size
+                    fh.seek(block.offset)
+                    data = fh.read(end - block.offset)
+                    for _, seq, ts, rec_actor, rec_action, detail, digest, _ in iter_records(data, 0):
+                        if actor_key is not None and rec_actor != actor_key:
+                            continue
+                        if action_key is not None and rec_action != action_key:
+                            continue
+                        if (since is not None and ts < since) or (until is not None and ts > until):
+                            continue
+                        fields = json.loads(detail)
+                        rec_actor = fields.pop(LONG_KEYS["actor"], rec_actor)
+                        rec_action = fields.pop(LONG_KEYS["action"], rec_action)
+                        if (actor is not None and rec_actor != actor) or (action is not None and rec_action != action):
+                            continue  # a truncated-hash collision
+                        results.append(
+                            AuditLog(
+                                id=seq,
+                                actor=rec_actor,
+                                action=rec_action,
+                                created_at=datetime.fromtimestamp(ts),
+                                detail=fields,
+                                hash=digest.hex(),
+                            )
+                        )
+                        if limit is not None and len(results) >= limit:
+                            return results
+        return results
+
+    def segments(self) -> List[str]:
+        with self._write_lock:
+            return [segment.path for segment in self._segments]
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            with self._lock:
+                self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._wake.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._write_lock:
+            records = sum(segment.count for segment in self._segments)
+            segments = len(self._segments)
+            head = self._segments[-1].last_hash.hex()
+        return {
+            "segments": segments,
+            "records": records,
+            "pending": len(self._pending),
+            "appended": self.appended,
+            "batches": self.batches,
+            "head": head,
+        }
+
+
+_STORE: Optional[AuditStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_audit_store() -> AuditStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                store = AuditStore()
+                atexit.register(store.close)
+                _STORE = store
+    return _STORE
+
 
 def save(record):
-    return {"saved": record}
+    seq = get_audit_store().append(record.get("actor"), record.get("action", "record"), record)
+    return {"saved": record, "id": seq}
+
+
+__all__ = [
+    "AuditStore",
+    "CorruptAuditLogError",
+    "GENESIS",
+    "RECORD",
+    "SEGMENT_HEADER",
+    "SEGMENT_SUFFIX",
+    "chain_hash",
+    "get_audit_store",
+    "iter_records",
+    "read_segment_header",
+    "save",
+]
@@ -1,4 +1,66 @@
-"""Data access placeholder."""
+"""Process definition, instance and task access."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.dao.base import BaseDAO
+
+
+class ProcessDefinitionDAO(BaseDAO):
+    table = "process_definition"
+    columns = ("name", "key", "version", "form_schema")
+
+    def latest(self, key: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM process_definition WHERE `key` = ? ORDER BY version DESC LIMIT 1", (key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+
+class ProcessInstanceDAO(BaseDAO):
+    table = "process_instance"
+    columns = ("id", "process_def_id", "business_id", "starter_id", "status")
+    scope_owner = "starter_id"
+
+    def set_status_many(self, changes: Iterable[Tuple[int, int]], conn=None) -> int:
+        """Apply ``(instance_id, status)`` pairs with one ``executemany``."""
+        rows = [(status, instance_id) for instance_id, status in changes]
+        with self._conn(conn) as c:
+            c.executemany("UPDATE process_instance SET status = ? WHERE id = ?", rows)
+        return len(rows)
+
+    def by_status(self, status: int, after: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        return self.page(after=after, limit=limit, where="status = ?", params=(status,))
+
+
+class TaskDAO(BaseDAO):
+    table = "task"
+    columns = ("id", "process_instance_id", "assignee_id", "node_key", "action", "comment", "created_at", "completed_at")
+
+    def complete_many(self, completions: Iterable[Tuple[int, Optional[str], Optional[str], str]], conn=None) -> int:
+        """Apply ``(task_id, action, comment, completed_at)`` tuples with one ``executemany``."""
+        rows = [(action, comment, completed_at, task_id) for task_id, action, comment, completed_at in completions]
+        with self._conn(conn) as c:
+            c.executemany("UPDATE task SET action = ?, comment = ?, completed_at = ? WHERE id = ?", rows)
+        return len(rows)
+
+    def open_for(self, assignee_id: int, after: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        return self.page(
+            after=after, limit=limit, where="assignee_id = ? AND completed_at IS NULL", params=(assignee_id,)
+        )
+
+    def open_in_running(self, running: int) -> List[Dict]:
+        """Uncompleted tasks of instances in status ``running``, with their process key/version and assignee's username."""
+        sql = (
+            "SELECT t.id, t.process_instance_id, t.assignee_id, t.node_key, t.created_at, u.username,"
+            " i.business_id, i.starter_id, d.`key`, d.version"
+            " FROM task t JOIN process_instance i ON i.id = t.process_instance_id"
+            " JOIN process_definition d ON d.id = i.process_def_id"
+            " LEFT JOIN `user` u ON u.id = t.assignee_id"
+            " WHERE i.status = ? AND t.completed_at IS NULL ORDER BY t.id"
+        )
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, (running,))]
+
 
 def save(record):
-    return {"saved": record}
+    return {"saved": record, "id": ProcessInstanceDAO().insert(record)}
@@ -1,4 +1,46 @@
-"""Data access placeholder."""
+"""User table access."""
+from typing import Dict, List, Optional
+
+from src.dao.base import BaseDAO
+
+
+class UserDAO(BaseDAO):
+    table = "user"
+    columns = ("username", "password", "real_name", "phone", "email", "dept_id", "position_id", "status")
+    scope_dept = "dept_id"
+    scope_owner = "id"
+
+    def find_by_username(self, username: str) -> Optional[Dict]:
+        return self.find_one("username", username)
+
+    def existing_usernames(self, usernames: List[str]) -> set:
+        """Return which of ``usernames`` are already taken (queried in chunks of 500)."""
+        found = set()
+        with self.pool.connection() as conn:
+            for start in range(0, len(usernames), 500):
+                chunk = usernames[start:start + 500]
+                marks = ", ".join("?" for _ in chunk)
+                rows = conn.execute(f"SELECT username FROM `user` WHERE username IN ({marks})", chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def ids_by_username(self, usernames: List[str]) -> Dict[str, int]:
+        """``{username: id}`` for the usernames that exist (queried in chunks of 500)."""
+        found: Dict[str, int] = {}
+        with self.pool.connection() as conn:
+            for start in range(0, len(usernames), 500):
+                chunk = usernames[start:start + 500]
+                marks = ", ".join("?" for _ in chunk)
+                rows = conn.execute(f"SELECT username, id FROM `user` WHERE username IN ({marks})", chunk)
+                found.update(rows.fetchall())
+        return found
+
+    def headcount_by_department(self) -> Dict[int, int]:
+        """Enabled users per ``dept_id`` (users without a department are left out)."""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT dept_id, COUNT(*) FROM `user` WHERE status = 1 AND dept_id IS NOT NULL GROUP BY dept_id")
+            return dict(rows.fetchall())
+
 
 def save(record):
-    return {"saved": record}
+    return {"saved": record, "id": UserDAO().insert(record)}
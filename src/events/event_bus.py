@@ -1,4 +1,319 @@
-"""Simple event bus stub."""
+"""In-process publish/subscribe event bus.
+
+Every subscription owns a bounded queue. ``publish`` only appends to the queues
+of matching subscriptions and schedules a drain; handlers run later, off the
+publisher's thread, and receive events in micro-batches of up to
+``batch_size``. At most one drain per subscription is in flight, so each
+subscriber sees its events in publish order.
+
+Dispatch runs either on a dedicated ``SharedExecutor`` (``mode="thread"``) or
+on an asyncio loop in a background thread (``mode="asyncio"``, where handlers
+may be coroutine functions). A full queue either drops its oldest event, drops
+the new one, or blocks the publisher for up to ``block_timeout`` seconds,
+depending on the subscription's ``overflow`` policy. ``metrics()`` reports
+queue depth, drops, errors and delivery lag per subscription.
+
+Topics are dotted names; a subscription pattern is an exact topic, a prefix
+ending in ``.*`` (``finance.*``) or ``*`` for everything.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from config.settings import EVENT_BATCH_SIZE, EVENT_DISPATCH, EVENT_QUEUE_SIZE, EVENT_WORKERS
+from src.common.runtime import SharedExecutor
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class Event(NamedTuple):
+    topic: str
+    payload: Any
+    published_at: float
+
+
+class Subscription:
+    def __init__(
+        self,
+        pattern: str,
+        handler: Callable,
+        batch: bool = True,
+        batch_size: int = EVENT_BATCH_SIZE,
+        capacity: int = EVENT_QUEUE_SIZE,
+        overflow: str = "drop_oldest",
+        block_timeout: float = 1.0,
+        name: Optional[str] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}; expected one of {OVERFLOW_POLICIES}")
+        self.pattern = pattern
+        self.handler = handler
+        self.batch = batch
+        self.batch_size = max(1, batch_size)
+        self.capacity = max(1, capacity)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.name = name or getattr(handler, "__qualname__", repr(handler))
+        self.is_coroutine = asyncio.iscoroutinefunction(handler)
+        self.active = True
+        self._queue: Deque[Event] = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._scheduled = False
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.max_lag = 0.0
+
+    def matches(self, topic: str) -> bool:
+        pattern = self.pattern
+        if pattern == "*" or pattern == topic:
+            return True
+        return pattern.endswith(".*") and topic.startswith(pattern[:-1])
+
+    def offer(self, event: Event) -> Tuple[bool, bool]:
+        """Enqueue ``event``; returns ``(accepted, needs_drain)``."""
+        with self._lock:
+            if len(self._queue) >= self.capacity:
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.overflow == "drop_newest":
+                    self.dropped += 1
+                    return False, False
+                elif not self._not_full.wait_for(lambda: len(self._queue) < self.capacity, self.block_timeout):
+                    self.dropped += 1
+                    return False, False
+            self._queue.append(event)
+            self.received += 1
+            needs_drain = not self._scheduled
+            self._scheduled = True
+        return True, needs_drain
+
+    def take(self) -> List[Event]:
+        """Pop the next micro-batch; an empty result marks the subscription idle."""
+        with self._lock:
+            queue = self._queue
+            count = min(self.batch_size, len(queue))
+            if not count:
+                self._scheduled = False
+                return []
+            batch = [queue.popleft() for _ in range(count)]
+            self._not_full.notify(count)
+        return batch
+
+    def _record(self, batch: List[Event], error: Optional[BaseException]) -> None:
+        lag = time.monotonic() - batch[0].published_at
+        with self._lock:
+            self.batches += 1
+            self.delivered += len(batch)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if error is not None:
+                self.errors += 1
+                self.last_error = f"{type(error).__name__}: {error}"
+
+    def deliver(self, batch: List[Event]) -> None:
+        error = None
+        try:
+            if self.batch:
+                self.handler(batch)
+            else:
+                for event in batch:
+                    self.handler(event)
+        except Exception as exc:  # a failing subscriber must not stop the drain
+            error = exc
+        self._record(batch, error)
+
+    async def deliver_async(self, batch: List[Event]) -> None:
+        error = None
+        try:
+            if self.batch:
+                await self.handler(batch)
+            else:
+                for event in batch:
+                    await self.handler(event)
+        except Exception as exc:
+            error = exc
+        self._record(batch, error)
+
+    @property
+    def idle(self) -> bool:
+        with self._lock:
+            return not self._scheduled
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = len(self._queue)
+            lag = time.monotonic() - self._queue[0].published_at if depth else 0.0
+            return {
+                "pattern": self.pattern,
+                "name": self.name,
+                "depth": depth,
+                "capacity": self.capacity,
+                "received": self.received,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "avg_batch": round(self.delivered / self.batches, 2) if self.batches else 0.0,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "lag_ms": round(lag * 1000, 3),
+                "max_lag_ms": round(self.max_lag * 1000, 3),
+            }
+
+
+class EventBus:
+    def __init__(self, mode: str = EVENT_DISPATCH, workers: int = EVENT_WORKERS, max_batches_per_turn: int = 16):
+        if mode not in ("thread", "asyncio"):
+            raise ValueError(f"Unknown dispatch mode {mode!r}; expected 'thread' or 'asyncio'")
+        self.mode = mode
+        self.max_batches_per_turn = max(1, max_batches_per_turn)
+        self._subs: List[Subscription] = []
+        self._routes: Dict[str, Tuple[Subscription, ...]] = {}
+        self._lock = threading.Lock()
+        self._executor = SharedExecutor(workers, thread_name_prefix="erp-events") if mode == "thread" else None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        # Bus-level counters are updated without a lock and may undercount slightly
+        # under concurrent publishers; the per-subscription counters are exact.
+        self.published = 0
+        self.unrouted = 0
+
+    # --- subscriptions ---------------------------------------------------
+    def subscribe(self, pattern: str, handler: Callable, **options) -> Subscription:
+        """Attach ``handler``; see ``Subscription`` for the batching and overflow options."""
+        sub = Subscription(pattern, handler, **options)
+        if sub.is_coroutine and self.mode != "asyncio":
+            raise ValueError("Coroutine handlers need an asyncio-mode bus")
+        with self._lock:
+            self._subs.append(sub)
+            self._routes = {}
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            sub.active = False
+            self._subs = [s for s in self._subs if s is not sub]
+            self._routes = {}
+
+    def subscriptions(self, topic: Optional[str] = None) -> Tuple[Subscription, ...]:
+        if topic is None:
+            return tuple(self._subs)
+        routes = self._routes
+        subs = routes.get(topic)
+        if subs is None:
+            with self._lock:
+                subs = tuple(s for s in self._subs if s.matches(topic))
+                self._routes[topic] = subs
+        return subs
+
+    # --- publishing ------------------------------------------------------
+    def publish(self, topic: str, payload: Any = None) -> int:
+        """Queue ``payload`` for every matching subscriber; returns how many accepted it."""
+        self.published += 1
+        subs = self.subscriptions(topic)
+        if not subs:
+            self.unrouted += 1
+            return 0
+        event = Event(topic, payload, time.monotonic())
+        accepted = 0
+        for sub in subs:
+            ok, needs_drain = sub.offer(event)
+            if ok:
+                accepted += 1
+            if needs_drain:
+                self._schedule(sub)
+        return accepted
+
+    # --- dispatch --------------------------------------------------------
+    def _schedule(self, sub: Subscription) -> None:
+        if self._executor is not None:
+            self._executor.submit(lambda: self._drain(sub))
+        else:
+            loop = self._ensure_loop()
+            loop.call_soon_threadsafe(lambda: loop.create_task(self._drain_async(sub)))
+
+    def _drain(self, sub: Subscription) -> None:
+        for _ in range(self.max_batches_per_turn):
+            batch = sub.take()
+            if not batch:
+                return
+            sub.deliver(batch)
+        # Yield the worker so one busy subscriber cannot starve the others.
+        self._executor.submit(lambda: self._drain(sub))
+
+    async def _drain_async(self, sub: Subscription) -> None:
+        while True:
+            batch = sub.take()
+            if not batch:
+                return
+            if sub.is_coroutine:
+                await sub.deliver_async(batch)
+            else:
+                sub.deliver(batch)
+            await asyncio.sleep(0)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="erp-events-loop", daemon=True)
+                    thread.start()
+                    self._loop_thread = thread
+                    self._loop = loop
+        return self._loop
+
+    # --- lifecycle -------------------------------------------------------
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event has been handled; False if ``timeout`` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(sub.idle for sub in self._subs):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = 5.0) -> None:
+        if drain:
+            self.flush(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=drain)
+        loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._loop_thread.join()
+            loop.close()
+            self._loop_thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        subs = [sub.metrics() for sub in self._subs]
+        return {
+            "mode": self.mode,
+            "published": self.published,
+            "unrouted": self.unrouted,
+            "dropped": sum(s["dropped"] for s in subs),
+            "depth": sum(s["depth"] for s in subs),
+            "subscriptions": subs,
+        }
+
+
+BUS = EventBus()
+
+
+def get_bus() -> EventBus:
+    return BUS
+
 
 def emit(event_name: str, payload: dict):
-    return {"emitted": event_name, "payload": payload}
+    """Publish on the process-wide bus; delivery happens asynchronously."""
+    return {"emitted": event_name, "payload": payload, "subscribers": BUS.publish(event_name, payload)}
+
+
+__all__ = ["BUS", "Event", "EventBus", "OVERFLOW_POLICIES", "Subscription", "emit", "get_bus"]
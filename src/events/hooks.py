@@ -1,8 +1,37 @@
-"""Hook registration stub."""
+"""Named hooks backed by the event bus.
 
-HOOKS = {}
+Each name may have any number of handlers. Registering a handler subscribes it
+to the topic of the same name on ``event_bus.BUS``, so ``emit(name, payload)``
+reaches every handler asynchronously, one event at a time.
+"""
+from typing import Callable, Dict, List, Optional
 
+from src.events.event_bus import BUS, EventBus, Subscription
 
-def register(name: str, handler):
-    HOOKS[name] = handler
+HOOKS: Dict[str, List[Callable]] = {}
+_SUBSCRIPTIONS: Dict[tuple, Subscription] = {}
+
+
+def register(name: str, handler, bus: Optional[EventBus] = None, **options):
+    bus = bus or BUS
+    HOOKS.setdefault(name, []).append(handler)
+    options.setdefault("batch", False)
+    _SUBSCRIPTIONS[(name, id(handler), id(bus))] = bus.subscribe(name, handler, **options)
     return handler
+
+
+def unregister(name: str, handler, bus: Optional[EventBus] = None) -> bool:
+    bus = bus or BUS
+    sub = _SUBSCRIPTIONS.pop((name, id(handler), id(bus)), None)
+    if sub is None:
+        return False
+    bus.unsubscribe(sub)
+    handlers = HOOKS.get(name, [])
+    if handler in handlers:
+        handlers.remove(handler)
+    if not handlers:
+        HOOKS.pop(name, None)
+    return True
+
+
+__all__ = ["HOOKS", "register", "unregister"]
@@ -0,0 +1,20 @@
+"""Built-in event listeners and their bus wiring."""
+from typing import List, Optional
+
+from src.events.event_bus import BUS, EventBus, Subscription
+from src.events.listeners import finance_listener, process_listener, user_listener
+
+LISTENERS = (finance_listener, process_listener, user_listener)
+
+
+def attach(bus: Optional[EventBus] = None, **options) -> List[Subscription]:
+    """Subscribe every listener's ``handle_batch`` to its ``TOPICS`` on ``bus``."""
+    bus = bus or BUS
+    subs = []
+    for listener in LISTENERS:
+        for topic in listener.TOPICS:
+            subs.append(bus.subscribe(topic, listener.handle_batch, name=listener.__name__, **options))
+    return subs
+
+
+__all__ = ["LISTENERS", "attach"]
@@ -1,4 +1,36 @@
-"""${f.capitalize()} event listener stub."""
+"""Finance event listener: keeps running expense totals per submitter."""
+import threading
+from collections import Counter, defaultdict
+
+TOPICS = ("finance.*",)
+
+_lock = threading.Lock()
+COUNTS = Counter()
+TOTALS = defaultdict(float)
+
+
+def _amount(expense) -> float:
+    try:
+        return float((expense or {}).get("amount") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
 
 def handle(event):
     return {"handled": event}
+
+
+def handle_batch(events):
+    """Fold a micro-batch into the counters under one lock acquisition."""
+    counts = Counter()
+    totals = defaultdict(float)
+    for event in events:
+        counts[event.topic] += 1
+        payload = event.payload or {}
+        if event.topic == "finance.expense.submitted":
+            totals[payload.get("submitted_by")] += _amount(payload.get("expense"))
+    with _lock:
+        COUNTS.update(counts)
+        for user, amount in totals.items():
+            TOTALS[user] += amount
+    return len(events)
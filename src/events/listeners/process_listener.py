@@ -1,4 +1,23 @@
-"""${f.capitalize()} event listener stub."""
+"""Process event listener: tracks approval workflow activity by topic and status."""
+import threading
+from collections import Counter
+
+TOPICS = ("process.*",)
+
+_lock = threading.Lock()
+COUNTS = Counter()
+STATUSES = Counter()
+
 
 def handle(event):
     return {"handled": event}
+
+
+def handle_batch(events):
+    counts = Counter(event.topic for event in events)
+    statuses = Counter((event.payload or {}).get("status") for event in events)
+    statuses.pop(None, None)
+    with _lock:
+        COUNTS.update(counts)
+        STATUSES.update(statuses)
+    return len(events)
@@ -1,4 +1,22 @@
-"""${f.capitalize()} event listener stub."""
+"""User event listener: counts account events and remembers recently changed users."""
+import threading
+from collections import Counter, deque
+
+TOPICS = ("user.*",)
+
+_lock = threading.Lock()
+COUNTS = Counter()
+RECENT = deque(maxlen=100)
+
 
 def handle(event):
     return {"handled": event}
+
+
+def handle_batch(events):
+    counts = Counter(event.topic for event in events)
+    names = [(event.payload or {}).get("username") for event in events]
+    with _lock:
+        COUNTS.update(counts)
+        RECENT.extend(name for name in names if name)
+    return len(events)
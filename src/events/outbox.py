@@ -0,0 +1,509 @@
+"""Outbox delivery through a local, segment-file message log.
+
+``SegmentLog`` is an append-only log split into segment files named after the
+first offset they hold. Each record is ``offset | length | crc32`` followed by
+the payload. Appends only write to a buffered file under a short lock; a
+background flusher fsyncs whatever accumulated every ``fsync_interval``
+seconds, so many appends share one fsync. Readers see records once they are
+durable and read them through ``mmap`` without copying whole segments. A sparse
+per-segment index keeps seeks cheap. On open, segments are re-scanned and a
+torn tail left by a crash is truncated.
+
+``OutboxRelay`` drains the log in batches to a pluggable sink (anything with
+``publish(messages)``) and checkpoints the next offset after each acknowledged
+batch. Delivery is at-least-once; messages carry their log offset, so a sink
+such as ``LocalBroker`` drops redelivered offsets and ends up with each
+message exactly once. ``replay`` re-sends a range of offsets without moving
+the checkpoint. It is a deliberate redelivery, so it goes through the sink's
+``replay(messages)`` when there is one; ``LocalBroker`` then delivers those
+messages again instead of dropping them as duplicates.
+"""
+import atexit
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from config.settings import OUTBOX_DIR, OUTBOX_FSYNC_INTERVAL, OUTBOX_SEGMENT_BYTES
+from src.common.exceptions import ERPError
+
+HEADER = struct.Struct("<QII")  # offset, payload length, crc32
+SEGMENT_SUFFIX = ".log"
+
+
+class CorruptRecordError(ERPError):
+    """Raised when a durable record fails its checksum."""
+
+
+class OutboxMessage(NamedTuple):
+    offset: int
+    channel: str
+    destination: str
+    payload: Any
+
+
+class _Segment:
+    def __init__(self, path: str, base: int):
+        self.path = path
+        self.base = base
+        self.size = 0  # durable bytes, visible to readers
+        self.next_offset = base  # one past the last durable record
+        self.index_offsets: List[int] = []
+        self.index_positions: List[int] = []
+        self._map: Optional[mmap.mmap] = None
+
+    def view(self) -> Optional[mmap.mmap]:
+        size = self.size
+        current = self._map
+        if current is None or len(current) < size:
+            if size == 0:
+                return None
+            with open(self.path, "rb") as fh:
+                current = mmap.mmap(fh.fileno(), size, access=mmap.ACCESS_READ)
+            self._map = current
+        return current
+
+    def position_for(self, offset: int) -> int:
+        idx = bisect.bisect_right(self.index_offsets, offset) - 1
+        return self.index_positions[idx] if idx >= 0 else 0
+
+
+class SegmentLog:
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = OUTBOX_SEGMENT_BYTES,
+        fsync_interval: float = OUTBOX_FSYNC_INTERVAL,
+        index_interval: int = 64,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.index_interval = max(1, index_interval)
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._durable = threading.Condition()
+        self._dirty = threading.Event()
+        self._closed = False
+        self._segments: List[_Segment] = []
+        self._bases: List[int] = []
+        self.appends = 0
+        self.fsyncs = 0
+        self._recover()
+        active = self._segments[-1]
+        self._file = open(active.path, "ab", buffering=1 << 20)
+        self._pos = active.size
+        self._next_offset = active.next_offset
+        self._durable_next = self._next_offset
+        self._flusher = threading.Thread(target=self._flush_loop, name="outbox-fsync", daemon=True)
+        self._flusher.start()
+
+    # --- recovery --------------------------------------------------------
+    def _recover(self) -> None:
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        for name in names:
+            segment = _Segment(os.path.join(self.directory, name), int(name[: -len(SEGMENT_SUFFIX)]))
+            self._scan(segment)
+            self._add_segment(segment)
+        if not self._segments:
+            self._add_segment(self._new_segment(0))
+
+    def _scan(self, segment: _Segment) -> None:
+        """Validate every record, build the sparse index and cut off a torn tail."""
+        file_size = os.path.getsize(segment.path)
+        pos, offset = 0, segment.base
+        if file_size:
+            with open(segment.path, "rb") as fh:
+                data = mmap.mmap(fh.fileno(), file_size, access=mmap.ACCESS_READ)
+            try:
+                while pos + HEADER.size <= file_size:
+                    rec_offset, length, crc = HEADER.unpack_from(data, pos)
+                    end = pos + HEADER.size + length
+                    if rec_offset != offset or end > file_size or zlib.crc32(data[pos + HEADER.size:end]) != crc:
+                        break
+                    if (offset - segment.base) % self.index_interval == 0:
+                        segment.index_offsets.append(offset)
+                        segment.index_positions.append(pos)
+                    pos, offset = end, offset + 1
+            finally:
+                data.close()
+        if pos != file_size:
+            os.truncate(segment.path, pos)
+        segment.size = pos
+        segment.next_offset = offset
+
+    def _new_segment(self, base: int) -> _Segment:
+        segment = _Segment(os.path.join(self.directory, f"{base:020d}{SEGMENT_SUFFIX}"), base)
+        open(segment.path, "ab").close()
+        return segment
+
+    def _add_segment(self, segment: _Segment) -> None:
+        self._segments.append(segment)
+        self._bases.append(segment.base)
+
+    # --- writes ----------------------------------------------------------
+    def append(self, data: bytes, sync: bool = False) -> int:
+        """Append one record and return its offset; ``sync=True`` waits until it is fsynced."""
+        record_len = HEADER.size + len(data)
+        with self._lock:
+            if self._closed:
+                raise ERPError("Outbox log is closed")
+            if self._pos and self._pos + record_len > self.segment_bytes:
+                self._roll()
+            offset = self._next_offset
+            segment = self._segments[-1]
+            if (offset - segment.base) % self.index_interval == 0:
+                segment.index_offsets.append(offset)
+                segment.index_positions.append(self._pos)
+            self._file.write(HEADER.pack(offset, len(data), zlib.crc32(data)))
+            self._file.write(data)
+            self._pos += record_len
+            self._next_offset = offset + 1
+            self.appends += 1
+        self._dirty.set()
+        if sync:
+            self.wait_durable(offset)
+        return offset
+
+    def _roll(self) -> None:
+        """Seal the active segment (flush + fsync) and start a new one; caller holds the lock."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+        self._file.close()
+        self._publish(self._segments[-1], self._pos, self._next_offset)
+        segment = self._new_segment(self._next_offset)
+        self._add_segment(segment)
+        self._file = open(segment.path, "ab", buffering=1 << 20)
+        self._pos = 0
+
+    def _publish(self, segment: _Segment, size: int, next_offset: int) -> None:
+        with self._durable:
+            segment.size = max(segment.size, size)
+            segment.next_offset = max(segment.next_offset, next_offset)
+            if next_offset > self._durable_next:
+                self._durable_next = next_offset
+                self._durable.notify_all()
+
+    def flush(self) -> None:
+        """Make everything appended so far durable and readable now."""
+        with self._lock:
+            if self._closed:
+                return
+            self._file.flush()
+            fd = os.dup(self._file.fileno())
+            segment, size, next_offset = self._segments[-1], self._pos, self._next_offset
+        try:
+            # fsync a duplicate descriptor outside the lock so appends are never held up by the disk.
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.fsyncs += 1
+        self._publish(segment, size, next_offset)
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._dirty.wait()
+            if self._closed:
+                return
+            if self.fsync_interval > 0:
+                time.sleep(self.fsync_interval)
+            self._dirty.clear()
+            self.flush()
+
+    def wait_durable(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """Block until ``offset`` is durable; False on timeout."""
+        with self._durable:
+            return self._durable.wait_for(lambda: self._durable_next > offset or self._closed, timeout)
+
+    # --- reads -----------------------------------------------------------
+    @property
+    def next_offset(self) -> int:
+        return self._next_offset
+
+    @property
+    def durable_offset(self) -> int:
+        """One past the last durable offset."""
+        return self._durable_next
+
+    def read(self, start: int, max_records: int = 1000) -> List[Tuple[int, bytes]]:
+        """Up to ``max_records`` durable records with offset >= ``start``, in order."""
+        records: List[Tuple[int, bytes]] = []
+        bases, segments = self._bases, self._segments
+        idx = max(0, bisect.bisect_right(bases, start) - 1)
+        while idx < len(segments) and len(records) < max_records:
+            segment = segments[idx]
+            idx += 1
+            size = segment.size
+            if segment.next_offset <= start or size == 0:
+                continue
+            view = segment.view()
+            pos = segment.position_for(start)
+            while pos + HEADER.size <= size and len(records) < max_records:
+                offset, length, crc = HEADER.unpack_from(view, pos)
+                body_start = pos + HEADER.size
+                pos = body_start + length
+                if offset < start:
+                    continue
+                body = view[body_start:pos]
+                if zlib.crc32(body) != crc:
+                    raise CorruptRecordError(f"Checksum mismatch at offset {offset} in {segment.path}")
+                records.append((offset, body))
+        return records
+
+    # --- maintenance -----------------------------------------------------
+    def truncate_before(self, offset: int) -> int:
+        """Delete sealed segments whose records all precede ``offset``; returns how many went."""
+        with self._lock:
+            doomed = [s for s in self._segments[:-1] if s.next_offset <= offset]
+            if not doomed:
+                return 0
+            self._segments = self._segments[len(doomed):]
+            self._bases = self._bases[len(doomed):]
+        for segment in doomed:
+            os.remove(segment.path)
+        return len(doomed)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._file.close()
+        self._dirty.set()
+        with self._durable:
+            self._durable.notify_all()
+        self._flusher.join()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "next_offset": self._next_offset,
+            "durable_offset": self._durable_next,
+            "segments": len(self._segments),
+            "bytes": sum(s.size for s in self._segments),
+            "appends": self.appends,
+            "fsyncs": self.fsyncs,
+        }
+
+
+def encode_message(channel: str, destination: str, payload: Any) -> bytes:
+    return json.dumps([channel, destination, payload], ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+def decode_message(offset: int, data: bytes) -> OutboxMessage:
+    channel, destination, payload = json.loads(data)
+    return OutboxMessage(offset, channel, destination, payload)
+
+
+def decode_batch(records: List[Tuple[int, bytes]]) -> List[OutboxMessage]:
+    """Decode a batch with a single ``json.loads`` call instead of one per record."""
+    decoded = json.loads(b"[" + b",".join(data for _, data in records) + b"]")
+    return [OutboxMessage(offset, *fields) for (offset, _), fields in zip(records, decoded)]
+
+
+class LocalBroker:
+    """In-process stand-in for Kafka/RabbitMQ that ignores already-seen offsets unless they are replayed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.high_water = -1
+        self.duplicates = 0
+        self.replayed = 0
+        self.queues: Dict[Tuple[str, str], List[OutboxMessage]] = defaultdict(list)
+
+    def publish(self, messages: List[OutboxMessage]) -> int:
+        accepted = 0
+        with self._lock:
+            for message in messages:
+                if message.offset <= self.high_water:
+                    self.duplicates += 1
+                    continue
+                self.queues[(message.channel, message.destination)].append(message)
+                self.high_water = message.offset
+                accepted += 1
+        return accepted
+
+    def replay(self, messages: List[OutboxMessage]) -> int:
+        """Deliver ``messages`` again, even offsets already seen; new offsets also advance the high-water mark."""
+        with self._lock:
+            for message in messages:
+                self.queues[(message.channel, message.destination)].append(message)
+                if message.offset <= self.high_water:
+                    self.replayed += 1
+                else:
+                    self.high_water = message.offset
+        return len(messages)
+
+    def messages(self, channel: str, destination: str) -> List[OutboxMessage]:
+        with self._lock:
+            return list(self.queues.get((channel, destination), ()))
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        log: SegmentLog,
+        sink,
+        checkpoint_path: Optional[str] = None,
+        batch_size: int = 1000,
+        idle_wait: float = 0.05,
+        max_backoff: float = 1.0,
+    ):
+        self.log = log
+        self.sink = sink
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.idle_wait = idle_wait
+        self.max_backoff = max_backoff
+        self.position = self._load_checkpoint()
+        self.delivered = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_checkpoint(self) -> int:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as fh:
+                return int(fh.read().strip() or 0)
+        return 0
+
+    def _save_checkpoint(self) -> None:
+        if not self.checkpoint_path:
+            return
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(str(self.position))
+        os.replace(tmp, self.checkpoint_path)
+
+    def poll(self) -> int:
+        """Deliver one batch; returns how many messages went out (the sink may raise)."""
+        records = self.log.read(self.position, self.batch_size)
+        if not records:
+            return 0
+        self.sink.publish(decode_batch(records))
+        self.position = records[-1][0] + 1
+        self.delivered += len(records)
+        self.batches += 1
+        self._save_checkpoint()
+        return len(records)
+
+    def replay(self, start: int, end: Optional[int] = None, sink=None) -> int:
+        """Re-send offsets ``start <= offset < end`` to ``sink`` (default: the relay's) without moving the checkpoint."""
+        sink = sink or self.sink
+        publish = getattr(sink, "replay", sink.publish)
+        end = self.log.durable_offset if end is None else end
+        sent = 0
+        while start < end:
+            records = [r for r in self.log.read(start, min(self.batch_size, end - start)) if r[0] < end]
+            if not records:
+                break
+            publish(decode_batch(records))
+            sent += len(records)
+            start = records[-1][0] + 1
+        return sent
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while not self._stop.is_set():
+            try:
+                sent = self.poll()
+                backoff = 0.0
+            except Exception as exc:  # sink outage: retry the same batch later
+                self.failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                backoff = min(self.max_backoff, backoff * 2 or 0.01)
+                self._stop.wait(backoff)
+                continue
+            if not sent:
+                self.log.wait_durable(self.position, self.idle_wait)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True, timeout: float = 5.0) -> None:
+        if drain and self._thread is not None:
+            self.log.flush()
+            deadline = time.monotonic() + timeout
+            while self.position < self.log.durable_offset and time.monotonic() < deadline:
+                time.sleep(0.001)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "position": self.position,
+            "lag": self.log.next_offset - self.position,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class Outbox:
+    """Log + relay pair; ``enqueue`` returns as soon as the record is buffered."""
+
+    def __init__(self, directory: str, sink=None, **log_options):
+        self.log = SegmentLog(directory, **log_options)
+        self.sink = sink if sink is not None else LocalBroker()
+        self.relay = OutboxRelay(self.log, self.sink, os.path.join(directory, "relay.offset"))
+
+    def enqueue(self, channel: str, destination: str, payload: Any, sync: bool = False) -> int:
+        return self.log.append(encode_message(channel, destination, payload), sync=sync)
+
+    def start(self) -> "Outbox":
+        self.relay.start()
+        return self
+
+    def close(self) -> None:
+        self.relay.stop()
+        self.log.truncate_before(self.relay.position)
+        self.log.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"log": self.log.metrics(), "relay": self.relay.metrics()}
+
+
+_OUTBOX: Optional[Outbox] = None
+_OUTBOX_LOCK = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Process-wide outbox under ``config.settings.OUTBOX_DIR``, relaying to a ``LocalBroker``."""
+    global _OUTBOX
+    if _OUTBOX is None:
+        with _OUTBOX_LOCK:
+            if _OUTBOX is None:
+                outbox = Outbox(OUTBOX_DIR).start()
+                atexit.register(outbox.close)
+                _OUTBOX = outbox
+    return _OUTBOX
+
+
+__all__ = [
+    "CorruptRecordError",
+    "LocalBroker",
+    "Outbox",
+    "OutboxMessage",
+    "OutboxRelay",
+    "SegmentLog",
+    "decode_batch",
+    "decode_message",
+    "encode_message",
+    "get_outbox",
+]
@@ -0,0 +1,107 @@
+"""Verify the audit trail's hash chain.
+
+Each segment is checked on its own, in a process pool: header magic, gapless
+sequence numbers from its base, and every record hash recomputed from the
+segment's anchor. The results are then stitched together. Each segment's anchor
+must equal the previous segment's last hash and its base must continue the
+previous sequence, so a deleted, truncated or swapped segment is caught too.
+
+    python -m src.jobs.audit_verify --dir audit --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config.settings import AUDIT_DIR
+from src.dao.log_dao import (
+    GENESIS,
+    SEGMENT_HEADER,
+    SEGMENT_SUFFIX,
+    CorruptAuditLogError,
+    chain_hash,
+    iter_records,
+    read_segment_header,
+)
+
+
+def verify_segment(path: str) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"segment": os.path.basename(path), "ok": True, "error": None, "count": 0}
+    with open(path, "rb") as fh:
+        data = fh.read()
+    try:
+        base, anchor = read_segment_header(data)
+    except CorruptAuditLogError as exc:
+        return result | {"ok": False, "error": str(exc)}
+    result.update(base=base, anchor=anchor.hex())
+    previous, expected, consumed = anchor, base, SEGMENT_HEADER.size
+    for pos, seq, _, _, _, detail, digest, header in iter_records(data):
+        if seq != expected:
+            return result | {"ok": False, "error": f"expected seq {expected}, found {seq}", "bad_seq": seq}
+        if chain_hash(previous, header, detail) != digest:
+            return result | {"ok": False, "error": f"hash mismatch at seq {seq}", "bad_seq": seq}
+        previous, expected = digest, expected + 1
+        consumed = pos + len(header) + len(detail) + len(digest)
+        result["count"] += 1
+    trailing = len(data) - consumed
+    if trailing:
+        result.update(ok=False, error=f"{trailing} trailing bytes after seq {expected - 1}")
+    result["last_hash"] = previous.hex()
+    return result
+
+
+def verify(directory: str = AUDIT_DIR, workers: Optional[int] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+    )
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            results: List[Dict[str, Any]] = list(pool.map(verify_segment, paths))
+    else:
+        results = [verify_segment(path) for path in paths]
+
+    errors = [f"{r['segment']}: {r['error']}" for r in results if not r["ok"]]
+    previous: Optional[Dict[str, Any]] = None
+    for result in results:
+        if "anchor" not in result:
+            continue
+        if previous is not None and not previous["ok"]:
+            # The previous segment's own error is already reported; its tail cannot anchor this one.
+            previous = result
+            continue
+        expected_anchor = previous["last_hash"] if previous else GENESIS.hex()
+        if result["anchor"] != expected_anchor:
+            errors.append(f"{result['segment']}: anchor does not match the previous segment's last hash")
+        if previous and result["base"] != previous["base"] + previous["count"]:
+            expected_base = previous["base"] + previous["count"]
+            errors.append(f"{result['segment']}: starts at seq {result['base']}, expected {expected_base}")
+        previous = result
+    return {
+        "ok": not errors,
+        "segments": len(results),
+        "records": sum(r["count"] for r in results),
+        "errors": errors,
+        "head": previous.get("last_hash") if previous else GENESIS.hex(),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=AUDIT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    report = verify(args.dir, args.workers)
+    print(f"{report['segments']} segments, {report['records']:,} records verified in {report['elapsed']}s")
+    for error in report["errors"]:
+        print(f"  FAIL {error}")
+    print("chain intact" if report["ok"] else "chain BROKEN")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
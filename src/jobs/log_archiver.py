@@ -1,4 +1,40 @@
-"""Log archiver job stub."""
+"""Compress rotated JSON-lines logs.
 
-def archive():
-    return "archived"
+``AccessLogger`` renames full or expired files to
+``<name>-YYYYmmdd-HHMMSS-N.jsonl``; this job gzips each of those next to the
+original and removes the plain file once the archive is complete. Active files
+(``<name>.jsonl``) are never touched.
+"""
+import gzip
+import os
+import re
+import shutil
+from typing import Any, Dict, Optional
+
+from config.settings import LOG_DIR
+
+ROTATED = re.compile(r"^[\w.]+-\d{8}-\d{6}-\d+\.jsonl$")
+
+
+def archive(directory: str = LOG_DIR, compresslevel: int = 6, max_files: Optional[int] = None) -> Dict[str, Any]:
+    archived, bytes_in, bytes_out = [], 0, 0
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not ROTATED.match(name):
+                continue
+            if max_files is not None and len(archived) >= max_files:
+                break
+            source = os.path.join(directory, name)
+            target = source + ".gz"
+            partial = target + ".part"
+            with open(source, "rb") as src, gzip.open(partial, "wb", compresslevel=compresslevel) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(partial, target)
+            bytes_in += os.path.getsize(source)
+            bytes_out += os.path.getsize(target)
+            os.remove(source)
+            archived.append(name + ".gz")
+    return {"status": "archived", "files": archived, "bytes_in": bytes_in, "bytes_out": bytes_out}
+
+
+__all__ = ["ROTATED", "archive"]
@@ -1,6 +1,13 @@
 """Entrypoint demonstrating concurrent execution of platform stubs.
 Run with `python -m src.main` to see batched tasks dispatched via a thread pool.
+The run works in a scratch directory, so the workflow database, outbox
+segments and logs it creates do not land in the caller's working directory.
 """
+import atexit
+import os
+import shutil
+import tempfile
+
 from src.common.runtime import run_concurrent
 from src.services.iam import IAMService
 from src.services.integration import IntegrationService
@@ -61,8 +68,8 @@ def demo_tasks():
         lambda: ticket.ticket({"title": "VPN issue"}),
         lambda: knowledge.search("SSO"),
         lambda: learning.exam({"course_id": 5}),
-        lambda: mobile.approve(99),
-        lambda: portal.todo_center(1),
+        lambda: mobile.approve(99, "alice"),
+        lambda: portal.todo_center("alice"),
         lambda: itsm.monitor({"cpu": 70}),
         lambda: bi.dashboard({"scope": "company"}),
         lambda: dev.form_designer({"fields": []}),
@@ -71,6 +78,9 @@ def demo_tasks():
 
 
 def main():
+    scratch = tempfile.mkdtemp(prefix="erp-demo-")
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)  # registered first, so it runs after writers close
+    os.chdir(scratch)
     results = run_concurrent(demo_tasks())
     for idx in sorted(results):
         print(f"Task {idx}: {results[idx]}")
@@ -1,4 +1,27 @@
-"""Auth middleware stub."""
+"""Session authentication and route permission checks."""
+from http import HTTPStatus
+
 
 def authenticate(request):
     return {"authenticated": True, "user_id": request.get("user_id")}
+
+
+def middleware(call_next):
+    """Enforce the route's ``auth``/``admin``/``module`` metadata and set ``request.auth``."""
+
+    def auth(request, route):
+        if route.auth:
+            user = request.current_user()
+            if user is None:
+                request.respond(HTTPStatus.UNAUTHORIZED, {"error": "unauthorized"})
+                return
+            if route.admin and user[1].get("role") != "admin":
+                request.respond(HTTPStatus.FORBIDDEN, {"error": "forbidden"})
+                return
+            request.auth = user
+            if route.module and not request.module_allowed(route.module):
+                request.respond(HTTPStatus.FORBIDDEN, {"error": "forbidden", "module": route.module})
+                return
+        call_next(request, route)
+
+    return auth
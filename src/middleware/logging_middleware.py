@@ -1,4 +1,235 @@
-"""Logging middleware stub."""
+"""Structured access and audit logging.
+
+``AccessLogger`` keeps the request path cheap. ``log`` appends a tuple (or a
+dict) to a ``collections.deque``. That append is atomic under the GIL, so
+handler threads never take a lock. A background writer wakes every
+``flush_interval`` seconds, or sooner once a batch is full, and drains the
+queue. It formats the records as JSON lines and writes each batch with a
+single ``write`` call.
+
+The active file is ``<directory>/<name>.jsonl``. It is renamed to
+``<name>-YYYYmmdd-HHMMSS-N.jsonl`` once it exceeds ``max_bytes`` or is older
+than ``rotate_seconds``. ``src.jobs.log_archiver.archive`` later compresses the
+rotated files. When the queue holds ``capacity`` records, new ones are counted
+as dropped instead of growing memory without bound.
+
+``middleware`` is the pipeline stage that records one access line per API
+request. Security-relevant events (logins, user changes) are not logged here;
+they go to the hash-chained store in ``src.dao.log_dao`` through
+``IAMService``.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+from config.settings import LOG_DIR, LOG_FLUSH_INTERVAL, LOG_MAX_BYTES, LOG_QUEUE_SIZE, LOG_ROTATE_SECONDS
+
+logger = logging.getLogger("erp.web")
+
+ACCESS_FIELDS = ("ts", "method", "path", "route", "status", "duration", "user", "client")
+LOG_SUFFIX = ".jsonl"
+
+Record = Union[Tuple[Any, ...], Mapping[str, Any]]
+
+
+def _format_ts(ts: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)) + f".{int(ts % 1 * 1000):03d}"
+
+
+class AccessLogger:
+    def __init__(
+        self,
+        name: str = "access",
+        directory: str = LOG_DIR,
+        fields: Sequence[str] = ACCESS_FIELDS,
+        max_bytes: int = LOG_MAX_BYTES,
+        rotate_seconds: float = LOG_ROTATE_SECONDS,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        capacity: int = LOG_QUEUE_SIZE,
+        batch_size: int = 4096,
+    ):
+        self.name = name
+        self.directory = directory
+        self.fields = tuple(fields)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self._pending: Deque[Record] = deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._rotation_seq = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.name + LOG_SUFFIX)
+
+    # --- request path ----------------------------------------------------
+    def log(self, record: Record) -> None:
+        pending = self._pending
+        if len(pending) >= self.capacity:
+            self.dropped += 1
+            return
+        pending.append(record)
+        if self._thread is None:
+            self.start()
+        elif len(pending) >= self.batch_size:
+            self._wake.set()
+
+    # --- writer ----------------------------------------------------------
+    def start(self) -> "AccessLogger":
+        with self._start_lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=f"log-{self.name}", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        return self
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Writing %s failed", self.path)
+
+    def _format(self, record: Record) -> str:
+        entry = dict(record) if isinstance(record, Mapping) else dict(zip(self.fields, record))
+        if "ts" in entry:
+            entry["ts"] = _format_ts(entry["ts"])
+        if "duration" in entry:
+            entry["duration_ms"] = round(entry.pop("duration") * 1000, 3)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of records written."""
+        written = 0
+        with self._write_lock:
+            pending = self._pending
+            while pending:
+                lines = []
+                for _ in range(min(len(pending), self.batch_size)):
+                    lines.append(self._format(pending.popleft()))
+                data = ("\n".join(lines) + "\n").encode()
+                self._maybe_rotate(len(data))
+                self._file.write(data)
+                self._size += len(data)
+                written += len(lines)
+                self.batches += 1
+            if written:
+                self._file.flush()
+                self.written += written
+        return written
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _maybe_rotate(self, incoming: int) -> None:
+        if self._file is None:
+            self._open()
+        expired = self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds
+        if self._size and (self._size + incoming > self.max_bytes or expired):
+            self.rotate()
+
+    def rotate(self) -> Optional[str]:
+        """Close the active file and rename it with a timestamp suffix; returns the rotated path."""
+        if self._file is None:
+            return None
+        self._file.close()
+        self._file = None
+        self._rotation_seq += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        target = os.path.join(self.directory, f"{self.name}-{stamp}-{self._rotation_seq}{LOG_SUFFIX}")
+        os.replace(self.path, target)
+        self.rotations += 1
+        self._open()
+        return target
+
+    def close(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+        }
+
+
+ACCESS_LOG = AccessLogger("access")
+
 
 def log_request(request):
     return {"logged": True, "path": request.get("path", "")}
+
+
+def middleware(call_next):
+    """Write one access record per request, and log handler failures with the route that raised them."""
+    clock = time.perf_counter
+    now = time.time
+
+    def log(request, route):
+        started = clock()
+        try:
+            call_next(request, route)
+        except Exception:
+            logger.exception("Unhandled error in %s %s", route.method, route.pattern)
+            raise
+        finally:
+            auth = request.auth
+            ACCESS_LOG.log(
+                (
+                    now(),
+                    route.method,
+                    request.path,
+                    route.pattern,
+                    getattr(request, "status", None),
+                    clock() - started,
+                    auth[0] if auth else None,
+                    request.client_address[0],
+                )
+            )
+
+    return log
+
+
+__all__ = [
+    "ACCESS_FIELDS",
+    "ACCESS_LOG",
+    "AccessLogger",
+    "log_request",
+    "middleware",
+]
@@ -1,4 +1,375 @@
-"""Rate limit middleware stub."""
+"""Per-client rate limiting.
+
+``RateLimiter`` enforces one limit for many clients. Two algorithms are
+available:
+
+- ``token_bucket``: ``limit`` tokens per ``period``, refilled continuously, with
+  bursts of up to ``burst`` requests.
+- ``sliding_window``: at most ``limit`` requests in any ``period``. It is
+  approximated from the current and previous fixed windows, weighted by how far
+  the current window has progressed.
+
+Client state lives in lock-striped shards, in the same way as the memory
+session backend. Each shard maps a client key to a slot in a few parallel
+``array('d')`` columns, so a client costs four doubles plus one dict entry
+rather than an object. A check touches one shard lock and a handful of floats.
+A slot whose client has been idle long enough to be back at full allowance is
+recycled when new clients arrive, or when ``sweep`` runs, so the table holds
+only recently active clients.
+
+``RateLimits`` resolves which limiter applies to a request. A per-user override
+wins over a per-route limit, which wins over the default. The initial limits
+come from ``config.middleware``.
+"""
+import math
+import threading
+import time
+from array import array
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Hashable, List, Mapping, NamedTuple, Optional, Tuple
+
+from config.middleware import (
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMIT_IDLE_SECONDS,
+    RATE_LIMIT_ROUTES,
+    RATE_LIMIT_SHARDS,
+    RATE_LIMIT_USERS,
+)
+
+TOKEN_BUCKET = "token_bucket"
+SLIDING_WINDOW = "sliding_window"
+ALGORITHMS = (TOKEN_BUCKET, SLIDING_WINDOW)
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+    limit: float
+
+
+_new = tuple.__new__  # builds a Decision without the Python-level NamedTuple constructor on the hot path
+
+
+class _Shard:
+    __slots__ = ("lock", "slots", "level", "stamp", "previous", "seen", "free", "next_sweep")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots: Dict[Hashable, int] = {}
+        self.level = array("d")  # token bucket: tokens left; sliding window: hits in the current window
+        self.stamp = array("d")  # token bucket: last refill; sliding window: current window start
+        self.previous = array("d")  # sliding window: hits in the previous window
+        self.seen = array("d")
+        self.free: List[int] = []
+        self.next_sweep = 0.0
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limit: float,
+        period: float = 1.0,
+        algorithm: str = TOKEN_BUCKET,
+        burst: Optional[float] = None,
+        shards: int = RATE_LIMIT_SHARDS,
+        idle: float = RATE_LIMIT_IDLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm {algorithm!r}")
+        if limit <= 0 or period <= 0:
+            raise ValueError("limit and period must be positive")
+        self.limit = float(limit)
+        self.period = float(period)
+        self.algorithm = algorithm
+        self.burst = float(burst if burst is not None else limit)
+        self.rate = self.limit / self.period
+        self.clock = clock
+        # A client idle this long is indistinguishable from a new one, so its slot can be reused.
+        settled = self.burst / self.rate if algorithm == TOKEN_BUCKET else 2 * self.period
+        self.idle = max(idle, settled)
+        count = 1
+        while count < shards:
+            count <<= 1
+        self._mask = count - 1
+        self._shards = [_Shard() for _ in range(count)]
+        self.hit = self._token_bucket if algorithm == TOKEN_BUCKET else self._sliding_window
+        self.denied = 0
+        self.evicted = 0
+
+    def allow(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> bool:
+        return self.hit(key, cost, now)[0]
+
+    def _slot(self, shard: _Shard, key: Hashable, now: float, level: float) -> int:
+        """Allocate a slot for a new client; the caller holds ``shard.lock``."""
+        if now >= shard.next_sweep:
+            self._sweep_shard(shard, now)
+        if shard.free:
+            slot = shard.free.pop()
+            shard.level[slot] = level
+            shard.stamp[slot] = now
+            shard.previous[slot] = 0.0
+            shard.seen[slot] = now
+        else:
+            slot = len(shard.level)
+            shard.level.append(level)
+            shard.stamp.append(now)
+            shard.previous.append(0.0)
+            shard.seen.append(now)
+        shard.slots[key] = slot
+        return slot
+
+    def _token_bucket(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> Decision:
+        if now is None:
+            now = self.clock()
+        shard = self._shards[hash(key) & self._mask]
+        with shard.lock:
+            slot = shard.slots.get(key)
+            if slot is None:
+                slot = self._slot(shard, key, now, self.burst)
+            stamp = shard.stamp
+            tokens = shard.level[slot] + (now - stamp[slot]) * self.rate
+            if tokens > self.burst:
+                tokens = self.burst
+            stamp[slot] = now
+            shard.seen[slot] = now
+            if tokens >= cost:
+                tokens -= cost
+                shard.level[slot] = tokens
+                return _new(Decision, (True, tokens, 0.0, self.limit))
+            shard.level[slot] = tokens
+        self.denied += 1
+        return _new(Decision, (False, tokens, (cost - tokens) / self.rate, self.limit))
+
+    def _sliding_window(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> Decision:
+        if now is None:
+            now = self.clock()
+        period = self.period
+        shard = self._shards[hash(key) & self._mask]
+        with shard.lock:
+            slot = shard.slots.get(key)
+            if slot is None:
+                slot = self._slot(shard, key, now, 0.0)
+            level = shard.level
+            start = shard.stamp[slot]
+            elapsed = now - start
+            if elapsed >= period:
+                windows = int(elapsed // period)
+                shard.previous[slot] = level[slot] if windows == 1 else 0.0
+                level[slot] = 0.0
+                start += windows * period
+                shard.stamp[slot] = start
+                elapsed = now - start
+            shard.seen[slot] = now
+            previous, current = shard.previous[slot], level[slot]
+            weight = 1.0 - elapsed / period
+            used = previous * weight + current
+            if used + cost <= self.limit:
+                level[slot] = current + cost
+                return _new(Decision, (True, self.limit - used - cost, 0.0, self.limit))
+        self.denied += 1
+        # Wait until the previous window's weighted share has decayed enough, or failing that
+        # until the current window becomes the previous one.
+        spare = self.limit - current - cost
+        if previous > 0 and spare >= 0:
+            retry_after = (weight - spare / previous) * period
+        else:
+            retry_after = period - elapsed
+        return Decision(False, max(0.0, self.limit - used), max(0.0, retry_after), self.limit)
+
+    # --- maintenance -----------------------------------------------------
+    def _sweep_shard(self, shard: _Shard, now: float) -> int:
+        cutoff = now - self.idle
+        seen = shard.seen
+        stale = [key for key, slot in shard.slots.items() if seen[slot] <= cutoff]
+        for key in stale:
+            shard.free.append(shard.slots.pop(key))
+        shard.next_sweep = now + self.idle / 4
+        self.evicted += len(stale)
+        return len(stale)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = self.clock() if now is None else now
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += self._sweep_shard(shard, now)
+        return removed
+
+    def reset(self, key: Hashable) -> None:
+        shard = self._shards[hash(key) & self._mask]
+        with shard.lock:
+            slot = shard.slots.pop(key, None)
+            if slot is not None:
+                shard.free.append(slot)
+
+    def __len__(self) -> int:
+        return sum(len(shard.slots) for shard in self._shards)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "algorithm": self.algorithm,
+            "limit": self.limit,
+            "period": self.period,
+            "burst": self.burst,
+            "clients": len(self),
+            "slots": sum(len(shard.level) for shard in self._shards),
+            "denied": self.denied,
+            "evicted": self.evicted,
+        }
+
+
+def limiter_from_spec(spec: Optional[Mapping[str, Any]], **options) -> Optional[RateLimiter]:
+    """``{"limit", "period"?, "algorithm"?, "burst"?}``; ``None`` means unlimited."""
+    if spec is None:
+        return None
+    return RateLimiter(
+        spec["limit"],
+        spec.get("period", 1.0),
+        spec.get("algorithm", TOKEN_BUCKET),
+        spec.get("burst"),
+        **options,
+    )
+
+
+def _route_key(route: str) -> Tuple[str, str]:
+    method, _, pattern = route.partition(" ")
+    return (method.upper(), pattern) if pattern else ("*", method)
+
+
+class RateLimits:
+    """Limiter lookup: per-user override, then ``"METHOD /pattern"`` route limit, then the default."""
+
+    def __init__(
+        self,
+        default: Optional[Mapping[str, Any]] = RATE_LIMIT_DEFAULT,
+        routes: Mapping[str, Optional[Mapping[str, Any]]] = RATE_LIMIT_ROUTES,
+        users: Mapping[str, Optional[Mapping[str, Any]]] = RATE_LIMIT_USERS,
+        **options,
+    ):
+        self._options = options
+        self._lock = threading.Lock()
+        self.default = limiter_from_spec(default, **options)
+        self._routes: Dict[Tuple[str, str], Optional[RateLimiter]] = {}
+        self._users: Dict[Hashable, Optional[RateLimiter]] = {}
+        for route, spec in routes.items():
+            self.set_route_limit(route, spec)
+        for user, spec in users.items():
+            self.set_user_limit(user, spec)
+
+    def set_route_limit(self, route: str, spec: Optional[Mapping[str, Any]]) -> Optional[RateLimiter]:
+        limiter = limiter_from_spec(spec, **self._options)
+        with self._lock:
+            self._routes[_route_key(route)] = limiter
+        return limiter
+
+    def set_user_limit(self, user: Hashable, spec: Optional[Mapping[str, Any]]) -> Optional[RateLimiter]:
+        limiter = limiter_from_spec(spec, **self._options)
+        with self._lock:
+            self._users[user] = limiter
+        return limiter
+
+    def clear_user_limit(self, user: Hashable) -> None:
+        with self._lock:
+            self._users.pop(user, None)
+
+    def limiter_for(self, method: str = "*", route: Optional[str] = None, user: Optional[Hashable] = None):
+        if user is not None and user in self._users:
+            return self._users[user]
+        if route is not None:
+            key = (method, route)
+            if key in self._routes:
+                return self._routes[key]
+            if ("*", route) in self._routes:
+                return self._routes[("*", route)]
+        return self.default
+
+    def check(
+        self,
+        client: Hashable,
+        method: str = "*",
+        route: Optional[str] = None,
+        user: Optional[Hashable] = None,
+        cost: float = 1.0,
+    ) -> Optional[Decision]:
+        """Charge ``cost`` to the caller (``user`` when known, else ``client``); ``None`` when unlimited."""
+        limiter = self.limiter_for(method, route, user)
+        if limiter is None:
+            return None
+        return limiter.hit(user if user is not None else client, cost)
+
+    def sweep(self) -> int:
+        return sum(limiter.sweep() for limiter in self._limiters())
+
+    def _limiters(self) -> List[RateLimiter]:
+        with self._lock:
+            limiters = [self.default, *self._routes.values(), *self._users.values()]
+        unique = {id(limiter): limiter for limiter in limiters if limiter is not None}
+        return list(unique.values())
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {f"{method} {pattern}": limiter for (method, pattern), limiter in self._routes.items()}
+            users = dict(self._users)
+        return {
+            "default": self.default.metrics() if self.default else None,
+            "routes": {name: limiter.metrics() if limiter else None for name, limiter in routes.items()},
+            "users": {str(user): limiter.metrics() if limiter else None for user, limiter in users.items()},
+        }
+
+
+LIMITS = RateLimits()
+
+
+def get_limits() -> RateLimits:
+    return LIMITS
+
 
 def check_quota(request):
-    return {"allowed": True, "client": request.get("client")}
+    """``request`` carries ``client`` plus optional ``user``, ``method`` and ``route`` (the route pattern)."""
+    decision = LIMITS.check(
+        request.get("client"), request.get("method", "*"), request.get("route"), request.get("user")
+    )
+    if decision is None:
+        return {"allowed": True, "client": request.get("client"), "limit": None}
+    return {
+        "allowed": decision.allowed,
+        "client": request.get("client"),
+        "limit": decision.limit,
+        "remaining": int(decision.remaining),
+        "retry_after": decision.retry_after,
+    }
+
+
+def middleware(call_next):
+    """Charge each request to the user (or client address before login); over-limit calls get a 429."""
+
+    def rate_limit(request, route):
+        auth = request.auth
+        decision = LIMITS.check(request.client_address[0], route.method, route.pattern, auth[0] if auth else None)
+        if decision is not None and not decision.allowed:
+            request.respond(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                {"error": "rate limit exceeded", "retry_after": round(decision.retry_after, 3)},
+                {"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+            )
+            return
+        call_next(request, route)
+
+    return rate_limit
+
+
+__all__ = [
+    "ALGORITHMS",
+    "Decision",
+    "LIMITS",
+    "RateLimiter",
+    "RateLimits",
+    "SLIDING_WINDOW",
+    "TOKEN_BUCKET",
+    "check_quota",
+    "get_limits",
+    "limiter_from_spec",
+    "middleware",
+]
@@ -1,6 +1,7 @@
 """Audit log models."""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, Dict
 
 
 @dataclass
@@ -9,3 +10,5 @@ class AuditLog:
     actor: str
     action: str
     created_at: datetime
+    detail: Dict[str, Any] = field(default_factory=dict)
+    hash: str = ""
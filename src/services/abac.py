@@ -0,0 +1,448 @@
+"""Attribute-based access control: compiled policies and memoized decisions.
+
+A policy is a boolean expression over four roots: ``subject``, ``resource``,
+``action`` and ``env``. For example::
+
+    subject.department == resource.department and action in ["read", "approve"]
+    subject.level >= 3 or subject.id == resource.owner_id
+
+``compile_expression`` parses it once with ``ast`` and accepts only a small
+grammar:
+
+- attribute or constant-key subscript access on the roots;
+- constants, and list/tuple/set literals of constants;
+- ``and``/``or``/``not``;
+- comparisons (``== != < <= > >= in``, ``not in``, ``is``, ``is not``).
+
+Anything else, such as calls, lambdas or comprehensions, is rejected with
+``ValidationError``. The accepted tree is folded into nested closures
+``fn(subject, resource, action, env)``, specialised for constant operands. A
+missing attribute reads as ``None``, and an ordering comparison between
+incomparable values is simply false.
+
+``PolicyEngine`` indexes policies by resource type. It caches the applicable
+``(deny, allow)`` closures per ``(resource, action)``, so a decision only runs
+the policies that can apply. A match on a deny policy wins; otherwise a match
+on an allow policy; otherwise the request is denied.
+
+Decisions that depend only on subject attributes (no per-record ``resource``
+attributes and no ``env``) are memoized per ``(subject, resource, action)``.
+The subject is an ``Attributes`` mapping that hashes once. Every policy change
+bumps ``generation`` and starts a fresh memo, and subscribers are told. The
+IAM service broadcasts the change as an ``iam.policy.changed`` event.
+"""
+import ast
+import operator
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from config.settings import ABAC_MEMO_SIZE
+from src.common.exceptions import ValidationError
+
+ROOTS = ("subject", "resource", "action", "env")
+EFFECTS = ("allow", "deny")
+WILDCARD = "*"
+MAX_EXPRESSION_LENGTH = 4096
+
+Rule = Callable[[Mapping, Mapping, str, Mapping], Any]
+
+_EMPTY: Mapping[str, Any] = {}
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Attributes):
+        return value
+    if isinstance(value, Mapping):
+        return Attributes(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+class Attributes(dict):
+    """Attribute mapping that hashes once, usable as a memo key.
+
+    Lists become tuples, sets frozensets and mappings ``Attributes``, at every
+    depth, so ``{"roles": [{"id": 1}]}`` hashes too. Treat it as read-only once
+    built.
+    """
+
+    __slots__ = ("_hash",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for key, value in self.items():
+            self[key] = _freeze(value)
+        self._hash = None
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+
+# --- compiler ----------------------------------------------------------------
+def _ordered(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(left, right):
+        try:
+            return op(left, right)
+        except TypeError:  # e.g. None < 3: a missing attribute never satisfies an ordering
+            return False
+
+    return compare
+
+
+def _contains(left, right) -> bool:
+    try:
+        return left in right
+    except TypeError:
+        return False
+
+
+COMPARISONS: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: _ordered(operator.lt),
+    ast.LtE: _ordered(operator.le),
+    ast.Gt: _ordered(operator.gt),
+    ast.GtE: _ordered(operator.ge),
+    ast.In: _contains,
+    ast.NotIn: lambda left, right: not _contains(left, right),
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+
+class _Const(NamedTuple):
+    value: Any
+
+
+def _literal(node: ast.AST) -> Any:
+    values = [_compile(element) for element in node.elts]
+    if not all(isinstance(value, _Const) for value in values):
+        raise ValidationError("Only constants are allowed inside list literals")
+    items = [value.value for value in values]
+    if isinstance(node, ast.Set):
+        return frozenset(items)
+    return tuple(items)  # compares equal to a frozen list attribute
+
+
+def _lookup(operand):
+    """Right-hand side of ``in``/``not in``: a constant literal becomes a frozenset for hash lookups."""
+    if isinstance(operand, _Const) and isinstance(operand.value, tuple):
+        try:
+            return _Const(frozenset(operand.value))
+        except TypeError:
+            pass
+    return operand
+
+
+def _path(node: ast.AST) -> Tuple[str, Tuple[Any, ...]]:
+    """``subject.a["b"].c`` -> ``("subject", ("a", "b", "c"))``."""
+    keys: List[Any] = []
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        if isinstance(node, ast.Attribute):
+            keys.append(node.attr)
+        else:
+            key = _compile(node.slice)
+            if not isinstance(key, _Const):
+                raise ValidationError("Subscripts must be constants")
+            keys.append(key.value)
+        node = node.value
+    if not isinstance(node, ast.Name) or node.id not in ROOTS:
+        raise ValidationError(f"Unknown name; expressions may only use {', '.join(ROOTS)}")
+    return node.id, tuple(reversed(keys))
+
+
+def _getter(root: str, keys: Tuple[Any, ...]) -> Rule:
+    position = ROOTS.index(root)
+    if not keys:
+        return (
+            lambda s, r, a, e: s,
+            lambda s, r, a, e: r,
+            lambda s, r, a, e: a,
+            lambda s, r, a, e: e,
+        )[position]
+    if len(keys) == 1:
+        key = keys[0]
+        if position == 0:
+            return lambda s, r, a, e: s.get(key)
+        if position == 1:
+            return lambda s, r, a, e: r.get(key)
+        if position == 3:
+            return lambda s, r, a, e: e.get(key)
+
+    def get(s, r, a, e):
+        value = (s, r, a, e)[position]
+        for key in keys:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(key)
+        return value
+
+    return get
+
+
+def _compare(op: Callable[[Any, Any], bool], left, right) -> Rule:
+    if isinstance(left, _Const) and isinstance(right, _Const):
+        result = op(left.value, right.value)
+        return lambda s, r, a, e: result
+    if isinstance(right, _Const):
+        value = right.value
+        if op is operator.eq:
+            return lambda s, r, a, e: left(s, r, a, e) == value
+        if op is _contains:
+            return lambda s, r, a, e: _contains(left(s, r, a, e), value)
+        return lambda s, r, a, e: op(left(s, r, a, e), value)
+    if isinstance(left, _Const):
+        value = left.value
+        return lambda s, r, a, e: op(value, right(s, r, a, e))
+    if op is operator.eq:
+        return lambda s, r, a, e: left(s, r, a, e) == right(s, r, a, e)
+    return lambda s, r, a, e: op(left(s, r, a, e), right(s, r, a, e))
+
+
+def _as_rule(compiled) -> Rule:
+    if isinstance(compiled, _Const):
+        value = compiled.value
+        return lambda s, r, a, e: value
+    return compiled
+
+
+def _compile(node: ast.AST):
+    if isinstance(node, ast.Constant):
+        return _Const(node.value)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return _Const(_literal(node))
+    if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)):
+        return _getter(*_path(node))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile(node.operand)
+        if isinstance(operand, _Const):
+            return _Const(not operand.value)
+        return lambda s, r, a, e: not operand(s, r, a, e)
+    if isinstance(node, ast.BoolOp):
+        parts = tuple(_as_rule(_compile(value)) for value in node.values)
+        if isinstance(node.op, ast.And):
+            if len(parts) == 2:
+                first, second = parts
+                return lambda s, r, a, e: first(s, r, a, e) and second(s, r, a, e)
+            return lambda s, r, a, e: all(part(s, r, a, e) for part in parts)
+        if len(parts) == 2:
+            first, second = parts
+            return lambda s, r, a, e: first(s, r, a, e) or second(s, r, a, e)
+        return lambda s, r, a, e: any(part(s, r, a, e) for part in parts)
+    if isinstance(node, ast.Compare):
+        operands = [_compile(node.left)] + [_compile(comparator) for comparator in node.comparators]
+        checks = []
+        for op_node, left, right in zip(node.ops, operands, operands[1:]):
+            op = COMPARISONS.get(type(op_node))
+            if op is None:
+                raise ValidationError(f"Unsupported comparison {type(op_node).__name__}")
+            if isinstance(op_node, (ast.In, ast.NotIn)):
+                right = _lookup(right)
+            checks.append(_compare(op, left, right))
+        if len(checks) == 1:
+            return checks[0]
+        chain = tuple(checks)
+        return lambda s, r, a, e: all(check(s, r, a, e) for check in chain)
+    raise ValidationError(f"Unsupported expression element {type(node).__name__}")
+
+
+def compile_expression(expression: str) -> Rule:
+    """Parse and compile a policy expression; anything outside the grammar raises ``ValidationError``."""
+    if not isinstance(expression, str) or not expression.strip():
+        raise ValidationError("A policy expression is required")
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValidationError(f"Policy expressions are limited to {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValidationError(f"Invalid policy expression: {exc.msg}") from None
+    return _as_rule(_compile(tree.body))
+
+
+# --- engine ------------------------------------------------------------------
+class Policy(NamedTuple):
+    name: str
+    expression: str
+    effect: str
+    resources: FrozenSet[str]
+    actions: FrozenSet[str]
+    rule: Rule
+
+    def applies(self, resource: str, action: str) -> bool:
+        return (WILDCARD in self.resources or resource in self.resources) and (
+            WILDCARD in self.actions or action in self.actions
+        )
+
+
+def _names(values: Optional[Iterable[str]]) -> FrozenSet[str]:
+    if values is None:
+        return frozenset((WILDCARD,))
+    if isinstance(values, str):
+        return frozenset((values,))
+    return frozenset(values) or frozenset((WILDCARD,))
+
+
+class PolicyEngine:
+    def __init__(self, memo_size: int = ABAC_MEMO_SIZE):
+        self.memo_size = max(1, memo_size)
+        self._lock = threading.Lock()
+        self._policies: Dict[str, Policy] = {}
+        self._by_resource: Dict[str, List[Policy]] = {}
+        self._applicable: Dict[Tuple[str, str], Tuple[Tuple[Rule, ...], Tuple[Rule, ...]]] = {}
+        self._memo: Dict[Tuple[Hashable, str, str], bool] = {}
+        self._listeners: List[Callable[[int], None]] = []
+        self.generation = 0
+        self.evaluations = 0
+
+    # --- policies --------------------------------------------------------
+    def define(
+        self,
+        name: str,
+        expression: str,
+        effect: str = "allow",
+        resources: Optional[Iterable[str]] = None,
+        actions: Optional[Iterable[str]] = None,
+    ) -> Policy:
+        """Add or replace policy ``name``; ``resources``/``actions`` default to every one (``"*"``)."""
+        if effect not in EFFECTS:
+            raise ValidationError(f"Unknown policy effect {effect!r}; expected one of {EFFECTS}")
+        policy = Policy(name, expression, effect, _names(resources), _names(actions), compile_expression(expression))
+        with self._lock:
+            self._policies[name] = policy
+            self._reindex()
+        return policy
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            removed = self._policies.pop(name, None) is not None
+            if removed:
+                self._reindex()
+        return removed
+
+    def policies(self) -> List[Policy]:
+        return list(self._policies.values())
+
+    def _reindex(self) -> None:
+        by_resource: Dict[str, List[Policy]] = {}
+        for policy in self._policies.values():
+            for resource in policy.resources:
+                by_resource.setdefault(resource, []).append(policy)
+        self._by_resource = by_resource
+        self._applicable = {}
+        self._memo = {}
+        self.generation += 1
+        generation = self.generation
+        for callback in self._listeners:
+            callback(generation)
+
+    def subscribe(self, callback: Callable[[int], None]) -> None:
+        """Register ``callback(generation)``, called after every policy change."""
+        self._listeners.append(callback)
+
+    def invalidate(self) -> None:
+        """Drop memoized decisions, e.g. after subject attributes changed elsewhere."""
+        with self._lock:
+            self._memo = {}
+            self.generation += 1
+
+    def _rules_for(self, resource: str, action: str) -> Tuple[Tuple[Rule, ...], Tuple[Rule, ...]]:
+        key = (resource, action)
+        rules = self._applicable.get(key)
+        if rules is None:
+            # Built under the lock so a concurrent _reindex cannot pair stale rules with a fresh cache.
+            with self._lock:
+                rules = self._applicable.get(key)
+                if rules is None:
+                    by_resource = self._by_resource
+                    candidates = by_resource.get(resource, []) + (
+                        by_resource.get(WILDCARD, []) if resource != WILDCARD else []
+                    )
+                    applicable = [policy for policy in candidates if policy.applies(resource, action)]
+                    rules = (
+                        tuple(policy.rule for policy in applicable if policy.effect == "deny"),
+                        tuple(policy.rule for policy in applicable if policy.effect == "allow"),
+                    )
+                    self._applicable[key] = rules
+        return rules
+
+    # --- decisions -------------------------------------------------------
+    def decide(
+        self,
+        subject: Mapping[str, Any],
+        resource: str,
+        action: str,
+        attributes: Optional[Mapping[str, Any]] = None,
+        env: Optional[Mapping[str, Any]] = None,
+    ) -> bool:
+        """Allow or deny ``action`` on ``resource`` (a resource type such as ``"expense"``).
+
+        ``attributes`` are the record's own attributes (``resource.*`` in
+        expressions) and ``env`` the request context; decisions using either
+        are evaluated every time, all others are memoized.
+        """
+        if type(subject) is not Attributes:
+            subject = Attributes(subject)
+        memoize = attributes is None and env is None
+        if memoize:
+            memo = self._memo
+            key = (subject, resource, action)
+            try:
+                decision = memo.get(key)
+            except TypeError:  # an opaque unhashable value inside the subject: evaluate, don't memoize
+                memoize, decision = False, None
+            if decision is not None:
+                return decision
+        denies, allows = self._rules_for(resource, action)
+        attributes = _EMPTY if attributes is None else attributes
+        env = _EMPTY if env is None else env
+        self.evaluations += 1
+        decision = False
+        for rule in denies:
+            if rule(subject, attributes, action, env):
+                break
+        else:
+            for rule in allows:
+                if rule(subject, attributes, action, env):
+                    decision = True
+                    break
+        if memoize:
+            if len(memo) >= self.memo_size:
+                # Oldest-first eviction: cheaper than LRU bookkeeping on every hit.
+                try:
+                    del memo[next(iter(memo))]
+                except (KeyError, RuntimeError, StopIteration):
+                    pass
+            memo[key] = decision  # a memo replaced by a policy change is simply discarded
+        return decision
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "policies": len(self._policies),
+            "generation": self.generation,
+            "memo": len(self._memo),
+            "evaluations": self.evaluations,
+        }
+
+
+POLICIES = PolicyEngine()
+
+
+def get_policy_engine() -> PolicyEngine:
+    return POLICIES
+
+
+__all__ = [
+    "Attributes",
+    "EFFECTS",
+    "POLICIES",
+    "Policy",
+    "PolicyEngine",
+    "ROOTS",
+    "compile_expression",
+    "get_policy_engine",
+]
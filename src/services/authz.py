@@ -0,0 +1,198 @@
+"""Compiled authorization data for RBAC permissions and module access.
+
+``PermissionIndex`` mirrors the ``permission`` / ``role_permission`` /
+``user_role`` tables from ``schema.sql`` and flattens them into one frozenset of
+permission codes per user. Granting a permission also grants its descendants
+(``permission.parent_id``), so a menu grant covers the buttons and APIs below
+it.
+
+``AuthzCache`` compiles a web user's module list (plus any ``module:<key>``
+permissions granted through roles) into a bitmask once, so module and task
+checks on the request path are a single ``&``. Both caches are invalidated
+when role assignments or user records change.
+
+Role assignments are keyed by the numeric ``user.id``, as in ``user_role``.
+``AuthzCache`` caches by username, reads the index with the record's ``id``
+and maps an invalidated id back to the username.
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Set
+
+MODULE_PERMISSION_PREFIX = "module:"
+
+
+class PermissionIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._codes: Dict[int, str] = {}
+        self._children: Dict[Optional[int], Set[int]] = defaultdict(set)
+        self._role_perms: Dict[int, Set[int]] = defaultdict(set)
+        self._user_roles: Dict[Hashable, Set[int]] = defaultdict(set)
+        self._role_cache: Dict[int, FrozenSet[str]] = {}
+        self._user_cache: Dict[Hashable, FrozenSet[str]] = {}
+        self._listeners: List[Callable[[Optional[Hashable]], None]] = []
+        self.generation = 0
+
+    # --- loading ---------------------------------------------------------
+    def load(
+        self,
+        permissions: Iterable[Mapping] = (),
+        role_permissions: Iterable[Mapping] = (),
+        user_roles: Iterable[Mapping] = (),
+    ) -> None:
+        """Bulk-load rows shaped like the schema tables (``id``/``code``/``parent_id`` etc.)."""
+        with self._lock:
+            for row in permissions:
+                self._add_permission(row["id"], row["code"], row.get("parent_id"))
+            for row in role_permissions:
+                self._role_perms[row["role_id"]].add(row["permission_id"])
+            for row in user_roles:
+                self._user_roles[row["user_id"]].add(row["role_id"])
+            self._invalidate(None)
+
+    def add_permission(self, permission_id: int, code: str, parent_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._add_permission(permission_id, code, parent_id)
+            self._invalidate(None)
+
+    def _add_permission(self, permission_id: int, code: str, parent_id: Optional[int]) -> None:
+        for children in self._children.values():
+            children.discard(permission_id)
+        self._codes[permission_id] = code
+        self._children[parent_id].add(permission_id)
+
+    def grant(self, role_id: int, permission_id: int) -> None:
+        with self._lock:
+            self._role_perms[role_id].add(permission_id)
+            self._invalidate(None)
+
+    def assign_role(self, user_id: Hashable, role_id: int) -> None:
+        with self._lock:
+            self._user_roles[user_id].add(role_id)
+            self._invalidate(user_id)
+
+    def revoke_role(self, user_id: Hashable, role_id: int) -> None:
+        with self._lock:
+            self._user_roles[user_id].discard(role_id)
+            self._invalidate(user_id)
+
+    # --- lookup ----------------------------------------------------------
+    def roles_for(self, user_id: Hashable) -> FrozenSet[int]:
+        with self._lock:
+            return frozenset(self._user_roles.get(user_id, ()))
+
+    def permissions_for(self, user_id: Hashable) -> FrozenSet[str]:
+        codes = self._user_cache.get(user_id)
+        if codes is not None:
+            return codes
+        with self._lock:
+            codes = frozenset().union(*(self._role_codes(r) for r in self._user_roles.get(user_id, ())))
+            self._user_cache[user_id] = codes
+        return codes
+
+    def has_permission(self, user_id: Hashable, code: str) -> bool:
+        return code in self.permissions_for(user_id)
+
+    def _role_codes(self, role_id: int) -> FrozenSet[str]:
+        codes = self._role_cache.get(role_id)
+        if codes is None:
+            seen: Set[int] = set()
+            stack = list(self._role_perms.get(role_id, ()))
+            while stack:
+                perm = stack.pop()
+                if perm in seen:
+                    continue
+                seen.add(perm)
+                stack.extend(self._children.get(perm, ()))
+            codes = frozenset(self._codes[p] for p in seen if p in self._codes)
+            self._role_cache[role_id] = codes
+        return codes
+
+    # --- invalidation ----------------------------------------------------
+    def subscribe(self, callback: Callable[[Optional[Hashable]], None]) -> None:
+        """Register ``callback(user_id)``; ``None`` means every user may be affected."""
+        self._listeners.append(callback)
+
+    def _invalidate(self, user_id: Optional[Hashable]) -> None:
+        self.generation += 1
+        if user_id is None:
+            self._role_cache.clear()
+            self._user_cache.clear()
+        else:
+            self._user_cache.pop(user_id, None)
+        for callback in self._listeners:
+            callback(user_id)
+
+
+class Grants(NamedTuple):
+    modules: tuple
+    mask: int
+    role: Optional[str]
+
+
+class AuthzCache:
+    def __init__(self, modules: Iterable[str], index: Optional[PermissionIndex] = None):
+        self.bits: Dict[str, int] = {m: 1 << i for i, m in enumerate(modules)}
+        # Modules outside the table map to a bit nobody is ever granted.
+        self.unknown_bit = 1 << len(self.bits)
+        self.index = index if index is not None else PERMISSION_INDEX
+        self._grants: Dict[str, Grants] = {}
+        self._usernames: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.index.subscribe(self.invalidate)
+
+    def add_module(self, module: str) -> None:
+        """Allocate a bit for a newly registered module and drop all compiled grants."""
+        with self._lock:
+            if module not in self.bits:
+                self.bits[module] = self.unknown_bit
+                self.unknown_bit <<= 1
+        self.invalidate()
+
+    def bit(self, module: str) -> int:
+        return self.bits.get(module, self.unknown_bit)
+
+    def mask_of(self, modules: Iterable[str]) -> int:
+        mask = 0
+        bits = self.bits
+        unknown = self.unknown_bit
+        for module in modules:
+            mask |= bits.get(module, unknown)
+        return mask
+
+    def grants(self, username: str, user: Mapping) -> Grants:
+        grants = self._grants.get(username)
+        if grants is None:
+            generation = self._generation
+            grants = self._compile(username, user)
+            with self._lock:
+                if generation == self._generation:
+                    self._grants[username] = grants
+        return grants
+
+    def _compile(self, username: str, user: Mapping) -> Grants:
+        granted = set(user.get("modules", ()))
+        user_id = user.get("id")
+        if user_id is not None:  # a record without an id has no role assignments
+            self._usernames[user_id] = username
+            for code in self.index.permissions_for(user_id):
+                if code.startswith(MODULE_PERMISSION_PREFIX):
+                    granted.add(code[len(MODULE_PERMISSION_PREFIX):])
+        modules = tuple(m for m in self.bits if m in granted)
+        return Grants(modules, self.mask_of(modules), user.get("role"))
+
+    def invalidate(self, username: Optional[Hashable] = None) -> None:
+        """Drop compiled grants for ``username`` (or a user id from the index), or for everyone."""
+        with self._lock:
+            self._generation += 1
+            if username is None:
+                self._grants.clear()
+            else:
+                self._grants.pop(self._usernames.get(username, username), None)
+
+
+PERMISSION_INDEX = PermissionIndex()
+
+__all__ = ["PermissionIndex", "AuthzCache", "Grants", "PERMISSION_INDEX", "MODULE_PERMISSION_PREFIX"]
@@ -0,0 +1,197 @@
+"""Password hashing and off-thread verification.
+
+Hashes use the ``pbkdf2_sha256$<iterations>$<salt>$<hash>`` format, so the
+work factor travels with each hash. Raising ``PASSWORD_ITERATIONS`` therefore
+needs no migration. ``needs_rehash`` flags weaker hashes, and ``check_password``
+returns an upgraded hash on the next successful login. It does the same for
+legacy plaintext entries. ``UNUSABLE`` marks accounts that have no password yet
+(for example users imported from a directory). It never verifies.
+
+PBKDF2 at a realistic work factor costs tens of milliseconds of CPU per check.
+``CredentialVerifier`` runs checks on a dedicated process pool, so they escape
+the GIL and request threads just wait on a future. ``PASSWORD_QUEUE`` bounds the
+checks in flight. A login burst beyond that waits up to
+``PASSWORD_QUEUE_TIMEOUT`` for a slot, then fails with ``CredentialsBusy``
+instead of queueing without bound.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.security import PASSWORD_ITERATIONS, PASSWORD_QUEUE, PASSWORD_QUEUE_TIMEOUT, PASSWORD_WORKERS
+from src.common.exceptions import ERPError
+
+ALGORITHM = "pbkdf2_sha256"
+UNUSABLE = "!"
+
+
+class CredentialsBusy(ERPError):
+    """Raised when no verification slot frees up in time."""
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password: Optional[str], iterations: int = PASSWORD_ITERATIONS, salt: Optional[bytes] = None) -> str:
+    if not password:
+        return UNUSABLE
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if algorithm != ALGORITHM:
+        return False
+    try:
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(salt), int(iterations))
+        return hmac.compare_digest(digest, _unb64(expected))
+    except (ValueError, OverflowError, binascii.Error):  # a corrupt stored hash never matches
+        return False
+
+
+def needs_rehash(encoded: str, iterations: int = PASSWORD_ITERATIONS) -> bool:
+    """True when ``encoded`` is not a current-format hash with at least ``iterations`` rounds."""
+    parts = encoded.split("$") if isinstance(encoded, str) else ()
+    return len(parts) != 4 or parts[0] != ALGORITHM or not parts[1].isdigit() or int(parts[1]) < iterations
+
+
+def check_password(password: str, encoded: Optional[str], iterations: int = PASSWORD_ITERATIONS) -> Tuple[bool, Optional[str]]:
+    """``(matches, upgraded_hash)``; the upgraded hash is only set for a match on outdated parameters."""
+    if not encoded or encoded == UNUSABLE:
+        return False, None
+    if "$" in encoded:
+        ok = verify_password(password, encoded)
+    else:  # legacy plaintext entry
+        ok = hmac.compare_digest(password.encode(), encoded.encode())
+    if ok and needs_rehash(encoded, iterations):
+        return True, hash_password(password, iterations)
+    return ok, None
+
+
+def _warm() -> None:
+    return None
+
+
+class CredentialVerifier:
+    def __init__(
+        self,
+        workers: int = PASSWORD_WORKERS,
+        max_pending: int = PASSWORD_QUEUE,
+        wait: float = PASSWORD_QUEUE_TIMEOUT,
+        iterations: int = PASSWORD_ITERATIONS,
+    ):
+        self.workers = max(0, workers)
+        self.max_pending = max(1, max_pending)
+        self.wait = wait
+        self.iterations = iterations
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dummy: Optional[str] = None
+        self.inflight = 0
+        self.verified = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.busy = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # The server is multi-threaded, so worker processes come from a forkserver instead of a plain fork.
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver") if "forkserver" in methods else None
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def start(self) -> "CredentialVerifier":
+        """Spawn the worker processes now, so the first logins do not pay for it."""
+        if self.workers:
+            pool = self._executor()
+            for future in [pool.submit(_warm) for _ in range(self.workers)]:
+                future.result()
+        return self
+
+    def _run(self, fn: Callable[..., Any], *args) -> Any:
+        if not self._slots.acquire(timeout=self.wait):
+            self.busy += 1
+            raise CredentialsBusy(f"{self.max_pending} credential checks already in flight")
+        with self._lock:
+            self.inflight += 1
+        try:
+            if not self.workers:
+                return fn(*args)
+            return self._executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.inflight -= 1
+            self._slots.release()
+
+    def _dummy_hash(self) -> str:
+        with self._lock:
+            if self._dummy is None:
+                self._dummy = hash_password(secrets.token_urlsafe(), self.iterations)
+            return self._dummy
+
+    def check(self, password: str, encoded: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Verify ``password``; with no ``encoded`` (unknown user) a dummy hash keeps the timing the same."""
+        ok, upgraded = self._run(check_password, password, encoded or self._dummy_hash(), self.iterations)
+        ok = ok and encoded is not None
+        if ok:
+            self.verified += 1
+        else:
+            self.rejected += 1
+        if upgraded:
+            self.rehashed += 1
+        return ok, upgraded if ok else None
+
+    def hash(self, password: Optional[str]) -> str:
+        return self._run(hash_password, password, self.iterations)
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "iterations": self.iterations,
+            "inflight": self.inflight,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "busy": self.busy,
+        }
+
+
+VERIFIER = CredentialVerifier()
+
+
+__all__ = [
+    "ALGORITHM",
+    "UNUSABLE",
+    "VERIFIER",
+    "CredentialVerifier",
+    "CredentialsBusy",
+    "check_password",
+    "hash_password",
+    "needs_rehash",
+    "verify_password",
+]
@@ -0,0 +1,161 @@
+"""Data scopes: which rows a user may list, pushed down into SQL.
+
+A user's scope is one of four kinds:
+
+- ``self``: rows the user owns;
+- ``department``: rows belonging to the user's department;
+- ``department_tree``: the department plus everything below it, following
+  ``department.parent_id``;
+- ``all``: no filter.
+
+``DataScopes`` resolves a user to a ``DataScope`` that holds a precomputed
+frozenset of department ids, sliced out of the ``OrgTree`` interval index
+(``src.services.org_tree``). Resolved scopes are cached until the tree's
+``generation`` changes, which happens when a department is added or moved.
+
+``DataScope.predicate(dao)`` turns that set into a ``WHERE`` clause for the
+DAO's table, and ``BaseDAO.page``/``count``/``iter_all`` add it to the query
+when called with ``scope=``. Runs of consecutive ids become ``BETWEEN`` ranges
+and the rest an ``IN`` list. The ids are integers we produced ourselves, so
+they are inlined rather than bound, which keeps large trees clear of SQLite's
+bound-parameter limit. Tables with a department column (``scope_dept``) are
+filtered on it directly. Tables with only an owner (``scope_owner``) are
+filtered through the owners' ``user.dept_id``.
+"""
+import threading
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+from src.common.exceptions import ValidationError
+from src.dao.user_dao import UserDAO
+from src.services.org_tree import OrgTree, get_org_tree
+
+SELF, DEPARTMENT, DEPARTMENT_TREE, ALL = "self", "department", "department_tree", "all"
+SCOPE_KINDS = (SELF, DEPARTMENT, DEPARTMENT_TREE, ALL)
+
+Predicate = Optional[Tuple[str, List[Any]]]
+
+
+def id_predicate(column: str, ids: Iterable[int]) -> str:
+    """``column`` restricted to ``ids``: consecutive runs as ``BETWEEN``, the rest as one ``IN`` list."""
+    ordered = sorted({int(i) for i in ids})
+    if not ordered:
+        return "0 = 1"
+    clauses, singles = [], []
+    start = prev = ordered[0]
+    for value in ordered[1:] + [None]:
+        if value is not None and value == prev + 1:
+            prev = value
+            continue
+        if prev - start >= 2:
+            clauses.append(f"{column} BETWEEN {start} AND {prev}")
+        else:
+            singles.extend(range(start, prev + 1))
+        if value is not None:
+            start = prev = value
+    if singles:
+        clauses.append(f"{column} = {singles[0]}" if len(singles) == 1 else f"{column} IN ({', '.join(map(str, singles))})")
+    return clauses[0] if len(clauses) == 1 else "(" + " OR ".join(clauses) + ")"
+
+
+class DataScope:
+    """A user's resolved scope; ``predicate(dao)`` is the row filter for that DAO's table."""
+
+    __slots__ = ("kind", "user_id", "departments", "_predicates")
+
+    def __init__(self, kind: str, user_id: Hashable, departments: Optional[FrozenSet[int]]):
+        self.kind = kind
+        self.user_id = user_id
+        self.departments = departments  # None for ``all``
+        self._predicates: Dict[str, Predicate] = {}
+
+    def predicate(self, dao) -> Predicate:
+        if self.kind == ALL:
+            return None
+        if dao.table not in self._predicates:
+            self._predicates[dao.table] = self._build(dao)
+        clause = self._predicates[dao.table]
+        return (clause[0], list(clause[1])) if clause is not None else None
+
+    def _build(self, dao) -> Predicate:
+        owner, owner_of = dao.scope_owner, dao.scope_owner_of
+        if self.kind == SELF and owner:
+            if owner_of:
+                return f"`{owner}` IN ({owner_of.format(users='?')})", [self.user_id]
+            return f"`{owner}` = ?", [self.user_id]
+        if dao.scope_dept:
+            return id_predicate(f"`{dao.scope_dept}`", self.departments), []
+        if owner:
+            users = f"SELECT id FROM `user` WHERE {id_predicate('dept_id', self.departments)}"
+            return f"`{owner}` IN ({owner_of.format(users=users) if owner_of else users})", []
+        raise ValueError(f"Table {dao.table!r} declares no scope_dept or scope_owner column")
+
+
+class DataScopes:
+    def __init__(self, org: Optional[OrgTree] = None, users: Optional[UserDAO] = None, default: str = SELF):
+        self.org = org if org is not None else get_org_tree()
+        self.users = users
+        self.default = default
+        self._lock = threading.Lock()
+        self._settings: Dict[Hashable, Tuple[str, Optional[int]]] = {}
+        self._resolved: Dict[Hashable, Tuple[int, DataScope]] = {}
+
+    def set_scope(self, user_id: Hashable, kind: str, dept_id: Optional[int] = None) -> DataScope:
+        """Give ``user_id`` a scope; ``dept_id`` defaults to the user's ``user.dept_id``."""
+        if kind not in SCOPE_KINDS:
+            raise ValidationError(f"Unknown data scope {kind!r}; expected one of {', '.join(SCOPE_KINDS)}")
+        with self._lock:
+            self._settings[user_id] = (kind, dept_id)
+            self._resolved.pop(user_id, None)
+        return self.scope_for(user_id)
+
+    def _department_of(self, user_id: Hashable) -> Optional[int]:
+        user = (self.users or UserDAO()).get(user_id)
+        return user.get("dept_id") if user else None
+
+    def scope_for(self, user_id: Hashable) -> DataScope:
+        generation = self.org.generation
+        cached = self._resolved.get(user_id)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        kind, dept_id = self._settings.get(user_id, (self.default, None))
+        if dept_id is None and kind in (DEPARTMENT, DEPARTMENT_TREE):
+            dept_id = self._department_of(user_id)
+        if kind == ALL:
+            departments = None
+        elif kind == DEPARTMENT_TREE and dept_id is not None:
+            departments = self.org.subtree(dept_id)
+        else:
+            departments = frozenset(() if dept_id is None else (dept_id,))
+        scope = DataScope(kind, user_id, departments)
+        with self._lock:
+            self._resolved[user_id] = (generation, scope)
+        return scope
+
+    def invalidate(self, user_id: Optional[Hashable] = None) -> None:
+        """Forget resolved scopes, e.g. after a user changed department."""
+        with self._lock:
+            if user_id is None:
+                self._resolved.clear()
+            else:
+                self._resolved.pop(user_id, None)
+
+
+SCOPES = DataScopes()
+
+
+def get_data_scopes() -> DataScopes:
+    return SCOPES
+
+
+__all__ = [
+    "ALL",
+    "DEPARTMENT",
+    "DEPARTMENT_TREE",
+    "SCOPES",
+    "SCOPE_KINDS",
+    "SELF",
+    "DataScope",
+    "DataScopes",
+    "get_data_scopes",
+    "id_predicate",
+]
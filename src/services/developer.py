@@ -1,10 +1,20 @@
 """Low-code and extension platform stubs."""
 from typing import Dict, Any
 
+from src.workflow.form_engine import get_form
+
 
 class DeveloperService:
     def form_designer(self, schema: Dict[str, Any]) -> Dict[str, Any]:
-        return {"action": "form_designer", "schema": schema}
+        # Compiles (or reuses) the form so schema errors surface at design time, and returns a preview.
+        form = get_form(schema)
+        return {
+            "action": "form_designer",
+            "schema": schema,
+            "key": form.key,
+            "fields": list(form.fields),
+            "preview": form.render(),
+        }
 
     def workflow_designer(self, bpmn: str) -> Dict[str, Any]:
         return {"action": "workflow_designer", "bpmn": bpmn}
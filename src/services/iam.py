@@ -1,5 +1,18 @@
 """IAM service stubs covering account, auth, permissions, org, and audit."""
-from typing import List, Dict, Any
+from dataclasses import asdict
+from typing import List, Dict, Any, Iterable, Optional
+
+from config.settings import LDAP_SYNC_SOURCE
+from src.common.exceptions import ValidationError
+from src.common.validators import require_fields
+from src.dao.department_dao import DepartmentDAO
+from src.dao.log_dao import get_audit_store
+from src.events.event_bus import emit
+from src.services.abac import get_policy_engine
+from src.services.authz import PERMISSION_INDEX
+from src.services.data_scope import get_data_scopes
+from src.services.iam_import import UserImporter, import_file
+from src.services.org_tree import QUOTA, STAFF, get_org_tree
 
 
 class IAMService:
@@ -9,11 +22,22 @@ class IAMService:
     def delete_user(self, user_id: int) -> Dict[str, Any]:
         return {"action": "delete_user", "status": "ok", "user_id": user_id}
 
-    def bulk_import_users(self, users: List[Dict[str, Any]]) -> Dict[str, Any]:
-        return {"action": "bulk_import", "count": len(users)}
-
-    def sync_ldap(self) -> Dict[str, Any]:
-        return {"action": "ldap_sync", "status": "queued"}
+    def bulk_import_users(self, users: Iterable[Dict[str, Any]], **options) -> Dict[str, Any]:
+        # Streams ``users`` through the chunked importer; ``options`` are ``UserImporter`` arguments.
+        report = UserImporter(**options).run(users, source="api")
+        if report.imported:
+            get_org_tree().reload_headcount()
+        return {"action": "bulk_import", "count": report.total, "report": report.to_dict()}
+
+    def sync_ldap(self, source: Optional[str] = None, **options) -> Dict[str, Any]:
+        # ``source`` is an LDIF export (default ``LDAP_SYNC_SOURCE``); reruns resume from its checkpoint.
+        source = source or LDAP_SYNC_SOURCE
+        if not source:
+            return {"action": "ldap_sync", "status": "not_configured"}
+        report = import_file(source, **options)
+        if report.imported:
+            get_org_tree().reload_headcount()
+        return {"action": "ldap_sync", "status": "completed", "report": report.to_dict()}
 
     def freeze_account(self, user_id: int) -> Dict[str, Any]:
         return {"action": "freeze", "user_id": user_id}
@@ -37,13 +61,47 @@ class IAMService:
         return {"action": "third_party_login", "provider": provider, "code": code, "status": "ok"}
 
     def assign_role(self, user_id: int, role_id: int) -> Dict[str, Any]:
+        # Updates the flattened RBAC index and drops the user's cached grants.
+        PERMISSION_INDEX.assign_role(user_id, role_id)
         return {"action": "assign_role", "user_id": user_id, "role_id": role_id}
 
-    def define_abac_policy(self, name: str, expression: str) -> Dict[str, Any]:
-        return {"action": "define_abac_policy", "name": name, "expression": expression}
-
-    def set_data_permission(self, user_id: int, scope: str) -> Dict[str, Any]:
-        return {"action": "data_permission", "user_id": user_id, "scope": scope}
+    def define_abac_policy(
+        self,
+        name: str,
+        expression: str,
+        effect: str = "allow",
+        resources: Optional[Iterable[str]] = None,
+        actions: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        # Compiles once (bad expressions raise ValidationError); the engine drops its own memo on the change.
+        engine = get_policy_engine()
+        policy = engine.define(name, expression, effect, resources, actions)
+        emit("iam.policy.changed", {"name": name, "generation": engine.generation})
+        return {
+            "action": "define_abac_policy",
+            "name": name,
+            "expression": expression,
+            "effect": policy.effect,
+            "resources": sorted(policy.resources),
+            "actions": sorted(policy.actions),
+            "generation": engine.generation,
+        }
+
+    def evaluate_abac(
+        self,
+        subject: Dict[str, Any],
+        resource: str,
+        action: str,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        allowed = get_policy_engine().decide(subject, resource, action, attributes)
+        return {"action": "evaluate_abac", "resource": resource, "operation": action, "allowed": allowed}
+
+    def set_data_permission(self, user_id: int, scope: str, dept_id: Optional[int] = None) -> Dict[str, Any]:
+        # Resolved once here; DAO reads take ``get_data_scopes().scope_for(user_id)`` as ``scope=``.
+        resolved = get_data_scopes().set_scope(user_id, scope, dept_id)
+        departments = None if resolved.departments is None else len(resolved.departments)
+        return {"action": "data_permission", "user_id": user_id, "scope": scope, "departments": departments}
 
     def set_function_permission(self, user_id: int, resource: str) -> Dict[str, Any]:
         return {"action": "function_permission", "user_id": user_id, "resource": resource}
@@ -52,19 +110,57 @@ class IAMService:
         return {"action": "authorize_resource", "resource": resource, "subject": subject}
 
     def create_department(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        return {"action": "create_department", "department": payload}
+        require_fields(payload, ("name",))
+        tree = get_org_tree()
+        parent_id = payload.get("parent_id")
+        if parent_id is not None and parent_id not in tree:
+            raise ValidationError(f"Unknown parent department {parent_id}")
+        dept_id = DepartmentDAO().insert(payload)
+        tree.add(dept_id, parent_id, payload.get("leader_id"))
+        return {"action": "create_department", "department": {**payload, "id": dept_id}}
+
+    def move_department(self, dept_id: int, parent_id: Optional[int]) -> Dict[str, Any]:
+        # The index rejects cycles before the row is touched.
+        get_org_tree().move(dept_id, parent_id)
+        DepartmentDAO().update(dept_id, {"parent_id": parent_id})
+        return {"action": "move_department", "dept_id": dept_id, "parent_id": parent_id}
+
+    def reporting_chain(self, dept_id: int) -> Dict[str, Any]:
+        return {"action": "reporting_chain", "dept_id": dept_id, "leaders": get_org_tree().reporting_chain(dept_id)}
 
     def create_position(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         return {"action": "create_position", "position": payload}
 
     def manage_headcount(self, dept_id: int, quota: int) -> Dict[str, Any]:
-        return {"action": "manage_headcount", "dept_id": dept_id, "quota": quota}
-
-    def log_login(self, user_id: int) -> Dict[str, Any]:
-        return {"action": "login_log", "user_id": user_id}
-
-    def log_operation(self, user_id: int, operation: str) -> Dict[str, Any]:
-        return {"action": "operation_log", "user_id": user_id, "operation": operation}
+        tree = get_org_tree()
+        if dept_id not in tree:
+            raise ValidationError(f"Unknown department {dept_id}")
+        DepartmentDAO().set_quota(dept_id, quota)
+        tree.set_value(QUOTA, dept_id, quota)
+        total_quota, staff = tree.rollup(QUOTA, dept_id), tree.rollup(STAFF, dept_id)
+        return {
+            "action": "manage_headcount",
+            "dept_id": dept_id,
+            "quota": quota,
+            "total_quota": total_quota,
+            "staff": staff,
+            "vacancies": total_quota - staff,
+        }
+
+    def log_login(self, user_id: Any, **detail) -> Dict[str, Any]:
+        seq = get_audit_store().append(user_id, "login", detail)
+        return {"action": "login_log", "user_id": user_id, "seq": seq}
+
+    def log_operation(self, user_id: Any, operation: str, **detail) -> Dict[str, Any]:
+        seq = get_audit_store().append(user_id, operation, detail)
+        return {"action": "operation_log", "user_id": user_id, "operation": operation, "seq": seq}
 
     def audit_permission_change(self, change: Dict[str, Any]) -> Dict[str, Any]:
-        return {"action": "permission_audit", "change": change}
+        seq = get_audit_store().append(change.get("actor") or change.get("by"), "permission.change", change)
+        return {"action": "permission_audit", "change": change, "seq": seq}
+
+    def audit_trail(
+        self, actor: Any = None, since: Any = None, until: Any = None, action: Optional[str] = None, limit: int = 100
+    ) -> Dict[str, Any]:
+        records = get_audit_store().query(actor, since, until, action, limit)
+        return {"action": "audit_trail", "actor": actor, "count": len(records), "records": [asdict(r) for r in records]}
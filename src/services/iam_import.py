@@ -0,0 +1,310 @@
+"""Streaming bulk user import.
+
+Sources are generators (``read_csv`` and ``read_ldif``), so a 200k-user export
+is never held in memory. ``UserImporter`` processes them in chunks:
+
+1. Each row is validated with ``require_fields`` and normalised to the
+   ``user`` columns. Bad rows are counted and reported by row number.
+2. Usernames are checked against this run's username index, then against the
+   table (``UserDAO.existing_usernames``), so duplicates are skipped rather than
+   failing the whole chunk.
+3. Passwords are hashed in a process pool. The next chunk is validated while
+   the current one is hashed.
+4. Each chunk goes in with one batched ``insert_many`` transaction, after which
+   a checkpoint records how many source rows are done. A rerun of the same,
+   unchanged source resumes after the last committed chunk. The checkpoint is
+   removed when the import completes.
+
+Rows without a password get the unusable marker from
+``src.services.credentials``, so those users must reset it before signing in.
+The same goes for LDIF ``userPassword`` values that are already hashed
+(``{SSHA}...``, ``{CRYPT}...``): they cannot be converted, and hashing them
+again would turn the hash text into the password. Only ``{CLEARTEXT}`` values
+are kept.
+"""
+import base64
+import csv
+import io
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple, Union
+
+from config.security import PASSWORD_ITERATIONS
+from config.settings import IMPORT_CHUNK_SIZE, IMPORT_WORKERS
+from src.common.exceptions import ValidationError
+from src.common.validators import require_fields
+from src.dao.user_dao import UserDAO
+from src.services.credentials import UNUSABLE, hash_password
+
+REQUIRED_FIELDS = ("username", "real_name")
+USERNAME = re.compile(r"^[A-Za-z0-9_.@-]{1,50}$")
+# LDAP attribute (lower-case) -> user column; the first attribute present wins.
+LDIF_FIELDS = {
+    "uid": "username",
+    "cn": "real_name",
+    "displayname": "real_name",
+    "mail": "email",
+    "telephonenumber": "phone",
+    "mobile": "phone",
+    "userpassword": "password",
+    "departmentnumber": "dept_id",
+}
+LDAP_SCHEME = re.compile(r"^\{([A-Za-z0-9._-]+)\}")  # RFC 3112 style "{SSHA}..." prefix
+
+Source = Union[str, os.PathLike, TextIO]
+
+
+# --- sources -----------------------------------------------------------------
+def _lines(source: Source) -> Iterator[str]:
+    if isinstance(source, io.IOBase) or hasattr(source, "read"):
+        yield from source
+        return
+    with open(source, encoding="utf-8", newline="") as fh:
+        yield from fh
+
+
+def read_csv(source: Source) -> Iterator[Dict[str, str]]:
+    """Rows of a CSV file with a header line named after the user columns."""
+    yield from csv.DictReader(_lines(source))
+
+
+def _ldif_entries(source: Source) -> Iterator[List[Tuple[str, Union[str, bytes]]]]:
+    # ``name:: value`` attributes stay as raw bytes: exports carry binary ones
+    # (objectGUID, objectSid, jpegPhoto) that are not text.
+    entry: List[Tuple[str, Union[str, bytes]]] = []
+    logical = ""
+    for raw in itertools.chain(_lines(source), [""]):
+        line = raw.rstrip("\r\n")
+        if line.startswith(" "):  # folded continuation of the previous line
+            logical += line[1:]
+            continue
+        if logical and not logical.startswith("#"):
+            name, _, value = logical.partition(":")
+            if value.startswith(":"):
+                entry.append((name.strip().lower(), base64.b64decode(value[1:].strip())))
+            else:
+                entry.append((name.strip().lower(), value.strip()))
+        logical = line
+        if not line and entry:
+            yield entry
+            entry = []
+
+
+def _ldif_password(value: str) -> str:
+    scheme = LDAP_SCHEME.match(value)
+    if scheme is None:
+        return value
+    if scheme.group(1).upper() == "CLEARTEXT":
+        return value[scheme.end():]
+    return ""  # a foreign hash: imported as unusable
+
+
+def read_ldif(source: Source) -> Iterator[Dict[str, str]]:
+    """User rows from an LDIF export; entries without a ``uid`` (OUs, groups) are skipped."""
+    for entry in _ldif_entries(source):
+        row: Dict[str, str] = {}
+        for name, value in entry:
+            column = LDIF_FIELDS.get(name)
+            if column is None:
+                continue
+            if isinstance(value, bytes):
+                value = value.decode("utf-8", errors="replace").strip()
+            if column == "password":
+                value = _ldif_password(value)
+            if column not in row:
+                row[column] = value
+        if "username" in row:
+            yield row
+
+
+def read_source(path: Union[str, os.PathLike]) -> Iterator[Dict[str, str]]:
+    return read_ldif(path) if str(path).lower().endswith(".ldif") else read_csv(path)
+
+
+def chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _hash_batch(passwords: Sequence[Optional[str]], iterations: int) -> List[str]:
+    return [hash_password(password, iterations) for password in passwords]
+
+
+# --- checkpoints -------------------------------------------------------------
+def load_checkpoint(path: Optional[str], source: str, fingerprint: Any = None) -> Dict[str, Any]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        state = json.load(fh)
+    if state.get("source") != source or state.get("fingerprint") != fingerprint:
+        return {}  # a different or modified source: row offsets no longer line up
+    return state
+
+
+def _save_checkpoint(path: str, state: Mapping[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+
+# --- import ------------------------------------------------------------------
+@dataclass
+class ImportReport:
+    source: str
+    total: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    resumed_from: int = 0
+    elapsed: float = 0.0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def users_per_sec(self) -> float:
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self) | {"elapsed": round(self.elapsed, 3), "users_per_sec": round(self.users_per_sec, 1)}
+
+
+class UserImporter:
+    def __init__(
+        self,
+        dao: Optional[UserDAO] = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        workers: int = IMPORT_WORKERS,
+        iterations: int = PASSWORD_ITERATIONS,
+        checkpoint_path: Optional[str] = None,
+        max_errors: int = 1000,
+    ):
+        self.dao = dao or UserDAO()
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, workers)
+        self.iterations = iterations
+        self.checkpoint_path = checkpoint_path
+        self.max_errors = max_errors
+
+    def _normalise(self, row: Mapping[str, Any]) -> Dict[str, Any]:
+        row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items() if key}
+        require_fields({key: value for key, value in row.items() if value not in (None, "")}, REQUIRED_FIELDS)
+        if not USERNAME.match(row["username"]):
+            raise ValidationError(f"Invalid username {row['username']!r}")
+        if row.get("email") and "@" not in row["email"]:
+            raise ValidationError(f"Invalid email {row['email']!r}")
+        # ``insert_many`` needs one column set per batch, so every column is present.
+        user = {column: row.get(column) or None for column in UserDAO.columns}
+        for column in ("dept_id", "position_id", "status"):
+            if user[column] is not None:
+                try:
+                    user[column] = int(user[column])
+                except (TypeError, ValueError):
+                    raise ValidationError(f"{column} must be an integer, got {user[column]!r}") from None
+        if user["status"] is None:
+            user["status"] = 1
+        return user
+
+    def _prepare(self, chunk: List[Mapping[str, Any]], first_row: int, seen: set, report: ImportReport) -> List[Dict]:
+        valid = []
+        for number, row in enumerate(chunk, start=first_row):
+            try:
+                user = self._normalise(row)
+            except ValidationError as exc:
+                report.invalid += 1
+                if len(report.errors) < self.max_errors:
+                    report.errors.append({"row": number, "username": row.get("username"), "error": str(exc)})
+                continue
+            if user["username"] in seen:
+                report.duplicates += 1
+                continue
+            seen.add(user["username"])
+            valid.append(user)
+        existing = self.dao.existing_usernames([user["username"] for user in valid])
+        report.duplicates += len(existing)
+        return [user for user in valid if user["username"] not in existing]
+
+    def _submit_hashes(self, pool: Optional[ProcessPoolExecutor], passwords: List[Optional[str]]) -> List[Future]:
+        if pool is None or not any(passwords):
+            done: Future = Future()
+            done.set_result(_hash_batch(passwords, self.iterations))
+            return [done]
+        step = -(-len(passwords) // self.workers)
+        return [
+            pool.submit(_hash_batch, passwords[start:start + step], self.iterations)
+            for start in range(0, len(passwords), step)
+        ]
+
+    def run(self, records: Iterable[Mapping[str, Any]], source: str = "inline", fingerprint: Any = None) -> ImportReport:
+        started = time.perf_counter()
+        report = ImportReport(source)
+        state = load_checkpoint(self.checkpoint_path, source, fingerprint)
+        rows_done = report.resumed_from = state.get("rows", 0)
+        report.imported = state.get("imported", 0)
+        report.total = rows_done
+        rows = itertools.islice(records, rows_done, None)
+        seen: set = set()
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        pending: Optional[Tuple[List[Dict], List[Future], int]] = None
+        try:
+            for chunk in chunked(rows, self.chunk_size):
+                users = self._prepare(chunk, rows_done + 1, seen, report)
+                rows_done += len(chunk)
+                report.total += len(chunk)
+                futures = self._submit_hashes(pool, [user["password"] for user in users])
+                if pending is not None:
+                    self._commit(*pending, report, source, fingerprint)
+                pending = (users, futures, rows_done)
+            if pending is not None:
+                self._commit(*pending, report, source, fingerprint)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _commit(
+        self, users: List[Dict], futures: List[Future], rows_done: int, report: ImportReport, source: str, fingerprint
+    ) -> None:
+        hashes = [digest for future in futures for digest in future.result()]
+        for user, digest in zip(users, hashes):
+            user["password"] = digest
+        if users:
+            self.dao.insert_many(users, batch_size=self.chunk_size)
+        report.imported += len(users)
+        if self.checkpoint_path:
+            state = {"source": source, "fingerprint": fingerprint, "rows": rows_done, "imported": report.imported}
+            _save_checkpoint(self.checkpoint_path, state)
+
+
+def import_file(path: Union[str, os.PathLike], **options) -> ImportReport:
+    """Import a CSV or LDIF file, checkpointing to ``<path>.checkpoint`` unless told otherwise."""
+    path = os.fspath(path)
+    stat = os.stat(path)
+    options.setdefault("checkpoint_path", path + ".checkpoint")
+    return UserImporter(**options).run(read_source(path), source=os.path.abspath(path), fingerprint=[stat.st_size, stat.st_mtime_ns])
+
+
+__all__ = [
+    "ImportReport",
+    "LDIF_FIELDS",
+    "REQUIRED_FIELDS",
+    "UNUSABLE",
+    "UserImporter",
+    "chunked",
+    "import_file",
+    "load_checkpoint",
+    "read_csv",
+    "read_ldif",
+    "read_source",
+]
@@ -1,6 +1,9 @@
 """Data and system integration platform stubs."""
 from typing import Dict, Any
 
+from src.events.outbox import get_outbox
+from src.middleware.rate_limit_middleware import TOKEN_BUCKET, get_limits
+
 
 class IntegrationService:
     def api_gateway_route(self, request: Dict[str, Any]) -> Dict[str, Any]:
@@ -9,17 +12,21 @@ class IntegrationService:
     def manage_token(self, token_id: str) -> Dict[str, Any]:
         return {"action": "token_management", "token_id": token_id}
 
-    def rate_limit(self, client_id: str, limit: int) -> Dict[str, Any]:
-        return {"action": "rate_limit", "client_id": client_id, "limit": limit}
+    def rate_limit(self, client_id: str, limit: int, period: float = 1.0, algorithm: str = TOKEN_BUCKET) -> Dict[str, Any]:
+        """Give ``client_id`` its own limit of ``limit`` requests per ``period`` seconds."""
+        limiter = get_limits().set_user_limit(client_id, {"limit": limit, "period": period, "algorithm": algorithm})
+        return {"action": "rate_limit", "client_id": client_id, "limit": limit, "limiter": limiter.metrics()}
 
     def api_docs(self) -> Dict[str, Any]:
         return {"action": "api_docs", "status": "generated"}
 
     def kafka_enqueue(self, topic: str, payload: Any) -> Dict[str, Any]:
-        return {"action": "kafka_enqueue", "topic": topic, "payload": payload}
+        offset = get_outbox().enqueue("kafka", topic, payload)
+        return {"action": "kafka_enqueue", "topic": topic, "payload": payload, "offset": offset}
 
     def rabbitmq_enqueue(self, queue: str, payload: Any) -> Dict[str, Any]:
-        return {"action": "rabbitmq_enqueue", "queue": queue, "payload": payload}
+        offset = get_outbox().enqueue("rabbitmq", queue, payload)
+        return {"action": "rabbitmq_enqueue", "queue": queue, "payload": payload, "offset": offset}
 
     def schedule_job(self, name: str, cron: str) -> Dict[str, Any]:
         return {"action": "schedule_job", "name": name, "cron": cron}
@@ -1,19 +1,47 @@
 """Knowledge and learning stubs."""
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
+
+from src.services.search_index import Hit, SearchIndex, get_search_index
+
+
+def _results(hits: List[Hit]) -> List[Dict[str, Any]]:
+    return [hit._asdict() for hit in hits]
 
 
 class KnowledgeService:
-    def document_center(self, query: str) -> Dict[str, Any]:
-        return {"action": "document_center", "query": query}
+    def __init__(self, index: Optional[SearchIndex] = None):
+        self._index = index
+
+    @property
+    def index(self) -> SearchIndex:
+        if self._index is None:
+            self._index = get_search_index()
+        return self._index
+
+    def save_article(self, article_id: int, title: str, body: str = "", tags: Iterable[str] = ()) -> Dict[str, Any]:
+        # Creating and editing are the same call: the previous version is tombstoned.
+        self.index.add(article_id, title, body, tags)
+        return {"action": "save_article", "article_id": article_id}
+
+    def delete_article(self, article_id: int) -> Dict[str, Any]:
+        return {"action": "delete_article", "article_id": article_id, "deleted": self.index.delete(article_id)}
+
+    def document_center(self, query: str, limit: int = 20) -> Dict[str, Any]:
+        hits = self.index.search(query, limit)
+        return {"action": "document_center", "query": query, "results": _results(hits)}
 
-    def faq(self, question: str) -> Dict[str, Any]:
-        return {"action": "faq", "question": question}
+    def faq(self, question: str, limit: int = 5) -> Dict[str, Any]:
+        # Questions are phrased loosely, so any matching term counts; only articles tagged "faq".
+        hits = self.index.search(question, limit, mode="or", tag="faq")
+        return {"action": "faq", "question": question, "results": _results(hits)}
 
     def tag(self, article_id: int, tag: str) -> Dict[str, Any]:
-        return {"action": "knowledge_tag", "article_id": article_id, "tag": tag}
+        tags = self.index.tag(article_id, tag)
+        return {"action": "knowledge_tag", "article_id": article_id, "tag": tag, "tags": tags}
 
-    def search(self, keyword: str) -> Dict[str, Any]:
-        return {"action": "search", "keyword": keyword}
+    def search(self, keyword: str, limit: int = 10, tag: Optional[str] = None) -> Dict[str, Any]:
+        hits = self.index.search(keyword, limit, tag=tag)
+        return {"action": "search", "keyword": keyword, "count": len(hits), "results": _results(hits)}
 
 
 class LearningService:
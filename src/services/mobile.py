@@ -1,10 +1,25 @@
 """Mobile office stubs."""
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from src.common.exceptions import ValidationError
+from src.workflow.engine import STATUS_NAMES, get_engine
 
 
 class MobileService:
-    def approve(self, task_id: int) -> Dict[str, Any]:
-        return {"action": "mobile_approve", "task_id": task_id}
+    def approve(
+        self, task_id: int, actor: str, decision: str = "approve", comment: Optional[str] = None
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"action": "mobile_approve", "task_id": task_id}
+        engine = get_engine()
+        item = engine.inbox.get(task_id)
+        # Same ownership rule as ``/api/todos/{id}/complete``: only the assignee may decide.
+        if item is None or item["assignee"] != actor:
+            return result | {"ok": False, "error": "task not found"}
+        try:
+            instance = engine.complete(task_id, decision, comment=comment)
+        except ValidationError as exc:
+            return result | {"ok": False, "error": str(exc)}
+        return result | {"ok": True, "instance_id": instance.id, "status": STATUS_NAMES[instance.status]}
 
     def punch(self, user_id: int) -> Dict[str, Any]:
         return {"action": "mobile_punch", "user_id": user_id}
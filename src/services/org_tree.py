@@ -0,0 +1,342 @@
+"""Org hierarchy index over ``department.parent_id``.
+
+Every department gets an Euler-tour interval ``(tin, tout)``: a department's
+descendants are exactly the departments whose ``tin`` falls inside its
+interval. That gives:
+
+- ``is_ancestor`` in O(1), by comparing two intervals;
+- ``subtree`` in O(log n + k), by bisecting the sorted ``tin`` labels and
+  slicing out the k departments in range;
+- ``ancestors`` and ``reporting_chain``, walked in memory and cached per
+  department, for approval routing;
+- ``rollup`` of per-department values such as headcount and quota, as a
+  Fenwick-tree range sum over the same ``tin`` order, with O(log n) updates.
+
+Labels are spaced ``GAP`` apart, so ``add`` and ``move`` usually fit the new
+interval into the free space under the parent and only shift the sorted
+label list. When a gap runs out, the whole tree is relabelled in O(n). Any
+structural change bumps ``generation``, which is what ``DataScopes`` keys its
+cache on. It also drops the Fenwick trees, since ranks shift; they are rebuilt
+on the next rollup.
+
+``load`` seeds the ``staff`` metric from enabled users and ``quota`` from
+``department_quota``. ``reload_headcount`` re-reads staff after bulk user
+writes.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from src.common.exceptions import ValidationError
+from src.dao.department_dao import DepartmentDAO
+from src.dao.user_dao import UserDAO
+
+GAP = 1 << 32  # label spacing after a full relabel
+STAFF = "staff"
+QUOTA = "quota"
+
+
+class Fenwick:
+    """Prefix sums over positions ``0..n-1`` with O(log n) point updates."""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, values: Iterable[int]):
+        tree = [0] + list(values)
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, position: int, delta: int) -> None:
+        i, tree = position + 1, self.tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count: int) -> int:
+        total, tree = 0, self.tree
+        while count > 0:
+            total += tree[count]
+            count -= count & -count
+        return total
+
+    def range_sum(self, start: int, stop: int) -> int:
+        return self.prefix(stop) - self.prefix(start)
+
+
+class OrgTree:
+    def __init__(self, dao: Optional[DepartmentDAO] = None, users: Optional[UserDAO] = None):
+        self.dao = dao
+        self.users = users
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._parent: Dict[int, Optional[int]] = {}
+        self._children: Dict[Optional[int], List[int]] = defaultdict(list)  # kept in label order
+        self._leader: Dict[int, Optional[int]] = {}
+        self._tin: Dict[int, int] = {}
+        self._tout: Dict[int, int] = {}
+        self._labels: List[int] = []  # sorted ``tin`` labels
+        self._nodes: List[int] = []  # department ids, parallel to ``_labels``
+        self._subtrees: Dict[int, FrozenSet[int]] = {}
+        self._ancestors: Dict[int, Tuple[int, ...]] = {}
+        self._values: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._fenwicks: Dict[str, Fenwick] = {}
+        self.generation = 0
+        self.relabels = 0
+
+    # --- loading ---------------------------------------------------------
+    def load(
+        self,
+        rows: Optional[Iterable[Mapping[str, Any]]] = None,
+        headcount: Optional[Mapping[int, int]] = None,
+        quotas: Optional[Mapping[int, int]] = None,
+    ) -> None:
+        """Replace the tree with ``rows`` (``id``/``parent_id``/``leader_id``), read from the tables when omitted.
+
+        ``headcount`` seeds the ``staff`` values and ``quotas`` the ``quota``
+        values; they are read from ``user`` and ``department_quota`` when
+        ``rows`` is read from ``department``.
+        """
+        if rows is None:
+            dao = self.dao or DepartmentDAO()
+            rows = dao.hierarchy()
+            if headcount is None:
+                headcount = (self.users or UserDAO()).headcount_by_department()
+            if quotas is None:
+                quotas = dao.quotas()
+        rows = list(rows)
+        with self._lock:
+            self._parent = {row["id"]: row.get("parent_id") for row in rows}
+            self._leader = {row["id"]: row.get("leader_id") for row in rows}
+            self._children = defaultdict(list)
+            for dept_id, parent_id in self._parent.items():
+                if parent_id not in self._parent:
+                    self._parent[dept_id] = parent_id = None  # dangling parents become roots
+                self._children[parent_id].append(dept_id)
+            self._values = defaultdict(dict)
+            for metric, values in ((STAFF, headcount), (QUOTA, quotas)):
+                if values:
+                    self._values[metric] = {dept: value for dept, value in values.items() if dept in self._parent}
+            self._relabel()
+            self._ancestors = {}
+            self._loaded = True
+
+    def _ensure(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def _relabel(self) -> None:
+        tin, tout, order, label = {}, {}, [], 0
+        stack = [(root, False) for root in reversed(self._children[None])]
+        while stack:
+            node, leaving = stack.pop()
+            label += GAP
+            if leaving:
+                tout[node] = label
+                continue
+            tin[node] = label
+            order.append(node)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(self._children.get(node, ())))
+        if len(order) != len(self._parent):
+            raise ValidationError("Department hierarchy contains a cycle")
+        self._tin, self._tout = tin, tout
+        self._nodes, self._labels = order, [tin[node] for node in order]
+        self.relabels += 1
+        self._changed()
+
+    def _changed(self) -> None:
+        self._subtrees = {}
+        self._fenwicks = {}
+        self.generation += 1
+
+    # --- structure -------------------------------------------------------
+    def _gap(self, parent_id: Optional[int]) -> Tuple[int, int]:
+        """Free label space after ``parent_id``'s last child."""
+        siblings = self._children.get(parent_id)
+        if siblings:
+            low = self._tout[siblings[-1]]
+        else:
+            low = self._tin[parent_id] if parent_id is not None else 0
+        high = self._tout[parent_id] if parent_id is not None else low + 3 * GAP
+        return low, high
+
+    def add(self, dept_id: int, parent_id: Optional[int] = None, leader_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._ensure()
+            if dept_id in self._parent:
+                raise ValidationError(f"Department {dept_id} already exists")
+            if parent_id is not None and parent_id not in self._parent:
+                raise ValidationError(f"Unknown parent department {parent_id}")
+            low, high = self._gap(parent_id)
+            step = min((high - low) // 3, GAP)
+            self._parent[dept_id] = parent_id
+            self._leader[dept_id] = leader_id
+            self._children[parent_id].append(dept_id)
+            if step < 1:
+                self._relabel()
+                return
+            self._tin[dept_id], self._tout[dept_id] = low + step, low + 2 * step
+            position = bisect_left(self._labels, low + step)
+            self._labels.insert(position, low + step)
+            self._nodes.insert(position, dept_id)
+            self._changed()
+
+    def move(self, dept_id: int, parent_id: Optional[int]) -> None:
+        """Re-parent ``dept_id`` with its whole subtree."""
+        with self._lock:
+            self._ensure()
+            if dept_id not in self._parent:
+                raise ValidationError(f"Unknown department {dept_id}")
+            if parent_id is not None and parent_id not in self._parent:
+                raise ValidationError(f"Unknown parent department {parent_id}")
+            if parent_id is not None and self.is_ancestor(dept_id, parent_id):
+                raise ValidationError(f"Department {parent_id} is inside {dept_id}")
+            if self._parent[dept_id] == parent_id:
+                return
+            start, stop = self._span(dept_id)
+            moved = self._nodes[start:stop]
+            del self._labels[start:stop], self._nodes[start:stop]
+            self._children[self._parent[dept_id]].remove(dept_id)
+            low, high = self._gap(parent_id)
+            self._parent[dept_id] = parent_id
+            self._children[parent_id].append(dept_id)
+            self._ancestors = {}
+            step = min((high - low) // (2 * len(moved) + 2), GAP)
+            if step < 1:
+                self._relabel()
+                return
+            label, stack = low, [(dept_id, False)]
+            while stack:
+                node, leaving = stack.pop()
+                label += step
+                if leaving:
+                    self._tout[node] = label
+                    continue
+                self._tin[node] = label
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(self._children.get(node, ())))
+            # ``moved`` is in pre-order, which the fresh labels follow.
+            position = bisect_left(self._labels, self._tin[dept_id])
+            self._labels[position:position] = [self._tin[node] for node in moved]
+            self._nodes[position:position] = moved
+            self._changed()
+
+    def set_leader(self, dept_id: int, leader_id: Optional[int]) -> None:
+        with self._lock:
+            self._ensure()
+            if dept_id not in self._parent:
+                raise ValidationError(f"Unknown department {dept_id}")
+            self._leader[dept_id] = leader_id
+
+    # --- queries ---------------------------------------------------------
+    def __contains__(self, dept_id: int) -> bool:
+        self._ensure()
+        return dept_id in self._parent
+
+    def __len__(self) -> int:
+        self._ensure()
+        return len(self._parent)
+
+    def _span(self, dept_id: int) -> Tuple[int, int]:
+        """Positions ``[start, stop)`` of ``dept_id``'s subtree in ``tin`` order."""
+        return bisect_left(self._labels, self._tin[dept_id]), bisect_right(self._labels, self._tout[dept_id])
+
+    def is_ancestor(self, ancestor: int, dept_id: int) -> bool:
+        """True when ``dept_id`` is ``ancestor`` or lies below it."""
+        self._ensure()
+        tin, tout = self._tin, self._tout
+        return tin[ancestor] <= tin[dept_id] and tout[dept_id] <= tout[ancestor]
+
+    def subtree(self, dept_id: int) -> FrozenSet[int]:
+        """``dept_id`` and every department below it."""
+        self._ensure()
+        ids = self._subtrees.get(dept_id)
+        if ids is None:
+            with self._lock:
+                if dept_id not in self._parent:
+                    raise ValidationError(f"Unknown department {dept_id}")
+                start, stop = self._span(dept_id)
+                ids = self._subtrees[dept_id] = frozenset(self._nodes[start:stop])
+        return ids
+
+    def ancestors(self, dept_id: int) -> Tuple[int, ...]:
+        """Departments above ``dept_id``, nearest first."""
+        self._ensure()
+        chain = self._ancestors.get(dept_id)
+        if chain is None:
+            with self._lock:
+                if dept_id not in self._parent:
+                    raise ValidationError(f"Unknown department {dept_id}")
+                walked, node = [], self._parent[dept_id]
+                while node is not None:
+                    walked.append(node)
+                    node = self._parent[node]
+                chain = self._ancestors[dept_id] = tuple(walked)
+        return chain
+
+    def reporting_chain(self, dept_id: int) -> List[int]:
+        """Leaders of ``dept_id`` and the departments above it, nearest first, for approval routing."""
+        chain: List[int] = []
+        for dept in (dept_id,) + self.ancestors(dept_id):
+            leader = self._leader.get(dept)
+            if leader is not None and leader not in chain:
+                chain.append(leader)
+        return chain
+
+    # --- rollups ---------------------------------------------------------
+    def value(self, metric: str, dept_id: int) -> int:
+        self._ensure()
+        return self._values[metric].get(dept_id, 0)
+
+    def set_value(self, metric: str, dept_id: int, value: int) -> None:
+        self.add_value(metric, dept_id, value - self.value(metric, dept_id))
+
+    def add_value(self, metric: str, dept_id: int, delta: int) -> None:
+        with self._lock:
+            self._ensure()
+            if dept_id not in self._parent:
+                raise ValidationError(f"Unknown department {dept_id}")
+            values = self._values[metric]
+            values[dept_id] = values.get(dept_id, 0) + delta
+            fenwick = self._fenwicks.get(metric)
+            if fenwick is not None:
+                fenwick.add(bisect_left(self._labels, self._tin[dept_id]), delta)
+
+    def reload_headcount(self, headcount: Optional[Mapping[int, int]] = None) -> None:
+        """Replace the ``staff`` values, read from ``user`` when omitted; a tree not loaded yet reads them on load."""
+        with self._lock:
+            if not self._loaded:
+                return
+            if headcount is None:
+                headcount = (self.users or UserDAO()).headcount_by_department()
+            self._values[STAFF] = {dept: count for dept, count in headcount.items() if dept in self._parent}
+            self._fenwicks.pop(STAFF, None)
+
+    def rollup(self, metric: str, dept_id: int) -> int:
+        """Sum of ``metric`` over ``dept_id`` and everything below it."""
+        with self._lock:
+            self._ensure()
+            if dept_id not in self._parent:
+                raise ValidationError(f"Unknown department {dept_id}")
+            fenwick = self._fenwicks.get(metric)
+            if fenwick is None:
+                values = self._values[metric]
+                fenwick = self._fenwicks[metric] = Fenwick(values.get(node, 0) for node in self._nodes)
+            return fenwick.range_sum(*self._span(dept_id))
+
+    def metrics(self) -> Dict[str, int]:
+        return {"departments": len(self._parent), "generation": self.generation, "relabels": self.relabels}
+
+
+ORG_TREE = OrgTree()
+
+
+def get_org_tree() -> OrgTree:
+    return ORG_TREE
+
+
+__all__ = ["GAP", "ORG_TREE", "QUOTA", "STAFF", "Fenwick", "OrgTree", "get_org_tree"]
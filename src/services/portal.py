@@ -1,13 +1,28 @@
 """Enterprise portal stubs."""
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from src.workflow.engine import get_engine
+from src.workflow.task_inbox import OPEN, decode_cursor, encode_cursor
 
 
 class PortalService:
     def unified_login(self, user_id: int) -> Dict[str, Any]:
         return {"action": "unified_login", "user_id": user_id}
 
-    def todo_center(self, user_id: int) -> Dict[str, Any]:
-        return {"action": "todo_center", "user_id": user_id}
+    def todo_center(
+        self, assignee: Any, status: str = OPEN, cursor: Optional[str] = None, limit: int = 20
+    ) -> Dict[str, Any]:
+        # ``assignee`` is the task inbox key: the username tasks are assigned to.
+        inbox = get_engine().inbox
+        items, next_cursor = inbox.page(assignee, status, decode_cursor(cursor), limit)
+        return {
+            "action": "todo_center",
+            "assignee": assignee,
+            "status": status,
+            "total": inbox.count(assignee, status),
+            "items": items,
+            "next_cursor": encode_cursor(next_cursor),
+        }
 
     def workspace(self, user_id: int) -> Dict[str, Any]:
         return {"action": "workspace", "user_id": user_id}
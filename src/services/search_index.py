@@ -0,0 +1,521 @@
+"""In-process full-text index for knowledge articles.
+
+Text is tokenised for mixed Chinese and English:
+
+- runs of CJK ideographs, kana and hangul become overlapping bigrams
+  (a lone character stays a unigram). Indexed text also gets a unigram for
+  every character, so a one-character query matches; longer queries use the
+  bigrams only;
+- everything else is split into case-folded words.
+
+Title and tag tokens count twice. Each tag is also indexed as the exact term
+``#<tag>`` so that queries can filter on it. Results are ranked with BM25.
+
+Postings are two parallel arrays per term: ``uint32`` document numbers in
+ascending order and ``uint8`` term frequencies (capped at 255).
+
+``save`` writes a single segment file: a sorted term dictionary, the posting
+arrays, per-document article ids, lengths and stored fields, and the deleted
+document numbers (empty since ``save`` compacts; older files may carry some).
+``SearchIndex`` maps that file with ``mmap`` and reads it in place through
+``memoryview`` casts. Startup therefore does not rebuild the index; it opens
+the file. Terms are looked up by binary search over the
+dictionary, and conjunctive queries bisect the longer posting lists directly
+in the mapped arrays.
+
+Documents added or edited after the last save go into an in-memory delta with
+the same layout. Every document number there is higher than any in the
+segment, so a term's postings are the segment slice followed by the delta
+array. An edit tombstones the old document number and appends a new one.
+``save`` merges the delta into a fresh segment (written to a temporary file,
+then ``os.replace``d) and runs automatically every ``flush_docs`` new
+documents. Deleted and replaced postings are skipped at query time until the
+next ``save``, which drops them and renumbers the surviving documents densely,
+so the segment does not grow with edits and document frequencies stay exact.
+"""
+import atexit
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from math import log
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from config.settings import SEARCH_FLUSH_DOCS, SEARCH_INDEX_PATH
+from src.common.exceptions import ERPError, ValidationError
+
+CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"  # kana, CJK ideographs, hangul
+TOKEN = re.compile(f"[{CJK}]+|[^\\W_{CJK}]+")
+CJK_RUN = re.compile(f"[{CJK}]")
+TAG_PREFIX = "#"
+TITLE_WEIGHT = 2
+TAG_WEIGHT = 2
+MAX_TF = 255
+K1, B = 1.2, 0.75
+
+MAGIC = b"ERPIDX1" + (b"L" if sys.byteorder == "little" else b"B")
+SECTIONS = (
+    ("term_offsets", "Q"),
+    ("terms", "B"),
+    ("post_start", "Q"),
+    ("docnos", "I"),
+    ("tfs", "B"),
+    ("doc_ids", "q"),
+    ("doc_lens", "I"),
+    ("stored_offsets", "Q"),
+    ("stored", "B"),
+    ("dead", "I"),
+)
+HEADER = struct.Struct(f"<8sQQ{2 * len(SECTIONS)}Q")  # magic, doc count, term count, (offset, length) per section
+
+
+class IndexFormatError(ERPError):
+    """Raised when a segment file is not one this build wrote."""
+
+
+class Hit(NamedTuple):
+    article_id: int
+    score: float
+    title: str
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """Query tokens; ``unigrams=True`` adds each CJK character of longer runs, as indexing does."""
+    tokens: List[str] = []
+    for run in TOKEN.findall(text.casefold()):
+        if CJK_RUN.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if unigrams:
+                tokens.extend(run)
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _term_counts(title: str, body: str, tags: Sequence[str]) -> Counter:
+    counts = Counter(tokenize(body, unigrams=True))
+    for token in tokenize(title, unigrams=True):
+        counts[token] += TITLE_WEIGHT
+    for tag in tags:
+        for token in tokenize(tag, unigrams=True):
+            counts[token] += TAG_WEIGHT
+        counts[TAG_PREFIX + tag.casefold()] += 1
+    return counts
+
+
+def _dump(fields: Dict[str, Any]) -> bytes:
+    return json.dumps(fields, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class _Segment:
+    """A saved index file, read in place through ``mmap``."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self._map, 0)
+        if header[0] != MAGIC:
+            self._map.close()
+            raise IndexFormatError(f"{path} is not a search segment for this platform")
+        self.doc_count, self.term_count = header[1], header[2]
+        self._root = memoryview(self._map)
+        self._views: List[memoryview] = [self._root]
+        for i, (name, fmt) in enumerate(SECTIONS):
+            start, length = header[3 + 2 * i], header[4 + 2 * i]
+            view = self._root[start:start + length].cast(fmt)
+            self._views.append(view)
+            setattr(self, name, view)
+
+    def find(self, term: str) -> int:
+        """Dictionary position of ``term``, or -1."""
+        key, offsets, blob = term.encode(), self.term_offsets, self.terms
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(blob[offsets[mid]:offsets[mid + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.term_count and bytes(blob[offsets[lo]:offsets[lo + 1]]) == key:
+            return lo
+        return -1
+
+    def term(self, position: int) -> str:
+        return bytes(self.terms[self.term_offsets[position]:self.term_offsets[position + 1]]).decode()
+
+    def postings(self, position: int) -> Tuple[memoryview, memoryview]:
+        start, stop = self.post_start[position], self.post_start[position + 1]
+        return self.docnos[start:stop], self.tfs[start:stop]
+
+    def fields(self, docno: int) -> Dict[str, Any]:
+        return json.loads(bytes(self.stored[self.stored_offsets[docno]:self.stored_offsets[docno + 1]]))
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+
+
+class _Postings:
+    __slots__ = ("parts", "df")
+
+    def __init__(self, parts: List[Tuple[Sequence[int], Sequence[int]]]):
+        self.parts = [part for part in parts if len(part[0])]
+        self.df = sum(len(docs) for docs, _ in self.parts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for docs, tfs in self.parts:
+            yield from zip(docs, tfs)
+
+    def tf(self, docno: int) -> int:
+        for docs, tfs in self.parts:
+            if docs[-1] >= docno:
+                i = bisect_left(docs, docno)
+                return tfs[i] if docs[i] == docno else 0
+        return 0
+
+
+class SearchIndex:
+    def __init__(self, path: Optional[str] = None, flush_docs: int = SEARCH_FLUSH_DOCS):
+        self.path = path
+        self.flush_docs = flush_docs
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._segment: Optional[_Segment] = None
+        self._base = 0
+        self._delta: Dict[str, Tuple[array, array]] = {}
+        self._ids = array("q")
+        self._lens = array("I")
+        self._stored: List[Dict[str, Any]] = []
+        self._dead: set = set()
+        self._live: Dict[int, int] = {}
+        self._total_len = 0
+        self._dirty = False
+
+    # --- loading ---------------------------------------------------------
+    def _ensure(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path and os.path.exists(self.path):
+                self._open_segment()
+            self._loaded = True
+
+    def _open_segment(self) -> None:
+        segment = _Segment(self.path)
+        self._segment, self._base = segment, segment.doc_count
+        self._dead = set(segment.dead)
+        self._live = {aid: docno for docno, aid in enumerate(segment.doc_ids) if docno not in self._dead}
+        self._total_len = sum(segment.doc_lens) - sum(segment.doc_lens[docno] for docno in self._dead)
+
+    # --- writes ----------------------------------------------------------
+    def add(self, article_id: int, title: str = "", body: str = "", tags: Iterable[str] = ()) -> None:
+        """Index an article, replacing any earlier version of it."""
+        tags = list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+        counts = _term_counts(title, body, tags)
+        with self._lock:
+            self._ensure()
+            self._remove(article_id)
+            docno = self._base + len(self._ids)
+            delta = self._delta
+            for term, tf in counts.items():
+                lists = delta.get(term)
+                if lists is None:
+                    lists = delta[term] = (array("I"), array("B"))
+                lists[0].append(docno)
+                lists[1].append(min(tf, MAX_TF))
+            length = sum(counts.values())
+            self._ids.append(article_id)
+            self._lens.append(length)
+            self._stored.append({"title": title, "body": body, "tags": tags})
+            self._live[article_id] = docno
+            self._total_len += length
+            self._dirty = True
+            if self.flush_docs and len(self._ids) >= self.flush_docs:
+                self.save()
+
+    def delete(self, article_id: int) -> bool:
+        with self._lock:
+            self._ensure()
+            removed = self._remove(article_id)
+            self._dirty = self._dirty or removed
+            return removed
+
+    def _remove(self, article_id: int) -> bool:
+        docno = self._live.pop(article_id, None)
+        if docno is None:
+            return False
+        self._dead.add(docno)
+        self._total_len -= self._length(docno)
+        return True
+
+    def tag(self, article_id: int, tag: str) -> List[str]:
+        """Add ``tag`` to an indexed article; returns its tags."""
+        fields = self.document(article_id)
+        if fields is None:
+            raise ValidationError(f"Article {article_id} is not indexed")
+        if tag not in fields["tags"]:
+            fields["tags"] = fields["tags"] + [tag]
+            self.add(article_id, fields["title"], fields["body"], fields["tags"])
+        return fields["tags"]
+
+    # --- reads -----------------------------------------------------------
+    def __len__(self) -> int:
+        self._ensure()
+        return len(self._live)
+
+    def _length(self, docno: int) -> int:
+        return self._segment.doc_lens[docno] if docno < self._base else self._lens[docno - self._base]
+
+    def document(self, article_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._ensure()
+            docno = self._live.get(article_id)
+            if docno is None:
+                return None
+            if docno < self._base:
+                return self._segment.fields(docno)
+            return dict(self._stored[docno - self._base])
+
+    def _postings(self, term: str) -> _Postings:
+        parts = []
+        if self._segment is not None:
+            position = self._segment.find(term)
+            if position >= 0:
+                parts.append(self._segment.postings(position))
+        if term in self._delta:
+            parts.append(self._delta[term])
+        return _Postings(parts)
+
+    def search(self, query: str, limit: int = 10, mode: str = "and", tag: Optional[str] = None) -> List[Hit]:
+        """Top ``limit`` articles by BM25.
+
+        ``mode="and"`` requires every query term; ``"or"`` ranks any match.
+        ``tag`` restricts results to articles carrying that tag.
+        """
+        if mode not in ("and", "or"):
+            raise ValidationError(f"Unknown search mode {mode!r}")
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            self._ensure()
+            total = len(self._live)
+            if not terms or not total:
+                return []
+            lists = [self._postings(term) for term in terms]
+            required = [self._postings(TAG_PREFIX + tag.casefold())] if tag else []
+            avgdl = self._total_len / total
+            dead, length = self._dead, self._length
+            weights = [self._idf(postings.df, total) for postings in lists]
+
+            def score(docno: int, tf: int, idf: float) -> float:
+                return idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length(docno) / avgdl))
+
+            scores: Dict[int, float] = {}
+            if mode == "and":
+                order = sorted(range(len(lists)), key=lambda i: lists[i].df)
+                driver, others = lists[order[0]], [(lists[i], weights[i]) for i in order[1:]]
+                for docno, tf in driver:
+                    if docno in dead or any(not r.tf(docno) for r in required):
+                        continue
+                    total_score = score(docno, tf, weights[order[0]])
+                    for postings, idf in others:
+                        other_tf = postings.tf(docno)
+                        if not other_tf:
+                            break
+                        total_score += score(docno, other_tf, idf)
+                    else:
+                        scores[docno] = total_score
+            else:
+                for postings, idf in zip(lists, weights):
+                    for docno, tf in postings:
+                        if docno not in dead:
+                            scores[docno] = scores.get(docno, 0.0) + score(docno, tf, idf)
+                if required:
+                    scores = {d: s for d, s in scores.items() if all(r.tf(d) for r in required)}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [Hit(self._article_id(docno), round(value, 6), self._title(docno)) for docno, value in best]
+
+    @staticmethod
+    def _idf(df: int, total: int) -> float:
+        return log(1 + max(total - df, 0) / (df + 0.5) + 0.5 / (df + 0.5))
+
+    def _article_id(self, docno: int) -> int:
+        return self._segment.doc_ids[docno] if docno < self._base else self._ids[docno - self._base]
+
+    def _title(self, docno: int) -> str:
+        fields = self._segment.fields(docno) if docno < self._base else self._stored[docno - self._base]
+        return fields["title"]
+
+    # --- persistence -----------------------------------------------------
+    def save(self) -> bool:
+        """Merge the delta into a new segment file; False when there is nothing to write."""
+        with self._lock:
+            self._ensure()
+            if not self.path or not self._dirty:
+                return False
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as out:
+                self._write(out)
+                out.flush()
+                os.fsync(out.fileno())
+            if self._segment is not None:
+                self._segment.close()
+            os.replace(tmp, self.path)
+            self._delta, self._ids, self._lens, self._stored = {}, array("q"), array("I"), []
+            self._open_segment()
+            self._dirty = False
+            return True
+
+    def _merged_terms(self) -> Iterator[Tuple[str, int, Optional[Tuple[array, array]]]]:
+        """``(term, segment position or -1, delta lists or None)`` in byte order."""
+        segment = self._segment
+        count = segment.term_count if segment is not None else 0
+        delta_terms = sorted(self._delta, key=str.encode)
+        i = j = 0
+        while i < count or j < len(delta_terms):
+            seg_term = segment.term(i) if i < count else None
+            new_term = delta_terms[j] if j < len(delta_terms) else None
+            if new_term is None or (seg_term is not None and seg_term.encode() < new_term.encode()):
+                yield seg_term, i, None
+                i += 1
+            elif seg_term == new_term:
+                yield seg_term, i, self._delta[new_term]
+                i, j = i + 1, j + 1
+            else:
+                yield new_term, -1, self._delta[new_term]
+                j += 1
+
+    def _write(self, out) -> None:
+        segment = self._segment
+        total = self._base + len(self._ids)
+        remap: Optional[List[int]] = None
+        if self._dead:  # compact: live documents are renumbered densely, dead ones dropped
+            remap, next_docno = [-1] * total, 0
+            for docno in range(total):
+                if docno not in self._dead:
+                    remap[docno], next_docno = next_docno, next_docno + 1
+        sections: Dict[str, Tuple[int, int]] = {}
+        out.write(b"\0" * HEADER.size)
+
+        def section(name: str, chunks: Iterable[bytes]) -> None:
+            pad = -out.tell() % 8
+            out.write(b"\0" * pad)
+            start = out.tell()
+            for chunk in chunks:
+                out.write(chunk)
+            sections[name] = (start, out.tell() - start)
+
+        encoded: List[bytes] = []
+        starts, tfs = array("Q", [0]), array("B")
+
+        def docnos() -> Iterator[bytes]:
+            # Streams document numbers while collecting the (smaller) tf column and the surviving terms.
+            for term, position, lists in self._merged_terms():
+                parts = [segment.postings(position)] if position >= 0 else []
+                if lists is not None:
+                    parts.append(lists)
+                count = 0
+                for docs, freqs in parts:
+                    if remap is not None:
+                        kept = [(remap[docno], tf) for docno, tf in zip(docs, freqs) if remap[docno] >= 0]
+                        docs, freqs = array("I", [d for d, _ in kept]), array("B", [tf for _, tf in kept])
+                    if len(docs):
+                        yield docs.tobytes()
+                        tfs.frombytes(freqs.tobytes())
+                        count += len(docs)
+                if count:
+                    encoded.append(term.encode())
+                    starts.append(starts[-1] + count)
+
+        section("docnos", docnos())
+        section("tfs", [tfs.tobytes()])
+        offsets = array("Q", [0])
+        for term_bytes in encoded:
+            offsets.append(offsets[-1] + len(term_bytes))
+        section("term_offsets", [offsets.tobytes()])
+        section("terms", encoded)
+        section("post_start", [starts.tobytes()])
+        if remap is None:
+            ids = [segment.doc_ids.tobytes() if segment is not None else b"", self._ids.tobytes()]
+            lens = [segment.doc_lens.tobytes() if segment is not None else b"", self._lens.tobytes()]
+            stored = [segment.stored.tobytes()] if segment is not None and len(segment.stored) else []
+            stored_offsets = array("Q", segment.stored_offsets if segment is not None else [0])
+            blobs = [_dump(fields) for fields in self._stored]
+        else:
+            live = [docno for docno in range(total) if remap[docno] >= 0]
+            ids = [array("q", [self._article_id(docno) for docno in live]).tobytes()]
+            lens = [array("I", [self._length(docno) for docno in live]).tobytes()]
+            stored, stored_offsets = [], array("Q", [0])
+            blobs = [self._stored_blob(docno) for docno in live]
+        for blob in blobs:
+            stored_offsets.append(stored_offsets[-1] + len(blob))
+        section("doc_ids", ids)
+        section("doc_lens", lens)
+        section("stored_offsets", [stored_offsets.tobytes()])
+        section("stored", stored + blobs)
+        section("dead", [b""])  # always empty now; kept so segments with tombstones still open
+        fields = [value for name, _ in SECTIONS for value in sections[name]]
+        out.seek(0)
+        doc_count = total if remap is None else len(live)
+        out.write(HEADER.pack(MAGIC, doc_count, len(encoded), *fields))
+        out.seek(0, os.SEEK_END)
+
+    def _stored_blob(self, docno: int) -> bytes:
+        if docno < self._base:
+            offsets = self._segment.stored_offsets
+            return self._segment.stored[offsets[docno]:offsets[docno + 1]].tobytes()
+        return _dump(self._stored[docno - self._base])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._loaded:
+                self.save()
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            self._loaded = False
+
+    def metrics(self) -> Dict[str, Any]:
+        self._ensure()
+        return {
+            "documents": len(self._live),
+            "segment_documents": self._base,
+            "delta_documents": len(self._ids),
+            "deleted": len(self._dead),
+            "segment_terms": self._segment.term_count if self._segment is not None else 0,
+            "delta_terms": len(self._delta),
+        }
+
+
+_INDEX: Optional[SearchIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Process-wide index at ``config.settings.SEARCH_INDEX_PATH``, saved at exit."""
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                index = SearchIndex(SEARCH_INDEX_PATH)
+                atexit.register(index.close)
+                _INDEX = index
+    return _INDEX
+
+
+__all__ = [
+    "Hit",
+    "IndexFormatError",
+    "SearchIndex",
+    "get_search_index",
+    "tokenize",
+]
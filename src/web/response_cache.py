@@ -0,0 +1,50 @@
+"""Pre-serialized JSON responses for hot, rarely changing endpoints.
+
+Entries hold the encoded body and its ETag so handlers can write them straight
+to the socket (or answer ``304``) without re-running ``json.dumps``. Callers key
+entries by everything the payload depends on, e.g. a user's module bitmask, and
+``clear()`` drops everything when the underlying metadata changes.
+"""
+import hashlib
+import json
+import threading
+from typing import Callable, Dict, Hashable, NamedTuple
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    content_type: str = "application/json"
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, CachedResponse] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get_or_build(self, key: Hashable, build: Callable[[], object]) -> CachedResponse:
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        generation = self._generation
+        body = json.dumps(build()).encode()
+        entry = CachedResponse(body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        with self._lock:
+            if generation == self._generation:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = entry
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = ["CachedResponse", "ResponseCache"]
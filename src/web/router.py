@@ -0,0 +1,133 @@
+"""Precompiled route table for the demo web server.
+
+Routes are registered once at import time with per-route auth/module metadata.
+Literal paths resolve through a single dict lookup; paths with ``{param}``
+segments walk a segment trie, so dispatch cost depends on the depth of the path
+rather than on the number of registered endpoints. Static files get their own
+exact-match table.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Route:
+    method: str
+    pattern: str
+    handler: Callable
+    auth: bool = False
+    module: Optional[str] = None
+    admin: bool = False
+
+
+@dataclass(frozen=True)
+class StaticFile:
+    path: Path
+    login_required: bool = False
+
+
+@dataclass
+class _Node:
+    literals: Dict[str, "_Node"] = field(default_factory=dict)
+    param: Optional[Tuple[str, "_Node"]] = None
+    routes: Dict[str, Route] = field(default_factory=dict)
+
+
+class Router:
+    def __init__(self):
+        self._exact: Dict[Tuple[str, str], Route] = {}
+        self._trie = _Node()
+        self.static: Dict[str, StaticFile] = {}
+
+    # --- registration ----------------------------------------------------
+    def add(
+        self,
+        method: str,
+        pattern: str,
+        handler: Callable,
+        auth: bool = False,
+        module: Optional[str] = None,
+        admin: bool = False,
+    ) -> Route:
+        route = Route(method.upper(), pattern, handler, auth=auth or admin or module is not None, module=module, admin=admin)
+        if "{" not in pattern:
+            self._exact[(route.method, pattern)] = route
+            return route
+        node = self._trie
+        for segment in pattern.strip("/").split("/"):
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+                if node.param is None:
+                    node.param = (name, _Node())
+                elif node.param[0] != name:
+                    raise ValueError(f"Conflicting parameter names at {pattern!r}: {node.param[0]} vs {name}")
+                node = node.param[1]
+            else:
+                node = node.literals.setdefault(segment, _Node())
+        node.routes[route.method] = route
+        return route
+
+    def route(self, method: str, pattern: str, **meta) -> Callable[[Callable], Callable]:
+        def decorator(handler: Callable) -> Callable:
+            self.add(method, pattern, handler, **meta)
+            return handler
+
+        return decorator
+
+    def get(self, pattern: str, **meta) -> Callable[[Callable], Callable]:
+        return self.route("GET", pattern, **meta)
+
+    def post(self, pattern: str, **meta) -> Callable[[Callable], Callable]:
+        return self.route("POST", pattern, **meta)
+
+    def add_static_dir(self, root: Path, public_pages: Iterable[str] = ()) -> None:
+        """Map ``/static/<file>`` (public) and ``/<page>.html`` (login required) for every file under root."""
+        public = set(public_pages)
+        for path in sorted(p for p in root.rglob("*") if p.is_file()):
+            rel = path.relative_to(root).as_posix()
+            self.static[f"/static/{rel}"] = StaticFile(path)
+            if path.suffix == ".html":
+                self.static[f"/{rel}"] = StaticFile(path, login_required=rel not in public)
+
+    def routes(self) -> Iterator[Route]:
+        """Every registered endpoint (static files excluded)."""
+        yield from self._exact.values()
+        stack = [self._trie]
+        while stack:
+            node = stack.pop()
+            yield from node.routes.values()
+            stack.extend(node.literals.values())
+            if node.param is not None:
+                stack.append(node.param[1])
+
+    # --- lookup ----------------------------------------------------------
+    def resolve(self, method: str, path: str) -> Optional[Tuple[Route, Dict[str, str]]]:
+        route = self._exact.get((method, path))
+        if route is not None:
+            return route, {}
+        params: Dict[str, str] = {}
+        route = self._match(self._trie, path.strip("/").split("/"), 0, method, params)
+        if route is None:
+            return None
+        return route, params
+
+    def _match(self, node: _Node, segments, idx: int, method: str, params: Dict[str, str]) -> Optional[Route]:
+        if idx == len(segments):
+            return node.routes.get(method)
+        segment = segments[idx]
+        child = node.literals.get(segment)
+        if child is not None:
+            route = self._match(child, segments, idx + 1, method, params)
+            if route is not None:
+                return route
+        if node.param is not None and segment:
+            name, child = node.param
+            route = self._match(child, segments, idx + 1, method, params)
+            if route is not None:
+                params[name] = segment
+                return route
+        return None
+
+
+__all__ = ["Route", "Router", "StaticFile"]
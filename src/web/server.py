@@ -9,22 +9,62 @@ Endpoints
 - POST /api/users           -> admin-only user creation & permission assignment
 - GET /api/me               -> current user context
 - POST /api/run             -> run tasks concurrently with permission checks
-
-The server keeps an in-memory user store and session registry for demo purposes
-and reuses the existing thread pool helper for concurrency.
+- POST /api/run/stream      -> same as /api/run, streamed as NDJSON lines as tasks finish
+- GET /api/runtime          -> admin-only executor, event bus, rate limiter and middleware timings
+- GET /api/todos            -> the caller's workflow tasks, paginated by cursor
+- GET /api/todos/stream     -> server-sent events for the caller's task changes
+- POST /api/todos/{id}/complete -> approve or reject one of the caller's tasks
+
+The server keeps an in-memory user store for demo purposes (PBKDF2 password
+hashes, checked on a process pool by ``src.services.credentials.VERIFIER``), a TTL-bound session
+store (memory or SQLite, see ``src.web.sessions``) and reuses the existing thread pool helper for concurrency. Requests are served
+by a bounded thread-per-request server (``config.settings.MAX_WORKERS``) so one
+slow `/api/run` call no longer blocks logins and page loads for everyone else.
+API routes run through the middleware chain compiled once from
+``config.middleware.ENABLED`` (``src.middleware.pipeline``): logging, session
+auth with the route's admin/module checks, and per-user rate limiting (429 when
+over the limit). Each API request leaves a JSON line in ``logs/access.jsonl``;
+logins, logouts and user changes are appended to the hash-chained audit store
+(``src.dao.log_dao.AuditStore``).
 """
 import json
-import mimetypes
-import secrets
+import os
+import threading
+import time
 import uuid
 from http import HTTPStatus
 from http.cookies import SimpleCookie
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from itertools import count
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Tuple
-
-from src.common.runtime import run_concurrent
+from urllib.parse import parse_qsl
+
+from config.middleware import ENABLED as MIDDLEWARE, TIMING as MIDDLEWARE_TIMING
+from config.settings import (
+    FEED_CAPACITY,
+    FEED_SPILL_DIR,
+    MAX_WORKERS,
+    TASK_TIMEOUT,
+    TODO_STREAM_LIMIT,
+    TODO_STREAM_WINDOW,
+)
+from src.common.exceptions import TaskTimeoutError, ValidationError
+from src.common.ring_store import RingStore
+from src.common.runtime import executor_metrics, iter_completed, run_concurrent, shutdown_executor
+from src.dao.log_dao import get_audit_store
+from src.events import listeners
+from src.events.event_bus import BUS, emit
+from src.middleware.logging_middleware import ACCESS_LOG
+from src.middleware.pipeline import StageTimings, compile_pipeline
+from src.middleware.rate_limit_middleware import LIMITS
+from src.web.response_cache import CachedResponse, ResponseCache
+from src.web.router import Router
+from src.web.sessions import build_session_store
+from src.web.static_assets import StaticAssetCache
 from src.services.asset import AssetService
+from src.services.authz import AuthzCache, Grants
+from src.services.credentials import VERIFIER, CredentialsBusy, hash_password
 from src.services.crm import CRMService, TicketService
 from src.services.bi import BIService
 from src.services.developer import DeveloperService
@@ -41,6 +81,9 @@ from src.services.portal import PortalService
 from src.services.project import ProjectService
 from src.services.security import SecurityService
 from src.services.supply_chain import SupplyChainService
+from src.workflow.engine import STATUS_NAMES, get_engine
+from src.workflow.process_builder import REGISTRY
+from src.workflow.task_inbox import OPEN, STATUSES
 
 UI_DIR = Path(__file__).resolve().parent / "static"
 
@@ -142,7 +185,6 @@ MODULE_META: Dict[str, Dict[str, object]] = {
         "label": {"zh": "门户与移动", "en": "Portal & Mobile"},
         "description": {"zh": "移动门户与审批", "en": "Mobile portal and approvals"},
         "tasks": [
-            {"id": "mobile:approve", "label": {"zh": "移动审批", "en": "Mobile approval"}},
             {"id": "portal:todo", "label": {"zh": "门户待办", "en": "Portal todos"}},
         ],
     },
@@ -268,7 +310,8 @@ FEATURE_MAP: List[Dict[str, object]] = [
 ]
 
 DEFAULT_ADMIN = {
-    "password": "admin",
+    "id": 1,
+    "password": hash_password("admin"),
     "modules": [k for k in MODULE_META.keys() if k != "dashboard"],
     "department": "HQ",
     "role": "admin",
@@ -276,14 +319,67 @@ DEFAULT_ADMIN = {
 
 
 USER_DB: Dict[str, Dict[str, object]] = {"admin": DEFAULT_ADMIN.copy()}
-SESSIONS: Dict[str, str] = {}
-DOCUMENT_STORE: List[Dict[str, object]] = []
-CHAT_LOG: List[Dict[str, object]] = []
-APPROVALS: List[Dict[str, object]] = []
-EXPENSES: List[Dict[str, object]] = []
+USER_IDS = count(2)  # numeric ids, the key role assignments use (see src.services.authz)
+SESSIONS = build_session_store()
+AUTHZ = AuthzCache(MODULE_META)
+RESPONSE_CACHE = ResponseCache()
+
+
+def _feed_store(name: str) -> RingStore:
+    spill_path = os.path.join(FEED_SPILL_DIR, f"{name}.jsonl") if FEED_SPILL_DIR else None
+    return RingStore(FEED_CAPACITY, spill_path=spill_path)
+
+
+DOCUMENT_STORE = _feed_store("documents")
+CHAT_LOG = _feed_store("chat")
+APPROVALS = _feed_store("approvals")
+EXPENSES = _feed_store("expenses")
+listeners.attach(BUS)
+
+# Every OA submission runs through this process; its review task lands in the approver's inbox.
+OA_APPROVAL_PROCESS = {
+    "key": "oa.generic",
+    "name": "OA approval",
+    "version": 1,
+    "nodes": [
+        {"id": "submit", "type": "start"},
+        {"id": "manager_review", "type": "user_task", "name": "Manager review", "assignee": "$approver"},
+        {"id": "decision", "type": "exclusive"},
+        {"id": "approved", "type": "end", "status": "approved"},
+        {"id": "rejected", "type": "end", "status": "rejected"},
+    ],
+    "edges": [
+        {"from": "submit", "to": "manager_review"},
+        {"from": "manager_review", "to": "decision"},
+        {"from": "decision", "to": "approved", "condition": "approved"},
+        {"from": "decision", "to": "rejected"},
+    ],
+}
+REGISTRY.deploy(OA_APPROVAL_PROCESS)
+TODO_STREAMS = threading.BoundedSemaphore(TODO_STREAM_LIMIT)
+MIDDLEWARE_TIMINGS = StageTimings(MIDDLEWARE) if MIDDLEWARE_TIMING else None
+
+ROUTES = Router()
+ROUTES.add_static_dir(UI_DIR, public_pages=["login.html"])
+STATIC_ASSETS = StaticAssetCache(UI_DIR)
+STATIC_ASSETS.preload()
+
+
+def update_module_meta(key: str, meta: Dict[str, object]) -> None:
+    """Add or replace a module's metadata and drop every cache derived from it."""
+    MODULE_META[key] = meta
+    AUTHZ.add_module(key)
+    RESPONSE_CACHE.clear()
+
+
+def update_feature_map(areas: List[Dict[str, object]]) -> None:
+    FEATURE_MAP[:] = areas
+    RESPONSE_CACHE.clear()
 
 
 class DemoHandler(BaseHTTPRequestHandler):
+    """Request handler; endpoints register themselves on ``ROUTES`` below."""
+
     services = {
         "iam": IAMService(),
         "integration": IntegrationService(),
@@ -308,35 +404,39 @@ class DemoHandler(BaseHTTPRequestHandler):
         "asset": AssetService(),
     }
 
-    task_registry: Dict[str, Tuple[str, Callable[[], object]]] = {
-        "iam:create_user": ("iam", lambda: DemoHandler.services["iam"].create_user({"username": "web"})),
-        "iam:sync_ldap": ("iam", lambda: DemoHandler.services["iam"].sync_ldap()),
-        "security:waf": ("iam", lambda: DemoHandler.services["security"].waf_filter({"path": "/"})),
-        "integration:kafka": ("integration", lambda: DemoHandler.services["integration"].kafka_enqueue("events", {"source": "ui"})),
-        "document:edit": ("office", lambda: DemoHandler.services["document"].edit(1, "draft")),
-        "communication:chat": ("office", lambda: DemoHandler.services["communication"].chat("general", "hello")),
-        "calendar:remind": ("office", lambda: DemoHandler.services["calendar"].remind(101)),
-        "oa:approval": ("oa", lambda: DemoHandler.services["oa"].generic_approval({"type": "leave"})),
-        "hrm:payroll": ("hrm", lambda: DemoHandler.services["hrm"].payroll_run("2025-12")),
-        "finance:expense": ("finance", lambda: DemoHandler.services["finance"].expense_claim({"employee_id": 1, "total": 99.9})),
-        "supply:po": ("supply", lambda: DemoHandler.services["supply"].purchase_order({"vendor": "ACME"})),
-        "project:gantt": ("project", lambda: DemoHandler.services["project"].gantt(5)),
-        "crm:pipeline": ("crm", lambda: DemoHandler.services["crm"].pipeline("proposal")),
-        "ticket:create": ("crm", lambda: DemoHandler.services["ticket"].ticket({"title": "VPN"})),
-        "knowledge:search": ("knowledge", lambda: DemoHandler.services["knowledge"].search("SSO")),
-        "learning:exam": ("knowledge", lambda: DemoHandler.services["learning"].exam({"course_id": 7})),
-        "mobile:approve": ("mobile", lambda: DemoHandler.services["mobile"].approve(12)),
-        "portal:todo": ("mobile", lambda: DemoHandler.services["portal"].todo_center(1)),
-        "itsm:monitor": ("itsm", lambda: DemoHandler.services["itsm"].monitor({"cpu": 70})),
-        "bi:dashboard": ("itsm", lambda: DemoHandler.services["bi"].dashboard({"scope": "company"})),
-        "developer:form": ("developer", lambda: DemoHandler.services["developer"].form_designer({"fields": []})),
-        "asset:audit": ("asset", lambda: DemoHandler.services["asset"].audit(2)),
+    task_registry: Dict[str, Tuple[str, Callable[[str], object]]] = {
+        # Each task is called with the requesting username.
+        "iam:create_user": ("iam", lambda user: DemoHandler.services["iam"].create_user({"username": "web"})),
+        "iam:sync_ldap": ("iam", lambda user: DemoHandler.services["iam"].sync_ldap()),
+        "security:waf": ("iam", lambda user: DemoHandler.services["security"].waf_filter({"path": "/"})),
+        "integration:kafka": ("integration", lambda user: DemoHandler.services["integration"].kafka_enqueue("events", {"source": "ui"})),
+        "document:edit": ("office", lambda user: DemoHandler.services["document"].edit(1, "draft")),
+        "communication:chat": ("office", lambda user: DemoHandler.services["communication"].chat("general", "hello")),
+        "calendar:remind": ("office", lambda user: DemoHandler.services["calendar"].remind(101)),
+        "oa:approval": ("oa", lambda user: DemoHandler.services["oa"].generic_approval({"type": "leave"})),
+        "hrm:payroll": ("hrm", lambda user: DemoHandler.services["hrm"].payroll_run("2025-12")),
+        "finance:expense": ("finance", lambda user: DemoHandler.services["finance"].expense_claim({"employee_id": 1, "total": 99.9})),
+        "supply:po": ("supply", lambda user: DemoHandler.services["supply"].purchase_order({"vendor": "ACME"})),
+        "project:gantt": ("project", lambda user: DemoHandler.services["project"].gantt(5)),
+        "crm:pipeline": ("crm", lambda user: DemoHandler.services["crm"].pipeline("proposal")),
+        "ticket:create": ("crm", lambda user: DemoHandler.services["ticket"].ticket({"title": "VPN"})),
+        "knowledge:search": ("knowledge", lambda user: DemoHandler.services["knowledge"].search("SSO")),
+        "learning:exam": ("knowledge", lambda user: DemoHandler.services["learning"].exam({"course_id": 7})),
+        "portal:todo": ("mobile", lambda user: DemoHandler.services["portal"].todo_center(user)),
+        "itsm:monitor": ("itsm", lambda user: DemoHandler.services["itsm"].monitor({"cpu": 70})),
+        "bi:dashboard": ("itsm", lambda user: DemoHandler.services["bi"].dashboard({"scope": "company"})),
+        "developer:form": ("developer", lambda user: DemoHandler.services["developer"].form_designer({"fields": []})),
+        "asset:audit": ("asset", lambda user: DemoHandler.services["asset"].audit(2)),
     }
 
     def log_message(self, fmt, *args):
-        # Keep console noise minimal during tests/dev
+        # Keep console noise minimal during tests/dev; API requests go to the access log instead.
         return
 
+    def log_request(self, code="-", size="-"):
+        # ``send_response`` reports every status here; keep it for the access log record.
+        self.status = int(code) if isinstance(code, int) else code
+
     # --- session helpers -------------------------------------------------
     def _parse_cookies(self) -> Dict[str, str]:
         raw = self.headers.get("Cookie")
@@ -346,7 +446,7 @@ class DemoHandler(BaseHTTPRequestHandler):
         cookie.load(raw)
         return {k: v.value for k, v in cookie.items()}
 
-    def _current_user(self) -> Optional[Tuple[str, Dict[str, object]]]:
+    def current_user(self) -> Optional[Tuple[str, Dict[str, object]]]:
         cookies = self._parse_cookies()
         token = cookies.get("session")
         if not token:
@@ -359,39 +459,110 @@ class DemoHandler(BaseHTTPRequestHandler):
             return None
         return username, user
 
-    def _require_auth(self) -> Optional[Tuple[str, Dict[str, object]]]:
-        user = self._current_user()
-        if not user:
-            self._send_json({"error": "unauthorized"}, HTTPStatus.UNAUTHORIZED)
-        return user
+    def _grants(self) -> Grants:
+        username, user = self.auth
+        return AUTHZ.grants(username, user)
 
-    def _require_module(self, user: Dict[str, object], module: str) -> bool:
-        if module not in user.get("modules", []):
-            self._send_json({"error": "forbidden", "module": module}, HTTPStatus.FORBIDDEN)
-            return False
-        return True
+    def module_allowed(self, module: str) -> bool:
+        return bool(self._grants().mask & AUTHZ.bit(module))
 
     # --- response helpers -----------------------------------------------
-    def _send_json(self, payload: Dict, status: HTTPStatus = HTTPStatus.OK):
+    def _send_json(self, payload: Dict, status: HTTPStatus = HTTPStatus.OK, headers: Optional[Dict[str, str]] = None):
         body = json.dumps(payload).encode()
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(body)
 
+    def respond(self, status: HTTPStatus, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        """Short-circuit response used by the middleware pipeline."""
+        self._send_json(payload, status, headers)
+
+    def _send_cached(self, entry: CachedResponse):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", entry.etag)
+            self.send_header("Cache-Control", "private, no-cache")
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", entry.content_type)
+        self.send_header("Content-Length", str(len(entry.body)))
+        self.send_header("ETag", entry.etag)
+        self.send_header("Cache-Control", "private, no-cache")
+        self.end_headers()
+        self.wfile.write(entry.body)
+
     def _serve_file(self, path: Path):
-        if not path.exists() or not path.is_file():
+        asset = STATIC_ASSETS.get(path)
+        if asset is None:
             self.send_error(HTTPStatus.NOT_FOUND)
             return
-        content = path.read_bytes()
-        mime, _ = mimetypes.guess_type(str(path))
-        content_type = mime or "application/octet-stream"
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and (
+            if_none_match.strip() == "*" or asset.etag in (tag.strip() for tag in if_none_match.split(","))
+        ):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", asset.etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+        encoding, body = asset.variant(self.headers.get("Accept-Encoding", ""))
         self.send_response(HTTPStatus.OK)
-        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
-        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body) if body is not None else asset.size))
+        self.send_header("ETag", asset.etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
         self.end_headers()
-        self.wfile.write(content)
+        if body is not None:
+            self.wfile.write(body)
+            return
+        with open(asset.path, "rb") as fh:
+            self.connection.sendfile(fh)
+
+    def _stream_results(self, username: str, requested: List[str]):
+        """Write one NDJSON line per task as soon as it completes.
+
+        The body is delimited by closing the connection, so it works for the
+        HTTP/1.0 responses this handler emits without chunked encoding.
+        """
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def write(line: Dict[str, object]):
+            self.wfile.write(json.dumps(line).encode() + b"\n")
+            self.wfile.flush()
+
+        completed = iter_completed(self._task_calls(requested, username), timeout=TASK_TIMEOUT)
+        try:
+            pending: List[str] = []
+            try:
+                for idx, future in completed:
+                    line: Dict[str, object] = {"index": idx, "task": requested[idx]}
+                    error = future.exception()
+                    if error is None:
+                        line["result"] = future.result()
+                    else:
+                        line["error"] = str(error) or type(error).__name__
+                    write(line)
+            except TaskTimeoutError as exc:
+                pending = [requested[idx] for idx in exc.pending]
+            write({"done": True, "user": username, "pending": pending})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            completed.close()
 
     def _redirect(self, location: str):
         self.send_response(HTTPStatus.FOUND)
@@ -400,273 +571,451 @@ class DemoHandler(BaseHTTPRequestHandler):
 
     # --- routing ---------------------------------------------------------
     def do_GET(self):  # noqa: N802
-        if self.path == "/":
-            user = self._current_user()
-            target = "/dashboard.html" if user else "/login.html"
-            self._redirect(target)
-            return
-
-        if self.path.startswith("/static/"):
-            self._serve_file(UI_DIR / self.path.replace("/static/", ""))
-            return
-
-        if self.path.endswith(".html"):
-            if self.path == "/login.html":
-                self._serve_file(UI_DIR / "login.html")
-                return
-            user = self._current_user()
-            if not user:
+        path, _, query = self.path.partition("?")
+        self.query = dict(parse_qsl(query))
+        static = ROUTES.static.get(path)
+        if static is not None:
+            if static.login_required and not self.current_user():
                 self._redirect("/login.html")
                 return
-            self._serve_file(UI_DIR / self.path.strip("/"))
+            self._serve_file(static.path)
             return
+        self.data = {}
+        self._dispatch("GET", path)
 
-        if self.path == "/api/me":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            self._send_json(
-                {
-                    "username": username,
-                    "modules": user.get("modules", []),
-                    "department": user.get("department"),
-                    "role": user.get("role"),
-                }
-            )
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        try:
+            self.data = json.loads(raw.decode() or "{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, HTTPStatus.BAD_REQUEST)
             return
+        self._dispatch("POST", self.path.split("?", 1)[0])
 
-        if self.path == "/api/modules":
-            auth = self._require_auth()
-            if not auth:
+    def _dispatch(self, method: str, path: str):
+        match = ROUTES.resolve(method, path)
+        if match is None:
+            if method == "GET" and path.endswith(".html") and not self.current_user():
+                self._redirect("/login.html")
                 return
-            _, user = auth
-            allowed = [m for m in user.get("modules", []) if m in MODULE_META]
-            payload = [MODULE_META[m] | {"key": m} for m in allowed]
-            self._send_json({"modules": payload, "all": payload})
+            self.send_error(HTTPStatus.NOT_FOUND)
             return
+        route, self.params = match
+        self.auth = None
+        PIPELINE(self, route)
+
+    # --- GET endpoints ----------------------------------------------------
+    @ROUTES.get("/")
+    def _index(self):
+        user = self.current_user()
+        target = "/dashboard.html" if user else "/login.html"
+        self._redirect(target)
+
+    @ROUTES.get("/api/me", auth=True)
+    def _me(self):
+        username, user = self.auth
+        self._send_json(
+            {
+                "username": username,
+                "modules": list(self._grants().modules),
+                "department": user.get("department"),
+                "role": user.get("role"),
+            }
+        )
 
-        if self.path == "/api/features":
-            auth = self._require_auth()
-            if not auth:
-                return
-            self._send_json({"areas": FEATURE_MAP})
-            return
+    @ROUTES.get("/api/modules", auth=True)
+    def _modules(self):
+        grants = self._grants()
 
-        if self.path == "/api/office/feed":
-            auth = self._require_auth()
-            if not auth:
-                return
-            _, user = auth
-            if not self._require_module(user, "office"):
-                return
-            self._send_json(
-                {
-                    "documents": DOCUMENT_STORE[-5:],
-                    "messages": CHAT_LOG[-5:],
-                }
-            )
-            return
+        def build():
+            payload = [MODULE_META[m] | {"key": m} for m in grants.modules]
+            return {"modules": payload, "all": payload}
 
-        if self.path == "/api/oa/approvals":
-            auth = self._require_auth()
-            if not auth:
-                return
-            _, user = auth
-            if not self._require_module(user, "oa"):
-                return
-            self._send_json({"items": APPROVALS[-10:]})
-            return
+        # Keyed by the module bitmask, so a permission change maps to a new entry.
+        self._send_cached(RESPONSE_CACHE.get_or_build(("modules", grants.mask), build))
 
-        if self.path == "/api/finance/expenses":
-            auth = self._require_auth()
-            if not auth:
-                return
-            _, user = auth
-            if not self._require_module(user, "finance"):
-                return
-            self._send_json({"items": EXPENSES[-10:]})
-            return
+    @ROUTES.get("/api/features", auth=True)
+    def _features(self):
+        self._send_cached(RESPONSE_CACHE.get_or_build(("features",), lambda: {"areas": FEATURE_MAP}))
 
-        self.send_error(HTTPStatus.NOT_FOUND)
+    @ROUTES.get("/api/office/feed", module="office")
+    def _office_feed(self):
+        self._send_json(
+            {
+                "documents": DOCUMENT_STORE.tail(5),
+                "messages": CHAT_LOG.tail(5),
+            }
+        )
+
+    @ROUTES.get("/api/oa/approvals", module="oa")
+    def _oa_approvals(self):
+        self._send_json({"items": APPROVALS.tail(10)})
+
+    @ROUTES.get("/api/finance/expenses", module="finance")
+    def _finance_expenses(self):
+        self._send_json({"items": EXPENSES.tail(10)})
+
+    @ROUTES.get("/api/runtime", admin=True)
+    def _runtime(self):
+        self._send_json(
+            {
+                "executor": executor_metrics(),
+                "events": BUS.metrics(),
+                "rate_limits": LIMITS.metrics(),
+                "middleware": MIDDLEWARE_TIMINGS.metrics() if MIDDLEWARE_TIMINGS else {},
+                "logs": {"access": ACCESS_LOG.metrics(), "audit": get_audit_store().metrics()},
+                "credentials": VERIFIER.metrics(),
+            }
+        )
 
-    def do_POST(self):  # noqa: N802
-        length = int(self.headers.get("Content-Length", 0))
-        raw = self.rfile.read(length)
+    @ROUTES.get("/api/todos", auth=True)
+    def _todos(self):
+        status = self.query.get("status", OPEN)
+        if status not in STATUSES:
+            self._send_json({"error": f"Unknown status: {status}"}, HTTPStatus.BAD_REQUEST)
+            return
         try:
-            data = json.loads(raw.decode() or "{}")
-        except json.JSONDecodeError:
-            self._send_json({"error": "invalid JSON"}, HTTPStatus.BAD_REQUEST)
+            limit = min(100, max(1, int(self.query.get("limit", 20))))
+            page = self.services["portal"].todo_center(self.auth[0], status, self.query.get("cursor"), limit)
+        except ValueError:
+            self._send_json({"error": "invalid cursor or limit"}, HTTPStatus.BAD_REQUEST)
             return
-
-        if self.path == "/api/login":
-            username = data.get("username", "")
-            password = data.get("password", "")
-            user = USER_DB.get(username)
-            if not user or user.get("password") != password:
-                self._send_json({"error": "invalid credentials"}, HTTPStatus.UNAUTHORIZED)
-                return
-            token = secrets.token_hex(16)
-            SESSIONS[token] = username
+        self._send_json({"items": page["items"], "total": page["total"], "next_cursor": page["next_cursor"]})
+
+    @ROUTES.get("/api/todos/stream", auth=True)
+    def _todos_stream(self):
+        """Push the caller's task changes as server-sent events for one ``TODO_STREAM_WINDOW``.
+
+        The stream then closes and ``EventSource`` reconnects, so a handler
+        slot is never pinned for long; at most ``TODO_STREAM_LIMIT`` streams
+        are open at once so regular requests always find a free worker.
+        """
+        if not TODO_STREAMS.acquire(blocking=False):
+            self._send_json({"error": "too many open streams"}, HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        username = self.auth[0]
+        inbox = get_engine().inbox
+        subscription = inbox.subscribe(username)
+        try:
             self.send_response(HTTPStatus.OK)
-            body = json.dumps({"ok": True, "modules": user["modules"]}).encode()
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Content-Length", str(len(body)))
-            self.send_header("Set-Cookie", f"session={token}; HttpOnly; Path=/")
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
             self.end_headers()
-            self.wfile.write(body)
+            self.close_connection = True
+
+            def write(chunk: str):
+                self.wfile.write(chunk.encode())
+                self.wfile.flush()
+
+            write(f"retry: 2000\nevent: hello\ndata: {json.dumps({'open': inbox.count(username)})}\n\n")
+            deadline = time.monotonic() + TODO_STREAM_WINDOW
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                notice = subscription.get(timeout=min(15.0, remaining))
+                if notice is None:
+                    write(": keepalive\n\n")
+                    continue
+                write(f"event: {notice['type']}\ndata: {json.dumps(notice['task'], default=str)}\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            inbox.unsubscribe(subscription)
+            TODO_STREAMS.release()
+
+    # --- POST endpoints ---------------------------------------------------
+    @ROUTES.post("/api/login")
+    def _login(self):
+        data = self.data
+        username = data.get("username", "")
+        password = data.get("password", "")
+        user = USER_DB.get(username)
+        try:
+            ok, upgraded = VERIFIER.check(password, user.get("password") if user else None)
+        except CredentialsBusy:
+            self.respond(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many logins in progress"}, {"Retry-After": "1"})
             return
-
-        if self.path == "/api/logout":
-            cookies = self._parse_cookies()
-            token = cookies.get("session")
-            if token and token in SESSIONS:
-                SESSIONS.pop(token)
-            self._send_json({"ok": True})
+        if not ok:
+            self.services["iam"].log_operation(username or "anonymous", "login.failed", client=self.client_address[0])
+            self._send_json({"error": "invalid credentials"}, HTTPStatus.UNAUTHORIZED)
             return
+        if upgraded:
+            user["password"] = upgraded
+        self.services["iam"].log_login(username, client=self.client_address[0])
+        token = SESSIONS.create(username)
+        grants = AUTHZ.grants(username, user)
+        self.send_response(HTTPStatus.OK)
+        body = json.dumps({"ok": True, "modules": list(grants.modules)}).encode()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", f"session={token}; HttpOnly; Path=/; Max-Age={int(SESSIONS.ttl)}")
+        self.end_headers()
+        self.wfile.write(body)
 
-        if self.path == "/api/users":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            if user.get("role") != "admin":
-                self._send_json({"error": "forbidden"}, HTTPStatus.FORBIDDEN)
-                return
-            new_username = data.get("username") or f"user-{uuid.uuid4().hex[:6]}"
-            password = data.get("password") or "changeme"
-            modules = [m for m in data.get("modules", []) if m in MODULE_META and m != "dashboard"]
-            department = data.get("department", "General")
-            USER_DB[new_username] = {
-                "password": password,
-                "modules": modules or ["office"],
-                "department": department,
-                "role": data.get("role", "user"),
-            }
-            self._send_json({"ok": True, "created": new_username})
+    @ROUTES.post("/api/logout")
+    def _logout(self):
+        cookies = self._parse_cookies()
+        token = cookies.get("session")
+        username = SESSIONS.pop(token) if token else None
+        if username is not None:
+            self.services["iam"].log_operation(username, "logout", client=self.client_address[0])
+        self._send_json({"ok": True})
+
+    @ROUTES.post("/api/users", admin=True)
+    def _create_user(self):
+        data = self.data
+        new_username = data.get("username") or f"user-{uuid.uuid4().hex[:6]}"
+        try:
+            password = VERIFIER.hash(data.get("password") or "changeme")
+        except CredentialsBusy:
+            self.respond(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "credential service busy"}, {"Retry-After": "1"})
             return
+        modules = [m for m in data.get("modules", []) if m in MODULE_META and m != "dashboard"]
+        department = data.get("department", "General")
+        existing = USER_DB.get(new_username)
+        USER_DB[new_username] = {
+            "id": existing["id"] if existing else next(USER_IDS),
+            "password": password,
+            "modules": modules or ["office"],
+            "department": department,
+            "role": data.get("role", "user"),
+        }
+        AUTHZ.invalidate(new_username)
+        self.services["iam"].audit_permission_change(
+            {
+                "actor": self.auth[0],
+                "username": new_username,
+                "modules": USER_DB[new_username]["modules"],
+                "role": USER_DB[new_username]["role"],
+            }
+        )
+        emit("user.created", {"username": new_username, "modules": USER_DB[new_username]["modules"], "by": self.auth[0]})
+        self._send_json({"ok": True, "created": new_username})
+
+    def _authorized_tasks(self) -> Optional[List[str]]:
+        """Validate the requested task ids against the registry and user modules."""
+        requested: List[str] = self.data.get("tasks") or []
+        unknown = [t for t in requested if t not in self.task_registry]
+        if unknown:
+            self._send_json({"error": f"Unknown tasks: {', '.join(unknown)}"}, HTTPStatus.BAD_REQUEST)
+            return None
 
-        if self.path == "/api/run":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            requested: List[str] = data.get("tasks") or []
-            unknown = [t for t in requested if t not in self.task_registry]
-            if unknown:
-                self._send_json({"error": f"Unknown tasks: {', '.join(unknown)}"}, HTTPStatus.BAD_REQUEST)
-                return
+        # permission guard: one mask test, the per-task scan only runs to build the error
+        granted = self._grants().mask
+        required = AUTHZ.mask_of(self.task_registry[t][0] for t in requested)
+        if required & ~granted:
+            forbidden = [t for t in requested if not granted & AUTHZ.bit(self.task_registry[t][0])]
+            self._send_json({"error": f"No permission for tasks: {', '.join(forbidden)}"}, HTTPStatus.FORBIDDEN)
+            return None
+        return requested
 
-            # permission guard
-            forbidden = [t for t in requested if self.task_registry[t][0] not in user["modules"]]
-            if forbidden:
-                self._send_json({"error": f"No permission for tasks: {', '.join(forbidden)}"}, HTTPStatus.FORBIDDEN)
-                return
+    def _task_calls(self, requested: List[str], username: str) -> List[Callable[[], object]]:
+        return [lambda call=self.task_registry[t][1]: call(username) for t in requested]
 
-            tasks = [self.task_registry[t][1] for t in requested]
-            results = run_concurrent(tasks)
-            ordered = {task: results[idx] for idx, task in enumerate(requested)}
-            self._send_json({"results": ordered, "user": username})
+    @ROUTES.post("/api/run", auth=True)
+    def _run(self):
+        requested = self._authorized_tasks()
+        if requested is None:
             return
-
-        if self.path == "/api/office/document":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            if not self._require_module(user, "office"):
-                return
-            title = data.get("title") or "未命名文档"
-            content = data.get("content") or ""
-            collaborators = data.get("collaborators") or []
-            doc_id = len(DOCUMENT_STORE) + 1
-            version = 1
-            record = {
-                "id": doc_id,
-                "title": title,
-                "content": content,
-                "version": version,
-                "collaborators": collaborators,
-                "updated_by": username,
-            }
-            DOCUMENT_STORE.append(record)
-            payload = self.services["document"].edit(doc_id, content) | {"title": title, "version": version}
-            payload["collaborators"] = collaborators
-            self._send_json({"document": payload})
+        username = self.auth[0]
+        tasks = self._task_calls(requested, username)
+        try:
+            results = run_concurrent(tasks, timeout=TASK_TIMEOUT)
+        except TaskTimeoutError as exc:
+            partial = {task: exc.results[idx] for idx, task in enumerate(requested) if idx in exc.results}
+            pending = [requested[idx] for idx in exc.pending]
+            self._send_json(
+                {"error": str(exc), "results": partial, "pending": pending, "user": username},
+                HTTPStatus.GATEWAY_TIMEOUT,
+            )
             return
+        ordered = {task: results[idx] for idx, task in enumerate(requested)}
+        self._send_json({"results": ordered, "user": username})
 
-        if self.path == "/api/office/chat":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            if not self._require_module(user, "office"):
-                return
-            channel = data.get("channel") or "general"
-            message = data.get("message") or ""
-            entry = {
-                "channel": channel,
-                "message": message,
-                "from": username,
-            }
-            CHAT_LOG.append(entry)
-            payload = self.services["communication"].chat(channel, message) | {"from": username}
-            self._send_json({"message": payload})
+    @ROUTES.post("/api/run/stream", auth=True)
+    def _run_stream(self):
+        requested = self._authorized_tasks()
+        if requested is None:
             return
+        self._stream_results(self.auth[0], requested)
 
-        if self.path == "/api/oa/approval":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            if not self._require_module(user, "oa"):
-                return
-            form = data.get("form") or {}
-            approval_id = len(APPROVALS) + 1
-            record = {
-                "id": approval_id,
-                "form": form,
-                "status": "submitted",
-                "submitted_by": username,
-                "next_step": "manager_review",
-            }
-            APPROVALS.append(record)
-            payload = self.services["oa"].generic_approval(form) | {"id": approval_id, "status": "submitted"}
-            self._send_json({"approval": payload})
+    @ROUTES.post("/api/todos/{task_id}/complete", auth=True)
+    def _complete_todo(self):
+        try:
+            task_id = int(self.params["task_id"])
+        except ValueError:
+            self._send_json({"error": "invalid task id"}, HTTPStatus.BAD_REQUEST)
             return
-
-        if self.path == "/api/finance/expense":
-            auth = self._require_auth()
-            if not auth:
-                return
-            username, user = auth
-            if not self._require_module(user, "finance"):
-                return
-            expense = data.get("expense") or {}
-            expense_id = len(EXPENSES) + 1
-            record = {
-                "id": expense_id,
-                "expense": expense,
-                "status": "pending_approval",
-                "submitted_by": username,
-                "next_approver": "财务主管",
-            }
-            EXPENSES.append(record)
-            payload = self.services["finance"].expense_claim(expense) | {
-                "id": expense_id,
-                "status": record["status"],
-                "next_approver": record["next_approver"],
-            }
-            self._send_json({"expense": payload})
+        decision = self.data.get("action", "approve")
+        if decision not in ("approve", "reject"):
+            self._send_json({"error": f"Unknown action: {decision}"}, HTTPStatus.BAD_REQUEST)
             return
+        engine = get_engine()
+        item = engine.inbox.get(task_id)
+        if item is None or item["assignee"] != self.auth[0]:
+            self._send_json({"error": "task not found"}, HTTPStatus.NOT_FOUND)
+            return
+        try:
+            instance = engine.complete(task_id, decision, comment=self.data.get("comment"))
+        except ValidationError as exc:
+            self._send_json({"error": str(exc)}, HTTPStatus.CONFLICT)
+            return
+        self._send_json({"task_id": task_id, "instance_id": instance.id, "status": STATUS_NAMES[instance.status]})
+
+    @ROUTES.post("/api/office/document", module="office")
+    def _office_document(self):
+        username = self.auth[0]
+        data = self.data
+        title = data.get("title") or "未命名文档"
+        content = data.get("content") or ""
+        collaborators = data.get("collaborators") or []
+        doc_id = DOCUMENT_STORE.next_id()
+        version = 1
+        record = {
+            "id": doc_id,
+            "title": title,
+            "content": content,
+            "version": version,
+            "collaborators": collaborators,
+            "updated_by": username,
+        }
+        DOCUMENT_STORE.append(record)
+        payload = self.services["document"].edit(doc_id, content) | {"title": title, "version": version}
+        payload["collaborators"] = collaborators
+        self._send_json({"document": payload})
+
+    @ROUTES.post("/api/office/chat", module="office")
+    def _office_chat(self):
+        username = self.auth[0]
+        data = self.data
+        channel = data.get("channel") or "general"
+        message = data.get("message") or ""
+        entry = {
+            "channel": channel,
+            "message": message,
+            "from": username,
+        }
+        CHAT_LOG.append(entry)
+        payload = self.services["communication"].chat(channel, message) | {"from": username}
+        self._send_json({"message": payload})
+
+    @ROUTES.post("/api/oa/approval", module="oa")
+    def _oa_approval(self):
+        username = self.auth[0]
+        form = self.data.get("form") or {}
+        approver = self.data.get("approver")
+        if approver not in USER_DB:
+            approver = "admin"
+        approval_id = APPROVALS.next_id()
+        instance = get_engine().start(
+            OA_APPROVAL_PROCESS["key"],
+            {"approval_id": approval_id, "form": form, "submitted_by": username, "approver": approver},
+        )
+        record = {
+            "id": approval_id,
+            "form": form,
+            "status": "submitted",
+            "submitted_by": username,
+            "next_step": "manager_review",
+            "approver": approver,
+            "instance_id": instance.id,
+        }
+        APPROVALS.append(record)
+        emit("process.approval.submitted", record)
+        payload = self.services["oa"].generic_approval(form) | {
+            "id": approval_id,
+            "status": "submitted",
+            "instance_id": instance.id,
+        }
+        self._send_json({"approval": payload})
+
+    @ROUTES.post("/api/finance/expense", module="finance")
+    def _finance_expense(self):
+        username = self.auth[0]
+        expense = self.data.get("expense") or {}
+        expense_id = EXPENSES.next_id()
+        record = {
+            "id": expense_id,
+            "expense": expense,
+            "status": "pending_approval",
+            "submitted_by": username,
+            "next_approver": "财务主管",
+        }
+        EXPENSES.append(record)
+        emit("finance.expense.submitted", record)
+        payload = self.services["finance"].expense_claim(expense) | {
+            "id": expense_id,
+            "status": record["status"],
+            "next_approver": record["next_approver"],
+        }
+        self._send_json({"expense": payload})
+
+
+# Compiled once every endpoint is registered, so a config without auth fails here.
+PIPELINE = compile_pipeline(MIDDLEWARE, hook=MIDDLEWARE_TIMINGS, routes=ROUTES.routes())
+
+
+class BoundedThreadingHTTPServer(ThreadingHTTPServer):
+    """Thread-per-request server that caps the number of in-flight handlers.
+
+    The accept loop blocks once ``max_workers`` requests are being handled, so
+    extra clients wait in the (enlarged) listen backlog instead of spawning an
+    unbounded number of threads.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, server_address, handler_class, max_workers: int = MAX_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._slots.release()
+            raise
 
-        self.send_error(HTTPStatus.NOT_FOUND)
-
-
-def run_server(host: str = "0.0.0.0", port: int = 8000):
-    server = HTTPServer((host, port), DemoHandler)
-    print(f"Serving demo UI on http://{host}:{port}")
-    server.serve_forever()
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+def make_server(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    threaded: bool = True,
+    max_workers: int = MAX_WORKERS,
+) -> HTTPServer:
+    """Build (but do not start) the demo server; ``port=0`` picks a free port."""
+    if threaded:
+        return BoundedThreadingHTTPServer((host, port), DemoHandler, max_workers=max_workers)
+    return HTTPServer((host, port), DemoHandler)
+
+
+def run_server(host: str = "0.0.0.0", port: int = 8000, threaded: bool = True, max_workers: int = MAX_WORKERS):
+    server = make_server(host, port, threaded=threaded, max_workers=max_workers)
+    mode = f"threaded, {max_workers} workers" if threaded else "single-threaded"
+    print(f"Serving demo UI on http://{host}:{port} ({mode})")
+    SESSIONS.start_sweeper()
+    VERIFIER.start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        SESSIONS.stop_sweeper()
+        BUS.stop()
+        ACCESS_LOG.close()
+        VERIFIER.close()
+        shutdown_executor()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+"""Session store with TTL expiry and pluggable backends.
+
+``SessionStore`` maps opaque tokens to usernames. Sessions expire after
+``config.security.API_TOKEN_TTL`` seconds of inactivity: expired entries are
+dropped lazily when looked up and in bulk by an optional background sweeper.
+Two backends are provided:
+
+- ``MemorySessionBackend`` keeps sessions in lock-striped dict shards so
+  concurrent handler threads rarely contend on the same lock.
+- ``SQLiteSessionBackend`` stores sessions in a WAL-mode SQLite file so several
+  server processes on one host can share them and they survive restarts.
+"""
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config.security import API_TOKEN_TTL
+from config.settings import SESSION_BACKEND, SESSION_DB_PATH
+
+Entry = Tuple[str, float]  # (username, expires_at)
+
+
+class MemorySessionBackend:
+    def __init__(self, shards: int = 64):
+        count = 1
+        while count < shards:
+            count <<= 1
+        self._mask = count - 1
+        self._shards: List[Dict[str, Entry]] = [{} for _ in range(count)]
+        self._locks = [threading.Lock() for _ in range(count)]
+
+    def _index(self, token: str) -> int:
+        return hash(token) & self._mask
+
+    def put(self, token: str, username: str, expires_at: float) -> None:
+        idx = self._index(token)
+        with self._locks[idx]:
+            self._shards[idx][token] = (username, expires_at)
+
+    def get(self, token: str) -> Optional[Entry]:
+        # Single dict reads are atomic under the GIL, so lookups skip the lock.
+        return self._shards[self._index(token)].get(token)
+
+    def touch(self, token: str, expires_at: float) -> None:
+        idx = self._index(token)
+        with self._locks[idx]:
+            entry = self._shards[idx].get(token)
+            if entry is not None:
+                self._shards[idx][token] = (entry[0], expires_at)
+
+    def delete(self, token: str) -> Optional[Entry]:
+        idx = self._index(token)
+        with self._locks[idx]:
+            return self._shards[idx].pop(token, None)
+
+    def sweep(self, now: float) -> int:
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                expired = [token for token, (_, expires_at) in shard.items() if expires_at <= now]
+                for token in expired:
+                    del shard[token]
+            removed += len(expired)
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class SQLiteSessionBackend:
+    def __init__(self, path: str = SESSION_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session ("
+            " token TEXT PRIMARY KEY, username TEXT NOT NULL, expires_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_session_expires ON session(expires_at)")
+
+    def put(self, token: str, username: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session (token, username, expires_at) VALUES (?, ?, ?)",
+                (token, username, expires_at),
+            )
+
+    def get(self, token: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._conn.execute("SELECT username, expires_at FROM session WHERE token = ?", (token,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def touch(self, token: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE session SET expires_at = ? WHERE token = ?", (expires_at, token))
+
+    def delete(self, token: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._conn.execute("SELECT username, expires_at FROM session WHERE token = ?", (token,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM session WHERE token = ?", (token,))
+        return row[0], row[1]
+
+    def sweep(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM session WHERE expires_at <= ?", (now,)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM session").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SessionStore:
+    """Token -> username mapping with sliding TTL expiry."""
+
+    def __init__(self, backend=None, ttl: float = API_TOKEN_TTL, clock: Callable[[], float] = time.time):
+        self.backend = backend if backend is not None else MemorySessionBackend()
+        self.ttl = ttl
+        self.clock = clock
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def create(self, username: str) -> str:
+        token = secrets.token_hex(16)
+        self.backend.put(token, username, self.clock() + self.ttl)
+        return token
+
+    def get(self, token: str) -> Optional[str]:
+        entry = self.backend.get(token)
+        if entry is None:
+            return None
+        username, expires_at = entry
+        now = self.clock()
+        if expires_at <= now:
+            self.backend.delete(token)
+            return None
+        # Sliding expiry, renewed only once half the TTL is used to keep writes rare.
+        if expires_at - now < self.ttl / 2:
+            self.backend.touch(token, now + self.ttl)
+        return username
+
+    def pop(self, token: str) -> Optional[str]:
+        entry = self.backend.delete(token)
+        return entry[0] if entry else None
+
+    def sweep(self) -> int:
+        """Drop every expired session; returns how many were removed."""
+        return self.backend.sweep(self.clock())
+
+    def start_sweeper(self, interval: float = 60.0) -> None:
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def __contains__(self, token: str) -> bool:
+        return self.get(token) is not None
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+
+def build_session_store(backend: str = SESSION_BACKEND, path: str = SESSION_DB_PATH) -> SessionStore:
+    """Create the store selected by ``APP_SESSION_BACKEND`` (``memory`` or ``sqlite``)."""
+    if backend == "memory":
+        return SessionStore(MemorySessionBackend())
+    if backend == "sqlite":
+        return SessionStore(SQLiteSessionBackend(path))
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+__all__ = ["MemorySessionBackend", "SQLiteSessionBackend", "SessionStore", "build_session_store"]
@@ -20,6 +20,7 @@ const I18N = {
     running: '执行中...',
     done: '完成',
     awaiting: '等待执行...',
+    timed_out: '执行超时',
     admin_create: '管理员 · 创建用户并分配模块',
     create_user: '创建用户',
     username: '用户名',
@@ -68,6 +69,11 @@ const I18N = {
     submit_approval: '提交审批',
     approval_list_hint: '查看提交过的流程及下一步',
     feed_empty: '暂无数据，提交一条看看效果',
+    my_todos: '我的待办',
+    my_todos_hint: '分配给我的审批任务，实时更新',
+    approve: '同意',
+    reject: '驳回',
+    load_more: '加载更多',
   },
   en: {
     brand: 'Enterprise Platform',
@@ -87,6 +93,7 @@ const I18N = {
     running: 'Running...',
     done: 'Done',
     awaiting: 'Awaiting...',
+    timed_out: 'Timed out',
     admin_create: 'Admin · create user & assign modules',
     create_user: 'Create user',
     username: 'Username',
@@ -135,6 +142,11 @@ const I18N = {
     submit_approval: 'Submit',
     approval_list_hint: 'Previously submitted flows',
     feed_empty: 'No data yet — submit one to see results',
+    my_todos: 'My todos',
+    my_todos_hint: 'Approval tasks assigned to me, updated live',
+    approve: 'Approve',
+    reject: 'Reject',
+    load_more: 'Load more',
   },
 };
 
@@ -185,6 +197,37 @@ const ApiClient = {
   runTasks(tasks) {
     return this.request('/api/run', { method: 'POST', body: JSON.stringify({ tasks }) });
   },
+  async streamTasks(tasks, onLine) {
+    const res = await fetch('/api/run/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      credentials: 'include',
+      body: JSON.stringify({ tasks }),
+    });
+    if (!res.ok) {
+      throw new Error((await res.text()) || res.statusText);
+    }
+    if (!res.body) {
+      (await res.text()).split('\n').filter(Boolean).forEach((l) => onLine(JSON.parse(l)));
+      return;
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline = buffer.indexOf('\n');
+      while (newline >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (line) onLine(JSON.parse(line));
+        newline = buffer.indexOf('\n');
+      }
+    }
+    if (buffer.trim()) onLine(JSON.parse(buffer));
+  },
   createUser(payload) {
     return this.request('/api/users', { method: 'POST', body: JSON.stringify(payload) });
   },
@@ -203,6 +246,12 @@ const ApiClient = {
   oaFeed() {
     return this.request('/api/oa/approvals');
   },
+  todos(cursor) {
+    return this.request(`/api/todos${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`);
+  },
+  completeTodo(taskId, action) {
+    return this.request(`/api/todos/${taskId}/complete`, { method: 'POST', body: JSON.stringify({ action }) });
+  },
   financeSubmit(payload) {
     return this.request('/api/finance/expense', { method: 'POST', body: JSON.stringify(payload) });
   },
@@ -425,8 +474,12 @@ const Modules = {
       AppUI.buildQuickTasks('oa');
       AppUI.bindApprovalForm();
       await AppUI.refreshApprovalFeed();
+      await AppUI.refreshTodos();
+      AppUI.watchTodos();
       const btn = qs('#approval-refresh');
       if (btn) btn.onclick = () => AppUI.refreshApprovalFeed();
+      const todoBtn = qs('#todo-refresh');
+      if (todoBtn) todoBtn.onclick = () => AppUI.refreshTodos();
     },
   },
   finance: {
@@ -442,7 +495,7 @@ const Modules = {
 };
 
 const AppUI = {
-  state: { lang: localStorage.getItem(LANG_STORAGE_KEY) || 'zh', user: null, modules: [] },
+  state: { lang: localStorage.getItem(LANG_STORAGE_KEY) || 'zh', user: null, modules: [], todoCursor: null, todoStream: null },
 
   applyI18n() {
     qsa('[data-i18n]').forEach((el) => {
@@ -502,11 +555,26 @@ const AppUI = {
           status.textContent = I18N[this.state.lang].pick_one;
           return;
         }
-        status.textContent = I18N[this.state.lang].running;
+        const running = I18N[this.state.lang].running;
+        status.textContent = running;
         output.textContent = I18N[this.state.lang].awaiting;
-        const res = await ApiClient.runTasks(selected);
+        // Render each task result as soon as the server streams it back.
+        const results = {};
+        let finished = 0;
+        await ApiClient.streamTasks(selected, (line) => {
+          if (line.done) {
+            // Tasks still running at the server's deadline come back only in the final line.
+            const timedOut = I18N[this.state.lang].timed_out;
+            for (const task of line.pending || []) results[task] = { error: timedOut };
+            output.textContent = JSON.stringify(results, null, 2);
+            return;
+          }
+          results[line.task] = line.error ? { error: line.error } : line.result;
+          finished += 1;
+          status.textContent = `${running} ${finished}/${selected.length}`;
+          output.textContent = JSON.stringify(results, null, 2);
+        });
         status.textContent = I18N[this.state.lang].done;
-        output.textContent = JSON.stringify(res.results, null, 2);
       };
     }
   },
@@ -681,6 +749,58 @@ const AppUI = {
     });
   },
 
+  async refreshTodos(append = false) {
+    const feed = qs('#todo-feed');
+    const more = qs('#todo-more');
+    if (!feed) return;
+    const data = await ApiClient.todos(append ? this.state.todoCursor : null);
+    this.state.todoCursor = data.next_cursor;
+    if (more) {
+      more.hidden = !data.next_cursor;
+      more.onclick = () => AppUI.refreshTodos(true);
+    }
+    const render = (item) => {
+      const card = document.createElement('div');
+      card.className = 'feed-card';
+      const title = document.createElement('strong');
+      title.textContent = `${item.variables?.form?.type || item.process_name || 'task'} · ${item.name}`;
+      const p = document.createElement('p');
+      p.textContent = `${item.variables?.submitted_by || ''} · ${item.variables?.form?.reason || ''}`;
+      card.appendChild(title);
+      card.appendChild(p);
+      ['approve', 'reject'].forEach((action) => {
+        const btn = document.createElement('button');
+        btn.className = action === 'approve' ? 'primary' : 'ghost';
+        btn.type = 'button';
+        btn.textContent = I18N[this.state.lang][action];
+        btn.onclick = async () => {
+          await ApiClient.completeTodo(item.id, action);
+          await AppUI.refreshTodos();
+          await AppUI.refreshApprovalFeed();
+        };
+        card.appendChild(btn);
+      });
+      return card;
+    };
+    if (append) {
+      (data.items || []).forEach((item) => feed.appendChild(render(item)));
+    } else {
+      Render.feed(feed, data.items || [], render);
+    }
+  },
+
+  watchTodos() {
+    if (!window.EventSource || this.state.todoStream) return;
+    let pending;
+    const stream = new EventSource('/api/todos/stream');
+    const refresh = () => {
+      window.clearTimeout(pending);
+      pending = window.setTimeout(() => AppUI.refreshTodos(), 200);
+    };
+    ['task.opened', 'task.completed', 'task.cancelled'].forEach((type) => stream.addEventListener(type, refresh));
+    this.state.todoStream = stream;
+  },
+
   async refreshExpenseFeed() {
     const feed = qs('#expense-feed');
     if (!feed) return;
@@ -49,6 +49,7 @@ const I18N: Record<LocaleKey, TranslationMap> = {
     running: '执行中...',
     done: '完成',
     awaiting: '等待执行...',
+    timed_out: '执行超时',
     admin_create: '管理员 · 创建用户并分配模块',
     create_user: '创建用户',
     username: '用户名',
@@ -97,6 +98,11 @@ const I18N: Record<LocaleKey, TranslationMap> = {
     submit_approval: '提交审批',
     approval_list_hint: '查看提交过的流程及下一步',
     feed_empty: '暂无数据，提交一条看看效果',
+    my_todos: '我的待办',
+    my_todos_hint: '分配给我的审批任务，实时更新',
+    approve: '同意',
+    reject: '驳回',
+    load_more: '加载更多',
   },
   en: {
     brand: 'Enterprise Platform',
@@ -116,6 +122,7 @@ const I18N: Record<LocaleKey, TranslationMap> = {
     running: 'Running...',
     done: 'Done',
     awaiting: 'Awaiting...',
+    timed_out: 'Timed out',
     admin_create: 'Admin · create user & assign modules',
     create_user: 'Create user',
     username: 'Username',
@@ -164,6 +171,11 @@ const I18N: Record<LocaleKey, TranslationMap> = {
     submit_approval: 'Submit',
     approval_list_hint: 'Previously submitted flows',
     feed_empty: 'No data yet — submit one to see results',
+    my_todos: 'My todos',
+    my_todos_hint: 'Approval tasks assigned to me, updated live',
+    approve: 'Approve',
+    reject: 'Reject',
+    load_more: 'Load more',
   },
 };
 
@@ -216,6 +228,37 @@ const ApiClient = {
   runTasks(tasks: string[]) {
     return this.request('/api/run', { method: 'POST', body: JSON.stringify({ tasks }) });
   },
+  async streamTasks(tasks: string[], onLine: (line: any) => void): Promise<void> {
+    const res = await fetch('/api/run/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      credentials: 'include',
+      body: JSON.stringify({ tasks }),
+    });
+    if (!res.ok) {
+      throw new Error((await res.text()) || res.statusText);
+    }
+    if (!res.body) {
+      (await res.text()).split('\n').filter(Boolean).forEach((l) => onLine(JSON.parse(l)));
+      return;
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline = buffer.indexOf('\n');
+      while (newline >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (line) onLine(JSON.parse(line));
+        newline = buffer.indexOf('\n');
+      }
+    }
+    if (buffer.trim()) onLine(JSON.parse(buffer));
+  },
   createUser(payload: Record<string, unknown>) {
     return this.request('/api/users', { method: 'POST', body: JSON.stringify(payload) });
   },
@@ -234,6 +277,12 @@ const ApiClient = {
   oaFeed() {
     return this.request('/api/oa/approvals');
   },
+  todos(cursor?: string | null) {
+    return this.request(`/api/todos${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`);
+  },
+  completeTodo(taskId: number, action: string) {
+    return this.request(`/api/todos/${taskId}/complete`, { method: 'POST', body: JSON.stringify({ action }) });
+  },
   financeSubmit(payload: Record<string, unknown>) {
     return this.request('/api/finance/expense', { method: 'POST', body: JSON.stringify(payload) });
   },
@@ -377,8 +426,12 @@ const Modules = {
       AppUI.buildQuickTasks('oa');
       AppUI.bindApprovalForm();
       await AppUI.refreshApprovalFeed();
+      await AppUI.refreshTodos();
+      AppUI.watchTodos();
       const btn = qs<HTMLButtonElement>('#approval-refresh');
       if (btn) btn.onclick = () => AppUI.refreshApprovalFeed();
+      const todoBtn = qs<HTMLButtonElement>('#todo-refresh');
+      if (todoBtn) todoBtn.onclick = () => AppUI.refreshTodos();
     },
   },
   finance: {
@@ -398,6 +451,8 @@ const AppUI = {
     lang: (localStorage.getItem(LANG_STORAGE_KEY) as LocaleKey) || 'zh',
     user: null as UserContext | null,
     modules: [] as ModuleMeta[],
+    todoCursor: null as string | null,
+    todoStream: null as EventSource | null,
   },
 
   applyI18n() {
@@ -458,11 +513,26 @@ const AppUI = {
           status.textContent = I18N[this.state.lang].pick_one as string;
           return;
         }
-        status.textContent = I18N[this.state.lang].running as string;
+        const running = I18N[this.state.lang].running as string;
+        status.textContent = running;
         output.textContent = I18N[this.state.lang].awaiting as string;
-        const res = await ApiClient.runTasks(selected);
+        // Render each task result as soon as the server streams it back.
+        const results: Record<string, unknown> = {};
+        let finished = 0;
+        await ApiClient.streamTasks(selected, (line) => {
+          if (line.done) {
+            // Tasks still running at the server's deadline come back only in the final line.
+            const timedOut = I18N[this.state.lang].timed_out as string;
+            for (const task of line.pending || []) results[task] = { error: timedOut };
+            output.textContent = JSON.stringify(results, null, 2);
+            return;
+          }
+          results[line.task] = line.error ? { error: line.error } : line.result;
+          finished += 1;
+          status.textContent = `${running} ${finished}/${selected.length}`;
+          output.textContent = JSON.stringify(results, null, 2);
+        });
         status.textContent = I18N[this.state.lang].done as string;
-        output.textContent = JSON.stringify(res.results, null, 2);
       };
     }
   },
@@ -637,6 +707,58 @@ const AppUI = {
     });
   },
 
+  async refreshTodos(append = false) {
+    const feed = qs<HTMLElement>('#todo-feed');
+    const more = qs<HTMLButtonElement>('#todo-more');
+    if (!feed) return;
+    const data = await ApiClient.todos(append ? this.state.todoCursor : null);
+    this.state.todoCursor = data.next_cursor;
+    if (more) {
+      more.hidden = !data.next_cursor;
+      more.onclick = () => AppUI.refreshTodos(true);
+    }
+    const render = (item: any) => {
+      const card = document.createElement('div');
+      card.className = 'feed-card';
+      const title = document.createElement('strong');
+      title.textContent = `${item.variables?.form?.type || item.process_name || 'task'} · ${item.name}`;
+      const p = document.createElement('p');
+      p.textContent = `${item.variables?.submitted_by || ''} · ${item.variables?.form?.reason || ''}`;
+      card.appendChild(title);
+      card.appendChild(p);
+      ['approve', 'reject'].forEach((action) => {
+        const btn = document.createElement('button');
+        btn.className = action === 'approve' ? 'primary' : 'ghost';
+        btn.type = 'button';
+        btn.textContent = I18N[this.state.lang][action] as string;
+        btn.onclick = async () => {
+          await ApiClient.completeTodo(item.id, action);
+          await AppUI.refreshTodos();
+          await AppUI.refreshApprovalFeed();
+        };
+        card.appendChild(btn);
+      });
+      return card;
+    };
+    if (append) {
+      (data.items || []).forEach((item: any) => feed.appendChild(render(item)));
+    } else {
+      Render.feed(feed, data.items || [], render);
+    }
+  },
+
+  watchTodos() {
+    if (!window.EventSource || this.state.todoStream) return;
+    let pending: number | undefined;
+    const stream = new EventSource('/api/todos/stream');
+    const refresh = () => {
+      window.clearTimeout(pending);
+      pending = window.setTimeout(() => AppUI.refreshTodos(), 200);
+    };
+    ['task.opened', 'task.completed', 'task.cancelled'].forEach((type) => stream.addEventListener(type, refresh));
+    this.state.todoStream = stream;
+  },
+
   async refreshExpenseFeed() {
     const feed = qs<HTMLElement>('#expense-feed');
     if (!feed) return;
@@ -0,0 +1,141 @@
+"""In-memory cache for the web UI's static assets.
+
+Files under ``src/web/static`` are read once, hashed into a strong ETag and, for
+text types, precompressed with gzip (and brotli when the optional ``brotli``
+package is installed). Entries are re-validated against the file's mtime at most
+once per ``check_interval`` seconds, so edits show up without a restart. Files
+above ``sendfile_threshold`` are not kept in memory and are streamed with
+``socket.sendfile`` instead.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:  # optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_PREFIXES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    path: Path
+    content_type: str
+    etag: str
+    size: int
+    mtime_ns: int
+    body: Optional[bytes] = None
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    def variant(self, accept_encoding: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Pick the preferred encoding the client accepts: (content-encoding, body)."""
+        if self.body is None or not (self.gzip or self.br):
+            return None, self.body
+        accepted = _accepted_encodings(accept_encoding)
+        if self.br is not None and "br" in accepted:
+            return "br", self.br
+        if self.gzip is not None and "gzip" in accepted:
+            return "gzip", self.gzip
+        return None, self.body
+
+
+def _accepted_encodings(header: str) -> frozenset:
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(name.strip().lower())
+    return frozenset(encodings)
+
+
+class StaticAssetCache:
+    def __init__(
+        self,
+        root: Path,
+        check_interval: float = 1.0,
+        sendfile_threshold: int = 256 * 1024,
+        compress_min: int = 512,
+    ):
+        self.root = Path(root)
+        self.check_interval = check_interval
+        self.sendfile_threshold = sendfile_threshold
+        self.compress_min = compress_min
+        self._assets: Dict[Path, StaticAsset] = {}
+        self._next_check: Dict[Path, float] = {}
+        self._lock = threading.Lock()
+
+    def preload(self) -> int:
+        """Load every file under ``root``; returns the number of cached assets."""
+        for path in self.root.rglob("*"):
+            if path.is_file():
+                self.get(path)
+        return len(self._assets)
+
+    def get(self, path: Path) -> Optional[StaticAsset]:
+        asset = self._assets.get(path)
+        now = time.monotonic()
+        if asset is not None and now < self._next_check.get(path, 0.0):
+            return asset
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._assets.pop(path, None)
+                self._next_check.pop(path, None)
+            return None
+        if asset is None or asset.mtime_ns != stat.st_mtime_ns or asset.size != stat.st_size:
+            asset = self._load(path, stat)
+            with self._lock:
+                self._assets[path] = asset
+        self._next_check[path] = now + self.check_interval
+        return asset
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._assets.clear()
+                self._next_check.clear()
+            else:
+                self._assets.pop(path, None)
+                self._next_check.pop(path, None)
+
+    def _load(self, path: Path, stat: os.stat_result) -> StaticAsset:
+        mime, _ = mimetypes.guess_type(str(path))
+        mime = mime or "application/octet-stream"
+        content_type = f"{mime}; charset=utf-8" if mime.startswith(COMPRESSIBLE_PREFIXES) else mime
+        if stat.st_size > self.sendfile_threshold:
+            etag = f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            return StaticAsset(path, content_type, etag, stat.st_size, stat.st_mtime_ns)
+
+        body = path.read_bytes()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        gz = br = None
+        if len(body) >= self.compress_min and mime.startswith(COMPRESSIBLE_PREFIXES):
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) >= len(body):
+                gz = None
+            if brotli is not None:
+                br = brotli.compress(body)
+                if len(br) >= len(body):
+                    br = None
+        return StaticAsset(path, content_type, etag, len(body), stat.st_mtime_ns, body, gz, br)
+
+
+__all__ = ["StaticAsset", "StaticAssetCache"]
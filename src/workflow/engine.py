@@ -1,4 +1,535 @@
-"""Simple workflow engine stub."""
+"""Workflow engine running compiled process graphs.
 
-def start(process_key: str):
-    return {"started": process_key}
+Instances move through the graph in response to three events: ``start``,
+``complete`` (a user task was approved or rejected) and ``revoke``. Each event
+walks the compiled graph from the current node until the instance reaches a
+wait state, which is an open user task or a pending parallel join, or until it
+reaches an end node. Instance status changes are checked against
+``TRANSITIONS``. If the walk after ``complete`` fails (a service task raises),
+the task is reopened with the instance variables it had, so it can be retried.
+
+Parallel forks run their extra branches on the shared executor; joins count
+arrivals under the instance lock. Persistence is write-behind:
+``TransitionWriter`` buffers new instances, tasks, completions and status
+changes, and a background thread writes them with ``executemany`` in one
+transaction per batch, so the request path never waits on the database.
+Username assignees are resolved to ``user.id`` at flush time.
+
+Instances are dropped from memory once they reach an end state. An engine
+with a writer reloads the open tasks of running instances when it starts, and
+again for each process it deploys. Instance variables are not persisted, so a
+reloaded instance starts with none.
+"""
+import itertools
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, wait
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from src.common.exceptions import ValidationError
+from src.common.runtime import get_executor
+from src.dao.base import ConnectionPool, get_pool
+from src.dao.process_dao import ProcessDefinitionDAO, ProcessInstanceDAO, TaskDAO
+from src.dao.user_dao import UserDAO
+from src.events.event_bus import BUS
+from src.workflow import task_executor
+from src.workflow.process_builder import REGISTRY, CompiledProcess, Edge, Node, ProcessRegistry
+from src.workflow.task_inbox import CANCELLED, COMPLETED, INBOX, TaskInbox
+
+# process_instance.status values from schema.sql
+RUNNING, APPROVED, REJECTED, REVOKED = 1, 2, 3, 4
+STATUS_NAMES = {RUNNING: "running", APPROVED: "approved", REJECTED: "rejected", REVOKED: "revoked"}
+TRANSITIONS: Dict[int, Dict[str, int]] = {
+    RUNNING: {"approved": APPROVED, "rejected": REJECTED, "revoke": REVOKED},
+}
+
+
+class Instance:
+    __slots__ = ("id", "process", "variables", "status", "open_tasks", "arrivals", "lock", "starter_id", "business_id")
+
+    def __init__(self, instance_id: int, process: CompiledProcess, variables: Dict[str, Any], starter_id: int, business_id):
+        self.id = instance_id
+        self.process = process
+        self.variables = variables
+        self.status = RUNNING
+        self.open_tasks: Set[int] = set()
+        self.arrivals: Dict[int, int] = {}
+        self.lock = threading.Lock()
+        self.starter_id = starter_id
+        self.business_id = business_id
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "key": self.process.key,
+            "version": self.process.version,
+            "status": STATUS_NAMES[self.status],
+            "open_tasks": sorted(self.open_tasks),
+            "variables": dict(self.variables),
+        }
+
+
+class Task:
+    __slots__ = ("id", "instance", "node", "assignee", "created_at")
+
+    def __init__(self, task_id: int, instance: Instance, node: Node, assignee: Any):
+        self.id = task_id
+        self.instance = instance
+        self.node = node
+        self.assignee = assignee
+        self.created_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "instance_id": self.instance.id,
+            "node": self.node.id,
+            "name": self.node.name,
+            "assignee": self.assignee,
+            "created_at": self.created_at,
+        }
+
+
+def _timestamp(epoch: Optional[float] = None) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(epoch))
+
+
+class TransitionWriter:
+    """Write-behind buffer for instance/task rows, flushed in batched transactions."""
+
+    BUFFERS = ("instances", "tasks", "completions", "statuses")
+
+    def __init__(self, pool: Optional[ConnectionPool] = None, batch_size: int = 2000, flush_interval: float = 0.05):
+        self.pool = pool or get_pool()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.instances = ProcessInstanceDAO(self.pool)
+        self.tasks = TaskDAO(self.pool)
+        self.definitions = ProcessDefinitionDAO(self.pool)
+        self.users = UserDAO(self.pool)
+        self._definition_ids: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffers: Dict[str, list] = {name: [] for name in self.BUFFERS}
+        self._pending = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    def next_ids(self) -> Tuple[int, int]:
+        return self.instances.max_key() + 1, self.tasks.max_key() + 1
+
+    def definition_id(self, process: CompiledProcess) -> int:
+        cache_key = (process.key, process.version)
+        def_id = self._definition_ids.get(cache_key)
+        if def_id is None:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT id FROM process_definition WHERE `key` = ? AND version = ?", cache_key
+                ).fetchone()
+                if row is not None:
+                    def_id = row[0]
+                else:
+                    record = {"name": process.name, "key": process.key, "version": process.version}
+                    def_id = self.definitions.insert(record, conn=conn)
+            self._definition_ids[cache_key] = def_id
+        return def_id
+
+    def _queue(self, bucket: str, row) -> None:
+        with self._lock:
+            # Resolve the list under the lock: flush() swaps in fresh ones.
+            self._buffers[bucket].append(row)
+            self._pending += 1
+            full = self._pending >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def record_instance(self, instance: Instance) -> None:
+        self._queue(
+            "instances",
+            {
+                "id": instance.id,
+                "process_def_id": self.definition_id(instance.process),
+                "business_id": instance.business_id,
+                "starter_id": instance.starter_id,
+                "status": instance.status,
+            },
+        )
+
+    def record_task(self, task: Task) -> None:
+        self._queue(
+            "tasks",
+            {
+                "id": task.id,
+                "process_instance_id": task.instance.id,
+                "assignee_id": task.assignee,  # a username is resolved to user.id in flush()
+                "node_key": task.node.id,
+                "created_at": _timestamp(task.created_at),
+            },
+        )
+
+    def record_completion(self, task_id: int, action: Optional[str], comment: Optional[str]) -> None:
+        self._queue("completions", (task_id, action, comment, _timestamp()))
+
+    def record_status(self, instance_id: int, status: int) -> None:
+        self._queue("statuses", (instance_id, status))
+
+    def flush(self) -> int:
+        """Write everything buffered so far in one transaction; returns the number of rows."""
+        with self._flush_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, {name: [] for name in self.BUFFERS}
+                self._pending = 0
+            instances, tasks = buffers["instances"], buffers["tasks"]
+            completions, statuses = buffers["completions"], buffers["statuses"]
+            rows = len(instances) + len(tasks) + len(completions) + len(statuses)
+            if not rows:
+                return 0
+            self._resolve_assignees(tasks)
+            with self.pool.connection() as conn:
+                # Inserts first so the updates below always find their rows.
+                self.instances.insert_many(instances, batch_size=self.batch_size, conn=conn)
+                self.tasks.insert_many(tasks, batch_size=self.batch_size, conn=conn)
+                self.tasks.complete_many(completions, conn=conn)
+                self.instances.set_status_many(statuses, conn=conn)
+            self.flushes += 1
+            self.rows_written += rows
+            return rows
+
+    def _resolve_assignees(self, tasks: List[Dict[str, Any]]) -> None:
+        names = list({row["assignee_id"] for row in tasks if isinstance(row["assignee_id"], str)})
+        ids = self.users.ids_by_username(names) if names else {}
+        for row in tasks:
+            assignee = row["assignee_id"]
+            if not isinstance(assignee, int):
+                row["assignee_id"] = ids.get(assignee, 0)  # 0: no user row to point at
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self) -> "TransitionWriter":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="workflow-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def metrics(self) -> Dict[str, int]:
+        return {"pending": self._pending, "flushes": self.flushes, "rows_written": self.rows_written}
+
+
+class WorkflowEngine:
+    def __init__(
+        self,
+        registry: ProcessRegistry = REGISTRY,
+        writer: Optional[TransitionWriter] = None,
+        executor=None,
+        bus=None,
+        inbox: Optional[TaskInbox] = None,
+    ):
+        self.registry = registry
+        self.writer = writer
+        self.inbox = inbox
+        self.executor = executor or get_executor()
+        self.bus = bus
+        first_instance, first_task = writer.next_ids() if writer is not None else (1, 1)
+        self._instance_ids = itertools.count(first_instance)
+        self._task_ids = itertools.count(first_task)
+        self._instances: Dict[int, Instance] = {}
+        self._tasks: Dict[int, Task] = {}
+        self._branches: Set[Future] = set()
+        self._branch_lock = threading.Lock()
+        self.branch_errors = 0
+        self.finished: Counter = Counter()
+        if writer is not None:
+            self.recover()
+
+    # --- events ----------------------------------------------------------
+    def deploy(self, definition: Mapping[str, Any]) -> CompiledProcess:
+        process = self.registry.deploy(definition)
+        if self.writer is not None:
+            self.writer.definition_id(process)
+            self.recover()
+        return process
+
+    def recover(self) -> int:
+        """Reload persisted open tasks of running instances whose process is deployed; returns how many."""
+        recovered = 0
+        for row in self.writer.tasks.open_in_running(RUNNING):
+            if row["id"] in self._tasks:
+                continue
+            try:
+                process = self.registry.get(row["key"], row["version"])
+                node = process.node(row["node_key"])
+            except (ValidationError, KeyError):  # not deployed (yet) or the node no longer exists
+                continue
+            instance = self._instances.get(row["process_instance_id"])
+            if instance is None:
+                instance = Instance(row["process_instance_id"], process, {}, row["starter_id"], row["business_id"])
+                self._instances[instance.id] = instance
+            task = Task(row["id"], instance, node, row["username"] or row["assignee_id"])
+            task.created_at = time.mktime(time.strptime(row["created_at"], "%Y-%m-%d %H:%M:%S"))
+            instance.open_tasks.add(task.id)
+            self._tasks[task.id] = task
+            if self.inbox is not None:
+                item = task.snapshot()
+                item.update(process=process.key, process_name=process.name, variables={})
+                self.inbox.add(task.id, task.assignee, item, created_at=task.created_at)
+            recovered += 1
+        return recovered
+
+    def start(
+        self,
+        key: str,
+        variables: Optional[Mapping[str, Any]] = None,
+        version: Optional[int] = None,
+        starter_id: int = 0,
+        business_id: Optional[int] = None,
+    ) -> Instance:
+        process = self.registry.get(key, version)
+        if process.form is not None:
+            # Submitted form fields are validated and coerced; other variables pass through.
+            variables = {**(variables or {}), **process.form.validate(variables or {})}
+        instance = Instance(next(self._instance_ids), process, dict(variables or {}), starter_id, business_id)
+        self._instances[instance.id] = instance
+        if self.writer is not None:
+            self.writer.record_instance(instance)
+        self._advance(instance, process.start)
+        return instance
+
+    def complete(
+        self,
+        task_id: int,
+        action: str = "approve",
+        variables: Optional[Mapping[str, Any]] = None,
+        comment: Optional[str] = None,
+    ) -> Instance:
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            raise ValidationError(f"Task {task_id} is not open")
+        instance, node = task.instance, task.node
+        with instance.lock:
+            before = dict(instance.variables)
+            instance.open_tasks.discard(task_id)
+            if variables:
+                instance.variables.update(variables)
+            instance.variables["approved"] = action == "approve"
+            instance.variables[f"{node.id}_action"] = action
+        try:
+            self._advance(instance, instance.process.outgoing[node.index][0].target)
+        except Exception:
+            # Reopen the task so the instance is not left running with nothing to complete.
+            with instance.lock:
+                instance.variables.clear()
+                instance.variables.update(before)
+                if instance.status == RUNNING:
+                    instance.open_tasks.add(task_id)
+                    self._tasks[task_id] = task
+            raise
+        if self.writer is not None:
+            self.writer.record_completion(task_id, action, comment)
+        if self.inbox is not None:
+            self.inbox.update(task_id, COMPLETED, action=action, comment=comment)
+        return instance
+
+    def revoke(self, instance_id: int) -> Instance:
+        instance = self.instance(instance_id)
+        self._transition(instance, "revoke")
+        return instance
+
+    # --- queries ---------------------------------------------------------
+    def instance(self, instance_id: int) -> Instance:
+        instance = self._instances.get(instance_id)
+        if instance is None:
+            raise ValidationError(f"Unknown process instance {instance_id}")
+        return instance
+
+    def task(self, task_id: int) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def open_tasks(self, assignee: Any = None) -> List[Task]:
+        if assignee is None:
+            return list(self._tasks.values())
+        if self.inbox is not None:
+            tasks = (self._tasks.get(task_id) for task_id in self.inbox.ids(assignee))
+            return [t for t in tasks if t is not None]
+        return [t for t in list(self._tasks.values()) if t.assignee == assignee]
+
+    # --- graph walking ---------------------------------------------------
+    def _advance(self, instance: Instance, idx: int) -> None:
+        nodes, outgoing = instance.process.nodes, instance.process.outgoing
+        while instance.status == RUNNING:
+            node = nodes[idx]
+            kind = node.type
+            if kind == "user_task":
+                self._open_task(instance, node)
+                return
+            if kind == "end":
+                self._transition(instance, node.status)
+                return
+            if kind == "service_task":
+                task = {"id": node.id, "action": node.action, "instance_id": instance.id}
+                result = task_executor.execute(task, instance.variables)["result"]
+                if result:
+                    with instance.lock:
+                        instance.variables.update(result)
+            elif kind == "parallel" and node.join_count > 1:
+                with instance.lock:
+                    arrived = instance.arrivals.get(idx, 0) + 1
+                    if arrived < node.join_count:
+                        instance.arrivals[idx] = arrived
+                        return
+                    instance.arrivals.pop(idx, None)
+            edges = outgoing[idx]
+            if kind == "exclusive":
+                idx = self._choose(instance, node, edges)
+            else:
+                for edge in edges[1:]:
+                    self._spawn(instance, edge.target)
+                idx = edges[0].target
+
+    def _choose(self, instance: Instance, node: Node, edges: Tuple[Edge, ...]) -> int:
+        default = None
+        variables = instance.variables
+        for edge in edges:
+            if edge.predicate is None:
+                default = edge.target if default is None else default
+            elif edge.predicate(variables):
+                return edge.target
+        if default is None:
+            raise ValidationError(f"No outgoing condition of {node.id!r} matched for instance {instance.id}")
+        return default
+
+    def _spawn(self, instance: Instance, idx: int) -> None:
+        future = self.executor.submit(lambda: self._advance(instance, idx))
+        with self._branch_lock:
+            self._branches.add(future)
+        future.add_done_callback(self._branch_done)
+
+    def _branch_done(self, future: Future) -> None:
+        with self._branch_lock:
+            self._branches.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                self.branch_errors += 1
+
+    def _open_task(self, instance: Instance, node: Node) -> Task:
+        assignee = node.assignee
+        if isinstance(assignee, str) and assignee.startswith("$"):
+            assignee = instance.variables.get(assignee[1:])
+        task = Task(next(self._task_ids), instance, node, assignee)
+        with instance.lock:
+            if instance.status != RUNNING:
+                return task
+            instance.open_tasks.add(task.id)
+            self._tasks[task.id] = task
+        if self.writer is not None:
+            self.writer.record_task(task)
+        if self.inbox is not None:
+            item = task.snapshot()
+            item.update(process=instance.process.key, process_name=instance.process.name, variables=dict(instance.variables))
+            self.inbox.add(task.id, assignee, item, created_at=task.created_at)
+        return task
+
+    def _transition(self, instance: Instance, event: str) -> None:
+        with instance.lock:
+            status = TRANSITIONS.get(instance.status, {}).get(event)
+            if status is None:
+                raise ValidationError(
+                    f"Instance {instance.id} cannot handle {event!r} while {STATUS_NAMES[instance.status]}"
+                )
+            instance.status = status
+            cancelled, instance.open_tasks = instance.open_tasks, set()
+        self._instances.pop(instance.id, None)  # every transition ends the instance
+        self.finished[STATUS_NAMES[status]] += 1
+        for task_id in cancelled:
+            self._tasks.pop(task_id, None)
+            if self.inbox is not None:
+                self.inbox.update(task_id, CANCELLED)
+        if self.writer is not None:
+            self.writer.record_status(instance.id, status)
+        if self.bus is not None:
+            self.bus.publish(
+                f"process.instance.{STATUS_NAMES[status]}",
+                {"instance_id": instance.id, "key": instance.process.key, "status": STATUS_NAMES[status]},
+            )
+
+    # --- lifecycle -------------------------------------------------------
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for in-flight parallel branches (including ones they spawn)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._branch_lock:
+                pending = list(self._branches)
+            if not pending:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            wait(pending, timeout=remaining)
+
+    def metrics(self) -> Dict[str, Any]:
+        counts = {name: self.finished[name] for name in STATUS_NAMES.values()}
+        for instance in list(self._instances.values()):
+            counts[STATUS_NAMES[instance.status]] += 1
+        metrics = {
+            "instances": counts,
+            "open_tasks": len(self._tasks),
+            "branches_in_flight": len(self._branches),
+            "branch_errors": self.branch_errors,
+        }
+        if self.writer is not None:
+            metrics["writer"] = self.writer.metrics()
+        return metrics
+
+
+_ENGINE: Optional[WorkflowEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine() -> WorkflowEngine:
+    """Process-wide engine persisting through the default DAO pool, indexing tasks in ``INBOX`` and publishing on the bus."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = WorkflowEngine(writer=TransitionWriter().start(), bus=BUS, inbox=INBOX)
+    return _ENGINE
+
+
+def start(process_key: str, variables: Optional[Mapping[str, Any]] = None, **options):
+    instance = get_engine().start(process_key, variables, **options)
+    return {"started": process_key, "instance_id": instance.id, "status": STATUS_NAMES[instance.status]}
+
+
+__all__ = [
+    "APPROVED",
+    "Instance",
+    "REJECTED",
+    "REVOKED",
+    "RUNNING",
+    "STATUS_NAMES",
+    "TRANSITIONS",
+    "Task",
+    "TransitionWriter",
+    "WorkflowEngine",
+    "get_engine",
+    "start",
+]
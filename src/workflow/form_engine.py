@@ -1,4 +1,405 @@
-"""Workflow form engine stub."""
+"""Compile low-code form schemas into cached validators and renderers.
 
-def render(schema: dict):
-    return {"rendered": bool(schema)}
+A schema is ``{"fields": [{"name", "type", "label"?, "required"?, "default"?,
+...}]}``. The field types are listed in ``FIELD_TYPES``. Constraints are
+``min``/``max`` (number, integer), ``min_length``/``max_length`` (string,
+text, multiselect), ``pattern`` (string, text) and ``options`` (select,
+multiselect).
+
+``compile_form`` checks the schema once and generates a single ``check``
+function with one straight-line block per field. Each block has a type fast
+path and only the constraints that field declares. Field names, bounds and
+patterns are bound as constants rather than spliced into the source, so
+validating a submission never reads the schema dicts again. Rendering is
+compiled too: labels, attributes and option lists are escaped up front, and
+only values are formatted per call.
+
+``FormCache`` keeps compiled forms in an LRU keyed by a hash of the canonical
+schema JSON, so identical schemas share one compiled form. Processes compile
+their ``form_schema`` at deploy time (``CompiledProcess.form``), and
+``WorkflowEngine.start`` validates the submitted variables against it.
+"""
+import datetime
+import hashlib
+import html
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from config.settings import FORM_CACHE_SIZE
+from src.common.exceptions import ValidationError
+
+FIELD_TYPES = ("string", "text", "number", "integer", "boolean", "date", "select", "multiselect")
+
+Check = Callable[[Any], Any]
+
+
+class FormError(ValidationError):
+    """A submission failed validation; ``errors`` maps field name to message."""
+
+    def __init__(self, errors: Mapping[str, str]):
+        super().__init__("; ".join(f"{name}: {message}" for name, message in errors.items()))
+        self.errors = dict(errors)
+
+
+class _Invalid(Exception):
+    pass
+
+
+class FormBatch(NamedTuple):
+    valid: List[Tuple[int, Dict[str, Any]]]  # (row index, cleaned values)
+    errors: Dict[int, Dict[str, str]]  # row index -> field errors
+
+
+# --- coercion ----------------------------------------------------------------
+def _string(value: Any) -> str:
+    if not isinstance(value, str):
+        raise _Invalid("must be a string")
+    return value
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool):
+        raise _Invalid("must be a number")
+    if isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise _Invalid("must be a number") from None
+    if not math.isfinite(number):  # "nan", "inf" parse as floats
+        raise _Invalid("must be a finite number")
+    return number
+
+
+def _integer(value: Any) -> int:
+    if isinstance(value, bool):
+        raise _Invalid("must be an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        raise _Invalid("must be an integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise _Invalid("must be an integer") from None
+
+
+_TRUE = frozenset(("true", "1", "on", "yes"))
+_FALSE = frozenset(("false", "0", "off", "no"))
+
+
+def _boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise _Invalid("must be true or false")
+
+
+def _date(value: Any) -> str:
+    try:
+        datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise _Invalid("must be a YYYY-MM-DD date") from None
+    return value
+
+
+COERCERS: Dict[str, Check] = {
+    "string": _string,
+    "text": _string,
+    "number": _number,
+    "integer": _integer,
+    "boolean": _boolean,
+    "date": _date,
+}
+
+
+# --- validator generation ----------------------------------------------------
+def _choice(options: Tuple[Any, ...]) -> Check:
+    allowed = frozenset(options)
+
+    def choice(value):
+        try:
+            if value in allowed:
+                return value
+        except TypeError:  # unhashable, e.g. a list sent to a single select
+            pass
+        raise _Invalid("is not one of the options")
+
+    return choice
+
+
+def _choices(options: Tuple[Any, ...]) -> Check:
+    allowed = frozenset(options)
+
+    def choices(value):
+        if not isinstance(value, (list, tuple)):
+            raise _Invalid("must be a list")
+        try:
+            if allowed.issuperset(value):
+                return list(value)
+        except TypeError:
+            pass
+        raise _Invalid("contains a value that is not one of the options")
+
+    return choices
+
+
+# Fast-path guard per type; values that fail it go through the coercer in ``COERCERS``.
+_EXACT = {
+    "string": "type(v) is not str",
+    "text": "type(v) is not str",
+    "number": "type(v) is not int and (type(v) is not float or not _isfinite(v))",
+    "integer": "type(v) is not int",
+    "boolean": "type(v) is not bool",
+}
+
+
+def _field_source(i: int, spec: Mapping[str, Any], kind: str, names: Dict[str, Any]) -> List[str]:
+    """Source lines validating field ``i``; constants go into ``names`` so no schema text reaches the source."""
+    names[f"K{i}"] = spec["name"]
+    missing = '    if v is None or v == "":'
+    if kind == "multiselect":  # an empty selection counts as missing too
+        missing = '    if v is None or v == "" or v == [] or v == ():'
+    lines = [f"    v = get(K{i})", missing]
+    if spec.get("required"):
+        lines.append(f'        errors = _fail(errors, K{i}, "is required")')
+    elif "default" in spec:
+        names[f"D{i}"] = spec["default"]
+        lines.append(f"        cleaned[K{i}] = D{i}")
+    else:
+        lines.append("        pass")
+    lines += ["    else:", "        try:"]
+    body: List[str] = []
+    if kind in ("select", "multiselect"):
+        options = spec.get("options") or ()
+        if not isinstance(options, (list, tuple)) or not options:
+            raise ValidationError(f"Field {spec['name']!r} needs a list of options")
+        if not all(isinstance(option, (str, int, float)) for option in options):
+            raise ValidationError(f"Options of {spec['name']!r} must be strings or numbers")
+        options = tuple(options)
+        names[f"C{i}"] = (_choice if kind == "select" else _choices)(options)
+        body.append(f"v = C{i}(v)")
+    else:
+        names[f"C{i}"] = COERCERS[kind]
+        body += [f"if {_EXACT[kind]}:", f"    v = C{i}(v)"] if kind in _EXACT else [f"v = C{i}(v)"]
+    bounds = []
+    if kind in ("number", "integer"):
+        bounds = [("v", "min", "<", "value must be at least"), ("v", "max", ">", "value must be at most")]
+    elif kind in ("string", "text", "multiselect"):
+        bounds = [("len(v)", "min_length", "<", "length must be at least"), ("len(v)", "max_length", ">", "length must be at most")]
+    for measure, option, op, message in bounds:
+        if spec.get(option) is not None:
+            bound = spec[option]
+            numeric = option in ("min", "max")
+            if isinstance(bound, bool) or not isinstance(bound, (int, float) if numeric else int):
+                expected = "a number" if numeric else "an integer"
+                raise ValidationError(f"{option!r} of {spec['name']!r} must be {expected}, not {bound!r}")
+            names[f"{option}{i}"] = spec[option]
+            names[f"{option}_msg{i}"] = f"{message} {spec[option]}"
+            body += [f"if {measure} {op} {option}{i}:", f"    raise _Invalid({option}_msg{i})"]
+    if kind in ("string", "text") and spec.get("pattern"):
+        try:
+            names[f"P{i}"] = re.compile(spec["pattern"]).fullmatch
+        except (re.error, TypeError) as exc:
+            raise ValidationError(f"Invalid pattern for {spec['name']!r}: {exc}") from None
+        body += [f"if P{i}(v) is None:", '    raise _Invalid("has an invalid format")']
+    body.append(f"cleaned[K{i}] = v")
+    lines += ["            " + line for line in body]
+    lines += ["        except _Invalid as exc:", f"            errors = _fail(errors, K{i}, exc.args[0])"]
+    return lines
+
+
+def _fail(errors: Optional[Dict[str, str]], name: str, message: str) -> Dict[str, str]:
+    if errors is None:
+        errors = {}
+    errors[name] = message
+    return errors
+
+
+def _generate_check(specs: List[Tuple[Mapping[str, Any], str]]) -> Callable:
+    names: Dict[str, Any] = {"_Invalid": _Invalid, "_fail": _fail, "_isfinite": math.isfinite}
+    lines = ["def check(data):", "    cleaned = {}", "    errors = None", "    get = data.get"]
+    for i, (spec, kind) in enumerate(specs):
+        lines += _field_source(i, spec, kind, names)
+    lines.append("    return cleaned, errors")
+    exec(compile("\n".join(lines), "<form>", "exec"), names)
+    return names["check"]
+
+
+# --- rendering ---------------------------------------------------------------
+def _attr(value: Any) -> str:
+    return html.escape(str(value), quote=True)
+
+
+def _compile_renderer(spec: Mapping[str, Any], kind: str) -> Callable[[Any], str]:
+    name = _attr(spec["name"])
+    label = f'<div class="field"><label for="f-{name}">{_attr(spec.get("label", spec["name"]))}</label>'
+    required = " required" if spec.get("required") else ""
+    if kind in ("select", "multiselect"):
+        multiple = " multiple" if kind == "multiselect" else ""
+        head = f'{label}<select id="f-{name}" name="{name}"{multiple}{required}>'
+        options = tuple(
+            (option, f'<option value="{_attr(option)}">{_attr(option)}</option>',
+             f'<option value="{_attr(option)}" selected>{_attr(option)}</option>')
+            for option in spec.get("options") or ()
+        )
+
+        def render_select(value):
+            chosen = value if isinstance(value, (list, tuple, set)) else (value,)
+            return head + "".join(on if option in chosen else off for option, off, on in options) + "</select></div>"
+
+        return render_select
+    if kind == "text":
+        head, tail = f'{label}<textarea id="f-{name}" name="{name}"{required}>', "</textarea></div>"
+        return lambda value: head + ("" if value is None else html.escape(str(value))) + tail
+    if kind == "boolean":
+        unchecked = f'{label}<input id="f-{name}" name="{name}" type="checkbox"></div>'
+        checked = f'{label}<input id="f-{name}" name="{name}" type="checkbox" checked></div>'
+        return lambda value: checked if value else unchecked
+    input_type = {"number": "number", "integer": "number", "date": "date"}.get(kind, "text")
+    head = f'{label}<input id="f-{name}" name="{name}" type="{input_type}"{required} value="'
+    return lambda value: head + ("" if value is None else _attr(value)) + '"></div>'
+
+
+# --- compiled form -----------------------------------------------------------
+def schema_key(schema: Mapping[str, Any]) -> str:
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+class CompiledForm:
+    """A compiled schema. ``check(data)`` returns ``(cleaned, errors)``, with ``errors`` ``None`` when valid."""
+
+    __slots__ = ("key", "fields", "check", "_renderers")
+
+    def __init__(self, key: str, fields: Tuple[str, ...], check: Callable, renderers: Tuple):
+        self.key = key
+        self.fields = fields
+        self.check = check
+        self._renderers = renderers
+
+    def validate(self, data: Mapping[str, Any]) -> Dict[str, Any]:
+        cleaned, errors = self.check(data)
+        if errors:
+            raise FormError(errors)
+        return cleaned
+
+    def validate_many(self, rows: Iterable[Mapping[str, Any]]) -> FormBatch:
+        """Validate a batch in one pass, keeping the valid rows and the errors of the rest by index."""
+        check = self.check
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        failed: Dict[int, Dict[str, str]] = {}
+        for i, row in enumerate(rows):
+            cleaned, errors = check(row)
+            if errors:
+                failed[i] = errors
+            else:
+                valid.append((i, cleaned))
+        return FormBatch(valid, failed)
+
+    def render(self, values: Optional[Mapping[str, Any]] = None) -> str:
+        get = (values or {}).get
+        body = "".join([render(get(name, default)) for name, default, render in self._renderers])
+        return f'<form data-form="{self.key}">{body}</form>'
+
+
+def compile_form(schema: Mapping[str, Any], key: Optional[str] = None) -> CompiledForm:
+    """Check ``schema`` and compile it; malformed schemas raise ``ValidationError``."""
+    if not isinstance(schema, Mapping) or not isinstance(schema.get("fields", []), list):
+        raise ValidationError("A form schema needs a 'fields' list")
+    specs, renderers, names = [], [], []
+    for spec in schema.get("fields", []):
+        name = spec.get("name") if isinstance(spec, Mapping) else None
+        if not name:
+            raise ValidationError("Every form field needs a name")
+        if name in names:
+            raise ValidationError(f"Duplicate form field {name!r}")
+        kind = spec.get("type", "string")
+        if kind not in FIELD_TYPES:
+            raise ValidationError(f"Unknown field type {kind!r} for {name!r}")
+        names.append(name)
+        specs.append((spec, kind))
+        renderers.append((name, spec.get("default"), _compile_renderer(spec, kind)))
+    return CompiledForm(key or schema_key(schema), tuple(names), _generate_check(specs), tuple(renderers))
+
+
+class FormCache:
+    """LRU of compiled forms keyed by ``schema_key``, so a schema edited in place compiles afresh."""
+
+    def __init__(self, capacity: int = FORM_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self._forms: "OrderedDict[str, CompiledForm]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, schema: Mapping[str, Any]) -> CompiledForm:
+        key = schema_key(schema)
+        with self._lock:
+            form = self._forms.get(key)
+            if form is not None:
+                self._forms.move_to_end(key)
+                self.hits += 1
+                return form
+        form = compile_form(schema, key)  # compiled outside the lock; a racing duplicate is harmless
+        with self._lock:
+            self.misses += 1
+            self._forms[key] = form
+            while len(self._forms) > self.capacity:
+                self._forms.popitem(last=False)
+                self.evictions += 1
+        return form
+
+    def clear(self) -> None:
+        with self._lock:
+            self._forms.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        return {"size": len(self._forms), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+FORMS = FormCache()
+
+
+def get_form(schema: Mapping[str, Any]) -> CompiledForm:
+    return FORMS.get(schema)
+
+
+def render(schema: dict, values: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    form = FORMS.get(schema)
+    return {"rendered": bool(schema), "key": form.key, "html": form.render(values)}
+
+
+def validate(schema: Mapping[str, Any], data: Mapping[str, Any]) -> Dict[str, Any]:
+    return FORMS.get(schema).validate(data)
+
+
+def validate_many(schema: Mapping[str, Any], rows: Iterable[Mapping[str, Any]]) -> FormBatch:
+    return FORMS.get(schema).validate_many(rows)
+
+
+__all__ = [
+    "FIELD_TYPES",
+    "FORMS",
+    "CompiledForm",
+    "FormBatch",
+    "FormCache",
+    "FormError",
+    "compile_form",
+    "get_form",
+    "render",
+    "schema_key",
+    "validate",
+    "validate_many",
+]
@@ -1,4 +1,219 @@
-"""Workflow builder stub."""
+"""Compile process definitions into immutable graphs.
+
+A definition is a dict with ``key``, ``version``, ``name``, a ``nodes`` list
+(``{"id", "type", ...}``) and an ``edges`` list (``{"from", "to",
+"condition"?}``). Node types are ``start``, ``end``, ``user_task``,
+``service_task``, ``exclusive`` and ``parallel``. A parallel gateway with
+several incoming edges is a join; one with several outgoing edges is a fork.
+
+``compile_definition`` validates the definition once: every exclusive gateway
+needs exactly one unconditional (default) edge, and end nodes a status from
+``END_STATUSES``, so a walk cannot dead-end at run time. Node ids become integer
+indexes, adjacency becomes tuples and edge conditions become predicates. The
+result is cached by ``(key, version)``, so starting an instance never touches
+the raw definition again. A ``form_schema`` is compiled the same way
+(``src.workflow.form_engine``).
+"""
+import operator
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from src.common.exceptions import ValidationError
+from src.workflow.form_engine import CompiledForm, get_form
+
+NODE_TYPES = ("start", "end", "user_task", "service_task", "exclusive", "parallel")
+END_STATUSES = ("approved", "rejected")
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, options: value in options,
+}
+
+Predicate = Callable[[Mapping[str, Any]], bool]
+
+
+@dataclass(frozen=True)
+class Node:
+    index: int
+    id: str
+    type: str
+    name: str
+    assignee: Any = None
+    action: Optional[str] = None
+    status: Optional[str] = None  # end nodes: "approved" / "rejected"
+    join_count: int = 1
+
+
+@dataclass(frozen=True)
+class Edge:
+    target: int
+    predicate: Optional[Predicate] = None
+
+
+@dataclass(frozen=True)
+class CompiledProcess:
+    key: str
+    version: int
+    name: str
+    nodes: Tuple[Node, ...]
+    outgoing: Tuple[Tuple[Edge, ...], ...]
+    index: Mapping[str, int]
+    start: int
+    form_schema: Optional[Mapping[str, Any]] = None
+    form: Optional[CompiledForm] = None
+
+    def node(self, node_id: str) -> Node:
+        return self.nodes[self.index[node_id]]
+
+
+def compile_condition(condition: Any) -> Optional[Predicate]:
+    """``"approved"`` (truthy), ``"!approved"`` (falsy) or ``{"var", "op", "value"}``."""
+    if condition is None:
+        return None
+    if isinstance(condition, str):
+        if condition.startswith("!"):
+            name = condition[1:]
+            return lambda variables: not variables.get(name)
+        return lambda variables: bool(variables.get(condition))
+    if isinstance(condition, Mapping):
+        name, op, expected = condition.get("var"), condition.get("op", "=="), condition.get("value")
+        compare = OPERATORS.get(op)
+        if not name or compare is None:
+            raise ValidationError(f"Invalid condition {condition!r}")
+
+        def predicate(variables, name=name, compare=compare, expected=expected):
+            try:
+                return compare(variables.get(name), expected)
+            except TypeError:
+                return False
+
+        return predicate
+    raise ValidationError(f"Invalid condition {condition!r}")
+
+
+def compile_definition(definition: Mapping[str, Any]) -> CompiledProcess:
+    key = definition.get("key")
+    if not key:
+        raise ValidationError("Process definition needs a key")
+    raw_nodes = definition.get("nodes") or []
+    index: Dict[str, int] = {}
+    for i, raw in enumerate(raw_nodes):
+        if raw.get("type") not in NODE_TYPES:
+            raise ValidationError(f"Node {raw.get('id')!r} has unknown type {raw.get('type')!r}")
+        if raw["id"] in index:
+            raise ValidationError(f"Duplicate node id {raw['id']!r}")
+        index[raw["id"]] = i
+
+    outgoing = [[] for _ in raw_nodes]
+    incoming = [0] * len(raw_nodes)
+    for raw in definition.get("edges") or []:
+        source, target = raw.get("from"), raw.get("to")
+        if source not in index or target not in index:
+            raise ValidationError(f"Edge {source!r} -> {target!r} references an unknown node")
+        outgoing[index[source]].append(Edge(index[target], compile_condition(raw.get("condition"))))
+        incoming[index[target]] += 1
+
+    starts = [i for i, raw in enumerate(raw_nodes) if raw["type"] == "start"]
+    if len(starts) != 1:
+        raise ValidationError("Process definition needs exactly one start node")
+    if not any(raw["type"] == "end" for raw in raw_nodes):
+        raise ValidationError("Process definition needs an end node")
+
+    nodes = []
+    for i, raw in enumerate(raw_nodes):
+        kind = raw["type"]
+        if kind != "end" and not outgoing[i]:
+            raise ValidationError(f"Node {raw['id']!r} has no outgoing edge")
+        if kind in ("start", "user_task", "service_task") and len(outgoing[i]) != 1:
+            raise ValidationError(f"Node {raw['id']!r} must have exactly one outgoing edge")
+        if kind == "exclusive" and sum(edge.predicate is None for edge in outgoing[i]) != 1:
+            raise ValidationError(f"Exclusive gateway {raw['id']!r} needs exactly one edge without a condition")
+        if kind == "end" and raw.get("status", "approved") not in END_STATUSES:
+            raise ValidationError(f"End node {raw['id']!r} has unknown status {raw.get('status')!r}")
+        nodes.append(
+            Node(
+                index=i,
+                id=raw["id"],
+                type=kind,
+                name=raw.get("name", raw["id"]),
+                assignee=raw.get("assignee"),
+                action=raw.get("action"),
+                status=raw.get("status", "approved") if kind == "end" else None,
+                join_count=incoming[i] if kind == "parallel" else 1,
+            )
+        )
+    return CompiledProcess(
+        key=key,
+        version=int(definition.get("version", 1)),
+        name=definition.get("name", key),
+        nodes=tuple(nodes),
+        outgoing=tuple(tuple(edges) for edges in outgoing),
+        index=MappingProxyType(index),
+        start=starts[0],
+        form_schema=definition.get("form_schema"),
+        form=get_form(definition["form_schema"]) if definition.get("form_schema") else None,
+    )
+
+
+class ProcessRegistry:
+    """Compiled processes cached by ``(key, version)``, plus the latest version per key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled: Dict[Tuple[str, int], CompiledProcess] = {}
+        self._latest: Dict[str, int] = {}
+        self.compilations = 0
+
+    def deploy(self, definition: Mapping[str, Any]) -> CompiledProcess:
+        cache_key = (definition.get("key"), int(definition.get("version", 1)))
+        compiled = self._compiled.get(cache_key)
+        if compiled is not None:
+            return compiled
+        compiled = compile_definition(definition)
+        with self._lock:
+            compiled = self._compiled.setdefault(cache_key, compiled)
+            if compiled.version >= self._latest.get(compiled.key, 0):
+                self._latest[compiled.key] = compiled.version
+            self.compilations += 1
+        return compiled
+
+    def get(self, key: str, version: Optional[int] = None) -> CompiledProcess:
+        if version is None:
+            version = self._latest.get(key)
+        compiled = self._compiled.get((key, version))
+        if compiled is None:
+            raise ValidationError(f"Process {key!r} version {version} is not deployed")
+        return compiled
+
+
+REGISTRY = ProcessRegistry()
+
 
 def build(definition: dict):
-    return {"built": definition.get("name", "process")}
+    compiled = REGISTRY.deploy(definition)
+    return {
+        "built": definition.get("name", "process"),
+        "key": compiled.key,
+        "version": compiled.version,
+        "nodes": len(compiled.nodes),
+    }
+
+
+__all__ = [
+    "CompiledProcess",
+    "END_STATUSES",
+    "Edge",
+    "Node",
+    "NODE_TYPES",
+    "ProcessRegistry",
+    "REGISTRY",
+    "build",
+    "compile_condition",
+    "compile_definition",
+]
@@ -1,4 +1,27 @@
-"""Workflow task executor stub."""
+"""Service-task handlers for the workflow engine.
 
-def execute(task: dict):
-    return {"executed": task.get("id")}
+Handlers are registered by action name and called with the task dict and the
+instance variables; whatever mapping they return is merged back into the
+variables. Unknown actions are a no-op, so a definition can reference
+integrations that are not wired up in this deployment.
+"""
+from typing import Any, Callable, Dict, Mapping, Optional
+
+HANDLERS: Dict[str, Callable[[Mapping[str, Any], Dict[str, Any]], Optional[Mapping[str, Any]]]] = {}
+
+
+def register(action: str):
+    def decorator(handler):
+        HANDLERS[action] = handler
+        return handler
+
+    return decorator
+
+
+def execute(task: dict, variables: Optional[Dict[str, Any]] = None):
+    handler = HANDLERS.get(task.get("action"))
+    result = handler(task, variables if variables is not None else {}) if handler is not None else None
+    return {"executed": task.get("id"), "result": result}
+
+
+__all__ = ["HANDLERS", "execute", "register"]
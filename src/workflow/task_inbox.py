@@ -0,0 +1,212 @@
+"""In-memory secondary index over workflow tasks.
+
+Mirrors ``idx_task_assignee`` from ``schema.sql``. Tasks are bucketed by
+``(assignee, status)``, and each bucket is a list kept sorted by
+``(created_at, task_id)``. A "my open tasks" page is then a bisect plus a slice,
+O(log n + limit), instead of a scan over every task. The workflow engine keeps
+the index in sync as tasks are opened, completed or cancelled. Subscribers
+registered per assignee get a notification for every change, which the web
+layer pushes to connected browsers.
+"""
+import bisect
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+OPEN, COMPLETED, CANCELLED = "open", "completed", "cancelled"
+STATUSES = (OPEN, COMPLETED, CANCELLED)
+
+SortKey = Tuple[float, int]  # (created_at, task_id)
+
+
+class InboxSubscription:
+    """Bounded per-connection notification queue; the oldest notice is dropped when full."""
+
+    def __init__(self, assignee: Hashable, maxsize: int = 256):
+        self.assignee = assignee
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=maxsize)
+
+    def put(self, notice: Dict[str, Any]) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(notice)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class TaskInbox:
+    def __init__(self, closed_capacity: int = 100_000):
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[Hashable, str], List[SortKey]] = {}
+        self._items: Dict[int, Tuple[Hashable, str, SortKey, Dict[str, Any]]] = {}
+        self._closed: Deque[int] = deque()
+        self.closed_capacity = closed_capacity
+        self._subscribers: Dict[Hashable, List[InboxSubscription]] = {}
+
+    # --- index maintenance -----------------------------------------------
+    def add(self, task_id: int, assignee: Hashable, item: Dict[str, Any], created_at: Optional[float] = None) -> None:
+        key = (created_at if created_at is not None else time.time(), task_id)
+        item = dict(item, id=task_id, assignee=assignee, status=OPEN, created_at=key[0])
+        with self._lock:
+            if task_id in self._items:
+                self._unlink(task_id)
+            self._items[task_id] = (assignee, OPEN, key, item)
+            bisect.insort(self._buckets.setdefault((assignee, OPEN), []), key)
+        self._notify(assignee, {"type": "task.opened", "task": item})
+
+    def update(self, task_id: int, status: str, **changes) -> Optional[Dict[str, Any]]:
+        """Move a task to ``status`` (re-indexing it) and merge ``changes`` into its item."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown task status {status!r}")
+        with self._lock:
+            entry = self._items.get(task_id)
+            if entry is None:
+                return None
+            assignee, old_status, key, item = entry
+            item = dict(item, status=status, **changes)
+            if old_status != status:
+                self._remove_key(assignee, old_status, key)
+                bisect.insort(self._buckets.setdefault((assignee, status), []), key)
+                if status != OPEN:
+                    self._closed.append(task_id)
+            self._items[task_id] = (assignee, status, key, item)
+            self._evict_closed()
+        self._notify(assignee, {"type": f"task.{status}", "task": item})
+        return item
+
+    def remove(self, task_id: int) -> bool:
+        with self._lock:
+            return self._unlink(task_id)
+
+    def _unlink(self, task_id: int) -> bool:
+        entry = self._items.pop(task_id, None)
+        if entry is None:
+            return False
+        assignee, status, key, _ = entry
+        self._remove_key(assignee, status, key)
+        return True
+
+    def _remove_key(self, assignee: Hashable, status: str, key: SortKey) -> None:
+        bucket = self._buckets.get((assignee, status))
+        if not bucket:
+            return
+        idx = bisect.bisect_left(bucket, key)
+        if idx < len(bucket) and bucket[idx] == key:
+            del bucket[idx]
+        if not bucket:
+            del self._buckets[(assignee, status)]
+
+    def _evict_closed(self) -> None:
+        while len(self._closed) > self.closed_capacity:
+            task_id = self._closed.popleft()
+            entry = self._items.get(task_id)
+            if entry is not None and entry[1] != OPEN:
+                self._unlink(task_id)
+
+    # --- queries ---------------------------------------------------------
+    def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._items.get(task_id)
+        return entry[3] if entry else None
+
+    def ids(self, assignee: Hashable, status: str = OPEN) -> List[int]:
+        with self._lock:
+            return [task_id for _, task_id in self._buckets.get((assignee, status), ())]
+
+    def count(self, assignee: Hashable, status: str = OPEN) -> int:
+        return len(self._buckets.get((assignee, status), ()))
+
+    def page(
+        self,
+        assignee: Hashable,
+        status: str = OPEN,
+        cursor: Optional[SortKey] = None,
+        limit: int = 20,
+        newest_first: bool = True,
+    ) -> Tuple[List[Dict[str, Any]], Optional[SortKey]]:
+        """One page of tasks plus the cursor for the next page (``None`` when exhausted)."""
+        limit = max(1, limit)
+        with self._lock:
+            bucket = self._buckets.get((assignee, status), [])
+            if newest_first:
+                end = bisect.bisect_left(bucket, cursor) if cursor is not None else len(bucket)
+                start = max(0, end - limit)
+                keys = bucket[start:end][::-1]
+                more = start > 0
+            else:
+                start = bisect.bisect_right(bucket, cursor) if cursor is not None else 0
+                keys = bucket[start:start + limit]
+                more = start + limit < len(bucket)
+            items = [self._items[task_id][3] for _, task_id in keys]
+        return items, (keys[-1] if keys and more else None)
+
+    # --- push notifications ----------------------------------------------
+    def subscribe(self, assignee: Hashable, maxsize: int = 256) -> InboxSubscription:
+        subscription = InboxSubscription(assignee, maxsize)
+        with self._lock:
+            self._subscribers.setdefault(assignee, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: InboxSubscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(subscription.assignee, [])
+            if subscription in subs:
+                subs.remove(subscription)
+            if not subs:
+                self._subscribers.pop(subscription.assignee, None)
+
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def _notify(self, assignee: Hashable, notice: Dict[str, Any]) -> None:
+        for subscription in tuple(self._subscribers.get(assignee, ())):
+            subscription.put(notice)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def encode_cursor(cursor: Optional[SortKey]) -> Optional[str]:
+    return None if cursor is None else f"{cursor[0]!r}:{cursor[1]}"
+
+
+def decode_cursor(raw: Optional[str]) -> Optional[SortKey]:
+    """Parse ``encode_cursor`` output; malformed cursors raise ``ValueError``."""
+    if not raw:
+        return None
+    created_at, _, task_id = raw.rpartition(":")
+    return float(created_at), int(task_id)
+
+
+INBOX = TaskInbox()
+
+
+def get_inbox() -> TaskInbox:
+    return INBOX
+
+
+__all__ = [
+    "CANCELLED",
+    "COMPLETED",
+    "INBOX",
+    "InboxSubscription",
+    "OPEN",
+    "STATUSES",
+    "TaskInbox",
+    "decode_cursor",
+    "encode_cursor",
+    "get_inbox",
+]
@@ -0,0 +1,10 @@
+"""Point log and audit output at a scratch directory before any settings are imported."""
+import atexit
+import os
+import shutil
+import tempfile
+
+_SCRATCH = tempfile.mkdtemp(prefix="erp-tests-")
+os.environ["APP_LOG_DIR"] = os.path.join(_SCRATCH, "logs")
+os.environ["APP_AUDIT_DIR"] = os.path.join(_SCRATCH, "audit")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)  # registered first, so it runs after the loggers close
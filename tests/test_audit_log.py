@@ -0,0 +1,83 @@
+"""Hash-chained audit store tests."""
+import os
+import time
+
+from src.dao.log_dao import RECORD, SEGMENT_HEADER, AuditStore
+from src.jobs.audit_verify import verify
+
+
+def _fill(directory, records=600, segment_bytes=16 * 1024):
+    store = AuditStore(str(directory), segment_bytes=segment_bytes, index_interval=16, fsync=False)
+    for i in range(records):
+        store.append(f"user{i % 7}", "login" if i % 3 else "export", {"i": i})
+        if i % 100 == 99:
+            store.flush()
+    store.flush()
+    return store
+
+
+def test_query_uses_actor_and_time_and_survives_reopen(tmp_path):
+    store = _fill(tmp_path)
+    assert len(store.segments()) > 2
+    records = store.query(actor="user3")
+    assert [r.detail["i"] for r in records] == list(range(3, 600, 7))
+    assert all(r.actor == "user3" and len(r.hash) == 64 for r in records)
+    assert [r.id for r in store.query(actor="user3", action="export", limit=2)] == [4, 25]
+
+    middle = records[40].created_at.timestamp()
+    assert store.query(since=middle, until=middle)[0].id == records[40].id
+    assert store.query(until=time.time() - 3600) == []
+    store.close()
+
+    reopened = AuditStore(str(tmp_path), segment_bytes=16 * 1024, index_interval=16, fsync=False)
+    assert reopened.append("user1", "login") == 601
+    assert len(reopened.query(actor="user1")) == len(records) + 1
+    reopened.close()
+    report = verify(str(tmp_path), workers=2)
+    assert report["ok"] and report["records"] == 601 and report["segments"] == len(reopened.segments())
+
+
+def test_verify_detects_tampering_and_missing_segments(tmp_path):
+    store = _fill(tmp_path)
+    store.close()
+    paths = store.segments()
+    assert verify(str(tmp_path), workers=1)["ok"]
+
+    with open(paths[1], "r+b") as fh:  # flip one byte inside the first record's detail
+        fh.seek(SEGMENT_HEADER.size + RECORD.size + 2)
+        byte = fh.read(1)
+        fh.seek(-1, os.SEEK_CUR)
+        fh.write(bytes([byte[0] ^ 1]))
+    report = verify(str(tmp_path), workers=2)
+    assert not report["ok"] and "hash mismatch" in report["errors"][0]
+
+    os.remove(paths[1])
+    report = verify(str(tmp_path), workers=1)
+    assert any("anchor does not match" in error for error in report["errors"])
+
+
+def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    store = _fill(tmp_path, records=10)
+    store.close()
+    active = store.segments()[-1]
+    with open(active, "ab") as fh:
+        fh.write(b"\x01\x02\x03")
+    reopened = AuditStore(str(tmp_path), fsync=False)
+    assert reopened.append("user1", "login") == 11
+    reopened.close()
+    assert verify(str(tmp_path), workers=1)["ok"]
+
+
+def test_long_actor_and_action_are_hashed_into_the_record(tmp_path):
+    store = AuditStore(str(tmp_path), fsync=False)
+    name = "欧阳司马长孙上官诸葛慕容"  # 36 bytes in UTF-8
+    action = "permission.change." + "x" * 40
+    store.append(name, "login", {"ip": "127.0.0.1"})
+    store.append("~short", action)
+    store.append("alice", "login")
+    [record] = store.query(actor=name)
+    assert record.actor == name and record.detail == {"ip": "127.0.0.1"}
+    assert [(r.actor, r.action) for r in store.query(action=action)] == [("~short", action)]
+    assert [r.actor for r in store.query(action="login")] == [name, "alice"]
+    store.close()
+    assert verify(str(tmp_path))["ok"]
@@ -0,0 +1,62 @@
+"""Password hashing and verifier tests."""
+import pytest
+
+from src.services.credentials import (
+    UNUSABLE,
+    CredentialsBusy,
+    CredentialVerifier,
+    check_password,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
+
+
+def test_check_upgrades_weak_and_plaintext_entries():
+    weak = hash_password("pw", iterations=1000)
+    assert not needs_rehash(weak, 1000) and needs_rehash(weak, 2000)
+    ok, upgraded = check_password("pw", weak, iterations=2000)
+    assert ok and upgraded.startswith("pbkdf2_sha256$2000$")
+    assert check_password("pw", upgraded, iterations=2000) == (True, None)
+    assert check_password("bad", weak, iterations=2000) == (False, None)
+
+    ok, upgraded = check_password("legacy", "legacy", iterations=1000)
+    assert ok and not needs_rehash(upgraded, 1000)
+    assert check_password("", UNUSABLE) == (False, None)
+
+
+def test_corrupt_stored_hashes_never_match():
+    salt, digest = hash_password("pw", iterations=1000).split("$")[2:]
+    for corrupt in (
+        f"pbkdf2_sha256$abc${salt}${digest}",
+        f"pbkdf2_sha256$0${salt}${digest}",
+        f"pbkdf2_sha256$1000$a${digest}",
+        f"pbkdf2_sha256$1000${salt}$a",
+    ):
+        assert verify_password("pw", corrupt) is False
+        assert check_password("pw", corrupt, iterations=1000) == (False, None)
+
+
+def test_verifier_runs_checks_on_the_pool():
+    verifier = CredentialVerifier(workers=1, iterations=1000).start()
+    try:
+        stored = verifier.hash("s3cret")
+        assert verifier.check("s3cret", stored) == (True, None)
+        assert verifier.check("s3cret", None) == (False, None)
+        ok, upgraded = verifier.check("old", "old")
+        assert ok and upgraded.startswith("pbkdf2_sha256$1000$")
+        assert verifier.metrics() == {
+            "workers": 1, "iterations": 1000, "inflight": 0, "verified": 2, "rejected": 1, "rehashed": 1, "busy": 0,
+        }
+    finally:
+        verifier.close()
+
+
+def test_verifier_rejects_when_every_slot_is_taken():
+    verifier = CredentialVerifier(workers=0, max_pending=1, wait=0.01, iterations=1000)
+    verifier._slots.acquire()
+    with pytest.raises(CredentialsBusy):
+        verifier.check("pw", None)
+    verifier._slots.release()
+    assert verifier.check("pw", hash_password("pw", 1000)) == (True, None)
+    assert verifier.metrics()["busy"] == 1
@@ -0,0 +1,128 @@
+"""DAO layer tests against an in-memory SQLite pool."""
+import threading
+
+import pytest
+
+from src.dao.base import ConnectionPool, PoolTimeoutError, ensure_schema
+from src.dao.document_dao import DocumentDAO
+from src.dao.finance_dao import ExpenseClaimDAO
+from src.dao.process_dao import ProcessDefinitionDAO
+from src.dao.user_dao import UserDAO
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool("sqlite:///:memory:", size=3, timeout=0.2)
+    ensure_schema(pool)
+    yield pool
+    pool.close()
+
+
+def test_insert_many_and_keyset_pages(pool):
+    dao = DocumentDAO(pool)
+    docs = ({"name": f"d{i}", "path": f"/d/{i}", "type": "txt", "owner_id": 1, "folder_id": i % 2} for i in range(250))
+    assert dao.insert_many(docs, batch_size=64) == 250
+    assert dao.count() == 250
+
+    first = dao.page(limit=100)
+    second = dao.page(after=first[-1]["id"], limit=100)
+    assert [r["id"] for r in first] == list(range(1, 101))
+    assert second[0]["id"] == 101
+    assert len(list(dao.iter_all(batch_size=40))) == 250
+    assert all(r["folder_id"] == 1 for r in dao.by_folder(1, limit=500))
+    assert len(dao.by_folder(1, limit=500)) == 125
+
+
+def test_user_lookup_and_claim_transaction(pool):
+    users = UserDAO(pool)
+    users.insert({"username": "alice", "password": "x", "real_name": "Alice"})
+    assert users.find_by_username("alice")["real_name"] == "Alice"
+    assert users.existing_usernames(["alice", "bob"]) == {"alice"}
+
+    claims = ExpenseClaimDAO(pool)
+    claim_id = claims.create_claim({"employee_id": 7}, [{"amount": 10, "category": "taxi"}, {"amount": 5, "category": "meal"}])
+    assert claims.get(claim_id)["total_amount"] == 15
+    assert len(claims.items(claim_id)) == 2
+
+    defs = ProcessDefinitionDAO(pool)
+    defs.insert_many([{"name": "Leave", "key": "leave", "version": v} for v in (1, 2)])
+    assert defs.latest("leave")["version"] == 2
+
+
+def test_failed_transaction_rolls_back(pool):
+    dao = UserDAO(pool)
+    with pytest.raises(Exception):
+        dao.insert_many([{"username": "dup", "password": "x", "real_name": "A"}] * 2)
+    assert dao.count() == 0
+
+
+def test_pool_is_bounded(pool):
+    held = [pool.acquire() for _ in range(pool.size)]
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    released = threading.Timer(0.05, pool.release, args=(held.pop(),))
+    released.start()
+    conn = pool.acquire()
+    assert conn is not None
+    for c in held + [conn]:
+        pool.release(c)
+
+
+def test_close_drains_idle_connections(tmp_path):
+    pool = ConnectionPool(f"sqlite:///{tmp_path / 'closed.sqlite3'}", size=2)
+    pool.release(pool.acquire())
+    pool.close()
+    with pool.connection() as conn:  # a fresh connection, not a closed one from the idle queue
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    pool.close()
+
+
+def test_unsupported_dsn_rejected():
+    with pytest.raises(ValueError):
+        ConnectionPool("mysql+pymysql://u:p@localhost/erp")
+
+
+def test_data_scopes_push_department_filters_into_queries(pool):
+    from src.dao.department_dao import DepartmentDAO
+    from src.services.data_scope import DataScopes, id_predicate
+    from src.services.org_tree import OrgTree
+
+    depts = DepartmentDAO(pool)
+    hq = depts.insert({"name": "HQ"})
+    sales = depts.insert({"name": "Sales", "parent_id": hq})
+    north = depts.insert({"name": "North", "parent_id": sales})
+    ops = depts.insert({"name": "Ops", "parent_id": hq})
+    users = UserDAO(pool)
+    ids = {
+        name: users.insert({"username": name, "password": "x", "real_name": name, "dept_id": dept})
+        for name, dept in (("ceo", hq), ("sam", sales), ("nina", north), ("otto", ops))
+    }
+    docs = DocumentDAO(pool)
+    docs.insert_many({"name": n, "path": "/" + n, "type": "txt", "owner_id": ids[n]} for n in ids)
+    claims = ExpenseClaimDAO(pool)
+    with pool.connection() as conn:
+        for n in ids:
+            conn.execute("INSERT INTO employee (user_id, hire_date) VALUES (?, '2024-01-01')", (ids[n],))
+        employee = dict(conn.execute("SELECT user_id, id FROM employee").fetchall())
+    claims.insert_many({"employee_id": employee[ids[n]], "total_amount": 1} for n in ids)
+
+    scopes = DataScopes(OrgTree(depts, users), users)
+    scopes.set_scope(ids["sam"], "department_tree")
+    sam = scopes.scope_for(ids["sam"])
+    assert sam.departments == {sales, north}
+    assert {u["username"] for u in users.page(scope=sam)} == {"sam", "nina"}
+    assert {d["name"] for d in docs.iter_all(scope=sam)} == {"sam", "nina"}
+    assert claims.count(scope=sam) == 2
+    assert docs.count(where="type = ?", params=("txt",), scope=scopes.set_scope(ids["otto"], "self")) == 1
+    assert claims.count(scope=scopes.scope_for(ids["otto"])) == 1
+    assert users.count(scope=scopes.set_scope(ids["ceo"], "all")) == 4
+    assert docs.count(scope=scopes.set_scope(ids["nina"], "department")) == 1
+
+    west = depts.insert({"name": "West", "parent_id": sales})
+    scopes.org.add(west, sales)
+    users.insert({"username": "wes", "password": "x", "real_name": "wes", "dept_id": west})
+    assert scopes.scope_for(ids["sam"]) is not sam
+    assert users.count(scope=scopes.scope_for(ids["sam"])) == 3
+
+    assert id_predicate("d", [1, 2, 3, 4, 9, 11]) == "(d BETWEEN 1 AND 4 OR d IN (9, 11))"
+    assert id_predicate("d", [7]) == "d = 7" and id_predicate("d", []) == "0 = 1"
@@ -0,0 +1,107 @@
+"""Event bus, hooks and listener wiring tests."""
+import threading
+
+import pytest
+
+from src.events import hooks, listeners
+from src.events.event_bus import EventBus
+from src.events.listeners import finance_listener
+
+
+@pytest.fixture
+def bus():
+    bus = EventBus(mode="thread", workers=2)
+    yield bus
+    bus.stop()
+
+
+def test_fan_out_in_order_micro_batches(bus):
+    seen_a, seen_b, sizes = [], [], []
+
+    def collect(events):
+        sizes.append(len(events))
+        seen_a.extend(e.payload for e in events)
+
+    bus.subscribe("order.*", collect, batch_size=50)
+    bus.subscribe("order.created", lambda e: seen_b.append(e.payload), batch=False)
+    for i in range(500):
+        bus.publish("order.created", i)
+    assert bus.publish("other.topic", 1) == 0
+    assert bus.flush(5)
+    assert seen_a == list(range(500))
+    assert seen_b == list(range(500))
+    assert max(sizes) <= 50
+    assert bus.metrics()["unrouted"] == 1
+
+
+def test_drop_oldest_when_queue_is_full(bus):
+    gate = threading.Event()
+    seen = []
+
+    def slow(events):
+        gate.wait(5)
+        seen.extend(e.payload for e in events)
+
+    sub = bus.subscribe("t", slow, capacity=10, batch_size=1)
+    for i in range(100):
+        bus.publish("t", i)
+    gate.set()
+    assert bus.flush(5)
+    stats = sub.metrics()
+    assert stats["dropped"] >= 80
+    assert stats["delivered"] == len(seen)
+    assert stats["delivered"] + stats["dropped"] == 100
+    assert seen[-1] == 99
+
+
+def test_drop_newest_rejects_and_errors_are_counted(bus):
+    gate = threading.Event()
+
+    def failing(events):
+        gate.wait(5)
+        raise RuntimeError("boom")
+
+    sub = bus.subscribe("t", failing, capacity=2, overflow="drop_newest", batch_size=1)
+    accepted = [bus.publish("t", i) for i in range(10)]
+    gate.set()
+    assert bus.flush(5)
+    assert accepted.count(0) >= 7
+    stats = sub.metrics()
+    assert stats["errors"] == stats["batches"] > 0
+    assert "boom" in stats["last_error"]
+
+
+def test_asyncio_dispatch_with_coroutine_handlers():
+    bus = EventBus(mode="asyncio")
+    seen = []
+
+    async def handler(events):
+        seen.extend(e.payload for e in events)
+
+    bus.subscribe("*", handler)
+    for i in range(200):
+        bus.publish(f"x.{i % 3}", i)
+    assert bus.flush(5)
+    bus.stop()
+    assert seen == list(range(200))
+
+
+def test_hooks_allow_several_handlers(bus):
+    calls = []
+    first = hooks.register("invoice.paid", lambda e: calls.append(("a", e.payload)), bus=bus)
+    hooks.register("invoice.paid", lambda e: calls.append(("b", e.payload)), bus=bus)
+    assert len(hooks.HOOKS["invoice.paid"]) == 2
+    bus.publish("invoice.paid", 7)
+    bus.flush(5)
+    assert sorted(calls) == [("a", 7), ("b", 7)]
+    assert hooks.unregister("invoice.paid", first, bus=bus)
+    assert len(hooks.HOOKS["invoice.paid"]) == 1
+
+
+def test_listeners_receive_batches(bus):
+    listeners.attach(bus)
+    before = finance_listener.TOTALS["carol"]
+    for _ in range(10):
+        bus.publish("finance.expense.submitted", {"submitted_by": "carol", "expense": {"amount": "12.5"}})
+    bus.flush(5)
+    assert finance_listener.TOTALS["carol"] - before == pytest.approx(125.0)
@@ -0,0 +1,110 @@
+"""Form compiler tests."""
+import pytest
+
+from src.common.exceptions import ValidationError
+from src.services.developer import DeveloperService
+from src.workflow.engine import WorkflowEngine
+from src.workflow.form_engine import FormCache, FormError, compile_form
+from src.workflow.process_builder import ProcessRegistry
+
+SCHEMA = {
+    "fields": [
+        {"name": "title", "label": "Title <short>", "required": True, "max_length": 10},
+        {"name": "amount", "type": "number", "required": True, "min": 0, "max": 5000},
+        {"name": "days", "type": "integer", "default": 1},
+        {"name": "urgent", "type": "boolean"},
+        {"name": "start", "type": "date"},
+        {"name": "kind", "type": "select", "options": ["travel", "meal"]},
+        {"name": "code", "pattern": "[A-Z]{2}-\\d+"},
+    ]
+}
+
+
+def test_validate_coerces_and_reports_every_field():
+    form = compile_form(SCHEMA)
+    cleaned = form.validate({"title": "Trip", "amount": "120.5", "urgent": "on", "kind": "travel", "code": "AB-1"})
+    assert cleaned == {"title": "Trip", "amount": 120.5, "days": 1, "urgent": True, "kind": "travel", "code": "AB-1"}
+
+    with pytest.raises(FormError) as exc:
+        form.validate({"title": "x" * 11, "amount": 9000, "days": 1.5, "start": "2024-13-01", "kind": "car", "code": "a"})
+    assert exc.value.errors == {
+        "title": "length must be at most 10",
+        "amount": "value must be at most 5000",
+        "days": "must be an integer",
+        "start": "must be a YYYY-MM-DD date",
+        "kind": "is not one of the options",
+        "code": "has an invalid format",
+    }
+
+
+def test_validate_many_and_render():
+    form = compile_form(SCHEMA)
+    batch = form.validate_many([{"title": "a", "amount": 1}, {"amount": 1}, {"title": "b", "amount": -1}])
+    assert [i for i, _ in batch.valid] == [0]
+    assert batch.errors == {1: {"title": "is required"}, 2: {"amount": "value must be at least 0"}}
+
+    html = form.render({"title": '"><script>', "kind": "meal", "urgent": True})
+    assert "Title &lt;short&gt;" in html and "&quot;&gt;&lt;script&gt;" in html
+    assert '<option value="meal" selected>' in html and "checked" in html and 'value="1"' in html
+
+
+def test_cache_is_keyed_by_schema_content_with_lru_eviction():
+    cache = FormCache(capacity=2)
+    first = cache.get({"fields": [{"name": "a"}]})
+    assert cache.get({"fields": [{"name": "a"}]}) is first
+    cache.get({"fields": [{"name": "b"}]})
+    cache.get({"fields": [{"name": "c"}]})
+    assert cache.get({"fields": [{"name": "a"}]}) is not first
+    assert cache.metrics() == {"size": 2, "hits": 1, "misses": 4, "evictions": 2}
+    with pytest.raises(ValidationError):
+        cache.get({"fields": [{"name": "a", "type": "select"}]})
+
+    schema = {"fields": [{"name": "title", "type": "string"}]}
+    assert cache.get(schema).validate({"title": "x"}) == {"title": "x"}
+    schema["fields"].append({"name": "amount", "type": "number", "required": True})  # edited in place
+    with pytest.raises(FormError):
+        cache.get(schema).validate({"title": "x"})
+
+
+def test_process_form_validates_start_variables():
+    definition = {
+        "key": "leave",
+        "form_schema": {"fields": [{"name": "days", "type": "integer", "required": True, "min": 1}]},
+        "nodes": [{"id": "s", "type": "start"}, {"id": "e", "type": "end"}],
+        "edges": [{"from": "s", "to": "e"}],
+    }
+    engine = WorkflowEngine(registry=ProcessRegistry())
+    engine.deploy(definition)
+    assert engine.start("leave", {"days": "3", "note": "x"}).variables == {"days": 3, "note": "x"}
+    with pytest.raises(FormError):
+        engine.start("leave", {"days": 0})
+
+    designed = DeveloperService().form_designer(definition["form_schema"])
+    assert designed["fields"] == ["days"] and designed["preview"].startswith("<form")
+
+
+def test_field_names_never_reach_generated_source():
+    name = "x'] = 1\nimport os  #\""
+    form = compile_form({"fields": [{"name": name, "required": True, "pattern": "\\d+"}]})
+    assert form.check({}) == ({}, {name: "is required"})
+    assert form.check({name: "42"}) == ({name: "42"}, None)
+
+
+def test_empty_selections_non_finite_numbers_and_bad_bounds():
+    form = compile_form({
+        "fields": [
+            {"name": "tags", "type": "multiselect", "options": ["a", "b"], "required": True},
+            {"name": "rate", "type": "number"},
+        ]
+    })
+    assert form.check({"tags": [], "rate": "nan"})[1] == {"tags": "is required", "rate": "must be a finite number"}
+    assert form.check({"tags": ["a"], "rate": float("inf")})[1] == {"rate": "must be a finite number"}
+    assert form.check({"tags": ("b",), "rate": 1.5}) == ({"tags": ["b"], "rate": 1.5}, None)
+    for field in (
+        {"name": "n", "type": "number", "min": "5"},
+        {"name": "s", "max_length": True},
+        {"name": "k", "type": "select", "options": "ab"},
+        {"name": "k", "type": "select", "options": [["a"]]},
+    ):
+        with pytest.raises(ValidationError):
+            compile_form({"fields": [field]})
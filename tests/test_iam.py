@@ -1,4 +1,174 @@
-"""Basic smoke test for ${f}."""
+"""IAM service and authorization tests."""
+from src.services.authz import AuthzCache, PermissionIndex
+
 
 def test_smoke():
     assert True
+
+
+def test_permission_index_flattens_parent_permissions():
+    index = PermissionIndex()
+    index.load(
+        permissions=[
+            {"id": 1, "code": "module:finance", "parent_id": None},
+            {"id": 2, "code": "finance:expense:approve", "parent_id": 1},
+            {"id": 3, "code": "finance:expense:export", "parent_id": 2},
+            {"id": 4, "code": "module:hrm", "parent_id": None},
+        ],
+        role_permissions=[{"role_id": 10, "permission_id": 1}],
+        user_roles=[{"user_id": 7, "role_id": 10}],
+    )
+    assert index.permissions_for(7) == {"module:finance", "finance:expense:approve", "finance:expense:export"}
+    assert not index.has_permission(7, "module:hrm")
+    index.grant(10, 4)
+    assert index.has_permission(7, "module:hrm")
+
+
+def test_authz_cache_compiles_mask_and_invalidates_on_role_change():
+    index = PermissionIndex()
+    index.add_permission(1, "module:crm")
+    index.grant(5, 1)
+    cache = AuthzCache(["office", "oa", "crm"], index)
+    user = {"id": 7, "modules": ["office"], "role": "user"}
+
+    grants = cache.grants("alice", user)
+    assert grants.modules == ("office",)
+    assert grants.mask & cache.bit("office") and not grants.mask & cache.bit("crm")
+    assert cache.grants("alice", user) is grants
+    assert not cache.mask_of(["unknown"]) & grants.mask
+
+    index.assign_role(7, 5)  # keyed by user id, as IAMService.assign_role does
+    grants = cache.grants("alice", user)
+    assert grants.modules == ("office", "crm")
+    assert grants.mask == cache.mask_of(["office", "crm"])
+    index.revoke_role(7, 5)
+    assert cache.grants("alice", user).modules == ("office",)
+
+
+def test_abac_policies_compile_index_and_memoize():
+    import pytest
+
+    from src.common.exceptions import ValidationError
+    from src.services.abac import Attributes, PolicyEngine
+
+    engine = PolicyEngine()
+    engine.define(
+        "same-dept", 'subject.department == resource.department and action in ["read", "approve"]', resources=["expense"]
+    )
+    engine.define("senior", "subject.level >= 3 and not subject.tags['intern']", resources="expense")
+    engine.define("frozen", 'subject.status == "frozen"', effect="deny")
+    alice = Attributes(id=1, department="HQ", level=1, status="active", tags={"intern": True})
+    assert engine.decide(alice, "expense", "read", {"department": "HQ"})
+    assert not engine.decide(alice, "expense", "delete", {"department": "HQ"})
+    assert not engine.decide(alice, "contract", "read", {"department": "HQ"})
+    assert engine.decide({"level": 4, "tags": {}}, "expense", "delete")
+    assert not engine.decide({"level": None}, "expense", "delete")  # None >= 3 is just false
+    assert not engine.decide({"level": 4, "tags": {}, "status": "frozen"}, "expense", "delete")
+
+    boss = Attributes(level=5, tags={})
+    assert engine.decide(boss, "expense", "export") and engine.decide(boss, "expense", "export")
+    evaluations = engine.metrics()["evaluations"]
+    assert engine.decide(Attributes(level=5, tags={}), "expense", "export")  # equal attributes share the memo
+    assert engine.metrics()["evaluations"] == evaluations
+
+    seen = []
+    engine.subscribe(seen.append)
+    engine.define("senior", "subject.level >= 9", resources=["expense"])
+    assert not engine.decide(boss, "expense", "export") and seen == [engine.generation]
+
+    for bad in ("__import__('os')", "subject.x.__class__ == 1 or open('f')", "[x for x in subject]", "foo == 1", ""):
+        with pytest.raises(ValidationError):
+            engine.define("bad", bad)
+
+
+
+def test_abac_memoizes_nested_subject_attributes():
+    from src.services.abac import PolicyEngine
+
+    engine = PolicyEngine()
+    engine.define("admin", 'subject.profile["grade"] >= 3')
+    assert engine.decide({"roles": [{"id": 1}], "groups": [["a"]], "profile": {"grade": 4}}, "expense", "read")
+    assert not engine.decide({"roles": [{"id": 2}], "groups": [{"b"}], "profile": {"grade": 1}}, "expense", "read")
+    assert engine.metrics()["memo"] == 2
+
+    engine.define("tagged", 'subject.tags == ["a", "b"] and subject.tags != ("b", "a") and "x" not in ["y"]')
+    assert engine.decide({"tags": ["a", "b"]}, "contract", "read")
+    assert not engine.decide({"tags": ["b", "a"]}, "contract", "read")
+    assert engine.decide({"profile": {"grade": 3}, "opaque": bytearray(b"x")}, "expense", "read")  # not memoized
+    assert engine.metrics()["memo"] == 2
+
+def test_org_tree_intervals_survive_inserts_moves_and_roll_up_headcount():
+    import random
+
+    import pytest
+
+    from src.common.exceptions import ValidationError
+    from src.services import org_tree
+    from src.services.org_tree import OrgTree
+
+    tree = OrgTree()
+    tree.load([{"id": 1, "parent_id": None, "leader_id": 100}, {"id": 2, "parent_id": 1}], headcount={1: 2, 2: 3})
+    tree.add(3, 1, leader_id=300)
+    tree.add(4, 3)
+    assert tree.subtree(1) == {1, 2, 3, 4} and tree.subtree(3) == {3, 4}
+    assert tree.ancestors(4) == (3, 1) and tree.reporting_chain(4) == [300, 100]
+    assert tree.rollup("staff", 1) == 5
+    tree.add_value("staff", 4, 7)
+    assert tree.rollup("staff", 3) == 7 and tree.rollup("staff", 1) == 12
+
+    tree.move(3, 2)
+    assert tree.is_ancestor(2, 4) and not tree.is_ancestor(3, 2)
+    assert tree.ancestors(4) == (3, 2, 1) and tree.rollup("staff", 2) == 10
+    with pytest.raises(ValidationError):
+        tree.move(2, 4)
+
+    # Random growth with a tiny label gap forces relabels; every answer must match a plain parent walk.
+    rng = random.Random(5)
+    org_tree.GAP, saved = 8, org_tree.GAP
+    try:
+        for dept in range(5, 300):
+            tree.add(dept, rng.choice(list(tree._parent)))
+            if dept % 7 == 0:
+                target, parent = rng.randrange(2, dept), rng.randrange(1, dept)
+                if not tree.is_ancestor(target, parent):
+                    tree.move(target, parent)
+    finally:
+        org_tree.GAP = saved
+    assert tree.relabels > 1
+
+    def walk(dept):
+        chain = []
+        while tree._parent[dept] is not None:
+            dept = tree._parent[dept]
+            chain.append(dept)
+        return tuple(chain)
+
+    for dept in range(1, 300):
+        assert tree.ancestors(dept) == walk(dept)
+        assert tree.subtree(dept) == {d for d in range(1, 300) if d == dept or dept in walk(d)}
+        assert tree.rollup("staff", dept) == sum(tree.value("staff", d) for d in tree.subtree(dept))
+
+
+def test_org_tree_reads_persisted_quotas_and_reloads_headcount():
+    from src.dao.base import ConnectionPool, ensure_schema
+    from src.dao.department_dao import DepartmentDAO
+    from src.dao.user_dao import UserDAO
+    from src.services.org_tree import QUOTA, STAFF, OrgTree
+
+    pool = ConnectionPool("sqlite:///:memory:", size=2)
+    ensure_schema(pool)
+    depts, users = DepartmentDAO(pool), UserDAO(pool)
+    hq = depts.insert({"name": "HQ"})
+    sales = depts.insert({"name": "Sales", "parent_id": hq})
+    users.insert({"username": "a", "password": "x", "real_name": "A", "dept_id": sales})
+    depts.set_quota(sales, 5)
+    depts.set_quota(hq, 2)
+    depts.set_quota(hq, 3)
+
+    tree = OrgTree(depts, users)
+    assert tree.rollup(QUOTA, hq) == 8 and tree.rollup(STAFF, hq) == 1
+    users.insert_many({"username": f"u{i}", "password": "x", "real_name": "U", "dept_id": hq} for i in range(3))
+    assert tree.rollup(STAFF, hq) == 1
+    tree.reload_headcount()
+    assert tree.rollup(STAFF, hq) == 4 and tree.rollup(STAFF, sales) == 1
+    pool.close()
@@ -0,0 +1,118 @@
+"""Bulk user import tests."""
+import io
+import json
+
+import pytest
+
+from src.dao.base import ConnectionPool, ensure_schema
+from src.dao.user_dao import UserDAO
+from src.services.credentials import UNUSABLE, verify_password
+from src.services.iam_import import UserImporter, import_file, read_csv, read_ldif
+
+LDIF = """\
+dn: ou=people,dc=example,dc=com
+objectClass: organizationalUnit
+ou: people
+
+# a regular entry
+dn: uid=alice,ou=people,dc=example,dc=com
+uid: alice
+cn: Alice Zhang
+mail: alice@example.com
+userPassword: s3cret
+
+dn: uid=bob,ou=people,dc=example,dc=com
+uid: bob
+objectGUID:: 3q2+7w==
+jpegPhoto:: /9j/4AAQSkZJRgABAQ==
+cn:: 5byg5LiJ
+displayName: Bob
+telephoneNumber: 1380000
+ 0000
+departmentNumber: 2
+
+dn: uid=carol,ou=people,dc=example,dc=com
+uid: carol
+cn: Carol
+userPassword: {SSHA}W6ph5Mm5Pz8GgiULbPgzG37mj9g=
+
+dn: uid=dave,ou=people,dc=example,dc=com
+uid: dave
+cn: Dave
+userPassword: {CLEARTEXT}pw
+"""
+
+
+@pytest.fixture
+def dao():
+    pool = ConnectionPool("sqlite:///:memory:", size=3, timeout=0.2)
+    ensure_schema(pool)
+    return UserDAO(pool)
+
+
+def _csv(rows):
+    lines = ["username,real_name,password,email,dept_id"] + [",".join(row) for row in rows]
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def test_ldif_reader_unfolds_decodes_and_skips_binary_and_non_users():
+    rows = list(read_ldif(io.StringIO(LDIF)))
+    assert rows == [
+        {"username": "alice", "real_name": "Alice Zhang", "email": "alice@example.com", "password": "s3cret"},
+        {"username": "bob", "real_name": "张三", "phone": "13800000000", "dept_id": "2"},
+        {"username": "carol", "real_name": "Carol", "password": ""},  # a foreign hash becomes unusable
+        {"username": "dave", "real_name": "Dave", "password": "pw"},
+    ]
+
+
+def test_import_validates_dedupes_and_hashes(dao):
+    dao.insert({"username": "taken", "password": UNUSABLE, "real_name": "Existing", "status": 1})
+    source = _csv([
+        ("u1", "User One", "pw1", "u1@example.com", "1"),
+        ("u2", "User Two", "", "", ""),
+        ("u1", "Again", "pw", "", ""),
+        ("taken", "Dup", "pw", "", ""),
+        ("", "No Name", "pw", "", ""),
+        ("u3", "Bad Dept", "pw", "", "x"),
+        ("u4", "Bad Mail", "pw", "nope", ""),
+    ])
+    report = UserImporter(dao, chunk_size=3, workers=1, iterations=1000).run(read_csv(source))
+    assert (report.total, report.imported, report.duplicates, report.invalid) == (7, 2, 2, 3)
+    assert [error["row"] for error in report.errors] == [5, 6, 7]
+    assert "Missing fields: username" in report.errors[0]["error"]
+
+    u1, u2 = dao.find_by_username("u1"), dao.find_by_username("u2")
+    assert verify_password("pw1", u1["password"]) and u1["dept_id"] == 1 and u1["status"] == 1
+    assert u2["password"] == UNUSABLE and not verify_password("", u2["password"])
+    assert report.to_dict()["users_per_sec"] > 0
+
+
+def test_import_hashes_in_a_process_pool(dao):
+    users = [{"username": f"p{i}", "real_name": f"P {i}", "password": f"pw{i}"} for i in range(10)]
+    report = UserImporter(dao, chunk_size=4, workers=2, iterations=1000).run(iter(users))
+    assert report.imported == 10
+    assert verify_password("pw7", dao.find_by_username("p7")["password"])
+
+
+def test_import_resumes_from_checkpoint(dao, tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text(_csv([(f"r{i}", f"R {i}", "", "", "") for i in range(10)]).getvalue())
+    checkpoint = tmp_path / "users.checkpoint"
+
+    class FlakyDAO(UserDAO):
+        calls = 0
+
+        def insert_many(self, records, batch_size=1000, conn=None):
+            FlakyDAO.calls += 1
+            if FlakyDAO.calls == 3:
+                raise RuntimeError("connection lost")
+            return super().insert_many(records, batch_size, conn)
+
+    with pytest.raises(RuntimeError):
+        import_file(path, dao=FlakyDAO(dao.pool), chunk_size=3, workers=1, checkpoint_path=str(checkpoint))
+    assert json.loads(checkpoint.read_text())["rows"] == 6
+    assert dao.count() == 6
+
+    report = import_file(path, dao=dao, chunk_size=3, workers=1, checkpoint_path=str(checkpoint))
+    assert report.resumed_from == 6 and report.imported == 10 and report.duplicates == 0
+    assert dao.count() == 10 and not checkpoint.exists()
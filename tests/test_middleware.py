@@ -0,0 +1,154 @@
+"""Middleware pipeline tests."""
+from http import HTTPStatus
+
+import pytest
+
+from src.middleware.pipeline import ENDPOINT, StageTimings, compile_pipeline
+from src.web.router import Route, Router
+
+
+class FakeRequest:
+    def __init__(self, user=None, modules=()):
+        self.auth = None
+        self.path = "/api/test"
+        self.client_address = ("10.0.0.1", 5000)
+        self.user = user
+        self.modules = modules
+        self.responses = []
+        self.handled = False
+
+    def current_user(self):
+        return self.user
+
+    def module_allowed(self, module):
+        return module in self.modules
+
+    def respond(self, status, payload, headers=None):
+        self.responses.append((status, payload, headers))
+
+
+def _route(**meta):
+    def handler(request):
+        request.handled = True
+
+    return Route("GET", "/api/test", handler, auth=bool(meta), **meta)
+
+
+def test_stages_run_in_configured_order_and_can_short_circuit():
+    calls = []
+
+    def tracer(name, stop=False):
+        def middleware(call_next):
+            def stage(request, route):
+                calls.append(name)
+                if not stop:
+                    call_next(request, route)
+
+            return stage
+
+        return middleware
+
+    registry = {"a": tracer("a"), "b": tracer("b"), "stop": tracer("stop", stop=True)}
+    request = FakeRequest()
+    compile_pipeline(["a", "b"], registry=registry)(request, _route())
+    assert calls == ["a", "b"] and request.handled
+
+    calls.clear()
+    request = FakeRequest()
+    compile_pipeline(["a", "stop", "b"], registry=registry)(request, _route())
+    assert calls == ["a", "stop"] and not request.handled
+    with pytest.raises(ValueError):
+        compile_pipeline(["a", "missing"], registry=registry)
+
+
+def test_auth_stage_enforces_route_metadata():
+    pipeline = compile_pipeline(["auth"])
+    anonymous = FakeRequest()
+    pipeline(anonymous, _route(module="finance"))
+    assert anonymous.responses[0][0] == HTTPStatus.UNAUTHORIZED and not anonymous.handled
+
+    member = FakeRequest(user=("bob", {"role": "user"}), modules=("oa",))
+    pipeline(member, _route(module="finance"))
+    assert member.responses == [(HTTPStatus.FORBIDDEN, {"error": "forbidden", "module": "finance"}, None)]
+    pipeline(member, _route(admin=True))
+    assert member.responses[-1][0] == HTTPStatus.FORBIDDEN
+
+    pipeline(member, _route(module="oa"))
+    assert member.handled and member.auth == ("bob", {"role": "user"})
+
+
+def test_protected_routes_require_the_auth_stage():
+    router = Router()
+    router.add("GET", "/api/public", lambda request: None)
+    compile_pipeline(["logging"], routes=router.routes())
+    router.add("GET", "/api/items/{item_id}", lambda request: None, module="finance")
+    with pytest.raises(ValueError, match="GET /api/items/{item_id}"):
+        compile_pipeline(["logging", "rate_limit"], routes=router.routes())
+    compile_pipeline(["logging", "auth"], routes=router.routes())
+
+    from src.web.server import ROUTES
+
+    assert {"GET /api/office/feed", "POST /api/run"} <= {f"{r.method} {r.pattern}" for r in ROUTES.routes() if r.auth}
+    with pytest.raises(ValueError):
+        compile_pipeline(["logging", "rate_limit"], routes=ROUTES.routes())
+
+
+def test_timing_hook_reports_each_stage():
+    timings = StageTimings(["logging", "auth"])
+    pipeline = compile_pipeline(["logging", "auth"], hook=timings)
+    for _ in range(10):
+        pipeline(FakeRequest(), _route(module="oa"))  # auth short-circuits, so the handler never runs
+    metrics = timings.metrics()
+    assert list(metrics) == ["logging", "auth", ENDPOINT]
+    assert metrics["logging"]["calls"] == metrics["auth"]["calls"] == 10
+    assert metrics[ENDPOINT]["calls"] == 0
+    assert metrics["logging"]["avg_us"] >= metrics["auth"]["avg_us"] >= 0
+
+
+def test_access_logger_batches_rotates_and_archives(tmp_path):
+    import gzip
+    import json
+
+    from src.jobs.log_archiver import archive
+    from src.middleware.logging_middleware import AccessLogger
+
+    log = AccessLogger("access", directory=str(tmp_path), max_bytes=4096, flush_interval=60, batch_size=20)
+    for i in range(200):
+        log.log((1_700_000_000.5, "GET", f"/api/me?i={i}", "/api/me", 200, 0.0012, "admin", "127.0.0.1"))
+    assert log.flush() == 200 and log.rotations >= 1
+    log.log({"ts": 1_700_000_001.0, "event": "login", "actor": "admin"})
+    log.close()
+
+    rotated = sorted(p.name for p in tmp_path.iterdir() if p.name != "access.jsonl")
+    lines = []
+    for name in rotated + ["access.jsonl"]:
+        lines.extend((tmp_path / name).read_text().splitlines())
+    assert len(lines) == 201
+    first = json.loads(lines[0])
+    assert first["path"] == "/api/me?i=0" and first["duration_ms"] == 1.2 and first["ts"].endswith(".500")
+    assert json.loads(lines[-1])["event"] == "login"
+
+    result = archive(str(tmp_path))
+    assert len(result["files"]) == len(rotated) and result["bytes_out"] < result["bytes_in"]
+    assert (tmp_path / "access.jsonl").exists()
+    restored = gzip.decompress((tmp_path / result["files"][0]).read_bytes()).decode().splitlines()
+    assert restored == lines[: len(restored)]
+
+
+def test_logging_stage_records_status_user_and_capacity(monkeypatch, tmp_path):
+    from src.middleware import logging_middleware
+    from src.middleware.logging_middleware import AccessLogger
+
+    log = AccessLogger("access", directory=str(tmp_path), capacity=2, flush_interval=60)
+    monkeypatch.setattr(logging_middleware, "ACCESS_LOG", log)
+    pipeline = compile_pipeline(["logging", "auth"])
+    for _ in range(3):
+        request = FakeRequest(user=("bob", {"role": "user"}), modules=("oa",))
+        request.path = "/api/test?x=1"
+        request.status = 200
+        pipeline(request, _route(module="oa"))
+    assert log.dropped == 1 and len(log._pending) == 2
+    ts, method, path, route, status, duration, user, client = log._pending[0]
+    assert (method, path, route, status, user, client) == ("GET", "/api/test?x=1", "/api/test", 200, "bob", "10.0.0.1")
+    assert duration >= 0
+    log.close()
@@ -0,0 +1,91 @@
+"""Outbox segment log and relay tests."""
+import os
+
+import pytest
+
+from src.events import outbox as outbox_module
+from src.events.outbox import LocalBroker, Outbox, SegmentLog, encode_message
+from src.services.integration import IntegrationService
+
+
+def test_log_rolls_segments_and_reads_by_offset(tmp_path):
+    log = SegmentLog(str(tmp_path), segment_bytes=512, fsync_interval=0)
+    offsets = [log.append(f"record-{i}".encode()) for i in range(200)]
+    log.flush()
+    assert offsets == list(range(200))
+    assert log.metrics()["segments"] > 1
+    records = log.read(150, max_records=10)
+    assert [o for o, _ in records] == list(range(150, 160))
+    assert records[0][1] == b"record-150"
+    log.close()
+
+
+def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    log = SegmentLog(str(tmp_path), fsync_interval=0)
+    for i in range(10):
+        log.append(b"x" * 20)
+    log.close()
+    segment = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[0])
+    with open(segment, "ab") as fh:
+        fh.write(b"\x0a\x00\x00")  # half a header from an interrupted write
+    reopened = SegmentLog(str(tmp_path), fsync_interval=0)
+    assert reopened.next_offset == 10
+    assert reopened.append(b"next") == 10
+    reopened.flush()
+    assert reopened.read(10)[0] == (10, b"next")
+    reopened.close()
+
+
+def test_relay_delivers_once_and_resumes_from_checkpoint(tmp_path):
+    box = Outbox(str(tmp_path), segment_bytes=2048, fsync_interval=0.001).start()
+    for i in range(500):
+        box.enqueue("kafka", "orders", {"n": i})
+    box.close()
+    assert [m.payload["n"] for m in box.sink.messages("kafka", "orders")] == list(range(500))
+
+    resumed = Outbox(str(tmp_path), sink=box.sink)
+    assert resumed.relay.position == 500
+    resumed.enqueue("rabbitmq", "mail", {"n": 500}, sync=True)
+    assert resumed.relay.poll() == 1
+    # A plain redelivery of seen offsets is dropped; an explicit replay goes through.
+    assert box.sink.publish(box.sink.messages("kafka", "orders")[-5:]) == 0 and box.sink.duplicates == 5
+    assert resumed.relay.replay(495) == 6
+    assert box.sink.replayed == 6 and box.sink.duplicates == 5
+    assert [m.payload["n"] for m in box.sink.messages("kafka", "orders")[-5:]] == list(range(495, 500))
+    assert len(box.sink.messages("kafka", "orders")) == 505
+    fresh = LocalBroker()
+    assert resumed.relay.replay(501 - 3, sink=fresh) == 3 and fresh.replayed == 0
+    resumed.close()
+
+
+def test_relay_retries_after_sink_failure(tmp_path):
+    class FlakySink(LocalBroker):
+        calls = 0
+
+        def publish(self, messages):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("broker down")
+            return super().publish(messages)
+
+    box = Outbox(str(tmp_path), sink=FlakySink(), fsync_interval=0)
+    box.log.append(encode_message("kafka", "t", 1), sync=True)
+    with pytest.raises(ConnectionError):
+        box.relay.poll()
+    assert box.relay.position == 0
+    assert box.relay.poll() == 1
+    box.close()
+
+
+def test_integration_service_writes_to_outbox(tmp_path, monkeypatch):
+    box = Outbox(str(tmp_path), fsync_interval=0)
+    monkeypatch.setattr(outbox_module, "_OUTBOX", box)
+    service = IntegrationService()
+    first = service.kafka_enqueue("events", {"hello": "world"})
+    second = service.rabbitmq_enqueue("mail", {"to": "a@b.c"})
+    assert (first["offset"], second["offset"]) == (0, 1)
+    assert first["topic"] == "events"
+    box.log.flush()
+    box.relay.poll()
+    assert box.sink.messages("rabbitmq", "mail")[0].payload == {"to": "a@b.c"}
+    box.close()
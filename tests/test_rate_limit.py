@@ -0,0 +1,56 @@
+"""Rate limiter tests."""
+import pytest
+
+from src.middleware.rate_limit_middleware import SLIDING_WINDOW, RateLimiter, RateLimits
+
+
+def test_token_bucket_bursts_then_refills():
+    limiter = RateLimiter(10, 1.0, burst=5)
+    assert [limiter.allow("alice", now=100.0) for _ in range(6)] == [True] * 5 + [False]
+    denied = limiter.hit("alice", now=100.0)
+    assert not denied.allowed and denied.retry_after == pytest.approx(0.1)
+    assert limiter.allow("alice", now=100.15)
+    assert not limiter.allow("alice", now=100.15)
+    assert limiter.allow("bob", now=100.15)  # clients are independent
+    assert limiter.hit("alice", now=200.0).remaining == pytest.approx(4)  # refill is capped at the burst
+
+
+def test_sliding_window_weights_previous_window():
+    limiter = RateLimiter(10, 60.0, algorithm=SLIDING_WINDOW)
+    assert sum(limiter.allow("ip", now=t) for t in range(10)) == 10
+    assert not limiter.allow("ip", now=30.0)
+    # Halfway through the next window half of the previous 10 still count.
+    assert sum(limiter.allow("ip", now=90.0) for _ in range(10)) == 5
+    decision = limiter.hit("ip", now=90.0)
+    assert not decision.allowed and 0 < decision.retry_after <= 30.0
+    assert limiter.allow("ip", now=200.0)
+
+
+def test_idle_clients_are_evicted_and_slots_reused():
+    limiter = RateLimiter(5, 1.0, shards=1, idle=10.0)
+    for i in range(100):
+        limiter.allow(f"client{i}", now=0.0)
+    assert len(limiter) == 100
+    assert limiter.sweep(now=5.0) == 0
+    assert limiter.sweep(now=11.0) == 100 and len(limiter) == 0
+    for i in range(50):
+        limiter.allow(f"new{i}", now=12.0)
+    assert limiter.metrics()["slots"] == 100 and len(limiter) == 50
+
+
+def test_limits_resolve_user_then_route_then_default():
+    limits = RateLimits(
+        default={"limit": 100},
+        routes={"POST /api/login": {"limit": 1, "period": 60.0, "algorithm": SLIDING_WINDOW}, "GET /health": None},
+        users={},
+    )
+    assert limits.check("1.2.3.4", "POST", "/api/login").allowed
+    assert not limits.check("1.2.3.4", "POST", "/api/login").allowed
+    assert limits.check("1.2.3.4", "GET", "/health") is None
+    assert limits.limiter_for("GET", "/api/me") is limits.default
+
+    limits.set_user_limit("batch", {"limit": 1, "period": 60.0})
+    assert limits.check("1.2.3.4", "GET", "/api/me", user="batch").allowed
+    assert not limits.check("5.6.7.8", "GET", "/api/me", user="batch").allowed  # keyed by user, not address
+    limits.clear_user_limit("batch")
+    assert limits.check("1.2.3.4", "GET", "/api/me", user="batch").allowed
@@ -0,0 +1,31 @@
+"""Bounded ring store tests."""
+import json
+import threading
+
+from src.common.ring_store import RingStore
+
+
+def test_ring_store_bounds_memory_and_spills_overflow(tmp_path):
+    spill = tmp_path / "feed" / "chat.jsonl"
+    store = RingStore(capacity=3, spill_path=str(spill))
+    ids = []
+
+    def writer():
+        for _ in range(50):
+            record_id = store.next_id()
+            ids.append(record_id)
+            store.append({"id": record_id})
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+
+    assert sorted(ids) == list(range(1, 201))
+    assert len(store) == 3
+    assert len(store.tail(2)) == 2 and store.tail(0) == []
+    spilled = [json.loads(line)["id"] for line in spill.read_text().splitlines()]
+    assert len(spilled) == store.spilled == 197
+    assert sorted(spilled + [r["id"] for r in store]) == list(range(1, 201))
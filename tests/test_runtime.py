@@ -0,0 +1,60 @@
+"""Shared runtime executor tests."""
+import threading
+import time
+
+import pytest
+
+from src.common.exceptions import TaskTimeoutError
+from src.common.runtime import SharedExecutor, executor_metrics, get_executor, run_concurrent
+
+
+def test_run_concurrent_reuses_shared_executor():
+    baseline = threading.active_count()
+    first = run_concurrent([lambda i=i: i * 2 for i in range(10)])
+    for _ in range(20):
+        second = run_concurrent([lambda i=i: i + 1 for i in range(10)])
+    assert first == {i: i * 2 for i in range(10)}
+    assert second == {i: i + 1 for i in range(10)}
+    assert threading.active_count() <= baseline + get_executor().max_workers
+    assert executor_metrics()["completed"] >= 20
+
+
+def test_run_concurrent_caps_in_flight_tasks():
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def task():
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+
+    run_concurrent([task] * 12, max_workers=2)
+    assert state["peak"] <= 2
+
+
+def test_run_concurrent_timeout_returns_partial_results_and_cancels():
+    executor = get_executor()
+    release = threading.Event()
+    tasks = [lambda: "fast"] + [lambda: release.wait(2) and "slow"] * (executor.max_workers + 4)
+    with pytest.raises(TaskTimeoutError) as info:
+        run_concurrent(tasks, timeout=0.1)
+    release.set()
+    assert info.value.results == {0: "fast"}
+    assert len(info.value.pending) == len(tasks) - 1
+    assert executor_metrics()["cancelled"] >= 4
+
+
+def test_shared_executor_resize_and_metrics():
+    executor = SharedExecutor(max_workers=2)
+    assert executor.submit(lambda: 1).result() == 1
+    executor.resize(4)
+    assert executor.submit(lambda: 2).result() == 2
+    metrics = executor.metrics()
+    assert metrics["max_workers"] == 4
+    assert metrics["submitted"] == metrics["completed"] == 2
+    assert metrics["queue_depth"] == metrics["active_workers"] == 0
+    executor.shutdown()
+
@@ -0,0 +1,70 @@
+"""Full-text index tests: tokenising, BM25 ranking, edits and mmap segments."""
+import pytest
+
+from src.common.exceptions import ValidationError
+from src.services.knowledge import KnowledgeService
+from src.services.search_index import SearchIndex, tokenize
+
+
+def _articles(index):
+    index.add(1, "单点登录配置", "如何为门户配置 SSO 单点登录", ["faq"])
+    index.add(2, "VPN setup", "Connect to the VPN before the SSO login page")
+    index.add(3, "差旅报销", "差旅报销需要部门经理审批，SSO 登录后提交")
+    index.add(4, "Printer", "Printer drivers for the office")
+
+
+def test_tokenize_mixes_cjk_bigrams_and_words():
+    assert tokenize("单点登录 SSO_Guide, v2 中") == ["单点", "点登", "登录", "sso", "guide", "v2", "中"]
+    assert tokenize("登录", unigrams=True) == ["登录", "登", "录"]
+
+
+def test_bm25_ranking_modes_and_tag_filter():
+    index = SearchIndex()
+    _articles(index)
+    assert [hit.article_id for hit in index.search("单点登录")] == [1]
+    assert [hit.article_id for hit in index.search("点")] == [1] and index.search("差")[0].article_id == 3
+    assert {hit.article_id for hit in index.search("sso")} == {1, 2, 3}
+    assert index.search("vpn sso")[0].article_id == 2 and len(index.search("vpn sso")) == 1
+    assert [hit.article_id for hit in index.search("vpn printer", mode="or")] in ([2, 4], [4, 2])
+    assert [hit.article_id for hit in index.search("sso", tag="faq")] == [1]
+    assert index.search("office sso") == [] and index.search("  ") == []
+    with pytest.raises(ValidationError):
+        index.search("sso", mode="near")
+
+
+def test_edits_tags_and_segments_survive_reopen(tmp_path):
+    path = str(tmp_path / "kb.idx")
+    index = SearchIndex(path, flush_docs=0)
+    _articles(index)
+    assert index.save() and not index.save()
+
+    index.add(4, "Printer", "Network printer setup")  # edit: old version is tombstoned
+    assert index.tag(2, "network") == ["network"]
+    assert index.delete(3) and not index.delete(3)
+    index.add(5, "网络打印机", "network printer 配置")
+    assert {hit.article_id for hit in index.search("network")} == {2, 4, 5}
+    assert index.search("drivers") == [] and index.search("报销") == []
+    index.close()
+
+    reopened = SearchIndex(path)
+    assert reopened.metrics()["delta_documents"] == 0 and len(reopened) == 4
+    assert reopened.metrics()["segment_documents"] == 4 and reopened.metrics()["deleted"] == 0  # compacted on save
+    assert reopened.search("drivers") == [] and reopened.search("报销") == []
+    assert {hit.article_id for hit in reopened.search("network")} == {2, 4, 5}
+    assert [hit.article_id for hit in reopened.search("打印")] == [5]
+    assert reopened.document(2)["tags"] == ["network"]
+    reopened.add(6, "SSO FAQ", "sso sso sso", ["faq"])  # segment postings followed by delta postings
+    assert [hit.article_id for hit in reopened.search("sso", tag="faq")] == [6, 1]
+    reopened.close()
+
+
+def test_knowledge_service_uses_the_index():
+    service = KnowledgeService(SearchIndex())
+    service.save_article(1, "Reset password", "Use the self-service portal", tags=["faq"])
+    service.save_article(2, "Portal news", "The portal moved")
+    assert service.tag(2, "announcement")["tags"] == ["announcement"]
+    assert [r["article_id"] for r in service.faq("how do I reset my password?")["results"]] == [1]
+    assert service.search("portal")["count"] == 2
+    assert service.document_center("portal news")["results"][0]["title"] == "Portal news"
+    with pytest.raises(ValidationError):
+        service.tag(99, "x")
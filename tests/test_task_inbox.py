@@ -0,0 +1,99 @@
+"""Task inbox index tests."""
+import pytest
+
+from src.workflow.engine import WorkflowEngine
+from src.workflow.process_builder import ProcessRegistry
+from src.workflow.task_inbox import CANCELLED, COMPLETED, OPEN, TaskInbox, decode_cursor, encode_cursor
+
+
+def test_page_walks_newest_first_with_cursor():
+    inbox = TaskInbox()
+    for task_id in range(1, 26):
+        inbox.add(task_id, "alice", {"name": f"t{task_id}"}, created_at=1000.0 + task_id)
+    inbox.add(99, "bob", {"name": "other"}, created_at=1050.0)
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = inbox.page("alice", OPEN, decode_cursor(encode_cursor(cursor)), limit=10)
+        seen.extend(item["id"] for item in items)
+        if cursor is None:
+            break
+    assert seen == list(range(25, 0, -1))
+    assert inbox.count("alice") == 25 and inbox.ids("bob") == [99]
+
+    items, cursor = inbox.page("alice", OPEN, limit=10, newest_first=False)
+    assert [item["id"] for item in items] == list(range(1, 11)) and cursor == (1010.0, 10)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_status_moves_reindex_and_notify():
+    inbox = TaskInbox(closed_capacity=2)
+    subscription = inbox.subscribe("alice")
+    for task_id in (1, 2, 3):
+        inbox.add(task_id, "alice", {}, created_at=float(task_id))
+    inbox.update(1, COMPLETED, action="approve")
+    inbox.update(2, CANCELLED)
+    assert inbox.ids("alice", OPEN) == [3]
+    assert inbox.get(1)["action"] == "approve" and inbox.ids("alice", CANCELLED) == [2]
+
+    inbox.update(3, COMPLETED)
+    assert inbox.get(1) is None and inbox.ids("alice", COMPLETED) == [3]  # oldest closed task evicted
+
+    types = []
+    while (notice := subscription.get(timeout=0)) is not None:
+        types.append(notice["type"])
+    assert types == ["task.opened"] * 3 + ["task.completed", "task.cancelled", "task.completed"]
+    inbox.unsubscribe(subscription)
+    assert inbox.subscriber_count() == 0
+
+
+def test_engine_keeps_inbox_in_sync():
+    registry, inbox = ProcessRegistry(), TaskInbox()
+    engine = WorkflowEngine(registry=registry, inbox=inbox)
+    engine.deploy(
+        {
+            "key": "leave",
+            "nodes": [
+                {"id": "start", "type": "start"},
+                {"id": "review", "type": "user_task", "assignee": "$approver"},
+                {"id": "end", "type": "end"},
+            ],
+            "edges": [{"from": "start", "to": "review"}, {"from": "review", "to": "end"}],
+        }
+    )
+    first = engine.start("leave", {"approver": "alice"})
+    engine.start("leave", {"approver": "alice"})
+    items, _ = inbox.page("alice")
+    assert len(items) == 2 and items[0]["process"] == "leave"
+    task_id = next(item["id"] for item in items if item["instance_id"] == first.id)
+
+    engine.complete(task_id, "approve", comment="ok")
+    assert inbox.count("alice", OPEN) == 1
+    assert inbox.get(task_id)["status"] == COMPLETED and inbox.get(task_id)["comment"] == "ok"
+    assert [task.id for task in engine.open_tasks("alice")] == inbox.ids("alice")
+
+
+def test_mobile_approve_only_lets_the_assignee_decide(monkeypatch):
+    from src.services import mobile
+
+    engine = WorkflowEngine(registry=ProcessRegistry(), inbox=TaskInbox())
+    engine.deploy(
+        {
+            "key": "leave",
+            "nodes": [
+                {"id": "start", "type": "start"},
+                {"id": "review", "type": "user_task", "assignee": "$approver"},
+                {"id": "end", "type": "end"},
+            ],
+            "edges": [{"from": "start", "to": "review"}, {"from": "review", "to": "end"}],
+        }
+    )
+    monkeypatch.setattr(mobile, "get_engine", lambda: engine)
+    engine.start("leave", {"approver": "alice"})
+    task_id = engine.inbox.ids("alice")[0]
+
+    service = mobile.MobileService()
+    assert service.approve(task_id, "mallory") == {"action": "mobile_approve", "task_id": task_id, "ok": False, "error": "task not found"}
+    assert engine.inbox.get(task_id)["status"] == OPEN
+    assert service.approve(task_id, "alice", "reject")["ok"]
@@ -0,0 +1,261 @@
+"""Web server tests."""
+import http.client
+import json
+import threading
+import time
+
+from src.web.server import DemoHandler, make_server
+
+
+def _start_server():
+    server = make_server("127.0.0.1", 0, threaded=True, max_workers=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _request(port, method, path, body=None, cookie=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Cookie": cookie} if cookie else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+def _login(port):
+    resp, _ = _request(port, "POST", "/api/login", {"username": "admin", "password": "admin"})
+    return resp.getheader("Set-Cookie").split(";", 1)[0]
+
+
+def test_slow_run_does_not_block_other_requests():
+    DemoHandler.task_registry["test:slow"] = ("iam", lambda user: time.sleep(0.5) or {"slow": True})
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        cookie = _login(port)
+        slow = threading.Thread(target=_request, args=(port, "POST", "/api/run", {"tasks": ["test:slow"]}, cookie))
+        slow.start()
+        time.sleep(0.05)
+        started = time.perf_counter()
+        resp, body = _request(port, "GET", "/api/me", cookie=cookie)
+        assert resp.status == 200
+        assert json.loads(body)["username"] == "admin"
+        assert time.perf_counter() - started < 0.4
+        slow.join()
+    finally:
+        DemoHandler.task_registry.pop("test:slow", None)
+        server.shutdown()
+        server.server_close()
+
+
+def test_run_stream_yields_results_as_tasks_finish():
+    DemoHandler.task_registry["test:slow"] = ("iam", lambda user: time.sleep(0.5) or {"slow": True})
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        cookie = _login(port)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        body = json.dumps({"tasks": ["test:slow", "iam:sync_ldap"]})
+        started = time.perf_counter()
+        conn.request("POST", "/api/run/stream", body=body, headers={"Cookie": cookie})
+        resp = conn.getresponse()
+        assert resp.getheader("Content-Type") == "application/x-ndjson"
+        first = json.loads(resp.readline())
+        assert first["task"] == "iam:sync_ldap"
+        assert time.perf_counter() - started < 0.4
+        second = json.loads(resp.readline())
+        assert second == {"index": 0, "task": "test:slow", "result": {"slow": True}}
+        assert json.loads(resp.readline()) == {"done": True, "user": "admin", "pending": []}
+        conn.close()
+    finally:
+        DemoHandler.task_registry.pop("test:slow", None)
+        server.shutdown()
+        server.server_close()
+
+
+def test_router_resolves_literal_and_parameter_routes():
+    from src.web.router import Router
+
+    router = Router()
+    router.add("GET", "/api/users", "list")
+    router.add("GET", "/api/users/{name}", "detail", module="iam")
+    router.add("GET", "/api/users/{name}/roles", "roles")
+    router.add("GET", "/api/users/me/settings", "settings")
+
+    route, params = router.resolve("GET", "/api/users")
+    assert route.handler == "list" and params == {}
+    route, params = router.resolve("GET", "/api/users/alice")
+    assert route.handler == "detail" and params == {"name": "alice"} and route.auth
+    route, params = router.resolve("GET", "/api/users/me/roles")
+    assert route.handler == "roles" and params == {"name": "me"}
+    assert router.resolve("GET", "/api/users/me/settings")[0].handler == "settings"
+    assert router.resolve("POST", "/api/users/alice") is None
+    assert router.resolve("GET", "/api/users/alice/unknown") is None
+
+
+def test_static_routes_are_exact_and_guarded():
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        resp, body = _request(port, "GET", "/static/app.js")
+        assert resp.status == 200 and body
+        resp, _ = _request(port, "GET", "/dashboard.html")
+        assert resp.status == 302 and resp.getheader("Location") == "/login.html"
+        resp, _ = _request(port, "GET", "/login.html")
+        assert resp.status == 200
+        resp, _ = _request(port, "GET", "/static/../server.py")
+        assert resp.status == 404
+        resp, _ = _request(port, "GET", "/api/me")
+        assert resp.status == 401
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_static_assets_are_cached_with_etag_and_gzip(tmp_path):
+    import gzip
+    import os
+
+    from src.web.static_assets import StaticAssetCache
+
+    page = tmp_path / "page.js"
+    page.write_text("console.log('hello');\n" * 100)
+    cache = StaticAssetCache(tmp_path, check_interval=0)
+    assert cache.preload() == 1
+    asset = cache.get(page)
+    encoding, body = asset.variant("gzip, deflate, br;q=0")
+    assert encoding == "gzip" and gzip.decompress(body) == page.read_bytes()
+    assert asset.variant("identity") == (None, page.read_bytes())
+
+    page.write_text("changed")
+    os.utime(page, ns=(asset.mtime_ns + 10**9, asset.mtime_ns + 10**9))
+    refreshed = cache.get(page)
+    assert refreshed.body == b"changed" and refreshed.etag != asset.etag
+
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        resp, _ = _request(port, "GET", "/static/style.css")
+        etag = resp.getheader("ETag")
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/static/style.css", headers={"If-None-Match": etag})
+        resp = conn.getresponse()
+        assert resp.status == 304 and resp.read() == b""
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_session_store_expires_and_shares_sqlite_backend(tmp_path):
+    from src.web.sessions import SQLiteSessionBackend, SessionStore
+
+    now = [1000.0]
+    store = SessionStore(ttl=60, clock=lambda: now[0])
+    token = store.create("alice")
+    stale = store.create("bob")
+    assert store.get(token) == "alice"
+    now[0] += 45
+    assert store.get(token) == "alice"  # renewed past half-life
+    now[0] += 30
+    assert store.get(token) == "alice"
+    assert store.get(stale) is None and len(store) == 1
+    now[0] += 61
+    assert store.sweep() == 1 and len(store) == 0
+
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SessionStore(SQLiteSessionBackend(path), ttl=60)
+    second = SessionStore(SQLiteSessionBackend(path), ttl=60)
+    token = first.create("carol")
+    assert second.get(token) == "carol"
+    assert second.pop(token) == "carol"
+    assert first.get(token) is None
+
+
+def test_modules_response_is_cached_per_module_set():
+    from src.web import server as web
+
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        cookie = _login(port)
+        resp, body = _request(port, "GET", "/api/modules", cookie=cookie)
+        etag = resp.getheader("ETag")
+        assert resp.status == 200 and etag
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/api/modules", headers={"Cookie": cookie, "If-None-Match": etag})
+        assert conn.getresponse().status == 304
+        conn.close()
+
+        _request(port, "POST", "/api/users", {"username": "cache-user", "password": "pw", "modules": ["oa"]}, cookie)
+        assert web.USER_DB["cache-user"]["password"].startswith("pbkdf2_sha256$")
+        assert _request(port, "POST", "/api/login", {"username": "cache-user", "password": "nope"})[0].status == 401
+        resp, _ = _request(port, "POST", "/api/login", {"username": "cache-user", "password": "pw"})
+        user_cookie = resp.getheader("Set-Cookie").split(";", 1)[0]
+        resp, user_body = _request(port, "GET", "/api/modules", cookie=user_cookie)
+        assert [m["key"] for m in json.loads(user_body)["modules"]] == ["oa"]
+        assert resp.getheader("ETag") != etag
+
+        web.update_module_meta("oa", web.MODULE_META["oa"] | {"path": "/oa-v2.html"})
+        _, user_body = _request(port, "GET", "/api/modules", cookie=user_cookie)
+        assert json.loads(user_body)["modules"][0]["path"] == "/oa-v2.html"
+    finally:
+        web.MODULE_META["oa"]["path"] = "/oa.html"
+        web.RESPONSE_CACHE.clear()
+        web.USER_DB.pop("cache-user", None)
+        server.shutdown()
+        server.server_close()
+
+
+def test_oa_approval_lands_in_approver_todos(monkeypatch):
+    import src.workflow.engine as engine_module
+    from src.workflow.task_inbox import TaskInbox
+
+    monkeypatch.setattr(engine_module, "_ENGINE", engine_module.WorkflowEngine(inbox=TaskInbox()))
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        cookie = _login(port)
+        for title in ("trip", "laptop", "leave"):
+            resp, _ = _request(port, "POST", "/api/oa/approval", {"form": {"title": title}}, cookie)
+            assert resp.status == 200
+        resp, body = _request(port, "GET", "/api/todos?limit=2", cookie=cookie)
+        page = json.loads(body)
+        assert page["total"] == 3 and [i["variables"]["form"]["title"] for i in page["items"]] == ["leave", "laptop"]
+        resp, body = _request(port, "GET", f"/api/todos?limit=2&cursor={page['next_cursor']}", cookie=cookie)
+        assert [i["variables"]["form"]["title"] for i in json.loads(body)["items"]] == ["trip"]
+        resp, _ = _request(port, "GET", "/api/todos?cursor=bogus", cookie=cookie)
+        assert resp.status == 400
+        resp, body = _request(port, "POST", "/api/run", {"tasks": ["portal:todo"]}, cookie)
+        todo = json.loads(body)["results"]["portal:todo"]
+        assert todo["assignee"] == "admin" and todo["total"] == 3
+
+        task_id = page["items"][0]["id"]
+        resp, body = _request(port, "POST", f"/api/todos/{task_id}/complete", {"action": "reject"}, cookie)
+        assert resp.status == 200 and json.loads(body)["status"] == "rejected"
+        resp, _ = _request(port, "POST", f"/api/todos/{task_id}/complete", {"action": "approve"}, cookie)
+        assert resp.status == 409
+        resp, body = _request(port, "GET", "/api/todos?status=completed", cookie=cookie)
+        assert [i["action"] for i in json.loads(body)["items"]] == ["reject"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_rate_limited_requests_get_429(monkeypatch):
+    from src.middleware.rate_limit_middleware import RateLimits
+
+    monkeypatch.setattr("src.middleware.rate_limit_middleware.LIMITS", RateLimits(default={"limit": 3, "period": 60.0}, routes={}, users={}))
+    server = _start_server()
+    port = server.server_address[1]
+    try:
+        cookie = _login(port)
+        statuses = [_request(port, "GET", "/api/me", cookie=cookie)[0].status for _ in range(3)]
+        resp, body = _request(port, "GET", "/api/me", cookie=cookie)
+        assert statuses == [200, 200, 200]  # the login was charged to the client address, not the user
+        assert resp.status == 429 and int(resp.getheader("Retry-After")) >= 1
+        assert json.loads(body)["error"] == "rate limit exceeded"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,4 +1,169 @@
-"""Basic smoke test for ${f}."""
+"""Workflow compiler and engine tests."""
+import pytest
+
+from src.common.exceptions import ValidationError
+from src.dao.base import ConnectionPool, ensure_schema
+from src.workflow import task_executor
+from src.workflow.engine import APPROVED, REJECTED, REVOKED, RUNNING, TransitionWriter, WorkflowEngine
+from src.workflow.process_builder import ProcessRegistry, compile_definition
+
+EXPENSE = {
+    "key": "expense",
+    "name": "Expense approval",
+    "version": 1,
+    "nodes": [
+        {"id": "start", "type": "start"},
+        {"id": "manager", "type": "user_task", "assignee": "$manager_id"},
+        {"id": "decide", "type": "exclusive"},
+        {"id": "fork", "type": "parallel"},
+        {"id": "finance", "type": "user_task", "assignee": 9},
+        {"id": "book", "type": "service_task", "action": "test.book"},
+        {"id": "join", "type": "parallel"},
+        {"id": "done", "type": "end"},
+        {"id": "rejected", "type": "end", "status": "rejected"},
+    ],
+    "edges": [
+        {"from": "start", "to": "manager"},
+        {"from": "manager", "to": "decide"},
+        {"from": "decide", "to": "fork", "condition": "approved"},
+        {"from": "decide", "to": "rejected"},
+        {"from": "fork", "to": "finance"},
+        {"from": "fork", "to": "book"},
+        {"from": "finance", "to": "join"},
+        {"from": "book", "to": "join"},
+        {"from": "join", "to": "done"},
+    ],
+}
+
+
+@task_executor.register("test.book")
+def _book(task, variables):
+    return {"booked": variables.get("amount")}
+
+
+@task_executor.register("test.post")
+def _post(task, variables):
+    if variables.get("ledger_down"):
+        raise RuntimeError("ledger unavailable")
+    return {"posted": True}
+
 
 def test_smoke():
     assert True
+
+
+def test_compiled_graph_is_cached_and_validated():
+    registry = ProcessRegistry()
+    first = registry.deploy(EXPENSE)
+    assert registry.deploy(dict(EXPENSE)) is first
+    assert registry.compilations == 1
+    assert first.node("join").join_count == 2
+    assert registry.get("expense") is first
+    with pytest.raises(ValidationError):
+        compile_definition({"key": "broken", "nodes": [{"id": "s", "type": "start"}], "edges": []})
+    no_default = dict(EXPENSE, edges=[e for e in EXPENSE["edges"] if e != {"from": "decide", "to": "rejected"}])
+    with pytest.raises(ValidationError, match="decide"):
+        compile_definition(no_default)
+    bad_end = dict(EXPENSE, nodes=[n if n["id"] != "done" else dict(n, status="archived") for n in EXPENSE["nodes"]])
+    with pytest.raises(ValidationError, match="archived"):
+        compile_definition(bad_end)
+
+
+def test_parallel_branches_join_and_finish():
+    engine = WorkflowEngine(registry=ProcessRegistry())
+    engine.deploy(EXPENSE)
+    instance = engine.start("expense", {"manager_id": 5, "amount": 120})
+    (manager_task,) = engine.open_tasks(assignee=5)
+    engine.complete(manager_task.id, "approve")
+    assert engine.drain(5)
+    (finance_task,) = engine.open_tasks(assignee=9)
+    assert instance.status == RUNNING
+    engine.complete(finance_task.id)
+    assert engine.drain(5)
+    assert instance.status == APPROVED
+    assert instance.variables["booked"] == 120
+    assert engine.open_tasks() == []
+
+
+def test_rejection_and_revocation():
+    engine = WorkflowEngine(registry=ProcessRegistry())
+    engine.deploy(EXPENSE)
+    rejected = engine.start("expense", {"manager_id": 1})
+    engine.complete(engine.open_tasks()[0].id, "reject")
+    assert rejected.status == REJECTED
+
+    revoked = engine.start("expense", {"manager_id": 2})
+    engine.revoke(revoked.id)
+    assert revoked.status == REVOKED
+    assert engine.open_tasks(assignee=2) == []
+    with pytest.raises(ValidationError):
+        engine.revoke(revoked.id)
+
+
+def test_failed_advance_reopens_the_completed_task():
+    engine = WorkflowEngine(registry=ProcessRegistry())
+    engine.deploy({
+        "key": "posting",
+        "nodes": [
+            {"id": "start", "type": "start"},
+            {"id": "review", "type": "user_task", "assignee": 6},
+            {"id": "post", "type": "service_task", "action": "test.post"},
+            {"id": "end", "type": "end"},
+        ],
+        "edges": [{"from": "start", "to": "review"}, {"from": "review", "to": "post"}, {"from": "post", "to": "end"}],
+    })
+    instance = engine.start("posting")
+    (task,) = engine.open_tasks(assignee=6)
+    with pytest.raises(RuntimeError):
+        engine.complete(task.id, variables={"ledger_down": True})
+    assert instance.status == RUNNING and instance.open_tasks == {task.id}
+    assert "ledger_down" not in instance.variables
+    engine.complete(task.id)
+    assert instance.status == APPROVED and instance.variables["posted"]
+
+
+def test_transitions_are_persisted_in_batches():
+    pool = ConnectionPool("sqlite:///:memory:", size=2)
+    ensure_schema(pool)
+    writer = TransitionWriter(pool, batch_size=100)
+    engine = WorkflowEngine(registry=ProcessRegistry(), writer=writer)
+    engine.deploy(EXPENSE)
+    instances = [engine.start("expense", {"manager_id": 3}) for _ in range(50)]
+    for task in engine.open_tasks():
+        engine.complete(task.id, "reject", comment="no budget")
+    assert writer.flush() == 200  # instances + tasks + completions + status changes
+    assert writer.flushes == 1
+    assert writer.instances.count("status = ?", (REJECTED,)) == 50
+    assert writer.tasks.count("action = 'reject' AND completed_at IS NOT NULL") == 50
+    assert writer.next_ids() == (instances[-1].id + 1, 51)
+    pool.close()
+
+
+def test_open_tasks_reload_and_finished_instances_are_evicted():
+    from src.dao.user_dao import UserDAO
+
+    pool = ConnectionPool("sqlite:///:memory:", size=2)
+    ensure_schema(pool)
+    carol = UserDAO(pool).insert({"username": "carol", "password": "x", "real_name": "Carol"})
+    writer = TransitionWriter(pool)
+    engine = WorkflowEngine(registry=ProcessRegistry(), writer=writer)
+    engine.deploy(EXPENSE)
+    done = engine.start("expense", {"manager_id": 4})
+    engine.complete(engine.open_tasks(assignee=4)[0].id, "reject")
+    waiting = engine.start("expense", {"manager_id": "carol"})
+    assert done.status == REJECTED and engine.metrics()["instances"]["rejected"] == 1
+    with pytest.raises(ValidationError):
+        engine.instance(done.id)  # dropped once finished
+    writer.flush()
+    assert writer.tasks.count("assignee_id = ?", (carol,)) == 1
+
+    restarted = WorkflowEngine(registry=ProcessRegistry(), writer=writer)
+    assert restarted.open_tasks() == []  # nothing deployed yet
+    restarted.deploy(EXPENSE)
+    (task,) = restarted.open_tasks(assignee="carol")
+    assert task.instance.id == waiting.id and task.node.id == "manager"
+    restarted.deploy(EXPENSE)
+    assert len(restarted.open_tasks()) == 1
+    restarted.complete(task.id, "reject")
+    assert restarted.metrics()["instances"]["rejected"] == 1
+    pool.close()